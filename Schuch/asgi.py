@@ -26,7 +26,7 @@ application = ProtocolTypeRouter({
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
             URLRouter(
-                chat.routing.websocket_urlpatterns +
+                chat.routing.websocket_urlpatterns
             )
         )
     ),
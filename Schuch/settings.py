@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -336,32 +337,78 @@ SOCIALACCOUNT_PROVIDERS = {
 
 FIELD_ENCRYPTION_KEY = 'JFkYsizDtDsUc1MTl5RogD_uPnyRB0wWFAZ5VtKRqow='
 
-# WebSocket support enabled for WebRTC signaling only
+# WebSocket support (WebRTC-Signaling, Chat-Push)
 ASGI_APPLICATION = 'Schuch.asgi.application'
 
+# Redis-Deployment (mehrere daphne/gunicorn-Worker): SHARED_STATE_BACKEND=redis
+# setzt Channel-Layer UND Cache auf Redis, damit Call-Signaling, Chat-Push und
+# Rate-Limits über alle Prozesse hinweg funktionieren. Ohne ENV-Variable (und
+# immer in Tests) bleibt es beim prozesslokalen Speicher.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test' or 'pytest' in sys.modules
+USE_REDIS_SHARED_STATE = os.getenv('SHARED_STATE_BACKEND') == 'redis' and not TESTING
+
 # Channel Layers for WebSocket support
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+if USE_REDIS_SHARED_STATE:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.getenv('REDIS_CHANNELS_URL', 'redis://localhost:6379/2')],
+                "prefix": "workloom:asgi",
+                "capacity": int(os.getenv('CHANNEL_CAPACITY', '500')),
+                "expiry": 60,
+                "group_expiry": 86400,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
     }
-}
 
 # Allow same-origin iframes for content editor
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
 # Caching configuration for rate limiting
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,
-            'CULL_FREQUENCY': 3,
+if USE_REDIS_SHARED_STATE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+            # Eigener Namensraum, falls sich mehrere Instanzen einen Redis teilen
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'workloom'),
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                # Ein Pool pro Prozess; bei Erschöpfung warten statt Fehler werfen
+                'pool_class': 'redis.BlockingConnectionPool',
+                'max_connections': int(os.getenv('REDIS_CACHE_MAX_CONNECTIONS', '50')),
+                'timeout': 5,
+                'socket_connect_timeout': 2,
+                'socket_timeout': 2,
+                'retry_on_timeout': True,
+                'health_check_interval': 30,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000,
+                'CULL_FREQUENCY': 3,
+            }
         }
     }
-}
 
 # Video hosting without processing - direct file serving
+# VIDEO_ACCEL_REDIRECT=/protected-media/ → videos:stream übergibt die Auslieferung
+# per X-Accel-Redirect an nginx (internal-Location auf MEDIA_ROOT, siehe
+# docs/setup/NGINX_SETUP_GUIDE.md). Leer = Django streamt selbst (Range-genau).
+VIDEO_ACCEL_REDIRECT = os.getenv('VIDEO_ACCEL_REDIRECT', '')
 
 # Stripe Settings
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', '')
@@ -477,10 +524,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'mail_app.tasks.sync_emails',
         'schedule': MAIL_APP_SETTINGS['EMAIL_SYNC_INTERVAL'],
     },
+    'chat-expire-stale-calls': {
+        'task': 'chat.tasks.expire_stale_calls',
+        'schedule': 60.0,  # jede Minute: nicht angenommene Anrufe nach 5 Min auf 'missed' setzen
+    },
     'send-loomline-notifications': {
         'task': 'loomline.tasks.send_scheduled_notifications',
         'schedule': 300.0,  # Every 5 minutes
     },
+    'videos-recover-stale-uploads': {
+        'task': 'videos.tasks.recover_stale_uploads',
+        'schedule': 600.0,  # alle 10 Min: hängende Chunked-Upload-Finalisierungen neu anstoßen
+    },
     'cleanup-stuck-scenes': {
         'task': 'video.tasks.cleanup_stuck_scenes',
         'schedule': 300.0,  # Every 5 minutes
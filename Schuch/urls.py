@@ -41,6 +41,9 @@ urlpatterns = [
     path('social/', core_views.social_page_view, name='social_page'),
     path('social/click/<int:button_id>/', core_views.social_button_click, name='social_button_click'),
 
+    # Hintergrund-Jobs (core.async_decorator.async_task_view)
+    path('jobs/<str:job_id>/', core_views.async_job_status, name='async_job_status'),
+
     # LinkLoom - Multi-User Link-in-Bio
     path('linkloom/', include('linkloom.urls')),
     path('l/<slug:slug>/', linkloom_views.public_page_view, name='linkloom_public'),
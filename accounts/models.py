@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.db import models
 from encrypted_model_fields.fields import EncryptedCharField, EncryptedTextField
 from django.db.models import Sum, Q
@@ -109,12 +111,11 @@ class CustomUser(AbstractUser):
     
     def get_unread_chat_count(self):
         """Gibt die Anzahl ungelesener Chat-Nachrichten zurück"""
-        from chat.models import ChatRoom
-        
-        total_unread = 0
-        for room in self.chat_rooms.all():
-            total_unread += room.get_unread_count(self)
-        return total_unread
+        from chat.models import ChatRoomParticipant
+
+        # Denormalisierte Zähler pro Raum – eine Abfrage statt eines Anti-Joins pro Raum
+        total = ChatRoomParticipant.objects.filter(user=self).aggregate(total=Sum('unread_count'))['total']
+        return total or 0
     
     def is_currently_online(self):
         """Prüft ob der User als online betrachtet wird (letzte Aktivität < 5 Minuten)"""
@@ -1148,9 +1149,7 @@ class FeatureAccess(models.Model):
         elif self.subscription_required == 'any_paid':
             return FeatureAccessService.has_premium_access(user)
         elif self.subscription_required == 'storage_plan':
-            # Prüfe ob User einen Storage-Plan hat
-            subscription = FeatureAccessService.get_user_active_subscription(user)
-            return subscription and subscription.plan.plan_type == 'storage' and subscription.plan.price > 0
+            return FeatureAccessService.has_storage_plan(user)
         
         return False
     
@@ -1168,19 +1167,47 @@ class FeatureAccess(models.Model):
         }
         return messages.get(self.subscription_required, 'Ein Upgrade ist erforderlich um diese Funktion zu nutzen.')
     
+    RULES_CACHE_KEY = 'feature_access:rules'
+    RULES_CACHE_TTL = 3600
+    LOCAL_RULES_CACHE_TTL = 60  # prozesslokaler Cache: Signal erreicht andere Worker nicht
+    
+    @classmethod
+    def get_active_rules(cls, user=None):
+        """
+        Aktive Regeln als {app_name: FeatureAccess}. Liegt im Cache (Invalidierung
+        per Signal in accounts.signals) und wird pro Request am User gemerkt.
+        """
+        rules = getattr(user, '_feature_access_rules', None)
+        if rules is not None:
+            return rules
+        
+        rules = cache.get(cls.RULES_CACHE_KEY)
+        if rules is None:
+            rules = {feature.app_name: feature for feature in cls.objects.filter(is_active=True)}
+            shared = getattr(settings, 'USE_REDIS_SHARED_STATE', False)
+            cache.set(cls.RULES_CACHE_KEY, rules, cls.RULES_CACHE_TTL if shared else cls.LOCAL_RULES_CACHE_TTL)
+        
+        if user is not None:
+            user._feature_access_rules = rules
+        return rules
+    
+    @classmethod
+    def invalidate_rules_cache(cls):
+        cache.delete(cls.RULES_CACHE_KEY)
+    
     @classmethod
     def user_can_access_app(cls, app_name, user):
         """Klassenmethod um schnell zu prüfen ob ein User auf eine App zugreifen kann"""
-        try:
-            feature = cls.objects.get(app_name=app_name, is_active=True)
+        feature = cls.get_active_rules(user).get(app_name)
+        if feature is not None:
             return feature.user_has_access(user)
-        except cls.DoesNotExist:
-            # Wenn keine FeatureAccess-Regel existiert, prüfe alte AppPermission
-            if AppPermission.objects.filter(app_name=app_name).exists():
-                return AppPermission.user_has_access(app_name, user)
-            
-            # Standard: Kostenlos verfügbar für angemeldete Benutzer
-            return user and user.is_authenticated
+        
+        # Wenn keine FeatureAccess-Regel existiert, prüfe alte AppPermission
+        if AppPermission.objects.filter(app_name=app_name).exists():
+            return AppPermission.user_has_access(app_name, user)
+        
+        # Standard: Kostenlos verfügbar für angemeldete Benutzer
+        return user and user.is_authenticated
     
     @classmethod
     def get_user_accessible_apps(cls, user):
@@ -1,9 +1,9 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import UserLoginHistory
+from .models import FeatureAccess, UserLoginHistory
 
 User = get_user_model()
 
@@ -180,4 +180,11 @@ def get_client_ip(request):
         ip = x_forwarded_for.split(',')[0]
     else:
         ip = request.META.get('REMOTE_ADDR')
-    return ip
\ No newline at end of file
+    return ip
+
+
+@receiver(post_save, sender=FeatureAccess)
+@receiver(post_delete, sender=FeatureAccess)
+def invalidate_feature_access_rules(sender, instance, **kwargs):
+    """Gecachte Zugriffsregeln nach Änderung im Admin verwerfen"""
+    FeatureAccess.invalidate_rules_cache()
@@ -16,7 +16,7 @@ class ChatRoomAdmin(admin.ModelAdmin):
 
 @admin.register(ChatRoomParticipant)
 class ChatRoomParticipantAdmin(admin.ModelAdmin):
-    list_display = ('user', 'chat_room', 'joined_at', 'last_read_at', 'is_active')
+    list_display = ('user', 'chat_room', 'joined_at', 'last_read_at', 'unread_count', 'is_active')
     list_filter = ('is_active', 'joined_at')
     search_fields = ('user__username', 'chat_room__name')
 
@@ -2,7 +2,10 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
 from .models import ChatRoom, Call
+from . import realtime
 
 
 class CallConsumer(AsyncWebsocketConsumer):
@@ -71,4 +74,150 @@ class CallConsumer(AsyncWebsocketConsumer):
         message = event['message']
         
         # Send message to WebSocket
-        await self.send(text_data=json.dumps(message))
\ No newline at end of file
+        await self.send(text_data=json.dumps(message))
+
+
+class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Realtime-Kanal für den Chat (ein Socket pro Browser-Tab).
+
+    Client -> Server (JSON):
+        {"action": "join",   "room_id": 5}
+        {"action": "leave",  "room_id": 5}
+        {"action": "typing", "room_id": 5, "typing": true}
+        {"action": "read",   "room_id": 5, "last_message_id": 123}
+        {"action": "ping"}
+
+    Server -> Client: type = message | read | typing | presence | activity | joined | error | pong
+
+    Ein offener Chat erzeugt damit nur noch DB-Last, wenn tatsächlich etwas
+    passiert – das Polling in home_new.html läuft nur noch als Fallback.
+    """
+    # Verbindungszähler je User (mehrere Tabs) für die Präsenz
+    PRESENCE_KEY = 'chat:presence:{}'
+    PRESENCE_TTL = 24 * 60 * 60
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        self.rooms = set()
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+        await self.channel_layer.group_add(realtime.user_group(self.user.id), self.channel_name)
+        await self.accept()
+        await self.set_presence(+1)
+
+    async def disconnect(self, close_code):
+        if not self.user or not self.user.is_authenticated:
+            return
+        still_online = await self.set_presence(-1)
+        for room_id in list(self.rooms):
+            if not still_online:
+                await self.channel_layer.group_send(realtime.room_group(room_id), {
+                    'type': 'chat.presence', 'user_id': self.user.id, 'online': False,
+                })
+            await self.channel_layer.group_discard(realtime.room_group(room_id), self.channel_name)
+        await self.channel_layer.group_discard(realtime.user_group(self.user.id), self.channel_name)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            action = data.get('action')
+            room_id = int(data['room_id']) if data.get('room_id') else None
+        except (ValueError, TypeError, KeyError):
+            await self.send_json({'type': 'error', 'error': 'Ungültige Nachricht'})
+            return
+
+        if action == 'ping':
+            await self.send_json({'type': 'pong'})
+            return
+        if room_id is None:
+            await self.send_json({'type': 'error', 'error': 'room_id fehlt'})
+            return
+
+        if action == 'join':
+            if not await self.is_participant(room_id):
+                await self.send_json({'type': 'error', 'room_id': room_id, 'error': 'Zugriff verweigert'})
+                return
+            self.rooms.add(room_id)
+            await self.channel_layer.group_add(realtime.room_group(room_id), self.channel_name)
+            await self.send_json({'type': 'joined', 'room_id': room_id})
+            await self.channel_layer.group_send(realtime.room_group(room_id), {
+                'type': 'chat.presence', 'user_id': self.user.id, 'online': True,
+            })
+        elif action == 'leave':
+            self.rooms.discard(room_id)
+            await self.channel_layer.group_discard(realtime.room_group(room_id), self.channel_name)
+        elif room_id not in self.rooms:
+            await self.send_json({'type': 'error', 'room_id': room_id, 'error': 'Raum nicht beigetreten'})
+        elif action == 'typing':
+            await self.channel_layer.group_send(realtime.room_group(room_id), {
+                'type': 'chat.typing', 'room_id': room_id, 'user_id': self.user.id,
+                'user_name': self.user.get_full_name() or self.user.username,
+                'typing': bool(data.get('typing', True)),
+            })
+        elif action == 'read':
+            # Lesebestätigung wird in mark_room_read nach dem Commit verteilt
+            await self.mark_read(room_id, data.get('last_message_id'))
+
+    async def send_json(self, payload):
+        await self.send(text_data=json.dumps(payload))
+
+    @database_sync_to_async
+    def is_participant(self, room_id):
+        return ChatRoom.objects.filter(id=room_id, participants=self.user).exists()
+
+    @database_sync_to_async
+    def mark_read(self, room_id, last_message_id):
+        from .utils import mark_room_read
+        room = ChatRoom.objects.filter(id=room_id).first()
+        if room:
+            try:
+                up_to = int(last_message_id) if last_message_id else None
+            except (TypeError, ValueError):
+                up_to = None
+            mark_room_read(self.user, room, up_to_id=up_to)
+
+    @database_sync_to_async
+    def set_presence(self, delta):
+        """Zählt offene Sockets des Users; True solange mindestens einer offen ist."""
+        key = self.PRESENCE_KEY.format(self.user.id)
+        cache.add(key, 0, self.PRESENCE_TTL)
+        try:
+            count = cache.incr(key, delta)
+        except ValueError:
+            count = max(0, delta)
+            cache.set(key, count, self.PRESENCE_TTL)
+        if count <= 0:
+            cache.delete(key)
+        online = count > 0
+        fields = {'is_online': online}
+        if online:
+            fields['last_activity'] = timezone.now()
+        type(self.user).objects.filter(pk=self.user.pk).update(**fields)
+        return online
+
+    # --- Gruppen-Events -> Client ---
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
+
+    async def chat_activity(self, event):
+        await self.send_json(dict(event, type='activity'))
+
+    async def chat_read(self, event):
+        await self.send_json(dict(event, type='read'))
+
+    async def chat_typing(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send_json(dict(event, type='typing'))
+
+    async def chat_presence(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send_json(dict(event, type='presence'))
+
+    async def chat_call(self, event):
+        await self.send_json({'type': 'call', 'call': event['call']})
+
+    async def job_done(self, event):
+        await self.send_json({'type': 'job', 'job': event['job']})
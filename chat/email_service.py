@@ -4,7 +4,7 @@ from django.utils import timezone
 from django.urls import reverse
 from django.conf import settings
 
-from .models import ChatMessage, ChatMessageRead, ChatEmailNotificationTracker
+from .models import ChatMessage, ChatRoomParticipant, ChatEmailNotificationTracker
 from email_templates.services import EmailTemplateService
 from email_templates.models import EmailTemplate
 
@@ -31,7 +31,7 @@ class ChatEmailNotificationService:
                 continue
 
             # Check if message is already read by this user
-            if ChatMessageRead.objects.filter(message=message, user=participant).exists():
+            if ChatEmailNotificationService._is_read(message, participant):
                 continue
 
             # Schedule notification for 5 minutes from now
@@ -52,20 +52,29 @@ class ChatEmailNotificationService:
                 logger.info(f"Scheduled email notification for {participant.username} "
                            f"for message {message.id} at {scheduled_time}")
 
+    @staticmethod
+    def _is_read(message, user):
+        """Message is read once the user's read mark in the room has passed it"""
+        return ChatRoomParticipant.objects.filter(
+            chat_room_id=message.chat_room_id, user=user,
+            last_read_message_id__gte=message.id
+        ).exists()
+
     @staticmethod
     def cancel_notifications_for_user_in_room(user, chat_room):
         """
         Cancel pending notifications when user reads messages
         """
-        # Get all unread messages in this room
-        unread_messages = chat_room.messages.exclude(
-            read_by__user=user
-        ).exclude(sender=user)
+        # Everything up to the participant's read mark counts as read
+        last_read_id = ChatRoomParticipant.objects.filter(
+            chat_room=chat_room, user=user
+        ).values_list('last_read_message_id', flat=True).first() or 0
 
         # Cancel notifications for these messages
         cancelled_count = ChatEmailNotificationTracker.objects.filter(
             user=user,
-            message__in=unread_messages,
+            message__chat_room=chat_room,
+            message_id__lte=last_read_id,
             notification_sent=False,
             is_cancelled=False
         ).update(
@@ -113,7 +122,7 @@ class ChatEmailNotificationService:
             chat_room = message.chat_room
 
             # Double-check if message is still unread
-            if ChatMessageRead.objects.filter(message=message, user=user).exists():
+            if ChatEmailNotificationService._is_read(message, user):
                 tracker.is_cancelled = True
                 tracker.cancelled_reason = 'message_read_before_send'
                 tracker.save(update_fields=['is_cancelled', 'cancelled_reason'])
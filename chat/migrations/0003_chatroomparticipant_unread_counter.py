@@ -0,0 +1,46 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_read_marks(apps, schema_editor):
+    """Gelesen-Marke aus den bisherigen ChatMessageRead-Zeilen ableiten und Zähler neu aufbauen"""
+    ChatRoomParticipant = apps.get_model('chat', 'ChatRoomParticipant')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    ChatMessageRead = apps.get_model('chat', 'ChatMessageRead')
+
+    for participant in ChatRoomParticipant.objects.all().iterator():
+        last_read = ChatMessageRead.objects.filter(
+            user_id=participant.user_id,
+            message__chat_room_id=participant.chat_room_id
+        ).aggregate(m=Max('message_id'))['m'] or 0
+        unread = ChatMessage.objects.filter(
+            chat_room_id=participant.chat_room_id, id__gt=last_read
+        ).exclude(sender_id=participant.user_id).count()
+        ChatRoomParticipant.objects.filter(pk=participant.pk).update(
+            last_read_message_id=last_read, unread_count=unread
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatemailnotificationtracker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroomparticipant',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatroomparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatroomparticipant',
+            index=models.Index(fields=['user', 'unread_count'], name='chat_part_user_unread_idx'),
+        ),
+        migrations.RunPython(backfill_read_marks, migrations.RunPython.noop),
+    ]
@@ -48,10 +48,16 @@ class ChatRoom(models.Model):
 
     def get_unread_count(self, user):
         """Get count of unread messages for a specific user"""
-        # Use the new ChatMessageRead system instead of last_read_at
-        return self.messages.exclude(
-            read_by__user=user
-        ).exclude(sender=user).count()
+        # Denormalisierter Zähler aus ChatRoomParticipant statt Anti-Join über alle Nachrichten
+        count = self.participants_through.filter(user=user).values_list('unread_count', flat=True).first()
+        return count or 0
+
+    @staticmethod
+    def unread_counts_for(user):
+        """{room_id: unread_count} für alle Räume des Users – eine Abfrage"""
+        return dict(ChatRoomParticipant.objects.filter(
+            user=user, unread_count__gt=0
+        ).values_list('chat_room_id', 'unread_count'))
 
 
 class ChatRoomParticipant(models.Model):
@@ -63,9 +69,15 @@ class ChatRoomParticipant(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     last_read_at = models.DateTimeField(default=timezone.now)
     is_active = models.BooleanField(default=True)
+    # Gelesen-Marke: alle Nachrichten mit id <= last_read_message_id gelten als gelesen
+    last_read_message_id = models.BigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ('chat_room', 'user')
+        indexes = [
+            models.Index(fields=['user', 'unread_count'], name='chat_part_user_unread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} in {self.chat_room}"
@@ -95,6 +107,10 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-Pagination (created_at, id) pro Raum
+            models.Index(fields=['chat_room', 'created_at', 'id'], name='chat_msg_room_created_idx'),
+        ]
 
     def __str__(self):
         sender_name = self.sender.username if self.sender else (self.sender_name or "Anonym")
@@ -115,6 +131,16 @@ class ChatMessage(models.Model):
             self.chat_room.last_message_at = self.created_at
             self.chat_room.save(update_fields=['last_message_at'])
 
+            # Ungelesen-Zähler der anderen Teilnehmer hochzählen,
+            # eigene Nachricht gilt für den Absender als gelesen
+            participants = ChatRoomParticipant.objects.filter(chat_room_id=self.chat_room_id)
+            if self.sender_id:
+                participants.filter(user_id=self.sender_id, last_read_message_id__lt=self.pk).update(
+                    last_read_message_id=self.pk
+                )
+                participants = participants.exclude(user_id=self.sender_id)
+            participants.update(unread_count=models.F('unread_count') + 1)
+
     def get_formatted_time(self):
         """Get formatted time for display"""
         now = timezone.now()
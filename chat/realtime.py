@@ -0,0 +1,246 @@
+"""
+Chat Realtime Push
+==================
+Verteilt Chat-Ereignisse (neue Nachricht, Lesebestätigung, Tippen, Präsenz)
+über den Channels-Layer an die WebSocket-Clients (siehe consumers.ChatConsumer).
+
+Gruppen:
+    chat_room_<id>   alle Clients, die einen Raum geöffnet haben
+    chat_user_<id>   alle Sockets eines Users (Chatliste, Unread-Badges, Anrufe,
+                     fertige Hintergrund-Jobs aus core.async_decorator)
+
+Eingehende Anrufe liegen zusätzlich als kleiner Cache-Eintrag pro User
+(chat:pending_call:<id>) vor, damit pollende Clients ohne DB-Zugriff
+auskommen. Das gilt nur mit geteiltem Cache (SHARED_STATE_BACKEND=redis);
+mit prozesslokalem Cache liest pending_call() aus der Datenbank.
+
+Die Funktionen hier sind synchron und werden aus den Views aufgerufen;
+gesendet wird erst nach erfolgreichem Commit der Transaktion.
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+logger = logging.getLogger(__name__)
+
+
+def room_group(room_id):
+    return f'chat_room_{room_id}'
+
+
+def user_group(user_id):
+    return f'chat_user_{user_id}'
+
+
+def serialize_attachment(attachment):
+    return {
+        'id': attachment.id,
+        'filename': attachment.filename,
+        'file_size': attachment.get_file_size_display(),
+        'file_type': attachment.file_type,
+        'file_url': attachment.file.url,
+        'is_image': attachment.is_image(),
+        'is_video': attachment.is_video(),
+        'is_audio': attachment.is_audio()
+    }
+
+
+def serialize_message(message, attachments=None):
+    """
+    Nachricht als JSON-dict – gleiche Felder wie get_messages/batch_update,
+    aber ohne 'is_own' (der Client vergleicht sender_id selbst).
+    """
+    if message.sender:
+        sender_name = message.sender.get_full_name() or message.sender.username
+        sender_id = message.sender.id
+    else:
+        sender_name = message.sender_name or "System"
+        sender_id = None
+    if attachments is None:
+        attachments = [serialize_attachment(a) for a in message.attachments.all()]
+    return {
+        'id': message.id,
+        'room_id': message.chat_room_id,
+        'content': message.content,
+        'sender': sender_name,
+        'sender_name': sender_name,
+        'sender_id': sender_id,
+        'timestamp': message.created_at.isoformat(),
+        'formatted_time': message.created_at.strftime('%H:%M'),
+        'message_type': message.message_type,
+        'reply_to': message.reply_to_id,
+        'attachments': attachments
+    }
+
+
+MESSAGE_CACHE_TTL = 24 * 3600
+
+
+def _message_cache_key(message):
+    # updated_at im Key: eine bearbeitete Nachricht bekommt automatisch einen neuen Eintrag
+    return f'chat:msg:{message.id}:{int(message.updated_at.timestamp() * 1000000)}'
+
+
+def serialize_messages(messages, user=None):
+    """
+    Serialisiert eine Nachrichtenseite über den Cache: unveränderte Nachrichten
+    kommen fertig aus dem Cache, nur Fehlschläge laden ihre Anhänge (ein
+    Prefetch für alle) und werden nachgetragen. 'is_own' wird pro User ergänzt.
+    """
+    messages = list(messages)
+    keys = {m.id: _message_cache_key(m) for m in messages}
+    cached = cache.get_many(list(keys.values()))
+    missing = [m for m in messages if keys[m.id] not in cached]
+    if missing:
+        prefetch_related_objects(missing, 'attachments')
+        fresh = {keys[m.id]: serialize_message(m) for m in missing}
+        cache.set_many(fresh, MESSAGE_CACHE_TTL)
+        cached.update(fresh)
+    user_id = getattr(user, 'id', None)
+    result = []
+    for m in messages:
+        payload = dict(cached[keys[m.id]])
+        payload['is_own'] = user_id is not None and payload['sender_id'] == user_id
+        result.append(payload)
+    return result
+
+
+def _send(groups, event):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    for group in groups:
+        try:
+            async_to_sync(layer.group_send)(group, event)
+        except Exception as e:
+            # Push ist Zusatz – Clients holen verpasste Nachrichten beim Reconnect nach
+            logger.warning(f"Chat-Push an {group} fehlgeschlagen: {e}")
+
+
+def _send_on_commit(groups, event):
+    transaction.on_commit(lambda: _send(groups, event))
+
+
+def push_message(message, attachments=None, participant_ids=None):
+    """Neue Nachricht an den Raum und (für Chatliste/Badges) an alle Teilnehmer."""
+    payload = serialize_message(message, attachments)
+    if participant_ids is None:
+        participant_ids = list(message.chat_room.participants.values_list('id', flat=True))
+    _send_on_commit([room_group(message.chat_room_id)],
+                    {'type': 'chat.message', 'message': payload})
+    _send_on_commit([user_group(uid) for uid in participant_ids if uid != payload['sender_id']],
+                    {'type': 'chat.activity', 'room_id': message.chat_room_id,
+                     'message_id': message.id, 'sender_id': payload['sender_id'],
+                     'sender_name': payload['sender_name'], 'preview': message.content[:100]})
+
+
+def push_job(user_id, job):
+    """Hintergrund-Job (core.async_decorator) fertig – sofort senden, kein DB-Commit beteiligt."""
+    _send([user_group(user_id)], {'type': 'job.done', 'job': job})
+
+
+def push_read(room_id, user_id, last_message_id):
+    """Lesebestätigung: user_id hat alles bis last_message_id gelesen."""
+    _send_on_commit([room_group(room_id), user_group(user_id)],
+                    {'type': 'chat.read', 'room_id': room_id, 'user_id': user_id,
+                     'last_message_id': last_message_id})
+
+
+# ------------------------------------------------------------------
+# Anrufe
+# ------------------------------------------------------------------
+
+PENDING_CALL_KEY = 'chat:pending_call:{}'
+CALL_RING_SECONDS = 5 * 60   # danach setzt tasks.expire_stale_calls den Anruf auf 'missed'
+RINGING_STATUSES = ('initiated', 'ringing')
+
+
+def pending_call_key(user_id):
+    return PENDING_CALL_KEY.format(user_id)
+
+
+def serialize_call(call):
+    caller = call.caller
+    return {
+        'call_id': call.id,
+        'message_id': call.id,  # For backward compatibility
+        'room_id': call.chat_room_id,
+        'room_name': str(call.chat_room),
+        'channel_name': f"call_{call.chat_room_id}_{call.id}",
+        'call_type': call.call_type,
+        'caller_id': caller.id,
+        'caller_name': caller.get_full_name() or caller.username,
+        'status': call.status,
+        'timestamp': call.started_at.isoformat(),
+    }
+
+
+def _call_recipients(call):
+    return list(call.chat_room.participants.exclude(id=call.caller_id).values_list('id', flat=True))
+
+
+def announce_call(call):
+    """Klingeln: Pending-Eintrag für jeden Angerufenen + Push an dessen Sockets."""
+    payload = serialize_call(call)
+    recipients = _call_recipients(call)
+    cache.set_many({pending_call_key(uid): payload for uid in recipients}, CALL_RING_SECONDS)
+    _send_on_commit([user_group(uid) for uid in recipients], {'type': 'chat.call', 'call': payload})
+
+
+def clear_call(call):
+    """Anruf klingelt nicht mehr (angenommen/abgelehnt/beendet/verpasst)."""
+    payload = serialize_call(call)
+    recipients = _call_recipients(call)
+    keys = [pending_call_key(uid) for uid in recipients]
+    # Nur Einträge dieses Anrufs löschen – ein neuerer Anruf bleibt stehen
+    stale = [k for k, v in cache.get_many(keys).items() if v.get('call_id') == call.id]
+    if stale:
+        cache.delete_many(stale)
+    _send_on_commit([user_group(uid) for uid in recipients + [call.caller_id]],
+                    {'type': 'chat.call', 'call': payload})
+
+
+def update_calls(queryset, **fields):
+    """
+    queryset.update() für Anrufe, aber mit Aufräumen wie beim post_save-Signal:
+    Pending-Einträge löschen und den neuen Status pushen. Gibt die Anzahl zurück.
+    """
+    calls = list(queryset.select_related('chat_room', 'caller'))
+    if not calls:
+        return 0
+    count = queryset.model.objects.filter(pk__in=[c.pk for c in calls]).update(**fields)
+    for call in calls:
+        for name, value in fields.items():
+            setattr(call, name, value)
+        try:
+            if call.status in RINGING_STATUSES:
+                announce_call(call)
+            else:
+                clear_call(call)
+        except Exception as e:
+            logger.warning(f"Anrufstatus für Call {call.id} nicht verteilbar: {e}")
+    return count
+
+
+def pending_call(user):
+    """Klingelnder Anruf für user (serialisiert) oder None."""
+    if getattr(settings, 'USE_REDIS_SHARED_STATE', False):
+        return cache.get(pending_call_key(user.id))
+
+    # Prozesslokaler Cache: der Eintrag stammt evtl. aus einem anderen Worker
+    from django.utils import timezone
+    from datetime import timedelta
+    from .models import Call
+
+    call = Call.objects.filter(
+        chat_room__participants=user,
+        status__in=RINGING_STATUSES,
+        started_at__gte=timezone.now() - timedelta(seconds=CALL_RING_SECONDS),
+    ).exclude(caller=user).select_related('chat_room', 'caller').order_by('-started_at').first()
+    return serialize_call(call) if call else None
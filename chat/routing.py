@@ -2,6 +2,8 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
-    # WebSocket support for WebRTC signaling only
+    # WebRTC-Signalisierung für Anrufe
     re_path(r'ws/call/(?P<room_id>\w+)/$', consumers.CallConsumer.as_asgi()),
+    # Chat-Nachrichten, Lesebestätigungen, Tippen, Präsenz
+    re_path(r'ws/chat/$', consumers.ChatConsumer.as_asgi()),
 ]
\ No newline at end of file
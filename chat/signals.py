@@ -6,7 +6,7 @@ Trackt File-Uploads und Deletions im globalen Storage-System
 
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import ChatMessageAttachment, ChatMessage
+from .models import ChatMessageAttachment, ChatMessage, Call
 from core.storage_service import StorageService
 import logging
 
@@ -84,3 +84,19 @@ def send_loomconnect_message_notification(sender, instance, created, **kwargs):
             send_new_message_email(instance)
         except Exception as e:
             logger.error(f"Failed to send LoomConnect message notification: {str(e)}")
+
+
+@receiver(post_save, sender=Call)
+def push_call_state(sender, instance, created, **kwargs):
+    """
+    Klingeln bzw. Auflegen per WebSocket an die Teilnehmer verteilen und den
+    Pending-Call-Cache pflegen (liest check_incoming_calls)
+    """
+    from . import realtime
+    try:
+        if instance.status in realtime.RINGING_STATUSES:
+            realtime.announce_call(instance)
+        else:
+            realtime.clear_call(instance)
+    except Exception as e:
+        logger.error(f"Failed to push call state for call {instance.id}: {str(e)}")
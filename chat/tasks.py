@@ -0,0 +1,41 @@
+"""
+Celery tasks for the chat app
+"""
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import Call
+from . import realtime
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def expire_stale_calls():
+    """
+    Setzt Anrufe, die länger als CALL_RING_SECONDS klingeln, auf 'missed'.
+
+    Läuft periodisch (Celery Beat) statt bei jedem check_incoming_calls-Poll.
+    Gespeichert wird einzeln, damit der post_save-Signal den Pending-Call-Cache
+    räumt und das Auflegen an die Clients pusht.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=realtime.CALL_RING_SECONDS)
+    stale = Call.objects.filter(
+        status__in=realtime.RINGING_STATUSES,
+        started_at__lt=cutoff
+    ).select_related('chat_room', 'caller')
+
+    expired = 0
+    for call in stale:
+        call.status = 'missed'
+        call.ended_at = now
+        call.save(update_fields=['status', 'ended_at'])
+        expired += 1
+
+    if expired:
+        logger.info(f"Expired {expired} stale chat calls")
+    return expired
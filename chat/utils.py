@@ -44,6 +44,9 @@ def send_system_message(user_id, message_content):
         from .email_service import ChatEmailNotificationService
         ChatEmailNotificationService.schedule_notification_for_message(message)
 
+        from . import realtime
+        realtime.push_message(message, attachments=[], participant_ids=[system_user.id, target_user.id])
+
         return True, f"Message sent to {target_user.username}"
 
     except User.DoesNotExist:
@@ -51,3 +54,42 @@ def send_system_message(user_id, message_content):
     except Exception as e:
         return False, f"An error occurred: {str(e)}"
 
+
+def mark_room_read(user, chat_room, up_to_id=None):
+    """
+    Markiert alle fremden Nachrichten eines Raums (optional bis up_to_id) als
+    gelesen: EIN Update auf ChatRoomParticipant setzt die Gelesen-Marke und
+    zählt den Rest (Nachrichten nach der Marke) neu – statt einer
+    ChatMessageRead-Zeile pro Nachricht. Verteilt die Lesebestätigung per
+    WebSocket. Gibt die neue Gelesen-Marke zurück (0 = nichts geändert).
+    """
+    from django.db.models import Count, OuterRef, Subquery, Value
+    from django.db.models.functions import Coalesce
+    from django.utils import timezone
+    from .models import ChatRoomParticipant
+    from .email_service import ChatEmailNotificationService
+    from . import realtime
+
+    # Nie über die letzte existierende Nachricht hinaus (sonst wären künftige schon "gelesen")
+    latest_id = chat_room.messages.order_by('-id').values_list('id', flat=True).first() or 0
+    up_to_id = latest_id if up_to_id is None else min(up_to_id, latest_id)
+
+    remaining = ChatMessage.objects.filter(
+        chat_room_id=OuterRef('chat_room_id'), id__gt=up_to_id
+    ).exclude(sender_id=OuterRef('user_id')).order_by().values('chat_room_id').annotate(
+        c=Count('id')
+    ).values('c')
+
+    participant = ChatRoomParticipant.objects.filter(chat_room=chat_room, user=user)
+    advanced = participant.filter(last_read_message_id__lt=up_to_id).update(
+        last_read_message_id=up_to_id,
+        unread_count=Coalesce(Subquery(remaining), Value(0)),
+        last_read_at=timezone.now()
+    )
+    if not advanced:
+        participant.update(last_read_at=timezone.now())
+        return 0
+
+    ChatEmailNotificationService.cancel_notifications_for_user_in_room(user, chat_room)
+    realtime.push_read(chat_room.id, user.id, up_to_id)
+    return up_to_id
@@ -2,19 +2,22 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse, Http404
-from django.db.models import Q, Count, Max
+from django.db import transaction
+from django.db.models import Q, Count, Max, F
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.conf import settings
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 import json
 
-from .models import ChatRoom, ChatMessage, ChatRoomParticipant, ChatMessageRead, ChatMessageAttachment
+from .models import ChatRoom, ChatMessage, ChatRoomParticipant, ChatMessageAttachment
 from .email_service import ChatEmailNotificationService
 from .agora_utils import generate_agora_token
+from .utils import mark_room_read
+from . import realtime
 from accounts.decorators import require_app_permission
 
 User = get_user_model()
@@ -89,8 +92,9 @@ def chat_home(request):
     ).order_by('-last_message_at', '-created_at')
     
     # Get unread counts and other data for each chat room
+    unread_counts = ChatRoom.unread_counts_for(request.user)
     for room in chat_rooms:
-        room.unread_count = room.get_unread_count(request.user)
+        room.unread_count = unread_counts.get(room.id, 0)
         
         # Set proper room name and user info
         if room.is_group_chat:
@@ -170,24 +174,12 @@ def room_detail(request, room_id):
     page_number = request.GET.get('page', 1)
     messages = paginator.get_page(page_number)
     
-    # Mark messages as read
-    unread_messages = chat_room.messages.exclude(
-        read_by__user=request.user
-    ).exclude(sender=request.user)
-    
-    for message in unread_messages:
-        ChatMessageRead.objects.get_or_create(
-            message=message,
-            user=request.user
-        )
-    
-    # Update last_read_at
-    participant, created = ChatRoomParticipant.objects.get_or_create(
+    # Mark messages as read (read mark + counter in one update, also sets last_read_at)
+    ChatRoomParticipant.objects.get_or_create(
         chat_room=chat_room,
         user=request.user
     )
-    participant.last_read_at = timezone.now()
-    participant.save()
+    mark_room_read(request.user, chat_room)
     
     context = {
         'chat_room': chat_room,
@@ -294,45 +286,41 @@ def send_message(request, room_id):
         if not content and not uploaded_files:
             return JsonResponse({'success': False, 'error': 'Nachricht oder Anhang erforderlich'})
         
-        # Create message
-        message = ChatMessage.objects.create(
-            chat_room=chat_room,
-            sender=request.user,
-            content=content or '',
-            message_type=message_type,
-            reply_to_id=reply_to_id if reply_to_id else None
-        )
-        
-        # Handle attachments
-        attachments = []
-        for uploaded_file in uploaded_files:
-            attachment = ChatMessageAttachment.objects.create(
-                message=message,
-                file=uploaded_file,
-                filename=uploaded_file.name,
-                file_size=uploaded_file.size,
-                file_type=uploaded_file.content_type
+        # Nachricht und Anhänge in einer Transaktion: ein Poll dazwischen würde
+        # sonst die Nachricht ohne Anhänge sehen (und so cachen)
+        with transaction.atomic():
+            # Create message
+            message = ChatMessage.objects.create(
+                chat_room=chat_room,
+                sender=request.user,
+                content=content or '',
+                message_type=message_type,
+                reply_to_id=reply_to_id if reply_to_id else None
             )
-            attachments.append({
-                'id': attachment.id,
-                'filename': attachment.filename,
-                'file_size': attachment.get_file_size_display(),
-                'file_type': attachment.file_type,
-                'file_url': attachment.file.url,
-                'is_image': attachment.is_image(),
-                'is_video': attachment.is_video(),
-                'is_audio': attachment.is_audio()
-            })
+            
+            # Handle attachments
+            attachments = []
+            for uploaded_file in uploaded_files:
+                attachment = ChatMessageAttachment.objects.create(
+                    message=message,
+                    file=uploaded_file,
+                    filename=uploaded_file.name,
+                    file_size=uploaded_file.size,
+                    file_type=uploaded_file.content_type
+                )
+                attachments.append(realtime.serialize_attachment(attachment))
+            
+            if attachments:
+                # Neuer Cache-Key (updated_at) für die Nachricht samt Anhängen
+                message.updated_at = timezone.now()
+                ChatMessage.objects.filter(pk=message.pk).update(updated_at=message.updated_at)
         
-        # Mark as read by sender
-        ChatMessageRead.objects.create(
-            message=message,
-            user=request.user
-        )
-
         # Schedule email notifications for other participants
         ChatEmailNotificationService.schedule_notification_for_message(message)
 
+        # Push to open chats (WebSocket) instead of waiting for the next poll
+        realtime.push_message(message, attachments=attachments)
+
         return JsonResponse({
             'success': True,
             'message': {
@@ -379,64 +367,22 @@ def batch_update(request, room_id):
         if last_message_id:
             messages_queryset = chat_room.messages.filter(
                 id__gt=last_message_id
-            ).select_related('sender').prefetch_related('attachments').order_by('created_at')[:50]
+            ).select_related('sender').order_by('created_at')[:50]
         else:
             messages_queryset = chat_room.messages.select_related(
                 'sender'
-            ).prefetch_related('attachments').order_by('-created_at')[:50]
+            ).order_by('-created_at')[:50]
             messages_queryset = reversed(list(messages_queryset))
 
         messages_list = list(messages_queryset)
 
         if messages_list:
-            messages_data = []
-            for message in messages_list:
-                if message.sender:
-                    sender_name = message.sender.get_full_name() or message.sender.username
-                    sender_id = message.sender.id
-                else:
-                    sender_name = message.sender_name or "System"
-                    sender_id = None
-
-                # Get attachments
-                attachments = []
-                for attachment in message.attachments.all():
-                    attachments.append({
-                        'id': attachment.id,
-                        'filename': attachment.filename,
-                        'file_size': attachment.get_file_size_display(),
-                        'file_type': attachment.file_type,
-                        'file_url': attachment.file.url,
-                        'is_image': attachment.is_image(),
-                        'is_video': attachment.is_video(),
-                        'is_audio': attachment.is_audio()
-                    })
-
-                messages_data.append({
-                    'id': message.id,
-                    'content': message.content,
-                    'sender': sender_name,
-                    'sender_id': sender_id,
-                    'is_own': message.sender == request.user if message.sender else False,
-                    'formatted_time': message.created_at.strftime('%H:%M'),
-                    'message_type': message.message_type,
-                    'reply_to': message.reply_to.id if message.reply_to else None,
-                    'attachments': attachments
-                })
-
+            messages_data = realtime.serialize_messages(messages_list, request.user)
             response_data['messages'] = messages_data
             response_data['last_message_id'] = messages_list[-1].id
 
-            # Mark messages as read
-            unread_messages = chat_room.messages.exclude(
-                read_by__user=request.user
-            ).exclude(sender=request.user).filter(id__in=[m.id for m in messages_list])
-
-            for message in unread_messages:
-                ChatMessageRead.objects.get_or_create(
-                    message=message,
-                    user=request.user
-                )
+            # Mark messages as read (one read-mark update, read receipt pushed to the room)
+            mark_room_read(request.user, chat_room, up_to_id=messages_list[-1].id)
 
         # Include room info if requested
         if include_room_info:
@@ -459,13 +405,9 @@ def batch_update(request, room_id):
             response_data['room_info'] = room_info
 
         # Get unread counts for all user's chats
-        user_rooms = ChatRoom.objects.filter(participants=request.user)
-        unread_counts = {}
-        for room in user_rooms:
-            count = room.get_unread_count(request.user)
-            # Only include if there are unread messages or if this is the current room
-            if count > 0 or str(room.id) == str(room_id):
-                unread_counts[str(room.id)] = count
+        # Only rooms with unread messages plus the current room
+        unread_counts = {str(rid): count for rid, count in ChatRoom.unread_counts_for(request.user).items()}
+        unread_counts.setdefault(str(room_id), 0)
         response_data['unread_counts'] = unread_counts
 
         # Get online status for participants
@@ -481,13 +423,35 @@ def batch_update(request, room_id):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+MESSAGES_PER_PAGE = 20
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _encode_message_cursor(message):
+    """Cursor auf (created_at, id) der ältesten Nachricht einer Seite (exakte Mikrosekunden)"""
+    micros = (message.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{message.id}"
+
+
+def _decode_message_cursor(cursor):
+    try:
+        micros, message_id = cursor.split('_', 1)
+        created_at = _EPOCH + timedelta(microseconds=int(micros))
+        return created_at, int(message_id)
+    except (ValueError, AttributeError):
+        return None
+
+
 @login_required
 def get_messages(request, room_id):
     """
     Get messages for a chat room (AJAX endpoint for polling)
+
+    Zurückblättern per Keyset-Cursor (?before=<cursor>) auf (created_at, id)
+    statt OFFSET + count(): jede Seite ist ein Index-Range-Scan, egal wie weit
+    zurück. Serialisierte Nachrichten kommen aus dem Cache (realtime.serialize_messages).
     """
     try:
-        print(f"DEBUG: Getting messages for room {room_id}")
         chat_room = get_object_or_404(ChatRoom, id=room_id)
         
         # Check if user is participant
@@ -495,77 +459,31 @@ def get_messages(request, room_id):
             return JsonResponse({'success': False, 'error': 'Zugriff verweigert'})
         
         since_id = request.GET.get('since_id')
-        page = request.GET.get('page', 1)
-        messages_per_page = 20
-        
-        try:
-            page = int(page)
-        except ValueError:
-            page = 1
-            
+        before = request.GET.get('before')
+        messages_per_page = MESSAGES_PER_PAGE
+        base_queryset = chat_room.messages.select_related('sender')
+        next_cursor = None
+
         if since_id:
             # Real-time updates - get messages newer than since_id
-            messages_queryset = chat_room.messages.filter(
-                id__gt=since_id
-            ).select_related('sender').order_by('created_at')
-            messages_list = list(messages_queryset)
+            messages_list = list(base_queryset.filter(id__gt=since_id).order_by('created_at', 'id'))
             has_more = False
-            total_messages = len(messages_list)
         else:
-            # Initial load or pagination - get messages with pagination
-            messages_queryset = chat_room.messages.select_related('sender').order_by('-created_at')
-            
-            # Apply pagination
-            start_index = (page - 1) * messages_per_page
-            end_index = start_index + messages_per_page
-            
-            messages_page = messages_queryset[start_index:end_index]
-            messages_list = list(reversed(messages_page))  # Reverse for chronological order
-            
-            # Check if there are more messages
-            total_messages = messages_queryset.count()
-            has_more = total_messages > end_index
-        
-        print(f"DEBUG: Found {len(messages_list)} messages")
-        messages_data = []
-        for message in messages_list:
-            # Handle anonymous messages (no sender)
-            if message.sender:
-                sender_name = message.sender.get_full_name() or message.sender.username
-                sender_id = message.sender.id
-                avatar_text = (message.sender.get_full_name() or message.sender.username)[0].upper()
-            else:
-                sender_name = message.sender_name or "Anonym"
-                sender_id = None
-                avatar_text = (message.sender_name or "A")[0].upper()
-            
-            # Get attachments
-            attachments = []
-            for attachment in message.attachments.all():
-                attachments.append({
-                    'id': attachment.id,
-                    'filename': attachment.filename,
-                    'file_size': attachment.get_file_size_display(),
-                    'file_type': attachment.file_type,
-                    'file_url': attachment.file.url,
-                    'is_image': attachment.is_image(),
-                    'is_video': attachment.is_video(),
-                    'is_audio': attachment.is_audio()
-                })
-            
-            messages_data.append({
-                'id': message.id,
-                'content': message.content,
-                'sender': sender_name,
-                'sender_name': sender_name,
-                'sender_id': sender_id,
-                'is_own': message.sender == request.user if message.sender else False,
-                'timestamp': message.created_at.isoformat(),
-                'formatted_time': message.created_at.strftime('%H:%M'),
-                'message_type': message.message_type,
-                'reply_to': message.reply_to.id if message.reply_to else None,
-                'attachments': attachments
-            })
+            # Initial load or scrolling back - newest first, one extra row tells us if there is more
+            messages_queryset = base_queryset.order_by('-created_at', '-id')
+            position = _decode_message_cursor(before) if before else None
+            if position:
+                created_at, message_id = position
+                messages_queryset = messages_queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+                )
+            messages_page = list(messages_queryset[:messages_per_page + 1])
+            has_more = len(messages_page) > messages_per_page
+            messages_list = list(reversed(messages_page[:messages_per_page]))  # Reverse for chronological order
+            if has_more and messages_list:
+                next_cursor = _encode_message_cursor(messages_list[0])
+
+        messages_data = realtime.serialize_messages(messages_list, request.user)
         
         # Also return room info for chat header
         room_info = {
@@ -577,18 +495,16 @@ def get_messages(request, room_id):
             'avatar_text': 'G' if chat_room.is_group_chat else 'U'
         }
         
-        print(f"DEBUG: Returning {len(messages_data)} messages")
         return JsonResponse({
             'success': True,
             'messages': messages_data,
             'room': room_info,
             'last_message_id': messages_list[-1].id if messages_list else None,
             'pagination': {
-                'page': page,
                 'messages_per_page': messages_per_page,
-                'total_messages': total_messages,
                 'has_more': has_more,
-                'has_previous': page > 1
+                'next_cursor': next_cursor,
+                'has_previous': bool(before)
             }
         })
         
@@ -668,29 +584,9 @@ def mark_messages_read(request, room_id):
         if not chat_room.participants.filter(id=request.user.id).exists():
             return JsonResponse({'success': False, 'error': 'Zugriff verweigert'})
         
-        # Mark all unread messages as read
-        unread_messages = chat_room.messages.exclude(
-            read_by__user=request.user
-        ).exclude(sender=request.user)
-        
-        for message in unread_messages:
-            ChatMessageRead.objects.get_or_create(
-                message=message,
-                user=request.user
-            )
-        
-        # Update last_read_at
-        participant = ChatRoomParticipant.objects.get(
-            chat_room=chat_room,
-            user=request.user
-        )
-        participant.last_read_at = timezone.now()
-        participant.save()
-
-        # Cancel pending email notifications for this user in this room
-        ChatEmailNotificationService.cancel_notifications_for_user_in_room(
-            request.user, chat_room
-        )
+        # Mark all unread messages as read, update last_read_at,
+        # cancel pending email notifications and push the read receipt
+        mark_room_read(request.user, chat_room)
 
         return JsonResponse({'success': True})
         
@@ -711,9 +607,9 @@ def get_unread_count(request):
         if unread_count > 0:
             # Find the latest unread message
             unread_messages = ChatMessage.objects.filter(
-                chat_room__participants=request.user
-            ).exclude(
-                read_by__user=request.user
+                chat_room__participants_through__user=request.user,
+                chat_room__participants_through__unread_count__gt=0,
+                id__gt=F('chat_room__participants_through__last_read_message_id')
             ).exclude(
                 sender=request.user
             ).select_related('sender', 'chat_room').order_by('-created_at').first()
@@ -813,55 +709,21 @@ def check_incoming_calls(request):
     if not request.user.is_authenticated:
         return JsonResponse({'has_call': False, 'error': 'Authentication required'})
     """
-    Check for incoming calls for the current user across all chat rooms using Call model
+    Check for incoming calls for the current user (fallback for clients without WebSocket)
+
+    Liest den Pending-Call-Cache-Eintrag des Users (gesetzt beim Klingeln,
+    gelöscht beim Annehmen/Ablehnen/Beenden) – kein DB-Zugriff pro Poll,
+    sofern der Cache geteilt ist (siehe realtime.pending_call).
+    Verwaiste Anrufe räumt chat.tasks.expire_stale_calls periodisch ab.
     """
     try:
-        from .models import Call
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # First, clean up stale calls (older than 5 minutes)
-        stale_calls = Call.objects.filter(
-            status__in=['initiated', 'ringing'],
-            started_at__lt=timezone.now() - timedelta(minutes=5)
-        )
-        stale_calls.update(status='missed')
-        
+        pending = realtime.pending_call(request.user)
+
         # Get the room_id from query params (optional, for backward compatibility)
         room_id = request.GET.get('room_id')
-        
-        # Get all rooms where user is a participant
-        user_rooms = ChatRoom.objects.filter(participants=request.user)
-        
-        if room_id:
-            # If room_id is specified, check only that room
-            active_calls = Call.objects.filter(
-                chat_room_id=room_id,
-                status__in=['initiated', 'ringing'],
-                chat_room__participants=request.user
-            ).exclude(caller=request.user).order_by('-started_at')
-        else:
-            # Check all user's chat rooms for incoming calls
-            active_calls = Call.objects.filter(
-                chat_room__in=user_rooms,
-                status__in=['initiated', 'ringing']
-            ).exclude(caller=request.user).order_by('-started_at')
-        
-        if active_calls.exists():
-            latest_call = active_calls.first()
-            
-            return JsonResponse({
-                'has_call': True,
-                'call_type': latest_call.call_type,
-                'channel_name': f"call_{latest_call.chat_room.id}_{latest_call.id}",
-                'caller_name': latest_call.caller.get_full_name() or latest_call.caller.username,
-                'caller_id': latest_call.caller.id,
-                'room_id': latest_call.chat_room.id,
-                'call_id': latest_call.id,
-                'message_id': latest_call.id,  # For backward compatibility
-                'status': latest_call.status
-            })
-        
+        if pending and (not room_id or str(pending['room_id']) == str(room_id)):
+            return JsonResponse(dict(pending, has_call=True))
+
         return JsonResponse({'has_call': False})
         
     except Exception as e:
@@ -946,8 +808,7 @@ def cleanup_all_calls(request):
                 started_at__lt=timezone.now() - timedelta(seconds=30)
             )
             
-            count = stale_calls.count()
-            stale_calls.update(status='ended')
+            count = realtime.update_calls(stale_calls, status='ended')
             
             # Also clean up calls from the same user trying to call again
             if hasattr(request, 'user') and request.user.is_authenticated:
@@ -955,9 +816,7 @@ def cleanup_all_calls(request):
                     caller=request.user,
                     status__in=['initiated', 'ringing', 'connected']
                 )
-                user_call_count = user_calls.count()
-                user_calls.update(status='ended')
-                count += user_call_count
+                count += realtime.update_calls(user_calls, status='ended')
             
             return JsonResponse({
                 'success': True,
@@ -1319,7 +1178,7 @@ def initiate_call(request, room_id):
             status__in=['initiated', 'ringing'],
             started_at__lt=timezone.now() - timedelta(minutes=10)
         )
-        stale_calls.update(status='missed')
+        realtime.update_calls(stale_calls, status='missed')
         
         # Also clean up calls that are still "connected" but older than 30 minutes
         old_connected_calls = Call.objects.filter(
@@ -1327,7 +1186,7 @@ def initiate_call(request, room_id):
             status='connected',
             started_at__lt=timezone.now() - timedelta(minutes=30)
         )
-        old_connected_calls.update(status='ended')
+        realtime.update_calls(old_connected_calls, status='ended')
         
         # Now check for active calls
         active_call = Call.objects.filter(
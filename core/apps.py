@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        """Dauer-Autobefüllung für Audio-Uploads und Suchindex-Pflege registrieren"""
+        from core.signals import connect_duration_signals, connect_search_signals
+        connect_duration_signals()
+        connect_search_signals()
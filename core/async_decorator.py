@@ -3,97 +3,194 @@ Zentraler Async-Decorator für lange API-Calls
 
 Verwendung:
     from core.async_decorator import async_task_view
-    
+
     @login_required
     @async_task_view(timeout=300)
     def api_generate_content(request, project_id):
         # Normaler Code - wird automatisch via Celery ausgeführt
         ...
         return JsonResponse({...})
+
+Ablauf (nicht blockierend):
+    1. Der Aufruf der View legt einen Job an, startet den Celery-Task und
+       antwortet sofort mit 202:
+           {"success": true, "job_id": "...", "status": "pending",
+            "status_url": "/jobs/<job_id>/"}
+    2. Der Task führt die eigentliche View aus; sein Rückgabewert (Antwort
+       der View) liegt im Celery-Result-Backend (Task-ID = Job-ID). Das
+       Backend teilen sich Web- und Worker-Prozesse, anders als den Cache.
+    3. Der Client fragt GET status_url ab – 202 solange der Job läuft,
+       danach die Antwort der View mit deren Statuscode. Mit geteiltem
+       Channel-Layer (SHARED_STATE_BACKEND=redis) kommt das Ende zusätzlich
+       per Push über den User-Socket (chat_user_<id>, Event {"type": "job"}).
+
+So belegt eine lange KI-Generierung keinen Gunicorn-Worker mehr.
 """
 
 import functools
 import logging
-import time
 import json
-import pickle
-import hashlib
+import uuid
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
 
 logger = logging.getLogger(__name__)
 
-# Cache für laufende Tasks (Redis-basiert wäre besser für Production)
-_running_tasks = {}
+WORKER_CHECK_KEY = 'async_job:workers_available'
+WORKER_CHECK_TTL = 60             # Worker-Ping höchstens einmal pro Minute
+
+
+def get_job(job_id):
+    """
+    Job-Eintrag aus dem Celery-Result-Backend. Solange der Task läuft (und
+    für unbekannte IDs) ist der Status 'pending'; ein per time_limit
+    abgebrochener Task erscheint dort als FAILURE und damit als 'error'.
+    """
+    result = AsyncResult(job_id, app=execute_view_task.app)
+    entry = {
+        'job_id': job_id,
+        'status': 'pending',
+        'status_url': reverse('async_job_status', args=[job_id]),
+    }
+    if result.state == 'SUCCESS' and isinstance(result.result, dict):
+        entry.update(result.result)
+        entry['status'] = 'done' if result.result.get('success') else 'error'
+    elif result.state in ('FAILURE', 'REVOKED'):
+        error = result.result
+        if isinstance(error, (TimeLimitExceeded, SoftTimeLimitExceeded)):
+            message = 'Zeitlimit überschritten'
+        else:
+            message = str(error) or type(error).__name__
+        entry.update(status='error', error=message)
+    return entry
+
+
+def _notify_job(entry):
+    """Job-Ende an alle Sockets des Users pushen (Zusatz – status_url bleibt maßgeblich)."""
+    if not entry.get('user_id'):
+        return
+    if not getattr(settings, 'USE_REDIS_SHARED_STATE', False):
+        # Prozesslokaler Channel-Layer: der Worker erreicht die Web-Sockets nicht
+        return
+    try:
+        from chat.realtime import push_job
+        push_job(entry['user_id'], {
+            'job_id': entry['job_id'],
+            'status': entry['status'],
+            'status_code': entry.get('status_code'),
+            'status_url': entry.get('status_url'),
+        })
+    except Exception as e:
+        logger.warning(f"Job-Push für {entry.get('job_id')} fehlgeschlagen: {e}")
+
 
+@shared_task(bind=True, max_retries=1, acks_late=False)
+def execute_view_task(self, view_path, request_data, args, kwargs, job_id=None):
+    """Führt eine View-Funktion als Celery Task aus.
 
-@shared_task(bind=True, max_retries=1)
-def execute_view_task(self, view_path, request_data, args, kwargs):
-    """Führt eine View-Funktion als Celery Task aus"""
+    acks_late=False: Views sind nicht idempotent – ein nach Worker-Absturz
+    erneut zugestellter Task würde die View ein zweites Mal ausführen.
+    """
     import importlib
     from django.test import RequestFactory
     from django.contrib.auth import get_user_model
-    
+
     User = get_user_model()
-    
+
     try:
         # View-Funktion laden
         module_path, func_name = view_path.rsplit('.', 1)
         module = importlib.import_module(module_path)
         view_func = getattr(module, func_name)
-        
+
         # Request rekonstruieren
         factory = RequestFactory()
-        
+
         method = request_data.get('method', 'POST')
         path = request_data.get('path', '/')
-        
-        if method == 'POST':
+
+        if request_data.get('body') is not None:
+            # JSON-Body (json.loads(request.body) in der View)
+            request = factory.generic(method, path, data=request_data['body'],
+                                      content_type=request_data.get('content_type', 'application/json'))
+        elif method == 'POST':
             request = factory.post(path, data=request_data.get('POST', {}))
         else:
             request = factory.get(path, data=request_data.get('GET', {}))
-        
+
         # User setzen
         user_id = request_data.get('user_id')
         if user_id:
             request.user = User.objects.get(id=user_id)
-        
+
         # View ausführen (ohne Decorator!)
         # Wir müssen die ursprüngliche Funktion aufrufen
         original_func = getattr(view_func, '_original_func', view_func)
         response = original_func(request, *args, **kwargs)
-        
+
         # Response serialisieren
         if isinstance(response, JsonResponse):
-            return {
+            result = {
                 'success': True,
                 'status_code': response.status_code,
                 'content': json.loads(response.content.decode())
             }
         elif isinstance(response, HttpResponse):
-            return {
+            result = {
                 'success': True,
                 'status_code': response.status_code,
                 'content': response.content.decode()
             }
         else:
-            return {'success': True, 'result': str(response)}
-            
+            result = {'success': True, 'result': str(response)}
+
     except Exception as e:
         logger.error(f'View task failed: {e}')
-        return {'success': False, 'error': str(e)}
+        result = {'success': False, 'error': str(e)}
+
+    if job_id:
+        # Besitzer im Ergebnis, damit async_job_status fremde Jobs abweisen kann
+        result['user_id'] = request_data.get('user_id')
+        _notify_job(dict(result, job_id=job_id, status='done' if result['success'] else 'error',
+                         status_url=reverse('async_job_status', args=[job_id])))
+    return result
 
 
-def async_task_view(timeout=300, poll_interval=0.5):
+def job_response(entry):
+    """HTTP-Antwort für einen Job-Eintrag: 202 solange offen, sonst das View-Ergebnis."""
+    if entry['status'] == 'pending':
+        return JsonResponse({'success': True, 'job_id': entry['job_id'], 'status': 'pending',
+                             'status_url': entry.get('status_url')}, status=202)
+    if entry['status'] == 'error':
+        return JsonResponse({
+            'success': False,
+            'error': entry.get('error', 'Unknown error')
+        }, status=500)
+    content = entry.get('content', {})
+    status_code = entry.get('status_code', 200)
+    if isinstance(content, dict):
+        return JsonResponse(content, status=status_code)
+    return HttpResponse(content, status=status_code)
+
+
+def async_task_view(timeout=300):
     """
     Decorator der eine View-Funktion via Celery ausführt.
-    
-    Die View wird synchron aufgerufen, aber intern via Celery verarbeitet.
-    So wird der Gunicorn Worker nicht blockiert.
-    
+
+    Die View antwortet sofort mit 202 und einem Job-Handle; das Ergebnis
+    liegt danach unter status_url bzw. kommt per Push. So wird der
+    Gunicorn Worker nicht blockiert.
+
     Args:
-        timeout: Max. Wartezeit in Sekunden (default: 5 Min)
-        poll_interval: Polling-Intervall in Sekunden
+        timeout: Max. Laufzeit des Tasks in Sekunden (default: 5 Min)
+
+    Ergebnisse bleiben so lange abrufbar, wie das Result-Backend sie hält
+    (CELERY_RESULT_EXPIRES, Celery-Default 1 Tag).
     """
     def decorator(view_func):
         @functools.wraps(view_func)
@@ -106,65 +203,69 @@ def async_task_view(timeout=300, poll_interval=0.5):
                 'GET': dict(request.GET),
                 'user_id': request.user.id if request.user.is_authenticated else None,
             }
-            
+            if request.content_type == 'application/json':
+                request_data['body'] = request.body.decode()
+                request_data['content_type'] = request.content_type
+
             # View-Pfad für Import
             view_path = f'{view_func.__module__}.{view_func.__name__}'
-            
-            # Task starten
-            task = execute_view_task.delay(
-                view_path,
-                request_data,
-                args,
-                {k: str(v) for k, v in kwargs.items()}  # UUID etc. als String
+
+            job_id = uuid.uuid4().hex
+            entry = {
+                'job_id': job_id,
+                'status': 'pending',
+                'status_url': reverse('async_job_status', args=[job_id]),
+            }
+
+            # Task starten – die Task-ID ist die Job-ID
+            execute_view_task.apply_async(
+                args=(
+                    view_path,
+                    request_data,
+                    args,
+                    {k: str(v) for k, v in kwargs.items()},  # UUID etc. als String
+                ),
+                kwargs={'job_id': job_id},
+                task_id=job_id,
+                soft_time_limit=timeout,
+                time_limit=timeout + 30,
             )
-            
-            # Auf Ergebnis warten (synchron)
-            start = time.time()
-            while time.time() - start < timeout:
-                if task.ready():
-                    result = task.result
-                    if result.get('success'):
-                        content = result.get('content', {})
-                        if isinstance(content, dict):
-                            return JsonResponse(content)
-                        else:
-                            return HttpResponse(content)
-                    else:
-                        return JsonResponse({
-                            'success': False,
-                            'error': result.get('error', 'Unknown error')
-                        }, status=500)
-                time.sleep(poll_interval)
-            
-            # Timeout
-            return JsonResponse({
-                'success': False,
-                'error': 'Request dauerte zu lange. Bitte erneut versuchen.'
-            }, status=504)
-        
+
+            return job_response(entry)
+
         # Original-Funktion speichern für Task-Ausführung
         wrapper._original_func = view_func
         return wrapper
-    
+
     return decorator
 
 
+def _workers_available():
+    """Celery-Worker erreichbar? Ergebnis wird kurz gecacht statt bei jedem Aufruf zu pingen."""
+    available = cache.get(WORKER_CHECK_KEY)
+    if available is None:
+        try:
+            from celery import current_app
+            available = bool(current_app.control.ping(timeout=0.5))
+        except Exception:
+            available = False
+        cache.set(WORKER_CHECK_KEY, available, WORKER_CHECK_TTL)
+    return available
+
+
 # Einfachere Alternative: Task-basierte Ausführung
 def run_in_celery(func, request, *args, **kwargs):
     """
     Führt eine Funktion via Celery aus und wartet auf das Ergebnis.
-    
+    Blockiert den Aufrufer – für lange Views async_task_view verwenden.
+
     Usage in View:
         result = run_in_celery(heavy_computation, request, param1, param2)
     """
     # Direkt ausführen wenn Celery nicht verfügbar
-    try:
-        from celery import current_app
-        if not current_app.control.ping():
-            return func(request, *args, **kwargs)
-    except:
+    if not _workers_available():
         return func(request, *args, **kwargs)
-    
+
     # Via Celery
     task = execute_view_task.delay(
         f'{func.__module__}.{func.__name__}',
@@ -172,7 +273,7 @@ def run_in_celery(func, request, *args, **kwargs):
         args,
         kwargs
     )
-    
+
     # Warten
     result = task.get(timeout=300)
     return result
@@ -0,0 +1,154 @@
+"""
+Management Command: Backfill Thumbnails
+=======================================
+Erzeugt fehlende Thumbnails (alle Größen, WebP + ggf. AVIF) für alle
+ImageFields der angegebenen Apps und trägt sie ins Thumbnail-Register ein.
+Jedes Original wird einmal dekodiert; das Rendern läuft in einem
+Prozess-Pool, registriert wird im Hauptprozess.
+
+Usage:
+    python manage.py backfill_thumbnails
+    python manage.py backfill_thumbnails --apps imageforge ideopin --workers 8
+    python manage.py backfill_thumbnails --force
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, models
+from django.db.models import Count
+
+from core.models import ThumbnailEntry
+from core.thumbnails import (
+    FORMAT_EXTENSIONS, THUMBNAIL_SIZES, available_formats, generate_thumbnails,
+    get_thumbnail_path, register_thumbnail, render_thumbnails_to_files, thumbnail_targets,
+)
+
+DEFAULT_APPS = ['imageforge', 'videos', 'naturmacher', 'ideopin']
+PROGRESS_EVERY = 100
+
+
+class Command(BaseCommand):
+    help = 'Erzeugt fehlende Thumbnails (WebP/AVIF, alle Größen) für ganze Apps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apps', nargs='+', default=DEFAULT_APPS,
+                            help=f'App-Labels (Standard: {" ".join(DEFAULT_APPS)})')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                            help='Parallele Render-Prozesse (Standard: Anzahl CPUs)')
+        parser.add_argument('--force', action='store_true',
+                            help='Auch bereits registrierte Thumbnails neu erzeugen')
+
+    def handle(self, *args, **options):
+        formats = available_formats()
+        exts = [FORMAT_EXTENSIONS[f] for f in formats]
+        self.stdout.write(f'Formate: {", ".join(exts)} – Größen: {", ".join(THUMBNAIL_SIZES)}')
+
+        done = set()
+        if not options['force']:
+            done = set(ThumbnailEntry.objects.values('source_name').annotate(
+                n=Count('id')
+            ).filter(n__gte=len(THUMBNAIL_SIZES)).values_list('source_name', flat=True))
+
+        started = time.monotonic()
+        total_images = total_bytes = total_failed = 0
+
+        for label in options['apps']:
+            try:
+                app_config = apps.get_app_config(label)
+            except LookupError:
+                self.stdout.write(self.style.WARNING(f'{label}: App nicht gefunden'))
+                continue
+
+            sources = self._collect_sources(app_config, done)
+            if not sources:
+                self.stdout.write(f'{label}: nichts zu tun')
+                continue
+
+            app_started = time.monotonic()
+            images, read_bytes, failed = self._render(sources, formats, exts, options['workers'])
+            done.update(sources)
+            app_elapsed = time.monotonic() - app_started
+
+            total_images += images
+            total_bytes += read_bytes
+            total_failed += failed
+            self.stdout.write(
+                f'{label}: {images}/{len(sources)} Bilder in {app_elapsed:.1f}s '
+                f'({images / app_elapsed if app_elapsed else 0:.1f}/s), {failed} Fehler')
+
+        elapsed = time.monotonic() - started
+        rate = total_images / elapsed if elapsed else 0
+        mb_rate = total_bytes / (1024 * 1024) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total_images} Bilder in {elapsed:.1f}s ({rate:.1f}/s, {mb_rate:.1f} MB/s gelesen), '
+            f'{total_failed} Fehler'))
+
+    def _collect_sources(self, app_config, done):
+        """{source_name: FieldFile} für alle noch nicht registrierten Bilder der App"""
+        sources = {}
+        for model in app_config.get_models():
+            image_fields = [f.name for f in model._meta.fields if isinstance(f, models.ImageField)]
+            for field_name in image_fields:
+                qs = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for obj in qs.only('pk', field_name).iterator():
+                    field_file = getattr(obj, field_name)
+                    if field_file.name and field_file.name not in done:
+                        sources.setdefault(field_file.name, field_file)
+        return sources
+
+    def _render(self, sources, formats, exts, workers):
+        """Rendert im Prozess-Pool (Dateisystem-Storage) bzw. seriell (sonst)."""
+        jobs, serial = {}, []
+        for name, field_file in sources.items():
+            try:
+                source_path = field_file.path
+            except NotImplementedError:
+                serial.append(field_file)
+                continue
+            targets = {
+                size: {fmt: default_storage.path(p) for fmt, p in variants.items()}
+                for size, variants in thumbnail_targets(name, formats=formats).items()
+            }
+            jobs[name] = (source_path, targets)
+
+        images = read_bytes = failed = 0
+
+        if jobs:
+            # Keine offenen DB-Verbindungen in die Worker-Prozesse vererben
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(render_thumbnails_to_files, path, targets, formats): name
+                    for name, (path, targets) in jobs.items()
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        read_bytes += future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'✗ {name}: {e}'))
+                        continue
+                    field_file = sources[name]
+                    mtime_ns = os.stat(jobs[name][0]).st_mtime_ns
+                    for size in THUMBNAIL_SIZES:
+                        register_thumbnail(field_file, size, get_thumbnail_path(name, size),
+                                           formats=exts, mtime_ns=mtime_ns)
+                    images += 1
+                    if images % PROGRESS_EVERY == 0:
+                        self.stdout.write(f'  … {images}/{len(sources)}')
+
+        for field_file in serial:
+            try:
+                generate_thumbnails(field_file, force=True)
+                images += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'✗ {field_file.name}: {e}'))
+
+        return images, read_bytes, failed
@@ -0,0 +1,66 @@
+"""
+Management Command: Probe Media
+===============================
+Füllt fehlende duration_sec-Felder (Radio-Bibliothek, Voice-Pot) über den
+Media-Probe-Cache auf. ffprobe läuft dabei parallel für alle Cache-Fehlschläge.
+
+Usage:
+    python manage.py probe_media
+    python manage.py probe_media --workers 8 --all
+"""
+
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.media_probe import DURATION_FIELDS, probe_many
+
+
+class Command(BaseCommand):
+    help = 'Ermittelt fehlende Mediendauern (duration_sec) per gecachtem ffprobe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Parallele ffprobe-Prozesse (Standard: 4)')
+        parser.add_argument('--all', action='store_true',
+                            help='Auch Einträge mit vorhandener Dauer neu prüfen (füllt nur den Cache)')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        started = time.monotonic()
+        total_files = total_updated = 0
+
+        for label, (file_field, duration_field) in DURATION_FIELDS.items():
+            try:
+                model = apps.get_model(label)
+            except LookupError:
+                continue
+
+            qs = model._default_manager.exclude(**{file_field: ''}).exclude(**{f'{file_field}__isnull': True})
+            if not options['all']:
+                qs = qs.filter(**{duration_field: 0})
+
+            paths = {}
+            for obj in qs.only('pk', file_field).iterator():
+                try:
+                    paths[obj.pk] = getattr(obj, file_field).path
+                except (NotImplementedError, ValueError):
+                    continue
+
+            results = probe_many(paths.values(), max_workers=workers)
+            updated = 0
+            for pk, path in paths.items():
+                info = results.get(path)
+                if info and info['duration']:
+                    updated += model._default_manager.filter(pk=pk, **{duration_field: 0}).update(
+                        **{duration_field: int(info['duration'])})
+
+            total_files += len(paths)
+            total_updated += updated
+            self.stdout.write(f'{label}: {len(paths)} Dateien geprüft, {updated} Dauern ergänzt')
+
+        elapsed = time.monotonic() - started
+        rate = total_files / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total_files} Dateien in {elapsed:.1f}s ({rate:.1f}/s), {total_updated} aktualisiert'))
@@ -0,0 +1,134 @@
+"""
+Management Command: Search Index
+================================
+Baut den Volltext-Index (core.search) neu auf und/oder misst die Suche
+gegen den bisherigen LIKE-Scan.
+
+Der Benchmark legt N synthetische Mail-Dokumente unter eigenem Label an
+(committed – InnoDB-FULLTEXT sieht nur committete Zeilen), misst pro
+Suchbegriff Index-Suche und LIKE '%q%' und löscht die Dokumente wieder.
+
+Deploy: nach Migration core 0007 einmalig --rebuild ausführen (Bestandsdaten
+in den Index übernehmen). Schlägt ein Modell fehl, bricht der Befehl mit
+Fehlercode ab und kann erneut gestartet bzw. mit --models fortgesetzt werden.
+
+Usage:
+    python manage.py search_index --rebuild
+    python manage.py search_index --rebuild --models mail_app.Email
+    python manage.py search_index --benchmark 100000
+    python manage.py search_index --benchmark 100000 --queries rechnung "lieferung mai"
+"""
+
+import itertools
+import random
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core import search
+from core.models import SearchDocument
+
+BENCHMARK_LABEL = 'benchmark.email'
+BENCHMARK_QUERIES = ['rechnung', 'lieferung termin', 'angeb', 'shopify bestellung storniert']
+BENCHMARK_REPEAT = 5
+
+# Fachwörter zwischen zufälligen Kunstwörtern (Zipf-Verteilung), damit die
+# Treffermengen wie bei echten Mails von "fast jede" bis "kaum eine" streuen
+PSEUDO_WORDS = 20000
+VOCABULARY = (
+    'rechnung angebot lieferung termin bestellung zahlung mahnung kunde projekt frage '
+    'antwort newsletter shopify produkt versand retoure storniert gutschein rabatt konto '
+    'passwort sicherheit meeting protokoll entwurf vertrag kündigung bewerbung urlaub '
+    'krankmeldung reise hotel flug ticket support fehler update release server backup '
+    'datenbank rechnungsnummer lieferschein paket sendung zustellung abholung lager '
+    'inventur einkauf verkauf umsatz quartal bericht analyse kampagne anzeige video'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Baut den Volltext-Suchindex neu auf bzw. misst die Suche (Index vs. LIKE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Index der Modelle komplett neu aufbauen')
+        parser.add_argument('--models', nargs='+', default=list(search.SEARCH_INDEXES),
+                            help='Modelle für --rebuild (Standard: alle aus SEARCH_INDEXES)')
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                            help='Benchmark mit N synthetischen Mail-Dokumenten')
+        parser.add_argument('--queries', nargs='+', default=BENCHMARK_QUERIES,
+                            help='Suchbegriffe für --benchmark')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Backend: {search.backend()}')
+        if options['rebuild']:
+            self._rebuild(options['models'])
+        if options['benchmark']:
+            self._benchmark(options['benchmark'], options['queries'])
+        if not options['rebuild'] and not options['benchmark']:
+            self.stdout.write('Nichts zu tun – --rebuild und/oder --benchmark N angeben')
+
+    def _rebuild(self, labels):
+        started = time.monotonic()
+        total = 0
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except LookupError:
+                self.stdout.write(self.style.WARNING(f'{label}: Modell nicht gefunden'))
+                continue
+            model_started = time.monotonic()
+            count = search.reindex_model(model)
+            total += count
+            self.stdout.write(f'{label}: {count} Dokumente in {time.monotonic() - model_started:.1f}s')
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} Dokumente indiziert in {elapsed:.1f}s ({rate:.0f}/s)'))
+
+    def _benchmark(self, n, queries):
+        rng = random.Random(42)
+        pseudo = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 10)))
+                  for _ in range(PSEUDO_WORDS)]
+        vocabulary = pseudo[:20] + VOCABULARY + pseudo[20:]
+        cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))
+
+        def text(words):
+            return ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+
+        SearchDocument.objects.filter(model_label=BENCHMARK_LABEL).delete()
+        started = time.monotonic()
+        batch = []
+        for i in range(n):
+            batch.append(SearchDocument(model_label=BENCHMARK_LABEL, object_id=i + 1,
+                                        title=text(6), body=text(rng.randint(40, 400))))
+            if len(batch) >= 2000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{n} Dokumente angelegt in {elapsed:.1f}s ({n / elapsed if elapsed else 0:.0f}/s)')
+
+        try:
+            for query in queries:
+                index_ms, hits = self._time(lambda: search.search_ids(None, query, label=BENCHMARK_LABEL))
+                like_ms, like_hits = self._time(lambda: self._like_scan(query))
+                speedup = like_ms / index_ms if index_ms else 0
+                self.stdout.write(
+                    f'"{query}": Index {index_ms:.1f} ms ({len(hits)} Top-Treffer) – '
+                    f'LIKE {like_ms:.1f} ms ({like_hits} Treffer) – {speedup:.1f}x')
+        finally:
+            SearchDocument.objects.filter(model_label=BENCHMARK_LABEL).delete()
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark abgeschlossen, Testdokumente entfernt'))
+
+    def _like_scan(self, query):
+        """Bisheriges Verfahren: OR-verkettetes icontains über die Textspalten."""
+        return SearchDocument.objects.filter(model_label=BENCHMARK_LABEL).filter(
+            Q(title__icontains=query) | Q(body__icontains=query)).count()
+
+    def _time(self, func):
+        func()  # Warm-up (Caches, Query-Plan)
+        started = time.perf_counter()
+        for _ in range(BENCHMARK_REPEAT):
+            result = func()
+        return (time.perf_counter() - started) * 1000 / BENCHMARK_REPEAT, result
@@ -0,0 +1,315 @@
+"""
+Media-Probe-Service für Workloom
+
+Zentraler, persistent gecachter ffprobe-Zugriff für Audio-/Videodateien.
+Ersetzt die verstreuten ffprobe-Aufrufe (radio, video, mycut, voice_pot).
+
+Cache-Stufen:
+  1. Prozess-Cache (LRU, max. MEMO_MAX_ENTRIES) – Schlüssel (Pfad, Größe, mtime)
+  2. DB-Tabelle core.MediaProbe – gleicher Schlüssel, überlebt Neustarts
+  3. Inhalts-Hash – erkennt verschobene/kopierte Dateien. Wiederverwendet
+     wird ein Ergebnis darüber nur bei Dateien bis FULL_HASH_MAX_BYTES
+     (typisch Audio), deren Hash über den kompletten Inhalt läuft.
+
+Nur bei einem Fehlschlag aller drei Stufen wird ffprobe gestartet.
+Temporäre Dateien mit use_cache=False prüfen – sie landen dann weder im
+Prozess-Cache noch in der DB.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Anzahl Bytes, die vom Anfang und Ende einer Datei in den Inhalts-Hash eingehen
+HASH_SAMPLE_BYTES = 64 * 1024
+# Bis zu dieser Größe wird die komplette Datei gehasht (Stichproben können
+# bei gleich langen Audiodateien mit gleichem Intro/Outro kollidieren)
+FULL_HASH_MAX_BYTES = 32 * 1024 * 1024
+MEMO_MAX_ENTRIES = 2048
+PROBE_TIMEOUT = 30
+BATCH_WORKERS = 4
+
+# (Pfad, Größe, mtime_ns) -> info-dict, älteste Einträge zuerst
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memo_get(key):
+    with _memo_lock:
+        info = _memo.get(key)
+        if info is not None:
+            _memo.move_to_end(key)
+        return info
+
+
+def _memo_put(key, info):
+    with _memo_lock:
+        _memo[key] = info
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def _stat_key(path):
+    """Gibt (Pfad, Größe, mtime_ns) zurück oder None wenn die Datei fehlt."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def content_hash(path, size=None):
+    """
+    Inhalts-Hash (SHA-256) einer Datei.
+
+    Bis FULL_HASH_MAX_BYTES über den kompletten Inhalt, darüber nur über
+    Größe + erste und letzte 64 KB, damit mehrere hundert MB Video nicht
+    komplett gelesen werden müssen. Stichproben-Hashes sind nur ein
+    Hinweis, keine Garantie für identischen Inhalt (siehe is_full_hash).
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if is_full_hash(size):
+        h = hashlib.sha256(f'full:{size}'.encode())
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b''):
+                h.update(block)
+        return h.hexdigest()
+    h = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as fh:
+        h.update(fh.read(HASH_SAMPLE_BYTES))
+        if size > 2 * HASH_SAMPLE_BYTES:
+            fh.seek(-HASH_SAMPLE_BYTES, os.SEEK_END)
+            h.update(fh.read(HASH_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+def is_full_hash(size):
+    """True, wenn content_hash() für diese Dateigröße den ganzen Inhalt hasht."""
+    return size <= FULL_HASH_MAX_BYTES
+
+
+def _run_ffprobe(path):
+    """Startet ffprobe und parst Format-/Stream-Daten. None bei Fehler."""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'quiet', '-print_format', 'json',
+             '-show_format', '-show_streams', path],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT, check=True,
+        )
+        data = json.loads(result.stdout or '{}')
+    except Exception as e:
+        logger.warning(f"ffprobe fehlgeschlagen für {path}: {e}")
+        return None
+
+    info = {
+        'duration': 0.0,
+        'width': 0,
+        'height': 0,
+        'fps': 0,
+        'video_codec': None,
+        'audio_codec': None,
+        'has_audio': False,
+    }
+    try:
+        info['duration'] = float((data.get('format') or {}).get('duration') or 0)
+    except (TypeError, ValueError):
+        pass
+
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'video' and not info['video_codec']:
+            info['width'] = int(stream.get('width') or 0)
+            info['height'] = int(stream.get('height') or 0)
+            info['video_codec'] = stream.get('codec_name')
+            fps_str = stream.get('r_frame_rate', '0/1')
+            if '/' in fps_str:
+                num, den = fps_str.split('/')
+                try:
+                    if int(den) > 0:
+                        info['fps'] = round(int(num) / int(den), 2)
+                except ValueError:
+                    pass
+            if not info['duration']:
+                try:
+                    info['duration'] = float(stream.get('duration') or 0)
+                except (TypeError, ValueError):
+                    pass
+        elif stream.get('codec_type') == 'audio':
+            info['audio_codec'] = info['audio_codec'] or stream.get('codec_name')
+            info['has_audio'] = True
+    return info
+
+
+def _load_from_db(key):
+    """Sucht einen gültigen DB-Eintrag (Pfad + Größe + mtime)."""
+    from .models import MediaProbe
+    path, size, mtime_ns = key
+    row = MediaProbe.objects.filter(path=path[:500], size_bytes=size, mtime_ns=mtime_ns).first()
+    return row.as_info() if row else None
+
+
+def _store(key, info, digest):
+    """Schreibt das Ergebnis in die DB (upsert über den Pfad)."""
+    from .models import MediaProbe
+    path, size, mtime_ns = key
+    try:
+        MediaProbe.objects.update_or_create(
+            path=path[:500],
+            defaults={
+                'size_bytes': size,
+                'mtime_ns': mtime_ns,
+                'content_hash': digest,
+                'duration': info['duration'] or 0,
+                'width': info['width'] or 0,
+                'height': info['height'] or 0,
+                'fps': info['fps'] or 0,
+                'video_codec': info['video_codec'] or '',
+                'audio_codec': info['audio_codec'] or '',
+                'has_audio': bool(info['has_audio']),
+            },
+        )
+    except Exception as e:
+        # Cache ist optional – ein DB-Fehler darf das Probing nicht scheitern lassen
+        logger.warning(f"MediaProbe konnte nicht gespeichert werden ({path}): {e}")
+
+
+def probe(path, use_cache=True):
+    """
+    Liefert Metadaten einer Mediendatei.
+
+    Mit use_cache=False wird direkt ffprobe gestartet und nichts
+    zwischengespeichert (für temporäre Dateien).
+
+    Returns:
+        dict mit: duration, width, height, fps, video_codec, audio_codec, has_audio
+        oder None, wenn die Datei fehlt bzw. nicht lesbar ist.
+    """
+    key = _stat_key(path)
+    if key is None:
+        return None
+
+    if not use_cache:
+        return _run_ffprobe(path)
+
+    cached = _memo_get(key)
+    if cached is not None:
+        return dict(cached)
+    try:
+        cached = _load_from_db(key)
+    except Exception as e:
+        logger.debug(f"MediaProbe-Lookup fehlgeschlagen: {e}")
+        cached = None
+    if cached is not None:
+        _memo_put(key, cached)
+        return dict(cached)
+
+    try:
+        digest = content_hash(path, key[1])
+    except OSError as e:
+        logger.warning(f"Datei nicht lesbar ({path}): {e}")
+        return None
+
+    info = None
+    if is_full_hash(key[1]):
+        # Gleicher Inhalt unter anderem Pfad (verschoben/kopiert) bereits geprüft?
+        try:
+            from .models import MediaProbe
+            twin = MediaProbe.objects.filter(content_hash=digest, size_bytes=key[1]).first()
+            info = twin.as_info() if twin else None
+        except Exception:
+            info = None
+
+    if info is None:
+        info = _run_ffprobe(path)
+        if info is None:
+            return None
+
+    _store(key, info, digest)
+    _memo_put(key, info)
+    return dict(info)
+
+
+def probe_duration(path, use_cache=True):
+    """Dauer in ganzen Sekunden (0 bei Fehler)."""
+    info = probe(path, use_cache=use_cache)
+    return int(info['duration']) if info else 0
+
+
+def probe_dims(path, default=(1920, 1080)):
+    """(Breite, Höhe) des ersten Videostreams oder `default`."""
+    info = probe(path)
+    if info and info['width'] and info['height']:
+        return info['width'], info['height']
+    return default
+
+
+def probe_many(paths, max_workers=BATCH_WORKERS):
+    """
+    Prüft viele Dateien parallel. Cache-Treffer kosten keinen Prozessstart,
+    nur die Fehlschläge laufen (begrenzt) parallel durch ffprobe.
+
+    Returns:
+        dict Pfad -> info-dict (oder None)
+    """
+    unique = list(dict.fromkeys(p for p in paths if p))
+    if not unique:
+        return {}
+    if len(unique) == 1 or max_workers <= 1:
+        return {p: probe(p) for p in unique}
+
+    from django.db import close_old_connections
+
+    def _worker(p):
+        try:
+            return probe(p)
+        finally:
+            # Threads öffnen eigene DB-Verbindungen – sauber schließen
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+        return dict(zip(unique, pool.map(_worker, unique)))
+
+
+def clear_memo():
+    """Leert den Prozess-Cache (z.B. für Tests)."""
+    with _memo_lock:
+        _memo.clear()
+
+
+# Modelle, deren duration_sec beim Upload automatisch befüllt wird:
+# 'app_label.Model' -> (Dateifeld, Dauerfeld)
+DURATION_FIELDS = {
+    'radio.Track': ('audio_file', 'duration_sec'),
+    'radio.SpokenContent': ('audio_file', 'duration_sec'),
+    'voice_pot.VoiceRecording': ('audio_file', 'duration_sec'),
+}
+
+
+def fill_duration(instance, file_field, duration_field):
+    """
+    Ergänzt eine fehlende Dauer aus der gespeicherten Datei.
+    Schreibt per queryset.update(), damit keine weiteren save-Signale auslösen.
+    """
+    if getattr(instance, duration_field, 0):
+        return False
+    f = getattr(instance, file_field, None)
+    if not f or not getattr(f, 'name', ''):
+        return False
+    try:
+        path = f.path
+    except (NotImplementedError, ValueError):
+        return False
+    seconds = probe_duration(path)
+    if not seconds:
+        return False
+    setattr(instance, duration_field, seconds)
+    type(instance)._default_manager.filter(pk=instance.pk).update(**{duration_field: seconds})
+    return True
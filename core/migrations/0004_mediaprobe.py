@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_storagelog_app_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaProbe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True, verbose_name='Pfad')),
+                ('size_bytes', models.BigIntegerField(verbose_name='Größe (Bytes)')),
+                ('mtime_ns', models.BigIntegerField(verbose_name='Änderungszeit (ns)')),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='Inhalts-Hash')),
+                ('duration', models.FloatField(default=0, verbose_name='Dauer (s)')),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('fps', models.FloatField(default=0)),
+                ('video_codec', models.CharField(blank=True, default='', max_length=40)),
+                ('audio_codec', models.CharField(blank=True, default='', max_length=40)),
+                ('has_audio', models.BooleanField(default=False)),
+                ('probed_at', models.DateTimeField(auto_now=True, verbose_name='Geprüft am')),
+            ],
+            options={
+                'verbose_name': 'Medien-Probe',
+                'verbose_name_plural': 'Medien-Proben',
+            },
+        ),
+    ]
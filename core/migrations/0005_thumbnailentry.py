@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_mediaprobe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=500, verbose_name='Original')),
+                ('size', models.CharField(max_length=20, verbose_name='Größe')),
+                ('thumb_name', models.CharField(max_length=500, verbose_name='Thumbnail')),
+                ('source_mtime_ns', models.BigIntegerField(default=0, verbose_name='Änderungszeit Original (ns)')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Erzeugt am')),
+            ],
+            options={
+                'verbose_name': 'Thumbnail',
+                'verbose_name_plural': 'Thumbnails',
+                'unique_together': {('source_name', 'size')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_thumbnailentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailentry',
+            name='formats',
+            field=models.CharField(default='webp', help_text='Kommagetrennt, z.B. "webp,avif" – gleiche Pfade mit anderer Endung', max_length=50, verbose_name='Formate'),
+        ),
+    ]
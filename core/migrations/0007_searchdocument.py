@@ -0,0 +1,84 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+FTS5_TABLE = 'core_searchdocument_fts'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS5_TABLE} USING fts5(
+        title, body, content='core_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO {FTS5_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO {FTS5_TABLE}({FTS5_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO {FTS5_TABLE}({FTS5_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS5_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_au',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ai',
+    f'DROP TABLE IF EXISTS {FTS5_TABLE}',
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        # (title) allein für die Titel-Gewichtung im Ranking
+        schema_editor.execute(
+            'ALTER TABLE core_searchdocument ADD FULLTEXT INDEX core_searchdoc_ft (title, body), '
+            'ADD FULLTEXT INDEX core_searchdoc_title_ft (title)'
+        )
+    elif vendor == 'sqlite':
+        try:
+            for sql in SQLITE_FORWARD:
+                schema_editor.execute(sql)
+        except Exception:
+            # SQLite ohne FTS5 – core.search fällt auf LIKE zurück
+            for sql in SQLITE_BACKWARD:
+                schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE core_searchdocument DROP INDEX core_searchdoc_ft, DROP INDEX core_searchdoc_title_ft'
+        )
+    elif vendor == 'sqlite':
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_thumbnailentry_formats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Modell')),
+                ('object_id', models.BigIntegerField(verbose_name='Objekt-ID')),
+                ('title', models.CharField(blank=True, max_length=1000, verbose_name='Titel')),
+                ('body', models.TextField(blank=True, verbose_name='Text')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Indiziert am')),
+            ],
+            options={
+                'verbose_name': 'Suchdokument',
+                'verbose_name_plural': 'Suchdokumente',
+                'unique_together': {('model_label', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
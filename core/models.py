@@ -128,3 +128,97 @@ class StorageLog(models.Model):
             'total_deleted_mb': (stats['total_deleted_bytes'] or 0) / (1024 * 1024),
             'per_app': list(per_app),
         }
+
+
+class MediaProbe(models.Model):
+    """
+    Persistenter ffprobe-Cache für Audio-/Videodateien.
+
+    Schlüssel ist (Pfad, Größe, mtime); zusätzlich wird ein Stichproben-Hash
+    des Inhalts gespeichert, damit verschobene/kopierte Dateien ohne erneuten
+    ffprobe-Aufruf erkannt werden. Siehe core.media_probe.
+    """
+
+    path = models.CharField(max_length=500, unique=True, verbose_name='Pfad')
+    size_bytes = models.BigIntegerField(verbose_name='Größe (Bytes)')
+    mtime_ns = models.BigIntegerField(verbose_name='Änderungszeit (ns)')
+    content_hash = models.CharField(max_length=64, db_index=True, verbose_name='Inhalts-Hash')
+    duration = models.FloatField(default=0, verbose_name='Dauer (s)')
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    fps = models.FloatField(default=0)
+    video_codec = models.CharField(max_length=40, blank=True, default='')
+    audio_codec = models.CharField(max_length=40, blank=True, default='')
+    has_audio = models.BooleanField(default=False)
+    probed_at = models.DateTimeField(auto_now=True, verbose_name='Geprüft am')
+
+    class Meta:
+        verbose_name = 'Medien-Probe'
+        verbose_name_plural = 'Medien-Proben'
+
+    def __str__(self):
+        return f"{self.path} ({self.duration:.1f}s)"
+
+    def as_info(self):
+        """Gibt die Metadaten im Format von FFmpegService.get_video_info zurück"""
+        return {
+            'duration': self.duration,
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'video_codec': self.video_codec or None,
+            'audio_codec': self.audio_codec or None,
+            'has_audio': self.has_audio,
+        }
+
+
+class ThumbnailEntry(models.Model):
+    """
+    Register aller erzeugten Thumbnails.
+
+    Schlüssel ist (Originalname, Größe); die mtime des Originals zum
+    Erzeugungszeitpunkt wird mitgespeichert. Templates fragen nur dieses
+    Register (über den Cache) ab statt storage.exists() pro Bild – siehe
+    core.thumbnails.get_or_create_thumbnail.
+    """
+
+    source_name = models.CharField(max_length=500, verbose_name='Original')
+    size = models.CharField(max_length=20, verbose_name='Größe')
+    thumb_name = models.CharField(max_length=500, verbose_name='Thumbnail')
+    formats = models.CharField(max_length=50, default='webp', verbose_name='Formate',
+                               help_text='Kommagetrennt, z.B. "webp,avif" – gleiche Pfade mit anderer Endung')
+    source_mtime_ns = models.BigIntegerField(default=0, verbose_name='Änderungszeit Original (ns)')
+    created_at = models.DateTimeField(auto_now=True, verbose_name='Erzeugt am')
+
+    class Meta:
+        verbose_name = 'Thumbnail'
+        verbose_name_plural = 'Thumbnails'
+        unique_together = ('source_name', 'size')
+
+    def __str__(self):
+        return f"{self.source_name} ({self.size})"
+
+
+class SearchDocument(models.Model):
+    """
+    Volltext-Index für Mail, Literatur und Shopify-Inhalte.
+
+    Eine Zeile pro indiziertem Objekt (model_label + object_id) mit
+    zusammengefasstem Titel und Text. Der eigentliche Index liegt je nach
+    Datenbank als FULLTEXT-Index (MySQL) bzw. FTS5-Tabelle (SQLite) darauf –
+    siehe core.search und Migration 0007.
+    """
+
+    model_label = models.CharField(max_length=100, verbose_name='Modell')
+    object_id = models.BigIntegerField(verbose_name='Objekt-ID')
+    title = models.CharField(max_length=1000, blank=True, verbose_name='Titel')
+    body = models.TextField(blank=True, verbose_name='Text')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Indiziert am')
+
+    class Meta:
+        verbose_name = 'Suchdokument'
+        verbose_name_plural = 'Suchdokumente'
+        unique_together = ('model_label', 'object_id')
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id}"
@@ -0,0 +1,202 @@
+"""
+Gemeinsames Rate-Limiting
+=========================
+Fixed-Window-Zähler im Django-Cache, nutzbar als Middleware (Pfad-Regeln)
+und als View-Decorator.
+
+Zähler:
+    Pro Schlüssel und Zeitfenster ein Cache-Eintrag rl:<scope>:<ident>:<fenster>.
+    cache.add() legt ihn an, cache.incr() zählt hoch – mit RedisCache
+    (SHARED_STATE_BACKEND=redis, siehe settings) ist das SET NX + INCRBY,
+    also atomar und über alle Worker geteilt; mit LocMem (Entwicklung/Tests)
+    prozesslokal. Kein get/set-Wettlauf mehr.
+
+Pfad-Regeln:
+    Die Middleware kompiliert ihre Präfixe beim Start in einen PrefixTrie
+    (ein Knoten pro Pfadsegment, '*' = beliebiges Segment). Pro Request wird
+    nur der Pfad segmentweise abgelaufen; Pfade ohne Regel kosten keinen
+    Cache-Zugriff.
+
+Verwendung:
+    from core.ratelimit import ratelimit
+
+    @login_required
+    @ratelimit(10, 60)                     # 10 Aufrufe pro Minute und User
+    def generate_image(request): ...
+
+    @ratelimit(120, 60, key='ip')          # öffentliche Tracking-Endpoints
+    def track_click(request, ad_id): ...
+"""
+
+import functools
+import logging
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from django.core.cache import cache
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rl'
+
+
+class RateLimitRule(NamedTuple):
+    limit: int
+    window: int                       # Sekunden
+    methods: Tuple[str, ...] = ()     # leer = alle Methoden
+    message: Optional[str] = None
+    scope: Optional[str] = None       # Standard: das Pfad-Präfix
+
+
+def hit(scope, ident, limit, window, cost=1):
+    """
+    Zählt einen Aufruf. Gibt (erlaubt, retry_after_sekunden) zurück.
+    Fällt der Cache aus, wird nicht limitiert.
+    """
+    now = int(time.time())
+    window_start = now - now % window
+    key = f'{KEY_PREFIX}:{scope}:{ident}:{window_start}'
+    try:
+        cache.add(key, 0, window + 1)
+        count = cache.incr(key, cost)
+    except ValueError:
+        # Eintrag zwischen add und incr abgelaufen
+        cache.set(key, cost, window + 1)
+        count = cost
+    except Exception as e:
+        logger.warning(f"Rate-Limit-Cache nicht erreichbar: {e}")
+        return True, 0
+    if count > limit:
+        return False, window_start + window - now
+    return True, 0
+
+
+def client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_identity(request, key='user_or_ip'):
+    """'user:<id>' für angemeldete User (bei key='user_or_ip'), sonst 'ip:<adresse>'."""
+    user = getattr(request, 'user', None)
+    if key == 'user_or_ip' and user is not None and user.is_authenticated:
+        return f'user:{user.id}'
+    return f'ip:{client_ip(request)}'
+
+
+def too_many_requests(limit, window, retry_after, message=None):
+    response = JsonResponse({
+        'error': message or f'Rate limit exceeded. Limit: {limit} requests per {window} seconds.',
+        'retry_after': retry_after,
+    }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class PrefixTrie:
+    """Längstes passendes Pfad-Präfix in O(Segmente); '*' passt auf ein beliebiges Segment."""
+
+    _VALUE = object()
+
+    def __init__(self, rules=None):
+        self.root = {}
+        for prefix, value in (rules or {}).items():
+            self.insert(prefix, value)
+
+    @staticmethod
+    def _segments(path):
+        return [s for s in path.split('/') if s]
+
+    def insert(self, prefix, value):
+        node = self.root
+        for segment in self._segments(prefix):
+            node = node.setdefault(segment, {})
+        node[self._VALUE] = value
+
+    def match(self, path):
+        """Wert des längsten passenden Präfixes oder None."""
+        return self._match(self.root, self._segments(path), 0)
+
+    def _match(self, node, segments, i):
+        best = node.get(self._VALUE)
+        if i == len(segments):
+            return best
+        for child_key in (segments[i], '*'):
+            child = node.get(child_key)
+            if child is not None:
+                found = self._match(child, segments, i + 1)
+                if found is not None:
+                    return found
+        return best
+
+
+def ratelimit(limit, window, scope=None, key='user_or_ip', methods=None, message=None):
+    """
+    View-Decorator: limit Aufrufe pro window Sekunden und User (bzw. IP).
+    scope trennt die Zähler (Standard: Modul + Name der View).
+    """
+    def decorator(view_func):
+        view_scope = scope or f'{view_func.__module__}.{view_func.__name__}'
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not methods or request.method in methods:
+                allowed, retry_after = hit(view_scope, request_identity(request, key), limit, window)
+                if not allowed:
+                    return too_many_requests(limit, window, retry_after, message)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware:
+    """
+    Basis-Middleware: Unterklassen setzen rules = {präfix: RateLimitRule}.
+    global_rule gilt zusätzlich (pro IP) für jeden Request mit passender Regel.
+    """
+    rules = {}
+    global_rule = None
+    skip_superusers = True
+    authenticated_only = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trie = PrefixTrie({
+            prefix: rule._replace(scope=rule.scope or prefix) for prefix, rule in self.rules.items()
+        })
+
+    def __call__(self, request):
+        return self.check(request) or self.get_response(request)
+
+    def applies(self, request):
+        """Zusätzlicher Filter für Requests mit passender Regel."""
+        return True
+
+    def check(self, request):
+        rule = self.trie.match(request.path)
+        if rule is None:
+            return None
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+        if self.authenticated_only and not authenticated:
+            return None
+        if self.skip_superusers and authenticated and user.is_superuser:
+            return None
+        if not self.applies(request):
+            return None
+
+        if self.global_rule:
+            g = self.global_rule
+            allowed, retry_after = hit(g.scope or 'global', request_identity(request, 'ip'), g.limit, g.window)
+            if not allowed:
+                return too_many_requests(g.limit, g.window, retry_after, g.message)
+
+        if rule.methods and request.method not in rule.methods:
+            return None
+        allowed, retry_after = hit(rule.scope, request_identity(request), rule.limit, rule.window)
+        if not allowed:
+            return too_many_requests(rule.limit, rule.window, retry_after, rule.message)
+        return None
@@ -0,0 +1,311 @@
+"""
+Volltextsuche
+=============
+Ein gemeinsamer Suchindex (core.SearchDocument) für alle Modelle aus
+SEARCH_INDEXES statt OR-verketteter __icontains-Filter (LIKE '%q%' über
+mehrere Textspalten = Full-Table-Scan).
+
+Pflege:
+    post_save/post_delete (core.signals.connect_search_signals) halten den
+    Index aktuell; Massenimporte per bulk_create (z.B. Mail-Sync) rufen
+    index_objects() selbst auf. Bestandsdaten indiziert migrate NICHT –
+    einmalig beim Deploy nach Migration 0007 (und nach Änderungen an
+    SEARCH_INDEXES) komplett aufbauen; bei Abbruch einfach erneut starten:
+        python manage.py search_index --rebuild
+
+Backends (nach Datenbank):
+    mysql    FULLTEXT-Index auf (title, body), MATCH … AGAINST im BOOLEAN MODE
+    sqlite   FTS5-Tabelle core_searchdocument_fts, Ranking per bm25()
+    sonst    LIKE auf SearchDocument (eine Tabelle, nicht n Spalten)
+
+Jedes Suchwort muss vorkommen und wird als Präfix gesucht ("rech" findet
+"Rechnung"); Treffer sind nach Relevanz sortiert, Titeltreffer zählen mehr.
+Nur die Relevanz-Sortierung ist auf SEARCH_LIMIT Treffer begrenzt; ohne
+Sortierung (ranked=False) filtert eine Unterabfrage auf alle Treffer.
+
+Verwendung:
+    from core import search
+
+    emails = search.filter_queryset(Email.objects.filter(account=account), query)
+    snippet = search.highlight(email.body_text, query)
+"""
+
+import html
+import logging
+import re
+from functools import lru_cache
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Modell -> (Titelfelder, Textfelder); Felder mit 'html' im Namen werden von Tags befreit
+SEARCH_INDEXES = {
+    'mail_app.Email': (('subject',), ('from_name', 'from_email', 'body_text', 'body_html')),
+    'library.Reference': (('title', 'bibtex_key'), ('authors', 'tags', 'abstract', 'notes')),
+    'shopify_manager.ShopifyProduct': (('title',), ('vendor', 'tags', 'body_html')),
+    'shopify_manager.ShopifyBlogPost': (('title',), ('author', 'tags', 'content')),
+}
+
+SEARCH_LIMIT = 500            # max. Treffer pro Suche (nach Relevanz)
+BODY_MAX_CHARS = 200_000      # längere Texte werden für den Index gekürzt
+MYSQL_MIN_TOKEN = 3           # innodb_ft_min_token_size – kürzere Wörter per LIKE
+FTS5_TABLE = 'core_searchdocument_fts'
+TITLE_WEIGHT = 10.0           # bm25-Gewicht Titel gegenüber Text (SQLite)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def tokenize(query):
+    return [t for t in _WORD_RE.findall((query or '').lower()) if t]
+
+
+# ------------------------------------------------------------------
+# Index-Pflege
+# ------------------------------------------------------------------
+
+def _indexed_fields(model):
+    return SEARCH_INDEXES.get(model._meta.label)
+
+
+def _field_text(instance, name):
+    value = getattr(instance, name, '') or ''
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(v) for v in value)
+    value = str(value)
+    if 'html' in name or name == 'content':
+        value = html.unescape(strip_tags(value))
+    return value
+
+
+def build_document(instance):
+    """(title, body) für ein Objekt eines indizierten Modells."""
+    title_fields, body_fields = _indexed_fields(type(instance))
+    title = ' '.join(filter(None, (_field_text(instance, f) for f in title_fields)))
+    body = '\n'.join(filter(None, (_field_text(instance, f) for f in body_fields)))
+    return title[:1000], body[:BODY_MAX_CHARS]
+
+
+def index_objects(objects):
+    """Index für die Objekte (eines Modells) neu schreiben – ein DELETE + ein bulk_create."""
+    from core.models import SearchDocument
+
+    objects = [o for o in objects if o.pk is not None]
+    if not objects:
+        return 0
+    label = model_label(type(objects[0]))
+    docs = []
+    for obj in objects:
+        title, body = build_document(obj)
+        docs.append(SearchDocument(model_label=label, object_id=obj.pk, title=title, body=body))
+    SearchDocument.objects.filter(model_label=label, object_id__in=[o.pk for o in objects]).delete()
+    SearchDocument.objects.bulk_create(docs, batch_size=500)
+    return len(docs)
+
+
+def unindex_object(instance):
+    from core.models import SearchDocument
+    SearchDocument.objects.filter(model_label=model_label(type(instance)), object_id=instance.pk).delete()
+
+
+def reindex_model(model, batch_size=1000):
+    """Index eines Modells komplett neu aufbauen; gibt die Anzahl zurück."""
+    from core.models import SearchDocument
+
+    SearchDocument.objects.filter(model_label=model_label(model)).delete()
+    title_fields, body_fields = _indexed_fields(model)
+    fields = [*title_fields, *body_fields]
+    total = 0
+    batch = []
+    for obj in model._default_manager.only(*fields).iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            total += index_objects(batch)
+            batch = []
+    total += index_objects(batch)
+    return total
+
+
+def indexed_models():
+    for label in SEARCH_INDEXES:
+        try:
+            yield apps.get_model(label)
+        except LookupError:
+            continue
+
+
+# ------------------------------------------------------------------
+# Suche
+# ------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def backend():
+    """'mysql', 'fts5' oder 'like' – einmal pro Prozess ermittelt."""
+    if connection.vendor == 'mysql':
+        return 'mysql'
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [FTS5_TABLE])
+            if cursor.fetchone():
+                return 'fts5'
+    return 'like'
+
+
+def _scope_sql(queryset, column):
+    """'AND <column> IN (<queryset>)' – leer ohne queryset (Benchmark, ganzer Index)."""
+    if queryset is None:
+        return '', []
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return f' AND {column} IN ({sql})', list(params)
+
+
+def _like_documents(label, tokens, queryset=None):
+    from core.models import SearchDocument
+
+    docs = SearchDocument.objects.filter(model_label=label)
+    if queryset is not None:
+        docs = docs.filter(object_id__in=queryset.order_by().values('pk'))
+    for token in tokens:
+        docs = docs.filter(Q(title__icontains=token) | Q(body__icontains=token))
+    return docs
+
+
+def _search_like(label, tokens, queryset, limit):
+    docs = _like_documents(label, tokens, queryset)
+    return list(docs.order_by('-object_id').values_list('object_id', flat=True)[:limit])
+
+
+def _mysql_against(tokens):
+    return ' '.join(f'+{t}*' for t in tokens)
+
+
+def _search_mysql(label, tokens, queryset, limit):
+    if any(len(t) < MYSQL_MIN_TOKEN for t in tokens):
+        # Zu kurz für den FULLTEXT-Index (wären stillschweigend ignoriert)
+        return _search_like(label, tokens, queryset, limit)
+    against = _mysql_against(tokens)
+    scope, scope_params = _scope_sql(queryset, 'object_id')
+    sql = (
+        'SELECT object_id, '
+        ' MATCH(title) AGAINST (%s IN BOOLEAN MODE) * 2 + MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) AS score '
+        'FROM core_searchdocument '
+        'WHERE MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) '
+        f'  AND model_label = %s{scope} '
+        'ORDER BY score DESC LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [against, against, against, label, *scope_params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fts5_match(tokens):
+    return ' '.join('"{}"*'.format(t.replace('"', '')) for t in tokens)
+
+
+def _search_fts5(label, tokens, queryset, limit):
+    match = _fts5_match(tokens)
+    scope, scope_params = _scope_sql(queryset, 'd.object_id')
+    sql = (
+        'SELECT d.object_id '
+        f'FROM {FTS5_TABLE} f JOIN core_searchdocument d ON d.id = f.rowid '
+        f'WHERE {FTS5_TABLE} MATCH %s AND d.model_label = %s{scope} '
+        f'ORDER BY bm25({FTS5_TABLE}, {TITLE_WEIGHT}, 1.0) LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, label, *scope_params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+_BACKENDS = {'mysql': _search_mysql, 'fts5': _search_fts5, 'like': _search_like}
+
+
+def search_ids(queryset, query, limit=SEARCH_LIMIT, label=None):
+    """
+    IDs der Treffer innerhalb von queryset, beste zuerst.
+    queryset=None durchsucht alle Dokumente von label.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    label = label or model_label(queryset.model)
+    try:
+        return _BACKENDS[backend()](label, tokens, queryset, limit)
+    except Exception as e:
+        logger.warning(f"Volltextsuche ({backend()}) fehlgeschlagen, nutze LIKE: {e}")
+        return _search_like(label, tokens, queryset, limit)
+
+
+def match_subquery(label, query):
+    """
+    Unterabfrage mit den object_ids aller Treffer (ohne Limit, unsortiert) –
+    für pk__in, wenn alle Treffer gebraucht werden.
+    """
+    tokens = tokenize(query)
+    kind = backend()
+    if kind == 'mysql' and all(len(t) >= MYSQL_MIN_TOKEN for t in tokens):
+        return RawSQL(
+            'SELECT object_id FROM core_searchdocument '
+            'WHERE MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) AND model_label = %s',
+            [_mysql_against(tokens), label],
+        )
+    if kind == 'fts5':
+        return RawSQL(
+            f'SELECT d.object_id FROM {FTS5_TABLE} f JOIN core_searchdocument d ON d.id = f.rowid '
+            f'WHERE {FTS5_TABLE} MATCH %s AND d.model_label = %s',
+            [_fts5_match(tokens), label],
+        )
+    return _like_documents(label, tokens).values('object_id')
+
+
+def filter_queryset(queryset, query, ranked=True, limit=SEARCH_LIMIT):
+    """
+    queryset auf die Treffer einschränken. ranked=True sortiert nach Relevanz
+    (die besten limit Treffer), sonst bleibt die Sortierung des querysets
+    erhalten und es zählen alle Treffer.
+    """
+    if not ranked:
+        if not tokenize(query):
+            return queryset.none()
+        return queryset.filter(pk__in=match_subquery(model_label(queryset.model), query))
+
+    ids = search_ids(queryset, query, limit)
+    queryset = queryset.filter(pk__in=ids)
+    if ids:
+        queryset = queryset.order_by(
+            Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+        )
+    return queryset
+
+
+def highlight(text, query, length=200):
+    """
+    HTML-Ausschnitt um den ersten Treffer, Suchwörter (als Präfix) in <mark>.
+    Der Text wird vorher von Tags befreit und escaped.
+    """
+    text = re.sub(r'\s+', ' ', html.unescape(strip_tags(text or ''))).strip()
+    tokens = tokenize(query)
+    if not text or not tokens:
+        return escape(text[:length])
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in tokens) + r')\w*', re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - length // 4) if first else 0
+    snippet = text[start:start + length]
+    parts = []
+    pos = 0
+    for m in pattern.finditer(snippet):
+        parts.append(escape(snippet[pos:m.start()]))
+        parts.append(f'<mark>{escape(m.group(0))}</mark>')
+        pos = m.end()
+    parts.append(escape(snippet[pos:]))
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + length < len(text) else ''
+    return mark_safe(prefix + ''.join(parts) + suffix)
@@ -0,0 +1,74 @@
+"""
+Core Signals
+============
+Befüllt duration_sec-Felder beim Upload automatisch über den Media-Probe-Cache
+und hält den Volltext-Index (core.search) aktuell.
+"""
+
+import logging
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from .media_probe import DURATION_FIELDS, fill_duration
+
+logger = logging.getLogger(__name__)
+
+
+def _make_duration_handler(file_field, duration_field):
+    def _fill_duration_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+        if raw:
+            return
+        # Nur reagieren, wenn die Datei in diesem save() tatsächlich geschrieben wurde
+        if update_fields is not None and file_field not in update_fields:
+            return
+        try:
+            fill_duration(instance, file_field, duration_field)
+        except Exception as e:
+            logger.warning(f"Dauer für {sender.__name__} #{instance.pk} nicht ermittelbar: {e}")
+    return _fill_duration_on_save
+
+
+def connect_duration_signals():
+    """Verbindet den Dauer-Handler mit allen Modellen aus DURATION_FIELDS."""
+    for label, (file_field, duration_field) in DURATION_FIELDS.items():
+        try:
+            model = apps.get_model(label)
+        except LookupError:
+            continue
+        post_save.connect(
+            _make_duration_handler(file_field, duration_field),
+            sender=model,
+            weak=False,
+            dispatch_uid=f'core_fill_duration_{label}',
+        )
+
+
+def _index_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    from core import search
+    title_fields, body_fields = search.SEARCH_INDEXES[sender._meta.label]
+    # z.B. mark_as_read() speichert nur Flags – Index bleibt gültig
+    if update_fields is not None and not set(update_fields) & {*title_fields, *body_fields}:
+        return
+    try:
+        search.index_objects([instance])
+    except Exception as e:
+        logger.warning(f"Suchindex für {sender.__name__} #{instance.pk} nicht aktualisiert: {e}")
+
+
+def _unindex_on_delete(sender, instance, **kwargs):
+    from core import search
+    try:
+        search.unindex_object(instance)
+    except Exception as e:
+        logger.warning(f"Suchindex für {sender.__name__} #{instance.pk} nicht entfernt: {e}")
+
+
+def connect_search_signals():
+    """Verbindet die Index-Pflege mit allen Modellen aus core.search.SEARCH_INDEXES."""
+    from core.search import indexed_models
+    for model in indexed_models():
+        post_save.connect(_index_on_save, sender=model, dispatch_uid=f'core_search_index_{model._meta.label}')
+        post_delete.connect(_unindex_on_delete, sender=model, dispatch_uid=f'core_search_unindex_{model._meta.label}')
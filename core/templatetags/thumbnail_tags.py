@@ -13,7 +13,7 @@ Verwendung in Templates:
 
 from django import template
 from django.utils.safestring import mark_safe
-from core.thumbnails import get_or_create_thumbnail
+from core.thumbnails import get_or_create_thumbnail, lookup_thumbnail_variants
 
 register = template.Library()
 
@@ -33,7 +33,7 @@ def thumbnail(image_field, size='medium'):
         size: 'small' (200px), 'medium' (400px), 'large' (800px)
 
     Returns:
-        URL zum Thumbnail oder Original bei Fehler
+        URL zum Thumbnail; Original bei Fehler oder solange es im Hintergrund erzeugt wird
     """
     if not image_field:
         return ''
@@ -45,6 +45,7 @@ def thumbnail(image_field, size='medium'):
 def thumbnail_img(image_field, size='medium', alt='', css_class='', style=''):
     """
     Generiert ein komplettes img-Tag mit Thumbnail und lazy loading.
+    Liegt eine AVIF-Variante vor, wird ein <picture> mit AVIF-Source ausgegeben.
 
     Verwendung:
         {% thumbnail_img obj.image 'medium' alt='Beschreibung' css_class='img-fluid' %}
@@ -73,4 +74,8 @@ def thumbnail_img(image_field, size='medium', alt='', css_class='', style=''):
     if style:
         attrs.append(f'style="{style}"')
 
-    return mark_safe(f'<img {" ".join(attrs)}>')
+    img_tag = f'<img {" ".join(attrs)}>'
+    avif_url = lookup_thumbnail_variants(image_field.name, size).get('avif')
+    if avif_url:
+        return mark_safe(f'<picture><source srcset="{avif_url}" type="image/avif">{img_tag}</picture>')
+    return mark_safe(img_tag)
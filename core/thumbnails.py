@@ -2,13 +2,22 @@
 Thumbnail-Utility für Workloom
 
 Generiert optimierte Thumbnails für schnelleres Laden von Bildergalerien.
-Unterstützt WebP-Format für bessere Kompression.
+Unterstützt WebP-Format für bessere Kompression, zusätzlich AVIF wenn
+Pillow mit libavif gebaut ist. Alle Größen entstehen aus EINEM
+Dekodier-Durchlauf (render_thumbnails).
+
+Beim Rendern wird nur das Register (core.ThumbnailEntry, davor der Cache)
+abgefragt – kein storage.exists(), kein Pillow im Request. Fehlt ein
+Thumbnail, liefert get_or_create_thumbnail sofort die Original-URL und
+stößt die Erzeugung per imageforge.tasks.generate_thumbnail_async an.
 """
 
 import os
+import hashlib
 import logging
 from io import BytesIO
-from PIL import Image
+from PIL import Image, features
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
@@ -24,14 +33,130 @@ THUMBNAIL_SIZES = {
 THUMBNAIL_QUALITY = 85  # WebP Qualität (0-100)
 THUMBNAIL_FORMAT = 'WEBP'
 
+# Zusätzliche Varianten neben WebP (nur wenn Pillow mit dem Codec gebaut ist)
+AVIF_QUALITY = 60
+AVIF_SPEED = 6
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif'}
 
-def get_thumbnail_path(original_path: str, size: str = 'medium') -> str:
+REGISTRY_CACHE_TTL = 24 * 3600   # Register-Treffer im Cache
+PENDING_TTL = 10 * 60            # so lange wird dieselbe Erzeugung nicht erneut eingereiht
+
+
+def available_formats():
+    """WebP immer, AVIF wenn libavif in Pillow verfügbar ist"""
+    formats = [THUMBNAIL_FORMAT]
+    try:
+        if features.check('avif'):
+            formats.append('AVIF')
+    except Exception:
+        pass
+    return formats
+
+
+def _registry_cache_key(source_name: str, size: str) -> str:
+    digest = hashlib.sha1(source_name.encode('utf-8')).hexdigest()
+    return f'thumb:{digest}:{size}'
+
+
+def _source_mtime_ns(image_field) -> int:
+    """mtime des Originals (nur im Worker beim Erzeugen, nie beim Rendern)"""
+    try:
+        return os.stat(image_field.path).st_mtime_ns
+    except (OSError, NotImplementedError, ValueError, AttributeError):
+        return 0
+
+
+def _variant_urls(thumb_name: str, formats: str) -> dict:
+    """{'webp': url, 'avif': url} für einen Register-Eintrag"""
+    urls = {}
+    for ext in (formats or 'webp').split(','):
+        urls[ext] = default_storage.url(thumb_name if ext == 'webp' else _with_extension(thumb_name, ext))
+    return urls
+
+
+def lookup_thumbnail_variants(source_name: str, size: str = 'medium') -> dict:
+    """
+    Registrierte Varianten {'webp': url, ...} oder {} – Cache, dann DB, kein Dateisystem.
+    """
+    key = _registry_cache_key(source_name, size)
+    urls = cache.get(key)
+    if isinstance(urls, dict) and urls:
+        return urls
+
+    from core.models import ThumbnailEntry
+    entry = ThumbnailEntry.objects.filter(
+        source_name=source_name, size=size
+    ).values_list('thumb_name', 'formats').first()
+    if not entry:
+        return {}
+    urls = _variant_urls(*entry)
+    cache.set(key, urls, REGISTRY_CACHE_TTL)
+    return urls
+
+
+def lookup_thumbnail(source_name: str, size: str = 'medium') -> str:
+    """URL des registrierten WebP-Thumbnails oder ''"""
+    return lookup_thumbnail_variants(source_name, size).get('webp', '')
+
+
+def register_thumbnail(image_field, size: str, thumb_path: str, formats=('webp',), mtime_ns=None) -> str:
+    """Trägt ein erzeugtes Thumbnail ins Register ein und gibt seine (WebP-)URL zurück."""
+    from core.models import ThumbnailEntry
+    formats = ','.join(formats)
+    ThumbnailEntry.objects.update_or_create(
+        source_name=image_field.name, size=size,
+        defaults={
+            'thumb_name': thumb_path,
+            'formats': formats,
+            'source_mtime_ns': _source_mtime_ns(image_field) if mtime_ns is None else mtime_ns,
+        }
+    )
+    urls = _variant_urls(thumb_path, formats)
+    cache.set(_registry_cache_key(image_field.name, size), urls, REGISTRY_CACHE_TTL)
+    return urls['webp']
+
+
+def request_thumbnail(image_field, size: str = 'medium') -> bool:
+    """
+    Reiht die Erzeugung der Thumbnails eines Bildes im Hintergrund ein
+    (alle Größen in einem Durchlauf, höchstens einmal pro PENDING_TTL).
+    Gibt False zurück, wenn das Feld zu keinem gespeicherten Objekt gehört
+    oder die Queue nicht erreichbar ist.
+    """
+    instance = getattr(image_field, 'instance', None)
+    field = getattr(image_field, 'field', None)
+    if instance is None or field is None or instance.pk is None:
+        return False
+
+    pending_key = _registry_cache_key(image_field.name, 'all') + ':pending'
+    if not cache.add(pending_key, 1, PENDING_TTL):
+        return True
+
+    try:
+        from imageforge.tasks import generate_thumbnail_async
+        generate_thumbnail_async.delay(
+            field.name, instance._meta.object_name, instance.pk, size,
+            app_label=instance._meta.app_label
+        )
+        return True
+    except Exception as e:
+        cache.delete(pending_key)
+        logger.warning(f"Thumbnail-Erzeugung konnte nicht eingereiht werden: {e}")
+        return False
+
+
+def _with_extension(path: str, ext: str) -> str:
+    return f"{os.path.splitext(path)[0]}.{ext}"
+
+
+def get_thumbnail_path(original_path: str, size: str = 'medium', ext: str = 'webp') -> str:
     """
     Generiert den Pfad für ein Thumbnail basierend auf dem Original.
 
     Args:
         original_path: Pfad zum Originalbild
         size: Größe des Thumbnails ('small', 'medium', 'large')
+        ext: Dateiendung der Variante ('webp', 'avif')
 
     Returns:
         Pfad zum Thumbnail
@@ -48,15 +173,145 @@ def get_thumbnail_path(original_path: str, size: str = 'medium') -> str:
     thumb_dir = os.path.join(directory, 'thumbnails')
 
     # Thumbnail-Dateiname
-    thumb_filename = f"{name}_{size}.webp"
+    thumb_filename = f"{name}_{size}.{ext}"
 
     return os.path.join(thumb_dir, thumb_filename)
 
 
+def _to_rgb(img):
+    """RGBA/P auf weißen Hintergrund, alles andere nach RGB"""
+    if img.mode in ('RGBA', 'P', 'LA'):
+        # Weißer Hintergrund für Transparenz
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _encode(img, fmt: str) -> bytes:
+    buf = BytesIO()
+    if fmt == 'AVIF':
+        img.save(buf, format='AVIF', quality=AVIF_QUALITY, speed=AVIF_SPEED)
+    else:
+        img.save(buf, format=fmt, quality=THUMBNAIL_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def render_thumbnails(source, sizes=None, formats=None) -> dict:
+    """
+    Dekodiert ein Bild EINMAL und erzeugt daraus alle Größen und Formate.
+
+    JPEGs werden per Draft-Modus direkt in reduzierter Auflösung dekodiert
+    (DCT-Skalierung 1/2, 1/4, 1/8 – nie kleiner als die größte Zielgröße),
+    andere Formate per reduce() über reducing_gap. Die kleineren Größen
+    entstehen nacheinander aus der jeweils nächstgrößeren statt jedes Mal
+    aus dem Vollbild.
+
+    Args:
+        source: Dateipfad oder file-artiges Objekt
+        sizes: Liste von Größen-Schlüsseln (Standard: alle)
+        formats: Liste von Pillow-Formaten (Standard: available_formats())
+
+    Returns:
+        {size: {format: bytes}}
+    """
+    sizes = sorted(sizes or THUMBNAIL_SIZES, key=lambda s: THUMBNAIL_SIZES[s][0], reverse=True)
+    formats = formats or available_formats()
+
+    rendered = {}
+    with Image.open(source) as img:
+        if img.format == 'JPEG':
+            img.draft('RGB', THUMBNAIL_SIZES[sizes[0]])
+        current = _to_rgb(img)
+        for size in sizes:
+            # Aspect Ratio beibehalten; in place auf dem Ergebnis der vorigen Größe
+            current.thumbnail(THUMBNAIL_SIZES[size], Image.Resampling.LANCZOS, reducing_gap=3.0)
+            rendered[size] = {fmt: _encode(current, fmt) for fmt in formats}
+    return rendered
+
+
+def render_thumbnails_to_files(source_path: str, targets: dict, formats=None) -> int:
+    """
+    Prozess-Pool-tauglicher Worker (kein Django-Zugriff): rendert ein Bild
+    und schreibt die Varianten atomar nach targets = {size: {format: abs_path}}.
+    Gibt die gelesenen Bytes des Originals zurück.
+    """
+    rendered = render_thumbnails(source_path, list(targets), formats)
+    for size, variants in rendered.items():
+        for fmt, data in variants.items():
+            path = targets[size].get(fmt)
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp{os.getpid()}"
+            with open(tmp, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+    return os.path.getsize(source_path)
+
+
+def thumbnail_targets(source_name: str, sizes=None, formats=None) -> dict:
+    """{size: {format: storage_name}} für ein Original"""
+    formats = formats or available_formats()
+    return {
+        size: {fmt: get_thumbnail_path(source_name, size, FORMAT_EXTENSIONS[fmt]) for fmt in formats}
+        for size in (sizes or THUMBNAIL_SIZES)
+    }
+
+
+def generate_thumbnails(image_field, force: bool = False) -> dict:
+    """
+    Erzeugt alle Größen (WebP + ggf. AVIF) eines ImageFields in einem
+    Dekodier-Durchlauf und registriert sie.
+
+    Returns:
+        {size: webp_url}
+    """
+    formats = available_formats()
+    targets = thumbnail_targets(image_field.name, formats=formats)
+    exts = [FORMAT_EXTENSIONS[f] for f in formats]
+
+    if not force and all(default_storage.exists(t[THUMBNAIL_FORMAT]) for t in targets.values()):
+        # Schon vorhanden (z.B. vor Einführung des Registers erzeugt) – nur nachregistrieren
+        return {
+            size: register_thumbnail(
+                image_field, size, t[THUMBNAIL_FORMAT],
+                formats=[e for e, f in zip(exts, formats) if default_storage.exists(t[f])]
+            )
+            for size, t in targets.items()
+        }
+
+    image_field.open('rb')
+    try:
+        image_field.seek(0)
+        rendered = render_thumbnails(image_field, list(targets), formats)
+    finally:
+        image_field.close()
+
+    urls = {}
+    for size, variants in rendered.items():
+        for fmt, data in variants.items():
+            thumb_path = targets[size][fmt]
+            # Ein altes Thumbnail ersetzen statt umbenennen zu lassen
+            if default_storage.exists(thumb_path):
+                default_storage.delete(thumb_path)
+            default_storage.save(thumb_path, ContentFile(data))
+        urls[size] = register_thumbnail(image_field, size, targets[size][THUMBNAIL_FORMAT], formats=exts)
+        logger.info(f"Thumbnail generiert: {targets[size][THUMBNAIL_FORMAT]} ({', '.join(exts)})")
+    return urls
+
+
 def generate_thumbnail(image_field, size: str = 'medium', force: bool = False) -> str:
     """
     Generiert ein Thumbnail für ein ImageField.
 
+    Erzeugt dabei alle Größen auf einmal (siehe generate_thumbnails) – das
+    Original wird nur einmal dekodiert.
+
     Args:
         image_field: Django ImageField
         size: Größe des Thumbnails ('small', 'medium', 'large')
@@ -69,44 +324,8 @@ def generate_thumbnail(image_field, size: str = 'medium', force: bool = False) -
         return ''
 
     try:
-        # Thumbnail-Pfad bestimmen
-        thumb_path = get_thumbnail_path(image_field.name, size)
-
-        # Prüfen ob Thumbnail bereits existiert
-        if not force and default_storage.exists(thumb_path):
-            return default_storage.url(thumb_path)
-
-        # Originalbild laden
-        image_field.seek(0)
-        img = Image.open(image_field)
-
-        # RGBA zu RGB konvertieren falls nötig
-        if img.mode in ('RGBA', 'P'):
-            # Weißer Hintergrund für Transparenz
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-
-        # Thumbnail-Größe bestimmen
-        max_size = THUMBNAIL_SIZES.get(size, THUMBNAIL_SIZES['medium'])
-
-        # Aspect Ratio beibehalten
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-        # In WebP speichern
-        thumb_io = BytesIO()
-        img.save(thumb_io, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, optimize=True)
-        thumb_io.seek(0)
-
-        # Thumbnail speichern
-        default_storage.save(thumb_path, ContentFile(thumb_io.read()))
-
-        logger.info(f"Thumbnail generiert: {thumb_path}")
-        return default_storage.url(thumb_path)
+        urls = generate_thumbnails(image_field, force=force)
+        return urls.get(size) or urls.get('medium', '')
 
     except Exception as e:
         logger.error(f"Fehler beim Generieren des Thumbnails: {e}")
@@ -118,25 +337,27 @@ def get_or_create_thumbnail(image_field, size: str = 'medium') -> str:
     """
     Gibt die URL eines Thumbnails zurück, generiert es bei Bedarf.
 
+    Fragt nur das Register ab. Bei einem Fehlschlag wird sofort die
+    Original-URL geliefert und das Thumbnail im Hintergrund erzeugt –
+    der nächste Seitenaufruf bekommt dann das Thumbnail.
+
     Args:
         image_field: Django ImageField
         size: Größe des Thumbnails ('small', 'medium', 'large')
 
     Returns:
-        URL zum Thumbnail
+        URL zum Thumbnail (oder zum Original, solange es noch fehlt)
     """
     if not image_field or not image_field.name:
         return ''
 
     try:
-        thumb_path = get_thumbnail_path(image_field.name, size)
-
-        # Thumbnail existiert bereits
-        if default_storage.exists(thumb_path):
-            return default_storage.url(thumb_path)
+        url = lookup_thumbnail(image_field.name, size)
+        if url:
+            return url
 
-        # Thumbnail generieren
-        return generate_thumbnail(image_field, size)
+        request_thumbnail(image_field, size)
+        return image_field.url
 
     except Exception as e:
         logger.error(f"Fehler bei get_or_create_thumbnail: {e}")
@@ -153,11 +374,16 @@ def delete_thumbnails(image_path: str) -> None:
     if not image_path:
         return
 
+    from core.models import ThumbnailEntry
+
     for size in THUMBNAIL_SIZES.keys():
         try:
-            thumb_path = get_thumbnail_path(image_path, size)
-            if default_storage.exists(thumb_path):
-                default_storage.delete(thumb_path)
-                logger.info(f"Thumbnail gelöscht: {thumb_path}")
+            for ext in FORMAT_EXTENSIONS.values():
+                thumb_path = get_thumbnail_path(image_path, size, ext)
+                if default_storage.exists(thumb_path):
+                    default_storage.delete(thumb_path)
+                    logger.info(f"Thumbnail gelöscht: {thumb_path}")
+            cache.delete(_registry_cache_key(image_path, size))
         except Exception as e:
             logger.error(f"Fehler beim Löschen des Thumbnails: {e}")
+    ThumbnailEntry.objects.filter(source_name=image_path).delete()
@@ -0,0 +1,180 @@
+"""
+Chunked Uploads
+===============
+Gemeinsame Bausteine für große Uploads in Teilen (Videos, StreamRec-Aufnahmen,
+FileShare). Der Browser-Client liegt in static/js/chunked-upload.js.
+
+Ablauf:
+    1. create_part_file() legt beim Init eine .part-Datei in voller Größe an
+       (sparse, belegt noch keinen Platz).
+    2. Jeder Chunk wird mit write_chunk() direkt an seinen Byte-Offset
+       geschrieben (tus-Prinzip). Chunks dürfen parallel und in beliebiger
+       Reihenfolge kommen – ein Zusammenfügen am Ende entfällt.
+    3. finalize_part_file() prüft die Größe und verschiebt die Datei per
+       os.replace ans Ziel (gleiches Dateisystem unter MEDIA_ROOT, keine Kopie).
+
+Kein Chunk wird komplett in den Speicher geladen:
+    - ChecksumUploadHandler rechnet die CRC32 mit, während Django den
+      Request-Body liest (kein zweiter Lesedurchgang).
+    - Liegt der Chunk als Temp-Datei vor (> FILE_UPLOAD_MAX_MEMORY_SIZE),
+      kopiert os.copy_file_range im Kernel in die .part-Datei; sonst
+      os.pwrite in Blöcken à COPY_BUFFER.
+
+Verwendung in einer View (Handler müssen vor dem Lesen von request.POST
+stehen, daher csrf_exempt außen und csrf_protect innen):
+
+    @csrf_exempt
+    def upload_chunk(request):
+        install_checksum_handler(request)
+        return _upload_chunk(request)
+
+    @csrf_protect
+    def _upload_chunk(request):
+        chunk = request.FILES['chunk']
+        crc = uploaded_checksum(request, 'chunk')
+        write_chunk(part_path, offset, chunk)
+"""
+
+import errno
+import logging
+import os
+import shutil
+import zlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER = 1024 * 1024     # Blockgröße für den gepufferten Weg
+PART_SUFFIX = '.part'
+
+# copy_file_range nicht verfügbar/unterstützt -> gepuffert kopieren
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+class ChunkSizeMismatch(Exception):
+    pass
+
+
+def format_checksum(crc):
+    return f'{crc & 0xFFFFFFFF:08x}'
+
+
+# ------------------------------------------------------------------
+# Prüfsummen beim Empfang
+# ------------------------------------------------------------------
+
+class ChecksumUploadHandler(FileUploadHandler):
+    """
+    CRC32 jeder hochgeladenen Datei, berechnet beim Empfang. Gibt die Daten
+    unverändert an die nächsten Handler weiter (Speicher/Temp-Datei).
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.checksums = {}
+        self._crc = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._crc = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._crc = zlib.crc32(raw_data, self._crc)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.checksums[self.field_name] = format_checksum(self._crc)
+        return None
+
+
+def install_checksum_handler(request):
+    request.upload_handlers.insert(0, ChecksumUploadHandler(request))
+
+
+def uploaded_checksum(request, field_name):
+    """CRC32 einer hochgeladenen Datei – vom Handler oder (ohne Handler) nachgerechnet."""
+    for handler in request.upload_handlers:
+        if isinstance(handler, ChecksumUploadHandler) and field_name in handler.checksums:
+            return handler.checksums[field_name]
+    uploaded = request.FILES[field_name]
+    crc = 0
+    for block in uploaded.chunks(COPY_BUFFER):
+        crc = zlib.crc32(block, crc)
+    return format_checksum(crc)
+
+
+# ------------------------------------------------------------------
+# .part-Datei
+# ------------------------------------------------------------------
+
+def create_part_file(path, size):
+    """Leere .part-Datei in Endgröße anlegen (sparse)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+
+def _copy_file_range(src_path, dst_fd, offset, size):
+    with open(src_path, 'rb') as src:
+        src_fd = src.fileno()
+        copied = 0
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, size - copied, copied, offset + copied)
+            if n == 0:
+                raise ChunkSizeMismatch(f'Temp-Datei endet nach {copied} von {size} Bytes')
+            copied += n
+
+
+def _pwrite_stream(uploaded, dst_fd, offset):
+    position = offset
+    uploaded.seek(0)
+    for block in uploaded.chunks(COPY_BUFFER):
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(dst_fd, view, position)
+            position += written
+            view = view[written:]
+    return position - offset
+
+
+def write_chunk(part_path, offset, uploaded):
+    """
+    Hochgeladene Datei (Django UploadedFile) an offset in die .part-Datei
+    schreiben. Parallele Aufrufe für verschiedene Offsets sind sicher
+    (positionsgenaues Schreiben, kein gemeinsamer Dateizeiger).
+    """
+    size = uploaded.size
+    fd = os.open(part_path, os.O_WRONLY)
+    try:
+        temp_path = getattr(uploaded, 'temporary_file_path', None)
+        if temp_path and hasattr(os, 'copy_file_range'):
+            try:
+                _copy_file_range(temp_path(), fd, offset, size)
+                return size
+            except OSError as e:
+                if e.errno not in _COPY_FALLBACK_ERRNOS:
+                    raise
+                logger.debug(f"copy_file_range nicht nutzbar ({e}), kopiere gepuffert")
+        written = _pwrite_stream(uploaded, fd, offset)
+        if written != size:
+            raise ChunkSizeMismatch(f'{written} statt {size} Bytes geschrieben')
+        return written
+    finally:
+        os.close(fd)
+
+
+def finalize_part_file(part_path, final_path, expected_size):
+    """Fertige .part-Datei prüfen und ans Ziel verschieben; gibt die Größe zurück."""
+    actual_size = os.path.getsize(part_path)
+    if actual_size != expected_size:
+        raise ChunkSizeMismatch(f'Datei hat {actual_size} statt {expected_size} Bytes')
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    try:
+        os.replace(part_path, final_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Anderes Dateisystem: einmal kopieren
+        shutil.move(part_path, final_path)
+    return actual_size
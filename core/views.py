@@ -1,6 +1,6 @@
 # core/views.py
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from accounts.models import CustomPage, EditableContent
 from accounts.decorators import require_app_permission
@@ -1486,3 +1486,15 @@ def social_button_click(request, button_id):
     button.save(update_fields=['click_count', 'last_clicked'])
 
     return redirect(button.url)
+
+
+@login_required
+def async_job_status(request, job_id):
+    """Status/Ergebnis eines async_task_view-Jobs (202 solange er läuft)."""
+    from core.async_decorator import get_job, job_response
+    entry = get_job(job_id)
+    # Besitzer steht erst im Ergebnis der View; 202 bzw. ein Task-Abbruch
+    # verraten nichts über fremde Jobs
+    if 'user_id' in entry and entry['user_id'] != request.user.id:
+        return JsonResponse({'success': False, 'error': 'Job nicht gefunden oder abgelaufen'}, status=404)
+    return job_response(entry)
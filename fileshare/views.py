@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse, Http404, FileResponse
+from django.http import JsonResponse, Http404, FileResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.base import ContentFile
@@ -11,13 +11,13 @@ from django.db.models import Sum, F
 from django.conf import settings
 import json
 import os
-import zipfile
 import mimetypes
 import hashlib
 from datetime import timedelta
 from .models import Transfer, TransferFile, TransferRecipient, DownloadLog
 from .forms import TransferForm
 from .utils import send_transfer_email, humanize_bytes, generate_qr_code
+from .zipstream import ZipMember, ZipStream, unique_names
 
 def index(request):
     """Main page for file sharing"""
@@ -241,27 +241,34 @@ def download_file(request, transfer_id, file_id=None):
             if not files:
                 raise Http404("No files in transfer")
 
-            # Create ZIP file in memory
-            import io
-            zip_buffer = io.BytesIO()
-
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for file_obj in files:
-                    zip_file.writestr(file_obj.original_filename, file_obj.file.read())
-
-            zip_buffer.seek(0)
-
-            response = HttpResponse(zip_buffer.read(), content_type='application/zip')
+            # ZIP wird beim Senden erzeugt (ZIP_STORED, CRC on the fly) -
+            # konstanter Speicherbedarf, Länge steht vorab fest
+            names = unique_names([file_obj.original_filename for file_obj in files])
+            members = [
+                ZipMember(
+                    name,
+                    file_obj.file.size,
+                    lambda file_field=file_obj.file: file_field.open('rb'),
+                    modified=timezone.localtime(file_obj.uploaded_at) if file_obj.uploaded_at else None,
+                )
+                for name, file_obj in zip(names, files)
+            ]
+
+            def mark_completed(length):
+                DownloadLog.objects.filter(pk=download_log.pk).update(
+                    download_completed=True,
+                    bytes_downloaded=length,
+                )
+
+            stream = ZipStream(members, on_complete=mark_completed)
+            response = StreamingHttpResponse(stream, content_type='application/zip')
+            response['Content-Length'] = str(len(stream))
             response['Content-Disposition'] = f'attachment; filename="transfer_{transfer_id}.zip"'
 
             # Aktualisiere Download-Zähler
             transfer.total_downloads += 1
             transfer.save()
 
-            download_log.download_completed = True
-            download_log.bytes_downloaded = len(zip_buffer.getvalue())
-            download_log.save()
-
             return response
 
     except Transfer.DoesNotExist:
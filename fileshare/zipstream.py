@@ -0,0 +1,205 @@
+"""
+Streaming ZIP archives for multi-file transfer downloads.
+
+The archive is generated while it is sent: every member is stored
+uncompressed (ZIP_STORED) and its CRC-32 is computed on the fly, so memory
+use is constant and the first bytes go out immediately. Because stored sizes
+equal file sizes, the exact archive length is known up front and can be sent
+as Content-Length (browsers show progress and a remaining time).
+
+Compression is deliberately not used: transfers are mostly photos, videos and
+archives that do not shrink, and deflate would make the length unknowable.
+
+ZIP64 records are written only where needed (members or offsets >= 4 GiB,
+more than 65535 members), small archives stay plain ZIP.
+"""
+
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_MAX_ENTRIES = 0xFFFF
+
+FLAG_DATA_DESCRIPTOR = 0x0008   # CRC follows the data
+FLAG_UTF8 = 0x0800              # file names are UTF-8
+METHOD_STORED = 0
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+UNIX_FILE_ATTRS = (0o100644 & 0xFFFF) << 16
+
+
+def _dos_datetime(dt):
+    """(time, date) in MS-DOS format; ZIP cannot store dates before 1980."""
+    if dt is None or dt.year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+        ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day,
+    )
+
+
+def unique_names(names):
+    """Make archive member names unique: 'a.jpg', 'a (2).jpg', ..."""
+    seen = set()
+    result = []
+    for name in names:
+        name = name.replace('\\', '/').lstrip('/') or 'datei'
+        candidate = name
+        counter = 2
+        while candidate.lower() in seen:
+            root, ext = os.path.splitext(name)
+            candidate = f'{root} ({counter}){ext}'
+            counter += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+class ZipMember:
+    """One file in the archive: name, exact size, mtime and a callable that opens it for reading."""
+
+    def __init__(self, name, size, open_file, modified=None):
+        self.name = name
+        self.encoded_name = name.encode('utf-8')
+        self.size = size
+        self.open_file = open_file
+        self.dos_time, self.dos_date = _dos_datetime(modified)
+        self.offset = 0
+        self.crc = 0
+
+    @property
+    def zip64(self):
+        return self.size >= ZIP32_LIMIT
+
+    @property
+    def version(self):
+        return VERSION_ZIP64 if self.zip64 or self.offset >= ZIP32_LIMIT else VERSION_DEFAULT
+
+    def local_header(self):
+        extra = b''
+        size32 = self.size
+        if self.zip64:
+            size32 = ZIP32_LIMIT
+            extra = struct.pack('<HHQQ', 0x0001, 16, self.size, self.size)
+        return struct.pack(
+            '<IHHHHHIIIHH',
+            0x04034b50, self.version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, METHOD_STORED,
+            self.dos_time, self.dos_date, 0, size32, size32,
+            len(self.encoded_name), len(extra),
+        ) + self.encoded_name + extra
+
+    def data_descriptor(self):
+        if self.zip64:
+            return struct.pack('<IIQQ', 0x08074b50, self.crc, self.size, self.size)
+        return struct.pack('<IIII', 0x08074b50, self.crc, self.size, self.size)
+
+    def central_header(self):
+        zip64_fields = []
+        size32 = self.size
+        offset32 = self.offset
+        if self.zip64:
+            size32 = ZIP32_LIMIT
+            zip64_fields += [self.size, self.size]
+        if self.offset >= ZIP32_LIMIT:
+            offset32 = ZIP32_LIMIT
+            zip64_fields.append(self.offset)
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII',
+            0x02014b50, (3 << 8) | self.version, self.version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8,
+            METHOD_STORED, self.dos_time, self.dos_date, self.crc, size32, size32,
+            len(self.encoded_name), len(extra), 0, 0, 0, UNIX_FILE_ATTRS, offset32,
+        ) + self.encoded_name + extra
+
+
+class ZipStream:
+    """
+    Iterable ZIP archive over ZipMember objects.
+
+        stream = ZipStream(members)
+        response = StreamingHttpResponse(stream, content_type='application/zip')
+        response['Content-Length'] = str(len(stream))
+    """
+
+    def __init__(self, members, on_complete=None):
+        self.members = list(members)
+        self.on_complete = on_complete
+        offset = 0
+        for member in self.members:
+            member.offset = offset
+            offset += len(member.local_header()) + member.size + len(member.data_descriptor())
+        self.central_offset = offset
+        self.central_size = sum(len(member.central_header()) for member in self.members)
+        self._length = self.central_offset + self.central_size + len(self._end_records())
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def needs_zip64(self):
+        return (
+            len(self.members) > ZIP32_MAX_ENTRIES
+            or self.central_offset >= ZIP32_LIMIT
+            or self.central_size >= ZIP32_LIMIT
+            or any(m.zip64 for m in self.members)
+        )
+
+    def _end_records(self):
+        count = len(self.members)
+        records = b''
+        if self.needs_zip64:
+            zip64_end_offset = self.central_offset + self.central_size
+            records += struct.pack(
+                '<IQHHIIQQQQ',
+                0x06064b50, 44, (3 << 8) | VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, self.central_size, self.central_offset,
+            )
+            records += struct.pack('<IIQI', 0x07064b50, 0, zip64_end_offset, 1)
+        records += struct.pack(
+            '<IHHHHIIH',
+            0x06054b50, 0, 0,
+            min(count, ZIP32_MAX_ENTRIES), min(count, ZIP32_MAX_ENTRIES),
+            min(self.central_size, ZIP32_LIMIT), min(self.central_offset, ZIP32_LIMIT), 0,
+        )
+        return records
+
+    def _member_data(self, member):
+        crc = 0
+        sent = 0
+        with member.open_file() as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sent += len(chunk)
+                if sent > member.size:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        if sent != member.size:
+            # Content-Length and offsets are already promised - a silently
+            # shorter or longer member would produce a corrupt archive
+            raise IOError(f'{member.name}: expected {member.size} bytes, read {sent}')
+        member.crc = crc
+
+    def __iter__(self):
+        for member in self.members:
+            yield member.local_header()
+            yield from self._member_data(member)
+            yield member.data_descriptor()
+        for member in self.members:
+            yield member.central_header()
+        yield self._end_records()
+        if self.on_complete:
+            try:
+                self.on_complete(self._length)
+            except Exception as e:
+                logger.warning(f'ZIP stream completion callback failed: {e}')
@@ -8,22 +8,26 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def generate_thumbnail_async(self, image_field_name: str, model_name: str, pk: int, size: str = 'medium'):
+def generate_thumbnail_async(self, image_field_name: str, model_name: str, pk, size: str = 'medium',
+                             app_label: str = 'imageforge'):
     """
-    Generiert ein Thumbnail asynchron im Hintergrund.
+    Generiert ein Thumbnail asynchron im Hintergrund und trägt es ins
+    Thumbnail-Register ein (wird von core.thumbnails bei Register-Fehlschlägen
+    für beliebige Apps eingereiht).
     
     Args:
         image_field_name: Name des ImageField (z.B. 'generated_image')
         model_name: Model-Klasse als String (z.B. 'ImageGeneration')
         pk: Primary Key des Objekts
         size: Thumbnail-Größe ('small', 'medium', 'large')
+        app_label: App des Models (Standard: 'imageforge')
     """
     try:
         from django.apps import apps
         from core.thumbnails import generate_thumbnail
         
         # Model laden
-        Model = apps.get_model('imageforge', model_name)
+        Model = apps.get_model(app_label, model_name)
         obj = Model.objects.get(pk=pk)
         
         # ImageField holen
@@ -47,6 +51,8 @@ def generate_thumbnail_async(self, image_field_name: str, model_name: str, pk: i
 def generate_all_thumbnails_for_generation(pk: int):
     """
     Generiert alle Thumbnail-Größen für eine ImageGeneration.
+
+    Ein Task statt drei: generate_thumbnail dekodiert das Original einmal
+    und erzeugt daraus alle Größen und Formate.
     """
-    for size in ['small', 'medium', 'large']:
-        generate_thumbnail_async.delay('generated_image', 'ImageGeneration', pk, size)
+    generate_thumbnail_async.delay('generated_image', 'ImageGeneration', pk, 'medium')
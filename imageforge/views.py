@@ -8,11 +8,17 @@ import time
 import logging
 import re
 
+from core.ratelimit import ratelimit
+
 from .models import ImageGeneration, Character, CharacterImage, StylePreset, ProductMockup
 from .services import PromptBuilder, GeminiGenerator, DalleGenerator
 
 logger = logging.getLogger(__name__)
 
+# Gemeinsames Limit aller Generierungs-Endpoints (ein Zähler pro User)
+generation_ratelimit = ratelimit(10, 60, scope='imageforge_generate', methods=('POST',),
+                                 message='Zu viele Generierungen. Bitte warten Sie einen Moment.')
+
 
 def remove_emojis(text: str) -> str:
     """
@@ -77,6 +83,7 @@ def dashboard(request):
 
 
 @login_required
+@generation_ratelimit
 def generate_image(request):
     """AJAX-Endpoint für Bildgenerierung"""
     if request.method != 'POST':
@@ -534,6 +541,7 @@ def mockup_json(request, mockup_id):
 
 
 @login_required
+@generation_ratelimit
 def generate_mockup(request):
     """AJAX: Step 1 - Generiert Produkt-Mockup mit Text oder Motiv"""
     if request.method != 'POST':
@@ -662,6 +670,7 @@ def generate_mockup(request):
 
 
 @login_required
+@generation_ratelimit
 def generate_mockup_scene(request):
     """AJAX: Step 2 - Platziert Mockup in Szene"""
     if request.method != 'POST':
@@ -914,6 +923,7 @@ def api_style_ref_images_history(request):
 
 
 @login_required
+@generation_ratelimit
 def api_generate_funny_sayings(request):
     """API: Generiert 30-50 humorvolle Sprüche nach Kategorien sortiert basierend auf einem Keyword"""
     if request.method != 'POST':
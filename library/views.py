@@ -2,11 +2,13 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.utils import timezone
 
+from core import search
+
 from .models import Reference, Collection, ModuleLink, ZoteroAccount
 from .forms import ReferenceForm, CollectionForm, ZoteroAccountForm, BibTexImportForm
 from .bibtex import parse_bibtex
@@ -62,11 +64,7 @@ def reference_list(request):
 
     q = request.GET.get("q", "").strip()
     if q:
-        qs = qs.filter(
-            Q(title__icontains=q) | Q(authors__icontains=q) |
-            Q(abstract__icontains=q) | Q(notes__icontains=q) |
-            Q(bibtex_key__icontains=q) | Q(tags__icontains=q)
-        )
+        qs = search.filter_queryset(qs, q, ranked=False)
 
     status = request.GET.get("status", "")
     if status:
@@ -216,11 +214,7 @@ def collection_detail(request, pk):
 
     q = request.GET.get("q", "").strip()
     if q:
-        qs = qs.filter(
-            Q(title__icontains=q) | Q(authors__icontains=q) |
-            Q(abstract__icontains=q) | Q(notes__icontains=q) |
-            Q(bibtex_key__icontains=q) | Q(tags__icontains=q)
-        )
+        qs = search.filter_queryset(qs, q, ranked=False)
 
     status = request.GET.get("status", "")
     if status:
@@ -263,9 +257,7 @@ def export_bibtex(request):
 
     q = request.GET.get("q", "").strip()
     if q:
-        refs = refs.filter(
-            Q(title__icontains=q) | Q(authors__icontains=q) |
-            Q(tags__icontains=q) | Q(bibtex_key__icontains=q))
+        refs = search.filter_queryset(refs, q, ranked=False)
 
     coll = request.GET.get("collection", "")
     if coll:
@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import json
 import random
 
+from core.ratelimit import ratelimit
+
 from .models import (
     Campaign, AdZone, Advertisement, AdPlacement,
     AdImpression, AdClick, AdSchedule, AdTargeting, ZoneIntegration, LoomAdsSettings,
@@ -505,6 +507,7 @@ def analytics(request):
 
 
 # API Endpoints für Anzeigen-Serving
+@ratelimit(300, 60, scope='loomads_serve', key='ip')
 def get_ad_for_zone(request, zone_code):
     """API: Anzeige für eine bestimmte Zone abrufen"""
     import logging
@@ -936,6 +939,7 @@ def get_ad_for_zone(request, zone_code):
     return JsonResponse(response_data)
 
 
+@ratelimit(300, 60, scope='loomads_serve', key='ip')
 def get_multiple_ads_for_zone(request, zone_code, count=3):
     """API: Mehrfache Anzeigen für eine Zone abrufen"""
     try:
@@ -1025,6 +1029,7 @@ def get_multiple_ads_for_zone(request, zone_code, count=3):
 
 
 @require_POST
+@ratelimit(60, 60, scope='loomads_click', key='ip')
 def track_click(request, ad_id):
     """API: Klick auf Anzeige tracken"""
     # Prüfen ob es eine normale Anzeige oder App-Anzeige ist
@@ -1083,6 +1088,7 @@ def get_client_ip(request):
 # SIMPLE ADS API - Vereinfachte Anzeigen-API
 # =============================================================================
 
+@ratelimit(300, 60, scope='loomads_serve', key='ip')
 def get_simple_ad(request, zone_code=None):
     """
     Holt eine zufällige SimpleAd für eine Zone.
@@ -1121,6 +1127,7 @@ def get_simple_ad(request, zone_code=None):
 
 
 @require_POST
+@ratelimit(60, 60, scope='loomads_click', key='ip')
 def track_simple_ad_click(request, ad_id):
     """Klick auf SimpleAd tracken"""
     try:
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mail_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='folder',
+            name='sync_high_water',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -18,6 +18,9 @@ class Folder(models.Model):
     unread_count = models.IntegerField(default=0)
     total_count = models.IntegerField(default=0)
     
+    # Newest Zoho receivedTime (ms) seen by the sync – incremental sync stops here
+    sync_high_water = models.BigIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -360,6 +360,7 @@ class ZohoMailAPIService:
             endpoint = f"accounts/{account_id}/messages/view"
             params = {
                 'folderId': folder_id,
+                'start': start + 1,  # Zoho counts from 1
                 'limit': limit
             }
             
@@ -2,10 +2,13 @@
 Email Synchronization Service
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q
+from core import search
 from .api import ZohoMailAPIService
 from .exceptions import EmailSyncError, ZohoAPIError, ReAuthorizationRequiredError
 from ..models import EmailAccount, Email, Folder, EmailAttachment, EmailThread, SyncLog
@@ -13,6 +16,9 @@ from ..constants import DEFAULT_EMAIL_LIMIT, MAX_EMAILS_PER_SYNC, FOLDER_TYPES
 
 logger = logging.getLogger(__name__)
 
+SYNC_BATCH_SIZE = 200  # Zoho API seems to limit to 200 per request
+DETAIL_FETCH_WORKERS = 4  # parallel body fetches per batch (Zoho rate limits)
+
 
 class EmailSyncService:
     """
@@ -74,7 +80,8 @@ class EmailSyncService:
             raise EmailSyncError(f"Folder sync failed: {e}")
     
     def sync_emails(self, folder: Optional[Folder] = None, limit: int = DEFAULT_EMAIL_LIMIT, 
-                   start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, int]:
+                   start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                   incremental: bool = False) -> Dict[str, int]:
         """
         Synchronize emails from Zoho Mail.
         
@@ -83,6 +90,7 @@ class EmailSyncService:
             limit: Maximum emails per folder
             start_date: Start date for email sync
             end_date: End date for email sync
+            incremental: Stop per folder once its high-water mark is reached
             
         Returns:
             Dictionary with sync statistics
@@ -111,7 +119,7 @@ class EmailSyncService:
             for folder_obj in folders_to_sync:
                 try:
                     folder_stats = self._sync_folder_emails(
-                        account_id, folder_obj, limit, start_date, end_date
+                        account_id, folder_obj, limit, start_date, end_date, incremental
                     )
                     
                     # Add to total stats
@@ -135,9 +143,14 @@ class EmailSyncService:
             raise EmailSyncError(f"Email sync failed: {e}")
     
     def _sync_folder_emails(self, account_id: str, folder: Folder, limit: int,
-                           start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, int]:
+                           start_date: Optional[datetime], end_date: Optional[datetime],
+                           incremental: bool = False) -> Dict[str, int]:
         """
-        Sync emails for a specific folder.
+        Sync emails for a specific folder, one API page (batch) at a time.
+        
+        Zoho returns messages newest first. In incremental mode the sync stops
+        at the first page that contains nothing newer than the folder's
+        high-water mark (Folder.sync_high_water) and no unknown message.
         
         Args:
             account_id: Zoho account ID
@@ -145,75 +158,57 @@ class EmailSyncService:
             limit: Email limit
             start_date: Start date filter
             end_date: End date filter
+            incremental: Stop once the high-water mark is reached
             
         Returns:
             Statistics dictionary
         """
         stats = {'fetched': 0, 'created': 0, 'updated': 0, 'errors': 0}
+        touched_folders = {folder.id}
+        high_water = folder.sync_high_water
         
         try:
-            logger.info(f"Syncing emails for folder: {folder.name} (limit: {limit})")
+            logger.info(f"Syncing emails for folder: {folder.name} (limit: {limit}, incremental: {incremental})")
             
-            # Fetch emails from API with pagination
-            emails_data = []
             remaining_limit = min(limit, MAX_EMAILS_PER_SYNC)
             start_index = 0
-            batch_size = 200  # Zoho API seems to limit to 200 per request
             
-            while remaining_limit > 0 and start_index < limit:
-                current_batch_size = min(batch_size, remaining_limit)
-                
-                logger.info(f"Fetching batch: start={start_index}, limit={current_batch_size}")
-                
+            while remaining_limit > 0:
+                current_batch_size = min(SYNC_BATCH_SIZE, remaining_limit)
                 batch_emails = self.api_service.get_emails(
                     account_id=account_id,
                     folder_id=folder.zoho_folder_id,
                     limit=current_batch_size,
                     start=start_index
                 )
-                
                 if not batch_emails:
-                    # No more emails available
-                    logger.info(f"No more emails available after {start_index} emails")
                     break
                 
-                emails_data.extend(batch_emails)
+                stats['fetched'] += len(batch_emails)
+                batch_stats, batch_high, all_known = self._sync_batch(
+                    account_id, folder, batch_emails, start_date, end_date, touched_folders
+                )
+                for key in stats:
+                    stats[key] += batch_stats.get(key, 0)
+                
+                high_water = max(high_water, batch_high)
                 
+                if incremental and all_known and batch_high <= folder.sync_high_water:
+                    logger.info(f"Folder {folder.name}: reached high-water mark after {stats['fetched']} emails")
+                    break
                 # If we got less than requested, we've reached the end
                 if len(batch_emails) < current_batch_size:
-                    logger.info(f"Got {len(batch_emails)} emails, less than requested {current_batch_size}. End reached.")
                     break
                 
                 start_index += len(batch_emails)
                 remaining_limit -= len(batch_emails)
-                
-                logger.info(f"Fetched {len(batch_emails)} emails, total so far: {len(emails_data)}")
             
-            logger.info(f"Total emails fetched from API: {len(emails_data)}")
+            if high_water > folder.sync_high_water:
+                folder.sync_high_water = high_water
+                folder.save(update_fields=['sync_high_water'])
             
-            stats['fetched'] = len(emails_data)
-            
-            if not emails_data:
-                logger.info(f"No emails found in folder {folder.name}")
-                return stats
-            
-            # Process each email
-            with transaction.atomic():
-                for email_data in emails_data:
-                    try:
-                        created = self._process_email(email_data, folder, start_date, end_date)
-                        if created is True:
-                            stats['created'] += 1
-                        elif created is False:
-                            stats['updated'] += 1
-                        # None means skipped (filtered out)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing email {email_data.get('messageId', 'unknown')}: {e}")
-                        stats['errors'] += 1
-            
-            # Update folder counts
-            folder.update_counts()
+            # Folder counters once per sync (also folders emails were moved out of)
+            self._update_folder_counts(touched_folders)
             
             logger.info(f"Folder {folder.name} sync complete: {stats}")
             return stats
@@ -223,177 +218,274 @@ class EmailSyncService:
             stats['errors'] += 1
             return stats
     
-    def _process_email(self, email_data: Dict, folder: Folder, 
-                      start_date: Optional[datetime], end_date: Optional[datetime]) -> Optional[bool]:
+    def _sync_batch(self, account_id: str, folder: Folder, emails_data: List[Dict],
+                    start_date: Optional[datetime], end_date: Optional[datetime],
+                    touched_folders: set) -> Tuple[Dict[str, int], int, bool]:
         """
-        Process a single email from API data.
+        Upsert one page of list-view messages.
+        
+        One query loads the already known messages of the page; changed flags
+        are written with bulk_update, new messages (plus threads and
+        attachments) with bulk_create. Missing bodies are fetched concurrently
+        beforehand, thread counters are recomputed once with an aggregate.
         
-        Args:
-            email_data: Email data from API
-            folder: Target folder
-            start_date: Date filter
-            end_date: Date filter
-            
         Returns:
-            True if created, False if updated, None if skipped
+            (stats, newest receivedTime in ms, whether every message was known)
         """
-        try:
+        stats = {'created': 0, 'updated': 0, 'errors': 0}
+        newest = 0
+        
+        candidates = {}
+        for email_data in emails_data:
             message_id = email_data.get('messageId')
             if not message_id:
                 logger.warning("Email missing messageId, skipping")
-                return None
-            
-            # Parse email date
+                continue
+            newest = max(newest, self._timestamp_ms(email_data.get('receivedTime')))
             sent_at = self._parse_email_date(email_data.get('sentDateInGMT') or email_data.get('receivedTime'))
-            
             # Apply date filters
             if start_date and sent_at < start_date:
-                return None
+                continue
             if end_date and sent_at > end_date:
-                return None
-            
-            # Check if email already exists
-            try:
-                existing_email = Email.objects.get(zoho_message_id=message_id)
-                # Update existing email
-                self._update_email(existing_email, email_data, folder)
-                return False
-            except Email.DoesNotExist:
-                # Create new email
-                self._create_email(email_data, folder, sent_at)
-                return True
-                
-        except Exception as e:
-            logger.error(f"Error processing email {email_data.get('messageId', 'unknown')}: {e}")
-            raise
-    
-    def _create_email(self, email_data: Dict, folder: Folder, sent_at: datetime) -> Email:
-        """Create a new email from API data."""
-        try:
-            # Extract email fields
-            subject = email_data.get('subject', '')
-            from_email = self._extract_email_address(email_data.get('fromAddress', ''))
-            from_name = self._extract_display_name(email_data.get('fromAddress', ''))
-            
-            # Parse recipients
-            to_emails = self._parse_email_addresses(email_data.get('toAddress', ''))
-            cc_emails = self._parse_email_addresses(email_data.get('ccAddress', ''))
-            bcc_emails = self._parse_email_addresses(email_data.get('bccAddress', ''))
-            
-            # Create email object
-            email = Email.objects.create(
-                account=self.account,
-                folder=folder,
-                zoho_message_id=email_data.get('messageId'),
-                message_id=email_data.get('messageId'),  # RFC message ID if available
-                zoho_thread_id=email_data.get('threadId', ''),
-                subject=subject,
-                from_email=from_email,
-                from_name=from_name,
-                to_emails=to_emails,
-                cc_emails=cc_emails,
-                bcc_emails=bcc_emails,
-                body_text=email_data.get('content', ''),
-                body_html=email_data.get('htmlContent', ''),
-                is_read=email_data.get('readFlag', False),
-                is_starred=email_data.get('flagged', False),
-                is_important=email_data.get('important', False),
-                sent_at=sent_at,
-                received_at=self._parse_email_date(email_data.get('receivedTime')) or sent_at
+                continue
+            candidates[message_id] = (email_data, sent_at)
+        
+        if not candidates:
+            return stats, newest, True
+        
+        existing = {
+            email.zoho_message_id: email
+            for email in Email.objects.filter(zoho_message_id__in=list(candidates)).only(
+                'id', 'zoho_message_id', 'folder', 'thread', 'is_read', 'is_starred', 'is_important'
             )
+        }
+        all_known = len(existing) == len(candidates)
+        
+        # Known messages: only flags and folder can change
+        changed = []
+        for message_id, email in existing.items():
+            email_data = candidates[message_id][0]
+            flags = (email_data.get('readFlag', False), email_data.get('flagged', False),
+                     email_data.get('important', False))
+            if (email.is_read, email.is_starred, email.is_important, email.folder_id) != (*flags, folder.id):
+                touched_folders.add(email.folder_id)
+                email.is_read, email.is_starred, email.is_important = flags
+                email.folder_id = folder.id
+                email.updated_at = timezone.now()
+                changed.append(email)
+        
+        new_data = [data for message_id, data in candidates.items() if message_id not in existing]
+        bodies = self._fetch_bodies(account_id, [data for data, _ in new_data])
+        
+        with transaction.atomic():
+            if changed:
+                Email.objects.bulk_update(
+                    changed, ['is_read', 'is_starred', 'is_important', 'folder', 'updated_at']
+                )
+            stats['updated'] = len(changed)
             
-            # Process attachments if any
-            if email_data.get('hasAttachment', False):
-                self._process_attachments(email, email_data)
-            
-            # Handle email threading
-            self._handle_email_threading(email, email_data)
-            
-            logger.debug(f"Created email: {subject[:50]}...")
-            return email
+            threads = self._threads_for_batch(new_data)
+            new_emails = []
+            for email_data, sent_at in new_data:
+                try:
+                    new_emails.append(self._build_email(
+                        email_data, folder, sent_at,
+                        bodies.get(email_data['messageId']),
+                        threads.get(email_data.get('threadId'))
+                    ))
+                except Exception as e:
+                    logger.error(f"Error processing email {email_data.get('messageId', 'unknown')}: {e}")
+                    stats['errors'] += 1
             
-        except Exception as e:
-            logger.error(f"Error creating email: {e}")
-            raise
+            # ignore_conflicts: a message inserted concurrently (parallel sync) must not fail the batch.
+            # bulk_create returns no pks on MySQL, so the rows are read back for attachments/index.
+            Email.objects.bulk_create(new_emails, batch_size=SYNC_BATCH_SIZE, ignore_conflicts=True)
+            created = list(Email.objects.filter(
+                zoho_message_id__in=[email.zoho_message_id for email in new_emails]
+            ))
+            stats['created'] = len(created)
+            
+            self._create_attachments(created, {data['messageId']: data for data, _ in new_data})
+            # bulk_create fires no post_save – update the search index directly
+            search.index_objects(created)
+            self._update_thread_stats(
+                {e.thread_id for e in created if e.thread_id} | {e.thread_id for e in changed if e.thread_id},
+                created
+            )
+        
+        return stats, newest, all_known
     
-    def _update_email(self, email: Email, email_data: Dict, folder: Folder):
-        """Update an existing email with new data."""
-        try:
-            # Update fields that might change
-            email.is_read = email_data.get('readFlag', False)
-            email.is_starred = email_data.get('flagged', False)
-            email.is_important = email_data.get('important', False)
-            
-            # Update folder if moved
-            if email.folder != folder:
-                email.folder = folder
-            
-            email.save(update_fields=['is_read', 'is_starred', 'is_important', 'folder', 'updated_at'])
-            logger.debug(f"Updated email: {email.subject[:50]}...")
-            
-        except Exception as e:
-            logger.error(f"Error updating email {email.zoho_message_id}: {e}")
-            raise
+    def _fetch_bodies(self, account_id: str, emails_data: List[Dict]) -> Dict[str, Dict]:
+        """
+        Fetch full content for list-view messages without a body, concurrently
+        with a bounded thread pool. Returns {messageId: detail_data}.
+        """
+        missing = [d['messageId'] for d in emails_data if not (d.get('content') or d.get('htmlContent'))]
+        if not missing:
+            return {}
+        
+        def fetch(message_id):
+            try:
+                return message_id, self.api_service.get_email_content(account_id, message_id)
+            except ReAuthorizationRequiredError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not fetch detailed content for {message_id}: {e}")
+                return message_id, None
+            finally:
+                # Worker threads open their own DB connection (token refresh)
+                connection.close()
+        
+        bodies = {}
+        with ThreadPoolExecutor(max_workers=min(DETAIL_FETCH_WORKERS, len(missing))) as pool:
+            for message_id, detail in pool.map(fetch, missing):
+                if detail:
+                    bodies[message_id] = detail
+        logger.info(f"Fetched {len(bodies)}/{len(missing)} email bodies")
+        return bodies
     
-    def _process_attachments(self, email: Email, email_data: Dict):
-        """Process email attachments."""
-        try:
-            attachments_data = email_data.get('attachments', [])
-            if not attachments_data:
-                return
-            
-            for attachment_data in attachments_data:
+    def _threads_for_batch(self, new_data: List[Tuple[Dict, datetime]]) -> Dict[str, EmailThread]:
+        """Load or bulk-create the threads referenced by new messages: {thread_id: thread}."""
+        first_seen = {}
+        for email_data, sent_at in new_data:
+            thread_id = email_data.get('threadId')
+            if thread_id and thread_id not in first_seen:
+                first_seen[thread_id] = (email_data.get('subject', ''), sent_at)
+        if not first_seen:
+            return {}
+        
+        threads = {t.thread_id: t for t in EmailThread.objects.filter(thread_id__in=list(first_seen))}
+        missing = [
+            EmailThread(account=self.account, thread_id=thread_id, subject=subject,
+                        first_message_at=sent_at, last_message_at=sent_at)
+            for thread_id, (subject, sent_at) in first_seen.items() if thread_id not in threads
+        ]
+        if missing:
+            EmailThread.objects.bulk_create(missing, ignore_conflicts=True)
+            threads.update({
+                t.thread_id: t for t in EmailThread.objects.filter(thread_id__in=[t.thread_id for t in missing])
+            })
+        return threads
+    
+    def _build_email(self, email_data: Dict, folder: Folder, sent_at: datetime,
+                     detail: Optional[Dict], thread: Optional[EmailThread]) -> Email:
+        """Unsaved Email from list-view data (and fetched detail content, if any)."""
+        body_text = email_data.get('content', '')
+        body_html = email_data.get('htmlContent', '')
+        if detail:
+            body_text = detail.get('content', detail.get('textContent', '')) or body_text
+            body_html = detail.get('htmlContent', detail.get('content', '')) or body_html
+        if not (body_text or body_html):
+            body_text = email_data.get('summary', '')
+        
+        return Email(
+            account=self.account,
+            folder=folder,
+            thread=thread,
+            zoho_message_id=email_data.get('messageId'),
+            message_id=email_data.get('messageId'),  # RFC message ID if available
+            zoho_thread_id=email_data.get('threadId', ''),
+            subject=email_data.get('subject', ''),
+            from_email=self._extract_email_address(email_data.get('fromAddress', '')),
+            from_name=self._extract_display_name(email_data.get('fromAddress', '')),
+            to_emails=self._parse_email_addresses(email_data.get('toAddress', '')),
+            cc_emails=self._parse_email_addresses(email_data.get('ccAddress', '')),
+            bcc_emails=self._parse_email_addresses(email_data.get('bccAddress', '')),
+            body_text=body_text,
+            body_html=body_html,
+            is_read=email_data.get('readFlag', False),
+            is_starred=email_data.get('flagged', False),
+            is_important=email_data.get('important', False),
+            sent_at=sent_at,
+            received_at=self._parse_email_date(email_data.get('receivedTime')) or sent_at
+        )
+    
+    def _create_attachments(self, emails: List[Email], data_by_message: Dict[str, Dict]):
+        """Attachment rows for freshly created emails in one bulk_create."""
+        # Emails a concurrent sync inserted first already have their attachments
+        with_attachments = set(
+            EmailAttachment.objects.filter(email__in=emails).values_list('email_id', flat=True)
+        )
+        attachments = []
+        for email in emails:
+            email_data = data_by_message.get(email.zoho_message_id, {})
+            if not email_data.get('hasAttachment', False) or email.pk in with_attachments:
+                continue
+            for attachment_data in email_data.get('attachments', []):
                 attachment_id = attachment_data.get('attachmentId')
                 if not attachment_id:
                     continue
-                
-                # Check if attachment already exists
-                if EmailAttachment.objects.filter(
-                    email=email, 
-                    zoho_attachment_id=attachment_id
-                ).exists():
-                    continue
-                
-                # Create attachment record
-                EmailAttachment.objects.create(
+                attachments.append(EmailAttachment(
                     email=email,
                     filename=attachment_data.get('attachmentName', 'unknown'),
                     content_type=attachment_data.get('contentType', 'application/octet-stream'),
                     file_size=attachment_data.get('size', 0),
                     zoho_attachment_id=attachment_id
-                )
-                
-        except Exception as e:
-            logger.error(f"Error processing attachments for email {email.zoho_message_id}: {e}")
+                ))
+        if attachments:
+            EmailAttachment.objects.bulk_create(attachments)
     
-    def _handle_email_threading(self, email: Email, email_data: Dict):
-        """Handle email threading logic."""
-        try:
-            thread_id = email_data.get('threadId')
-            if not thread_id:
-                return
-            
-            # Find or create thread
-            thread, created = EmailThread.objects.get_or_create(
-                account=self.account,
-                thread_id=thread_id,
-                defaults={
-                    'subject': email.subject,
-                    'first_message_at': email.sent_at,
-                    'last_message_at': email.sent_at
-                }
+    def _update_thread_stats(self, thread_pks: set, new_emails: List[Email]):
+        """Recompute counters of all touched threads with one aggregate query."""
+        if not thread_pks:
+            return
+        
+        # Participants only grow with new messages – merge them instead of reloading every email
+        new_participants = {}
+        for email in new_emails:
+            if email.thread_id:
+                people = new_participants.setdefault(email.thread_id, set())
+                people.add(email.from_email)
+                people.update(email.to_emails)
+                people.update(email.cc_emails)
+        
+        aggregates = {
+            row['thread_id']: row
+            for row in Email.objects.filter(thread_id__in=thread_pks).values('thread_id').annotate(
+                n=Count('id'),
+                unread=Count('id', filter=Q(is_read=False)),
+                first=Min('sent_at'),
+                last=Max('sent_at'),
             )
-            
-            # Associate email with thread
-            email.thread = thread
-            email.save(update_fields=['thread'])
-            
-            # Update thread statistics
-            if not created:
-                thread.update_thread_stats()
-                
-        except Exception as e:
-            logger.error(f"Error handling threading for email {email.zoho_message_id}: {e}")
+        }
+        threads = list(EmailThread.objects.filter(pk__in=aggregates))
+        for thread in threads:
+            row = aggregates[thread.pk]
+            thread.message_count = row['n']
+            thread.unread_count = row['unread']
+            thread.first_message_at = row['first']
+            thread.last_message_at = row['last']
+            participants = set(thread.participants) | new_participants.get(thread.pk, set())
+            participants.discard('')
+            participants.discard(self.account.email_address)
+            thread.participants = sorted(participants)
+            thread.updated_at = timezone.now()
+        EmailThread.objects.bulk_update(
+            threads, ['message_count', 'unread_count', 'first_message_at', 'last_message_at',
+                      'participants', 'updated_at']
+        )
+    
+    def _update_folder_counts(self, folder_ids: set):
+        """Total/unread counters of the given folders from one grouped COUNT."""
+        counts = {
+            row['folder_id']: row
+            for row in Email.objects.filter(folder_id__in=folder_ids).values('folder_id').annotate(
+                total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+            )
+        }
+        folders = list(Folder.objects.filter(pk__in=folder_ids))
+        for f in folders:
+            row = counts.get(f.pk, {})
+            f.total_count = row.get('total', 0)
+            f.unread_count = row.get('unread', 0)
+        Folder.objects.bulk_update(folders, ['total_count', 'unread_count'])
+    
+    def _timestamp_ms(self, value) -> int:
+        """Zoho millisecond timestamp (string or int) as int, 0 if missing."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
     
     def _map_folder_type(self, folder_name: str) -> str:
         """Map Zoho folder name to our folder type."""
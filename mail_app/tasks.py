@@ -55,7 +55,8 @@ def sync_emails(self, account_id=None):
                 
                 # Sync emails with configured limit
                 sync_stats = sync_service.sync_emails(
-                    limit=settings.MAIL_APP_SETTINGS.get('MAX_EMAILS_PER_SYNC', 100)
+                    limit=settings.MAIL_APP_SETTINGS.get('MAX_EMAILS_PER_SYNC', 100),
+                    incremental=True
                 )
                 
                 # Update sync log
@@ -453,22 +453,15 @@ def api_email_search(request):
         # Get user's email account
         account = get_object_or_404(EmailAccount, user=request.user, is_active=True)
         
-        # Search across all fields: subject, from_name, from_email, body_text, body_html
-        from django.db.models import Q
+        # Full-text index over subject, from_name, from_email, body_text, body_html (core.search)
+        from core import search
         
-        search_query = Q(
-            Q(subject__icontains=query) |
-            Q(from_name__icontains=query) |
-            Q(from_email__icontains=query) |
-            Q(body_text__icontains=query) |
-            Q(body_html__icontains=query)
+        # Get emails from user's account - show all results, newest first
+        emails = search.filter_queryset(
+            Email.objects.filter(account=account).select_related('folder').order_by('-sent_at'),
+            query, ranked=False
         )
         
-        # Get emails from user's account - show all results
-        emails = Email.objects.filter(
-            account=account,
-        ).filter(search_query).select_related('folder').order_by('-sent_at')
-        
         # Prepare response data
         email_data = []
         for email in emails:
@@ -480,6 +473,7 @@ def api_email_search(request):
                 'sent_at': email.sent_at.isoformat(),
                 'folder_name': email.folder.name,
                 'body_preview': email.body_preview,
+                'highlight': search.highlight(email.body_text or email.body_html, query),
                 'is_read': email.is_read,
                 'is_open': email.is_open,
             })
@@ -10,6 +10,7 @@ import subprocess
 import os
 import json
 import tempfile
+from functools import lru_cache
 from typing import Optional, List, Tuple
 from django.conf import settings
 
@@ -29,8 +30,9 @@ def has_ffmpeg() -> bool:
         return False
 
 
+@lru_cache(maxsize=1)
 def has_ffprobe() -> bool:
-    """Prüft ob FFprobe installiert ist."""
+    """Prüft ob FFprobe installiert ist (einmal pro Prozess)."""
     try:
         subprocess.run(
             ['ffprobe', '-version'],
@@ -50,64 +52,22 @@ class FFmpegService:
     @staticmethod
     def get_video_info(video_path: str) -> dict:
         """
-        Holt Video-Metadaten via FFprobe.
+        Holt Video-Metadaten via FFprobe (gecacht über core.media_probe,
+        Schlüssel Pfad/Größe/mtime bzw. Inhalts-Hash).
 
         Returns:
             dict mit: duration, width, height, fps, codec, audio_codec
         """
+        from core.media_probe import probe
+
         if not has_ffprobe():
             raise RuntimeError("FFprobe nicht verfügbar")
 
-        try:
-            cmd = [
-                'ffprobe',
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
-                video_path
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            data = json.loads(result.stdout)
-
-            info = {
-                'duration': 0,
-                'width': 0,
-                'height': 0,
-                'fps': 0,
-                'video_codec': None,
-                'audio_codec': None,
-                'has_audio': False,
-            }
-
-            # Format-Daten
-            if 'format' in data:
-                info['duration'] = float(data['format'].get('duration', 0))
-
-            # Stream-Daten
-            for stream in data.get('streams', []):
-                if stream.get('codec_type') == 'video':
-                    info['width'] = stream.get('width', 0)
-                    info['height'] = stream.get('height', 0)
-                    info['video_codec'] = stream.get('codec_name')
-
-                    # FPS berechnen
-                    fps_str = stream.get('r_frame_rate', '0/1')
-                    if '/' in fps_str:
-                        num, den = fps_str.split('/')
-                        if int(den) > 0:
-                            info['fps'] = round(int(num) / int(den), 2)
-
-                elif stream.get('codec_type') == 'audio':
-                    info['audio_codec'] = stream.get('codec_name')
-                    info['has_audio'] = True
-
-            return info
-
-        except Exception as e:
-            logger.error(f"Failed to get video info: {e}")
-            raise
+        info = probe(video_path)
+        if info is None:
+            logger.error(f"Failed to get video info: {video_path}")
+            raise RuntimeError(f"Video-Metadaten nicht lesbar: {video_path}")
+        return info
 
     @staticmethod
     def extract_audio(video_path: str, output_path: str, format: str = 'wav') -> bool:
@@ -1,10 +1,123 @@
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Customer, Subscription as StripeSubscription
+from django.core.cache import cache
+from .models import Subscription as StripeSubscription
 import logging
+import time
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+# Entitlements: Abo-Stand eines Users als Schnappschuss im Cache.
+# Schlüssel enthalten zwei Versionszähler – pro User (Abo/Customer geändert,
+# z.B. durch Stripe-Webhooks) und global (Pläne geändert). Die Signale in
+# payments.signals zählen hoch; alte Einträge laufen über den TTL aus.
+# Pro Request hängt der Schnappschuss am User-Objekt (user._entitlements);
+# ändert ein Request das Abo selbst, verwirft FeatureAccessService.refresh(user)
+# auch diese Kopie.
+# Die Invalidierung wirkt nur prozessübergreifend, wenn der Cache geteilt ist
+# (SHARED_STATE_BACKEND=redis); mit prozesslokalem Cache sehen andere Worker
+# die Änderung erst nach LOCAL_ENTITLEMENTS_TTL.
+ENTITLEMENTS_TTL = 3600
+LOCAL_ENTITLEMENTS_TTL = 60
+ENTITLEMENTS_KEY = 'entitlements:{user_id}:{plans_version}:{user_version}'
+USER_VERSION_KEY = 'entitlements:version:user:{}'
+PLANS_VERSION_KEY = 'entitlements:version:plans'
+
+ACTIVE_STATUSES = ['active', 'trialing']
+
+# Default features for free users
+DEFAULT_FEATURES = {
+    'unlimited_storage': False,
+    'all_apps_access': False,
+    'priority_support': False,
+    'trial_days': 0,
+    'apps': ['videos']  # Free users get basic video functionality
+}
+
+
+class Entitlements(NamedTuple):
+    """Was ein User laut aktivem Abo darf – ohne Datenbankzugriff auswertbar"""
+    has_subscription: bool = False
+    plan_name: str = 'Kostenlos'
+    plan_type: str = 'free'
+    price: Decimal = Decimal('0.00')
+    currency: str = 'EUR'
+    interval: str = 'month'
+    status: str = 'active'
+    storage_mb: Optional[int] = None
+    plan_features: Optional[dict] = None
+    current_period_end: object = None
+    trial_end: object = None
+    cancel_at_period_end: bool = False
+
+    @property
+    def is_founder_access(self):
+        return self.plan_type == 'founder_access'
+
+    @property
+    def is_premium(self):
+        return self.price > 0
+
+    @property
+    def is_storage_plan(self):
+        return self.plan_type == 'storage' and self.price > 0
+
+    @property
+    def features(self):
+        """Plan-Features über den Standardwerten für kostenlose User"""
+        return {**DEFAULT_FEATURES, **(self.plan_features or {})}
+
+    @property
+    def apps(self):
+        return (self.plan_features or {}).get('apps', [])
+
+    def can_use_app(self, app_name):
+        if not self.has_subscription:
+            return False
+        if self.is_founder_access:
+            return True
+        if (self.plan_features or {}).get('all_apps_access', False):
+            return True
+        return app_name in self.apps
+
+
+FREE_ENTITLEMENTS = Entitlements()
+
+
+def entitlements_ttl():
+    if getattr(settings, 'USE_REDIS_SHARED_STATE', False):
+        return ENTITLEMENTS_TTL
+    return LOCAL_ENTITLEMENTS_TTL
+
+
+def _new_version():
+    # Zeitbasierter Startwert: nach Verdrängung des Zählers passen alte Einträge nicht mehr
+    return time.time_ns()
+
+
+def _versions(user_id):
+    user_key = USER_VERSION_KEY.format(user_id)
+    versions = cache.get_many([PLANS_VERSION_KEY, user_key])
+    missing = {key: _new_version() for key in (PLANS_VERSION_KEY, user_key) if key not in versions}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        versions.update(cache.get_many(list(missing)))
+    return versions.get(PLANS_VERSION_KEY), versions.get(user_key)
+
+
+def invalidate_entitlements(user_id=None):
+    """Schnappschüsse eines Users verwerfen; ohne user_id alle (Pläne geändert)"""
+    key = USER_VERSION_KEY.format(user_id) if user_id else PLANS_VERSION_KEY
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
 
 class FeatureAccessService:
     """Service to control access to premium features based on subscriptions"""
@@ -12,30 +125,84 @@ class FeatureAccessService:
     @staticmethod
     def get_user_active_subscription(user):
         """Get user's active Stripe subscription"""
+        return StripeSubscription.objects.filter(
+            customer__user=user,
+            status__in=ACTIVE_STATUSES
+        ).select_related('plan').first()
+    
+    @staticmethod
+    def build_entitlements(user):
+        """Entitlements direkt aus der Datenbank (ein Query)"""
+        subscription = FeatureAccessService.get_user_active_subscription(user)
+        if not subscription:
+            return FREE_ENTITLEMENTS
+        plan = subscription.plan
+        return Entitlements(
+            has_subscription=True,
+            plan_name=plan.name,
+            plan_type=plan.plan_type,
+            price=plan.price,
+            currency=plan.currency,
+            interval=plan.interval,
+            status=subscription.status,
+            storage_mb=plan.storage_mb,
+            plan_features=plan.features or {},
+            current_period_end=subscription.current_period_end,
+            trial_end=subscription.trial_end,
+            cancel_at_period_end=subscription.cancel_at_period_end,
+        )
+    
+    @staticmethod
+    def get_entitlements(user):
+        """Entitlements des Users: pro Request einmal, sonst aus dem Cache"""
+        if not user or not getattr(user, 'is_authenticated', False):
+            return FREE_ENTITLEMENTS
+        entitlements = getattr(user, '_entitlements', None)
+        if entitlements is not None:
+            return entitlements
+        
+        key = None
         try:
-            customer = Customer.objects.get(user=user)
-            return StripeSubscription.objects.filter(
-                customer=customer,
-                status__in=['active', 'trialing']
-            ).first()
-        except Customer.DoesNotExist:
-            return None
+            plans_version, user_version = _versions(user.pk)
+            key = ENTITLEMENTS_KEY.format(user_id=user.pk, plans_version=plans_version, user_version=user_version)
+            entitlements = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Entitlement-Cache nicht erreichbar: {e}")
+        
+        if entitlements is None:
+            entitlements = FeatureAccessService.build_entitlements(user)
+            if key:
+                try:
+                    cache.set(key, entitlements, entitlements_ttl())
+                except Exception as e:
+                    logger.warning(f"Entitlement-Cache nicht erreichbar: {e}")
+        
+        user._entitlements = entitlements
+        return entitlements
+    
+    @staticmethod
+    def refresh(user):
+        """Nach einer Abo-Änderung im laufenden Request: Cache und die am
+        User-Objekt gemerkten Schnappschüsse (Entitlements, Freigaberegeln) verwerfen"""
+        invalidate_entitlements(user.pk)
+        for attr in ('_entitlements', '_feature_access_rules'):
+            if hasattr(user, attr):
+                delattr(user, attr)
     
     @staticmethod
     def has_founder_access(user):
         """Check if user has Founder's Early Access subscription"""
-        subscription = FeatureAccessService.get_user_active_subscription(user)
-        if not subscription:
-            return False
-        return subscription.plan.plan_type == 'founder_access'
+        return FeatureAccessService.get_entitlements(user).is_founder_access
     
     @staticmethod
     def has_premium_access(user):
         """Check if user has any premium subscription (including Founder's Access)"""
-        subscription = FeatureAccessService.get_user_active_subscription(user)
-        if not subscription:
-            return False
-        return subscription.plan.price > 0
+        return FeatureAccessService.get_entitlements(user).is_premium
+    
+    @staticmethod
+    def has_storage_plan(user):
+        """Check if user has a paid storage plan"""
+        return FeatureAccessService.get_entitlements(user).is_storage_plan
     
     @staticmethod
     def has_app_access(user, app_name):
@@ -44,82 +211,38 @@ class FeatureAccessService:
         if user.is_superuser:
             return True
         
-        # Check if user has Founder's Early Access (all apps unlocked)
-        if FeatureAccessService.has_founder_access(user):
-            return True
-        
-        subscription = FeatureAccessService.get_user_active_subscription(user)
-        if not subscription:
-            return False
-        
-        # Check if app is in the subscription features
-        features = subscription.plan.features or {}
-        if features.get('all_apps_access', False):
-            return True
-        
-        # Check specific app list
-        allowed_apps = features.get('apps', [])
-        return app_name in allowed_apps
+        # Founder's Early Access (all apps unlocked), all_apps_access or specific app list
+        return FeatureAccessService.get_entitlements(user).can_use_app(app_name)
     
     @staticmethod
     def get_user_features(user):
         """Get all features available to the user"""
-        subscription = FeatureAccessService.get_user_active_subscription(user)
-        
-        # Default features for free users
-        default_features = {
-            'unlimited_storage': False,
-            'all_apps_access': False,
-            'priority_support': False,
-            'trial_days': 0,
-            'apps': ['videos']  # Free users get basic video functionality
-        }
-        
-        if not subscription:
-            return default_features
-        
-        # Get features from subscription plan
-        plan_features = subscription.plan.features or {}
-        
-        # Merge with defaults, plan features override defaults
-        features = {**default_features, **plan_features}
-        
-        return features
+        return FeatureAccessService.get_entitlements(user).features
     
     @staticmethod
     def get_subscription_info(user):
         """Get detailed subscription information for the user"""
-        subscription = FeatureAccessService.get_user_active_subscription(user)
-        
-        if not subscription:
-            return {
-                'has_subscription': False,
-                'plan_name': 'Kostenlos',
-                'plan_type': 'free',
-                'price': 0.00,
-                'currency': 'EUR',
-                'interval': 'month',
-                'status': 'active',
-                'is_founder_access': False,
-                'is_premium': False,
-                'features': FeatureAccessService.get_user_features(user)
-            }
+        entitlements = FeatureAccessService.get_entitlements(user)
         
-        return {
-            'has_subscription': True,
-            'plan_name': subscription.plan.name,
-            'plan_type': subscription.plan.plan_type,
-            'price': float(subscription.plan.price),
-            'currency': subscription.plan.currency,
-            'interval': subscription.plan.interval,
-            'status': subscription.status,
-            'current_period_end': subscription.current_period_end,
-            'trial_end': subscription.trial_end,
-            'cancel_at_period_end': subscription.cancel_at_period_end,
-            'is_founder_access': subscription.plan.plan_type == 'founder_access',
-            'is_premium': subscription.plan.price > 0,
-            'features': FeatureAccessService.get_user_features(user)
+        info = {
+            'has_subscription': entitlements.has_subscription,
+            'plan_name': entitlements.plan_name,
+            'plan_type': entitlements.plan_type,
+            'price': float(entitlements.price),
+            'currency': entitlements.currency,
+            'interval': entitlements.interval,
+            'status': entitlements.status,
+            'is_founder_access': entitlements.is_founder_access,
+            'is_premium': entitlements.is_premium,
+            'features': entitlements.features
         }
+        if entitlements.has_subscription:
+            info.update({
+                'current_period_end': entitlements.current_period_end,
+                'trial_end': entitlements.trial_end,
+                'cancel_at_period_end': entitlements.cancel_at_period_end,
+            })
+        return info
 
 
 def require_founder_access(view_func):
@@ -8,6 +8,32 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
+# Entitlement-Cache zuerst invalidieren, damit die folgenden Receiver
+# (z.B. Storage-Sync) schon den neuen Abo-Stand sehen
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_entitlements(sender, instance, **kwargs):
+    """Entitlements des Users nach Abo-Änderung (Stripe-Webhook, Admin) verwerfen"""
+    from .feature_access import invalidate_entitlements
+    invalidate_entitlements(instance.customer.user_id)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_entitlements(sender, instance, **kwargs):
+    """Entitlements verwerfen, wenn ein Stripe-Customer angelegt oder gelöscht wird"""
+    from .feature_access import invalidate_entitlements
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_plan_entitlements(sender, instance, **kwargs):
+    """Preis/Features eines Plans geändert – alle Entitlements verwerfen"""
+    from .feature_access import invalidate_entitlements
+    invalidate_entitlements()
+
+
 @receiver(post_save, sender=Subscription)
 def sync_storage_on_subscription_update(sender, instance, created, **kwargs):
     """Sync video storage when subscription is created or updated"""
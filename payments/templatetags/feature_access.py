@@ -85,11 +85,11 @@ def feature_upgrade_prompt(context, app_name, custom_message=None):
         }
     
     # Get feature information
-    try:
-        feature = FeatureAccess.objects.get(app_name=app_name, is_active=True)
+    feature = FeatureAccess.get_active_rules(user).get(app_name)
+    if feature:
         upgrade_message = custom_message or feature.get_upgrade_message()
         subscription_required = feature.get_subscription_required_display()
-    except FeatureAccess.DoesNotExist:
+    else:
         upgrade_message = custom_message or f'Diese Funktion erfordert ein Abonnement.'
         subscription_required = 'Abonnement'
     
@@ -111,9 +111,8 @@ def subscription_required_badge(context, app_name):
     """
     user = context.get('user')
     
-    try:
-        feature = FeatureAccess.objects.get(app_name=app_name, is_active=True)
-        
+    feature = FeatureAccess.get_active_rules(user).get(app_name)
+    if feature:
         # Don't show badge for free features
         if feature.subscription_required == 'free':
             return {
@@ -148,11 +147,10 @@ def subscription_required_badge(context, app_name):
             'has_access': has_access,
             'app_name': app_name
         }
-        
-    except FeatureAccess.DoesNotExist:
-        return {
-            'show_badge': False
-        }
+    
+    return {
+        'show_badge': False
+    }
 
 
 @register.simple_tag(takes_context=True)
@@ -13,6 +13,7 @@ from django.contrib import messages
 from django.urls import reverse
 from .models import SubscriptionPlan, Customer, Subscription, WebhookEvent, Invoice
 from .stripe_service import StripeService
+from .feature_access import FeatureAccessService
 
 logger = logging.getLogger(__name__)
 
@@ -553,6 +554,7 @@ def create_checkout_session(request, plan_id):
                     current_period_end=None,
                     cancel_at_period_end=False,
                 )
+                FeatureAccessService.refresh(request.user)
 
                 messages.success(request, f'✅ {plan.name} erfolgreich aktiviert - komplett kostenlos!')
                 return JsonResponse({
@@ -596,6 +598,7 @@ def checkout_success(request):
             session = stripe.checkout.Session.retrieve(session_id)
             if session.subscription:
                 StripeService.sync_subscription_from_stripe(session.subscription)
+                FeatureAccessService.refresh(request.user)
                 messages.success(request, 'Subscription activated successfully!')
             else:
                 messages.error(request, 'No subscription found in checkout session')
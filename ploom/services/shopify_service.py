@@ -4,10 +4,11 @@ P-Loom Shopify Service für Produkt-Upload
 import base64
 import logging
 import requests
-import time
 from typing import Tuple, Optional, Dict, List
 from urllib.request import urlopen
 
+from shopify_manager.api_gateway import ShopifyGateway
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,47 +28,11 @@ class PLoomShopifyService:
             'X-Shopify-Access-Token': store.access_token,
             'Content-Type': 'application/json'
         }
-        self.last_request_time = 0
-        self.min_request_interval = 0.5
-
-    def _rate_limit(self):
-        """Wartet die minimale Zeit zwischen API-Requests ab"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-
-        self.last_request_time = time.time()
+        self.gateway = ShopifyGateway.for_store(store)
 
     def _make_request(self, method: str, url: str, **kwargs) -> requests.Response:
-        """Macht einen Rate-Limited API Request mit Retry-Logik"""
-        max_retries = 3
-        retry_delay = 1.0
-
-        for attempt in range(max_retries):
-            try:
-                self._rate_limit()
-                response = requests.request(method, url, headers=self.headers, **kwargs)
-
-                if response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-
-                return response
-
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    raise
-
-        return response
+        """API-Request über das gemeinsame Shopify-Gateway (Drosselung, Retries, Keep-Alive)"""
+        return self.gateway.request(method, url, **kwargs)
 
     def create_draft_product(self, ploom_product) -> Tuple[bool, str, str]:
         """
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radio', '0050_listenerstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleProjection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('queue_fp', models.CharField(default='', max_length=64)),
+                ('anchor', models.DateTimeField(blank=True, null=True)),
+                ('rows', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Timeline-Projektion',
+                'verbose_name_plural': 'Timeline-Projektionen',
+                'ordering': ['day'],
+            },
+        ),
+    ]
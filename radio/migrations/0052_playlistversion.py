@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+def create_singleton(apps, schema_editor):
+    apps.get_model('radio', 'PlaylistVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radio', '0051_scheduleprojection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Warteschlangen-Version',
+            },
+        ),
+        migrations.RunPython(create_singleton, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,8 @@ Diese Tabellen sind die **Single Source of Truth** der Programmplanung:
 Niemand spielt etwas direkt aus — alles geht über diese DB.
 """
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from encrypted_model_fields.fields import EncryptedCharField
 
 
@@ -664,3 +666,66 @@ class ListenerStat(models.Model):
 
     def __str__(self):
         return f"{self.ts:%Y-%m-%d %H:%M} – {self.listeners} Hörer"
+
+
+class PlaylistVersion(models.Model):
+    """
+    Änderungszähler der Warteschlange (Singleton, pk=1).
+
+    Wird bei jedem Speichern/Löschen eines PlaylistEntry per Signal erhöht,
+    Massen-Updates (bulk_create, queryset.update) rufen bump() selbst auf.
+    radio/projection.py erkennt daran, ob gespeicherte Projektionen veraltet sind.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Warteschlangen-Version'
+
+    def __str__(self):
+        return f'Warteschlange v{self.version}'
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+class ScheduleProjection(models.Model):
+    """
+    Vorberechnete Tages-Timeline (siehe radio/projection.py).
+
+    Gültig, solange Warteschlangen-Version + laufender Eintrag (queue_fp) und der
+    Anschlusspunkt (anchor = Ende des laufenden Beitrags) passen; Änderungen
+    an Pins/Slots/Saison-Tags löschen die Projektionen per Signal.
+    """
+    day = models.DateField(unique=True)
+    queue_fp = models.CharField(max_length=64, default='')
+    anchor = models.DateTimeField(null=True, blank=True)
+    rows = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day']
+        verbose_name = 'Timeline-Projektion'
+        verbose_name_plural = 'Timeline-Projektionen'
+
+    def __str__(self):
+        return f'Projektion {self.day:%d.%m.%Y} ({len(self.rows or [])} Zeilen)'
+
+
+@receiver([post_save, post_delete], sender=ScheduledItem)
+@receiver([post_save, post_delete], sender=ProgramSlot)
+@receiver([post_save, post_delete], sender=ContentTag)
+def _invalidate_schedule_projection(sender, **kwargs):
+    """Pins/Slots/Saisons geändert -> vorberechnete Timelines verwerfen."""
+    ScheduleProjection.objects.all().delete()
+
+
+@receiver([post_save, post_delete], sender=PlaylistEntry)
+def _bump_playlist_version(sender, **kwargs):
+    """Eintrag gespeichert/gelöscht -> Projektionen über die Version verwerfen."""
+    PlaylistVersion.bump()
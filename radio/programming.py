@@ -0,0 +1,296 @@
+"""
+Programm-Engine der Automatik-Rotation.
+
+Bisher wurde der Kandidaten-Pool pro Aufruf neu aus Einzelobjekten gebaut
+(Saison-Boost = dict n-fach in die Liste kopieren, Saison-Prüfung pro Zeile)
+und die Mischung mit Modulo-Indizes über gemischte Listen gezogen. Jetzt:
+
+- LibraryPool hält die Bibliothek als kompakte Arrays (Dauer, Art,
+  zuletzt gespielt, Gewicht). Saison-Sperre und -Boost werden je Tag EINMAL
+  pro Saison-Tag berechnet und per Index-Maske auf alle Inhalte angewandt.
+- RotationEngine wählt pro Schritt den "fälligsten" Inhalt (Zeit seit dem
+  letzten Einsatz × Gewicht) unter Abstandsregeln: Mindestabstand für
+  denselben Titel, nie zweimal direkt hintereinander, Jingle-/Wort-/Werbe-
+  Takt aus StationConfig bzw. den Slot-Regeln.
+- Die Engine führt ihre Rotationsuhr über mehrere plan()-Aufrufe fort:
+  ensure_queue_filled plant so mehrere Tage in einem Durchgang, ohne dass
+  der Folgetag dieselben Titel wiederholt.
+"""
+import numpy as np
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+# Mindestabstand, bis derselbe Inhalt wieder eingeplant wird (Sekunden);
+# bei kleinem Pool automatisch auf die halbe Pool-Spielzeit verkürzt
+REPEAT_GAP = 3 * 3600
+# Nie gespielte Inhalte gelten als so lange her gespielt -> Vorrang
+NEVER_PLAYED_AGE = 30 * 86400
+# Zufallsanteil der Punktzahl, damit gleich "fällige" Titel variieren
+JITTER = 0.15
+MAX_BOOST = 10
+
+BUCKETS = ('music', 'song', 'talk', 'jingle', 'ad', 'other')
+_CODE = {b: i for i, b in enumerate(BUCKETS)}
+
+# Wortarten, die ein Slot als "Wort" zwischen die Musik mischt
+SLOT_TALK_KINDS = ('news', 'tip', 'wissen', 'story', 'dialog', 'kreativ', 'jingle', 'effekt')
+
+
+def track_kind(category, source, has_lyrics):
+    """Rubrik eines Tracks: manuelle Kategorie hat Vorrang, sonst aus Quelle abgeleitet."""
+    if category in ('music', 'song', 'effekt', 'ad'):
+        return category
+    if source == 'elevenlabs':
+        return 'effekt'
+    if has_lyrics or source in ('acestep',):
+        return 'song'
+    return 'music'
+
+
+def _split_tags(tags_csv):
+    return [x.strip().lower() for x in (tags_csv or '').split(',') if x.strip()]
+
+
+class LibraryPool:
+    """Bibliotheks-Inhalte als Arrays; items sind die bekannten Kandidaten-dicts."""
+
+    def __init__(self, items, smap=None):
+        merged = {}
+        for it in items:
+            key = (it['type'], it['pk'])
+            if key in merged:
+                # Altes Pool-Format: Boost als n-fache Kopie -> Gewicht
+                merged[key]['weight'] = merged[key].get('weight', 1) + it.get('weight', 1)
+            else:
+                merged[key] = dict(it)
+        self.items = list(merged.values())
+        self.smap = smap or {}
+        n = len(self.items)
+        self.dur = np.fromiter((max(1, it.get('dur') or 60) for it in self.items), float, n)
+        self.weight = np.fromiter((it.get('weight', 1) for it in self.items), float, n)
+        self.last = np.fromiter((it['last'].timestamp() if it.get('last') else np.nan
+                                 for it in self.items), float, n)
+        self.kinds = np.array([it['kind'] for it in self.items], dtype=object)
+        self._tag_idx = {}
+        for i, it in enumerate(self.items):
+            for name in _split_tags(it.get('tags')):
+                if name in self.smap:
+                    self._tag_idx.setdefault(name, []).append(i)
+        self._tag_idx = {k: np.asarray(v) for k, v in self._tag_idx.items()}
+        self._season = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def load(cls, limit=None):
+        """Lädt alle automatisch einplanbaren Tracks und Wort-Inhalte (wenige Abfragen)."""
+        from .models import Track, SpokenContent
+        from . import scheduler
+        base = Track.objects.filter(is_active=True).exclude(audio_file='')
+        vocal = set(base.exclude(lyrics='').values_list('pk', flat=True))
+        fields = ('pk', 'title', 'category', 'source', 'mood', 'description',
+                  'duration_sec', 'tags', 'last_played_at')
+        rows = list(base.order_by('play_count', '-created_at').values(*fields)[:limit])
+        seen = {r['pk'] for r in rows}
+        # Werbe-/Spot-Tracks IMMER aufnehmen – nicht durch das Pool-Limit verdrängen
+        rows += [r for r in base.filter(category='ad').values(*fields) if r['pk'] not in seen]
+        items = []
+        for r in rows:
+            kind = track_kind(r['category'], r['source'], r['pk'] in vocal)
+            items.append({'type': 'track', 'pk': r['pk'], 'kind': kind, 'title': r['title'],
+                          'dur': r['duration_sec'] or (60 if kind == 'ad' else 120),
+                          'desc': (r['description'] or r['mood'] or '')[:80],
+                          'mood': r['mood'], 'source': r['source'],
+                          'tags': r['tags'], 'last': r['last_played_at']})
+        spoken = (SpokenContent.objects.filter(status='generated', auto_include=True)
+                  .exclude(audio_file='').exclude(kind='news')
+                  .order_by(F('last_played_at').asc(nulls_first=True), '-created_at')
+                  .annotate(text80=Substr('text', 1, 80))
+                  .values('pk', 'title', 'kind', 'description', 'text80', 'duration_sec',
+                          'tags', 'last_played_at')[:limit])
+        for r in spoken:
+            items.append({'type': 'spoken', 'pk': r['pk'], 'kind': r['kind'], 'title': r['title'],
+                          'dur': r['duration_sec'] or 60, 'desc': r['description'] or r['text80'],
+                          'tags': r['tags'], 'last': r['last_played_at']})
+        return cls(items, smap=scheduler._season_map())
+
+    def season(self, on_date):
+        """(einplanbar-Maske, Gewichte) für einen Tag – je Saison-Tag eine Prüfung."""
+        if on_date not in self._season:
+            ok = np.ones(len(self.items), bool)
+            weight = self.weight.copy()
+            for name, idx in self._tag_idx.items():
+                tag = self.smap[name]
+                if tag.is_in_season(on_date):
+                    boost = min(int(getattr(tag, 'boost', 1) or 1), MAX_BOOST)
+                    weight[idx] = np.maximum(weight[idx], boost)
+                else:
+                    ok[idx] = False
+            self._season[on_date] = (ok, weight)
+        return self._season[on_date]
+
+    def candidates(self, on_date):
+        """Einplanbare Kandidaten-dicts des Tages, inkl. Saison-Gewicht ('weight')."""
+        ok, weight = self.season(on_date)
+        return [dict(self.items[i], weight=int(weight[i])) for i in np.flatnonzero(ok)]
+
+
+class RotationEngine:
+    """
+    Plant Beitragsfolgen aus einem LibraryPool. Der Zustand (Rotationsuhr,
+    zuletzt eingeplant je Inhalt) bleibt über mehrere plan()-Aufrufe erhalten.
+    """
+
+    def __init__(self, pool, start=None, cfg=None, catmap=None, seed=None):
+        from .models import StationConfig, Rubrik
+        self.pool = pool
+        self.cfg = cfg or StationConfig.get()
+        if catmap is None:
+            # Pro-Rubrik konfigurierte Kategorie (Einstellungen → Rubriken); leer = automatisch
+            catmap = {r.key: r.category for r in Rubrik.objects.all() if r.category}
+        self.catmap = catmap
+        self.clock = (start or timezone.now()).timestamp()
+        self.last = pool.last.copy()
+        self.last[np.isnan(self.last)] = self.clock - NEVER_PLAYED_AGE
+        self.rng = np.random.default_rng(seed)
+        self._codes = {}
+
+    # --- Einteilung -------------------------------------------------------
+
+    def _station_bucket(self, it):
+        cat = self.catmap.get(it['kind'])   # explizite Rubrik-Kategorie hat Vorrang
+        if not cat:
+            if it['kind'] in ('music', 'song'):
+                cat = 'music'
+            elif it['kind'] in ('jingle', 'effekt'):
+                cat = 'jingle'
+            elif it['kind'] == 'ad':
+                cat = 'ad'
+            else:
+                cat = 'talk'
+        if cat == 'music' and it['kind'] == 'song':
+            return 'song'
+        return cat
+
+    @staticmethod
+    def _slot_bucket(it):
+        if it['kind'] in ('music', 'song'):
+            return it['kind']
+        if it['kind'] == 'ad':
+            return 'ad'
+        if it['kind'] in SLOT_TALK_KINDS:
+            return 'talk'
+        return 'other'
+
+    def _bucket_codes(self, mode):
+        if mode not in self._codes:
+            fn = self._slot_bucket if mode == 'slot' else self._station_bucket
+            self._codes[mode] = np.fromiter((_CODE[fn(it)] for it in self.pool.items),
+                                            np.int8, len(self.pool.items))
+        return self._codes[mode]
+
+    def station_rules(self):
+        cfg = self.cfg
+        return {'music_per_talk': cfg.std_music_per_talk or 0,   # 0 = nie automatisch Wortbeitrag
+                'jingle_every': cfg.std_jingle_every or 0,       # 0 = keine Jingles
+                'ad_every_min': cfg.std_ad_every_min or 0,       # 0 = keine Werbung
+                'song_share': getattr(cfg, 'song_share', 35) or 0}
+
+    # --- Auswahl ----------------------------------------------------------
+
+    def _pick(self, idx, weight, prev):
+        """Fälligster Inhalt aus idx unter Abstandsregeln; -1 wenn keiner."""
+        if idx.size == 0:
+            return -1
+        age = self.clock - self.last[idx]
+        gap = min(REPEAT_GAP, 0.5 * self.pool.dur[idx].sum())
+        score = age * weight[idx] * (1.0 + JITTER * self.rng.random(idx.size))
+        score[age < gap] *= 1e-6            # Mindestabstand: nur, wenn nichts anderes geht
+        if idx.size > 1:
+            score[idx == prev] = -1.0       # nie direkt wiederholen
+        return int(idx[int(np.argmax(score))])
+
+    def _commit(self, i, order):
+        order.append(self.pool.items[i])
+        self.last[i] = self.clock
+        self.clock += self.pool.dur[i]
+        return self.pool.dur[i]
+
+    def plan(self, target_sec, on_date=None, rules=None, mode='station', kinds=None,
+             predicate=None, start=None):
+        """
+        Beitragsfolge von ~target_sec Sekunden.
+
+        rules: music_per_talk, jingle_every, ad_every_min, song_share
+               (Standard: globale Misch-Regeln aus StationConfig)
+        mode:  'station' (Rubrik-Kategorien) oder 'slot' (Slot-Mischregeln)
+        kinds/predicate: Pool auf bestimmte Arten/Inhalte einschränken
+        start: frühester Zeitpunkt der Folge (Rotationsuhr springt ggf. vor)
+        """
+        if start is not None:
+            self.clock = max(self.clock, start.timestamp())
+        if on_date is None:
+            on_date = timezone.localdate()
+        rules = dict(self.station_rules(), **(rules or {})) if mode == 'station' else (rules or {})
+        mpt = rules.get('music_per_talk') or 0
+        jev = rules.get('jingle_every') or 0
+        ad_gap = (rules.get('ad_every_min') or 0) * 60
+        share = max(0, min(100, rules.get('song_share', 35) or 0)) / 100.0
+
+        ok, weight = self.pool.season(on_date)
+        mask = ok.copy()
+        if kinds:
+            mask &= np.isin(self.pool.kinds, list(kinds))
+        if predicate is not None:
+            mask &= np.fromiter((bool(predicate(it)) for it in self.pool.items), bool, len(mask))
+        codes = self._bucket_codes(mode)
+        pools = {b: np.flatnonzero(mask & (codes == _CODE[b])) for b in BUCKETS[:-1]}
+        has_music = pools['music'].size > 0 or pools['song'].size > 0
+        if not (has_music or pools['talk'].size or (mode == 'slot' and pools['ad'].size)):
+            return []
+
+        order, total, prev = [], 0.0, -1
+        acc = 0.0
+        since = mcount = 0
+        last_ad = 0.0
+        while total < target_sec:
+            music_step = False
+            if ad_gap and pools['ad'].size and (total - last_ad) >= ad_gap:
+                i = self._pick(pools['ad'], weight, prev)
+                last_ad = total
+            elif mpt and since >= mpt and pools['talk'].size:
+                i = self._pick(pools['talk'], weight, prev)
+                since = 0
+            elif has_music:
+                # Instrumental vs. Gesang nach eingestelltem Anteil (song_share)
+                acc += share
+                if (acc >= 1.0 and pools['song'].size) or not pools['music'].size:
+                    i = self._pick(pools['song'], weight, prev)
+                    acc -= 1.0
+                else:
+                    i = self._pick(pools['music'], weight, prev)
+                mcount += 1
+                since += 1
+                music_step = True
+            elif pools['talk'].size:
+                i = self._pick(pools['talk'], weight, prev)
+            else:
+                i = self._pick(pools['ad'], weight, prev)
+            total += self._commit(i, order)
+            prev = i
+            if jev and music_step and pools['jingle'].size and mcount % jev == 0:
+                prev = self._pick(pools['jingle'], weight, prev)
+                total += self._commit(prev, order)
+        return order
+
+
+def fetch_objects(order):
+    """{(type, pk): Track/SpokenContent} für eine Beitragsfolge – zwei Abfragen statt N."""
+    from .models import Track, SpokenContent
+    track_ids = {c['pk'] for c in order if c['type'] == 'track'}
+    spoken_ids = {c['pk'] for c in order if c['type'] == 'spoken'}
+    objs = {('track', pk): t for pk, t in Track.objects.in_bulk(track_ids).items()}
+    objs.update({('spoken', pk): s for pk, s in SpokenContent.objects.in_bulk(spoken_ids).items()})
+    return objs
@@ -0,0 +1,246 @@
+"""
+Vorberechnete Timeline-Projektion des Sendeplans.
+
+projected_timeline() musste bisher bei JEDER Dashboard-/Timeline-Anfrage die
+komplette Warteschlange laden, kumulierte Sendezeiten berechnen und für jeden
+Pin alle realen Einträge auf Dubletten im ±12-Minuten-Fenster prüfen
+(O(Pins × Queue)). Jetzt:
+
+- Ein expliziter Änderungszähler (PlaylistVersion, erhöht bei jedem
+  Speichern/Löschen eines Eintrags) plus der Anschlusspunkt (Ende des
+  laufenden Beitrags) entscheiden, ob die gespeicherte Projektion
+  (ScheduleProjection, pro Tag) noch stimmt.
+- Nur bei Änderung (Eintrag gespielt, verschoben, ersetzt …) wird neu
+  gerechnet – dann für mehrere Tage in einem Durchlauf und mit einem
+  Intervall-Index (PinIndex) statt verschachtelter Schleifen. Bewusst
+  komplett statt pro Tag inkrementell: jede Queue-Änderung verschiebt alle
+  folgenden Sendezeiten und damit ohnehin jeden späteren Tag.
+- Pin-/Slot-/Saison-Änderungen verwerfen die Projektionen per Signal
+  (radio/models.py); refresh() hält sie minütlich warm (enforce_pins).
+"""
+import hashlib
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import PlaylistEntry, PlaylistVersion, ScheduleProjection
+
+# ±12 Minuten: realer Eintrag gilt als Materialisierung des Pins
+PIN_MATCH_WINDOW = 720
+# Ohne laufenden Beitrag wandert der Anschlusspunkt mit "jetzt" – bis zu
+# dieser Abweichung bleibt die gespeicherte Projektion trotzdem gültig.
+ANCHOR_TOLERANCE = 60
+# Spätestens nach dieser Zeit neu rechnen (Bibliothek/Saison-Auflösbarkeit)
+MAX_AGE = timedelta(minutes=10)
+
+
+class PinIndex:
+    """Intervall-Index der realen Queue-Zeiten je Rubrik/Track/Wort-Beitrag.
+
+    near() beantwortet "gibt es einen passenden Eintrag im ±Fenster?" per
+    Binärsuche in O(log n) statt eines linearen Scans über die Queue.
+    """
+
+    def __init__(self, marks=()):
+        self._by_key = defaultdict(list)
+        for when, kind, track_id, spoken_id in marks:
+            self.add(when, kind, track_id, spoken_id)
+
+    def add(self, when, kind, track_id=None, spoken_id=None):
+        ts = when.timestamp()
+        keys = [('kind', kind)]
+        if track_id:
+            keys.append(('track', track_id))
+        if spoken_id:
+            keys.append(('spoken', spoken_id))
+        for key in keys:
+            arr = self._by_key[key]
+            if arr and arr[-1] > ts:
+                arr.insert(bisect_left(arr, ts), ts)
+            else:
+                arr.append(ts)
+
+    def near(self, key, when, window=PIN_MATCH_WINDOW):
+        arr = self._by_key.get(key)
+        if not arr:
+            return False
+        ts = when.timestamp()
+        i = bisect_left(arr, ts - window)
+        return i < len(arr) and arr[i] <= ts + window
+
+    def materializes(self, pin, when):
+        """Ist der Pin zur Zeit `when` bereits durch einen realen Eintrag abgedeckt?"""
+        if pin.mode == 'pinned_track' and pin.track_id:
+            return self.near(('track', pin.track_id), when)
+        if pin.mode == 'pinned_spoken' and pin.spoken_id:
+            return self.near(('spoken', pin.spoken_id), when)
+        if pin.mode in ('pinned_track', 'pinned_spoken'):
+            return False
+        return self.near(('kind', pin.rubrik_key or 'music'), when)
+
+
+def entry_mark_kind(e):
+    """Rubrik-Key eines realen Eintrags für den Pin-Abgleich."""
+    return e.spoken.kind if e.spoken_id and e.spoken else ('music' if e.track_id else e.kind)
+
+
+def queue_state(now=None):
+    """(Fingerabdruck, Anschlusspunkt, laufender Eintrag) – zwei kleine Abfragen.
+
+    Der Fingerabdruck besteht aus PlaylistVersion und dem laufenden Eintrag
+    und ändert sich damit bei jedem Abspielen, Verschieben, Ersetzen,
+    Einfügen oder Löschen eines Eintrags.
+    """
+    now = now or timezone.now()
+    current = (PlaylistEntry.objects.filter(status='playing')
+               .select_related('track', 'spoken').order_by('-started_at').first())
+    anchor = now
+    if current and current.started_at:
+        rest = (current.duration_sec or 0) - (now - current.started_at).total_seconds()
+        if rest > 0:
+            anchor = now + timedelta(seconds=rest)
+    raw = f'{PlaylistVersion.current()}|{current.pk if current else ""}'
+    return hashlib.sha1(raw.encode()).hexdigest(), anchor, current
+
+
+def compute_days(dates, anchor, now=None):
+    """Rechnet die Timeline-Zeilen für mehrere Tage in EINEM Queue-Durchlauf.
+
+    Liefert {date: rows}; Pin-Zeilen werden unabhängig von "jetzt"
+    gespeichert und erst beim Lesen (get_day) nach Uhrzeit gefiltert.
+    """
+    from .models import ScheduledItem, ProgramSlot
+    from . import scheduler
+
+    BERLIN, UTC = scheduler.BERLIN, scheduler.UTC
+    now = now or timezone.now()
+    dates = sorted(set(dates))
+    wanted = set(dates)
+    smap = scheduler._season_map()
+    out = {d: [] for d in dates}
+
+    queued = (PlaylistEntry.objects.filter(status='queued')
+              .select_related('track', 'spoken').order_by('position'))
+    index = PinIndex()
+    t = anchor
+    last_real = None
+    for e in queued:
+        pe = t.astimezone(BERLIN)
+        index.add(pe, entry_mark_kind(e), e.track_id, e.spoken_id)
+        if pe.date() in wanted:
+            try:
+                au = e.audio_url or ''
+            except Exception:
+                au = ''
+            out[pe.date()].append({'time': pe.isoformat(), 'time_str': pe.strftime('%H:%M'),
+                                   'kind': e.kind, 'title': e.title or '—', 'source': 'real',
+                                   'pk': e.pk, 'resolved': True, 'enforce': '', 'tags': '',
+                                   'audio_url': au})
+        last_real = t
+        t += timedelta(seconds=e.duration_sec or 120)
+
+    cutoff = (last_real or now).astimezone(BERLIN)
+    pins = list(ScheduledItem.objects.filter(is_active=True).select_related('track', 'spoken'))
+    slots = list(ProgramSlot.objects.filter(is_active=True))
+
+    for d in dates:
+        # Auflösbarkeit von Rubrik-Pins hängt nur von Rubrik + Tag ab -> einmal je Rubrik
+        resolvable = {}
+
+        def _resolvable(pin):
+            if pin.mode in ('compose', 'pinned_track', 'pinned_spoken', 'rubrik_gen'):
+                return scheduler._pin_resolvable(pin, d, smap)
+            if pin.rubrik_key not in resolvable:
+                resolvable[pin.rubrik_key] = scheduler._pin_resolvable(pin, d, smap)
+            return resolvable[pin.rubrik_key]
+
+        rows = out[d]
+        for pin in pins:
+            if not pin.applies_on(d):
+                continue
+            pt = datetime.combine(d, pin.start_time, tzinfo=BERLIN)
+            # Bereits materialisiert? -> Pin nicht doppelt zeigen
+            if index.materializes(pin, pt):
+                continue
+            title, kind = pin.name, (pin.rubrik_key or 'music')
+            if pin.mode == 'pinned_track' and pin.track:
+                title, kind = title or pin.track.title, 'music'
+            elif pin.mode == 'pinned_spoken' and pin.spoken:
+                title, kind = title or pin.spoken.title, pin.spoken.kind
+            else:
+                title = title or ('Rubrik: ' + (pin.rubrik_key or '?'))
+            pau = ''
+            try:
+                if pin.mode == 'pinned_track' and pin.track and pin.track.audio_file:
+                    pau = pin.track.audio_file.url
+                elif pin.mode == 'pinned_spoken' and pin.spoken and pin.spoken.audio_file:
+                    pau = pin.spoken.audio_file.url
+            except Exception:
+                pau = ''
+            rows.append({'time': pt.isoformat(), 'time_str': pt.strftime('%H:%M'),
+                         'kind': kind, 'title': title, 'source': 'theoretical', 'is_pin': True,
+                         'mode': pin.mode, 'pk': pin.pk, 'enforce': pin.enforce,
+                         'gen_status': pin.gen_status,
+                         'resolved': _resolvable(pin), 'tags': '',
+                         'audio_url': pau})
+
+        wd = d.weekday()
+        for slot in slots:
+            if wd not in slot.active_weekdays():
+                continue
+            st = datetime.combine(d, slot.start_time, tzinfo=UTC).astimezone(BERLIN)
+            if st <= cutoff:
+                continue
+            rows.append({'time': st.isoformat(), 'time_str': st.strftime('%H:%M'),
+                         'kind': 'auto', 'title': 'Auto-Block: ' + (slot.kinds or 'music'),
+                         'source': 'theoretical', 'is_slot': True, 'pk': slot.pk,
+                         'resolved': True, 'enforce': '', 'tags': ''})
+        rows.sort(key=lambda r: datetime.fromisoformat(r['time']))
+    return out
+
+
+def _is_fresh(proj, fp, anchor, now):
+    if proj is None or proj.queue_fp != fp or proj.anchor is None:
+        return False
+    if abs((proj.anchor - anchor).total_seconds()) > ANCHOR_TOLERANCE:
+        return False
+    return proj.computed_at is not None and now - proj.computed_at < MAX_AGE
+
+
+def _visible(rows, now):
+    """Vergangene Pins ausblenden (Pins liegen als Ebene über der Queue)."""
+    return [r for r in rows if not r.get('is_pin') or datetime.fromisoformat(r['time']) > now]
+
+
+def refresh(dates, now=None, force=False):
+    """Berechnet die Projektionen der Tage neu, sofern veraltet. Gibt {date: rows} zurück."""
+    now = now or timezone.now()
+    fp, anchor, _current = queue_state(now)
+    existing = {p.day: p for p in ScheduleProjection.objects.filter(day__in=list(dates))}
+    stale = [d for d in dates if force or not _is_fresh(existing.get(d), fp, anchor, now)]
+    result = {d: existing[d].rows for d in dates if d not in stale}
+    if stale:
+        computed = compute_days(stale, anchor, now)
+        for d, rows in computed.items():
+            ScheduleProjection.objects.update_or_create(
+                day=d, defaults={'queue_fp': fp, 'anchor': anchor, 'rows': rows})
+        result.update(computed)
+    return result
+
+
+def get_day(target_date, now=None):
+    """Timeline-Zeilen eines Tages – aus der gespeicherten Projektion, falls aktuell."""
+    now = now or timezone.now()
+    return _visible(refresh([target_date], now)[target_date], now)
+
+
+def refresh_ahead(days=2, now=None):
+    """Hält heute + die nächsten Tage vorberechnet (Celery, minütlich)."""
+    from . import scheduler
+    now = now or timezone.now()
+    today = now.astimezone(scheduler.BERLIN).date()
+    dates = [today + timedelta(days=i) for i in range(days + 1)]
+    ScheduleProjection.objects.filter(day__lt=today).delete()
+    return len(refresh(dates, now))
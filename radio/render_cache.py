@@ -0,0 +1,151 @@
+"""
+Render-Cache für Audio-Nachbearbeitung (Musikbett, News-Intro).
+
+_mix_music_bed() und _prepend_news_intro() liefen bisher bei jedem Wort-
+Beitrag komplett durch ffmpeg – inklusive erneutem Dekodieren, Resamplen und
+Filtern derselben Bett-/Intro-Datei. Jetzt:
+
+- Bett-Tracks und das Intro werden EINMAL als normalisiertes PCM-WAV
+  (44,1 kHz Stereo, EBU-R128-Lautheit, Bett zusätzlich tiefpassgefiltert)
+  vorbereitet und liegen als Schleifen-/Vorlaufmaterial bereit.
+- Fertige Mischungen werden unter einem Schlüssel aus Inhalts-Hashes der
+  Eingaben + Filterparametern abgelegt; derselbe Input (Wiederholung,
+  Retry, gleicher Jingle) kostet keinen ffmpeg-Lauf mehr.
+
+Ablage: MEDIA_ROOT/radio/render_cache/{prep,mix}/ – prune() räumt im
+nächtlichen Cleanup alte Mischungen weg.
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = 'radio/render_cache'
+SAMPLE_RATE = 44100
+# Ziel-Lautheit der vorbereiteten Betten/Intros (integriert, LUFS)
+BED_LOUDNESS = -16
+INTRO_LOUDNESS = -16
+BED_LOWPASS = 4500
+# Version der Vorbereitungs-Filterkette – bei Änderung neu rendern
+PREP_VERSION = 1
+MIX_MAX_AGE_DAYS = 30
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _dir(name):
+    path = os.path.join(settings.MEDIA_ROOT, CACHE_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def bytes_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    """Inhalts-Hash einer Datei (siehe core.media_probe.content_hash)."""
+    from core.media_probe import content_hash
+    return content_hash(path)
+
+
+def render_key(op, inputs, params):
+    """Schlüssel aus Operation, Inhalts-Hashes der Eingaben und Filterparametern."""
+    raw = json.dumps({'op': op, 'in': list(inputs), 'p': params}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _write_atomic(path, produce):
+    """produce(tmp_path) schreibt die Datei; erst bei Erfolg wird sie sichtbar."""
+    fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        produce(tmp)
+        if not os.path.getsize(tmp):
+            raise RuntimeError('leere Ausgabe')
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return path
+
+
+def run_ffmpeg(args, timeout=180):
+    subprocess.run(['ffmpeg', '-y', '-v', 'error'] + args, check=True, capture_output=True,
+                   timeout=timeout)
+
+
+def prepared(src_path, kind='bed'):
+    """
+    Pfad einer vorbereiteten PCM-WAV-Fassung von src_path (einmalig gerendert).
+
+    kind='bed':   lautheitsnormalisiert + Tiefpass – Schleifenmaterial fürs Musikbett
+    kind='intro': lautheitsnormalisiert – Vorlauf fürs News-Intro
+    """
+    if kind == 'bed':
+        flt = f'loudnorm=I={BED_LOUDNESS}:TP=-2:LRA=11,lowpass=f={BED_LOWPASS}'
+    else:
+        flt = f'loudnorm=I={INTRO_LOUDNESS}:TP=-1.5:LRA=11'
+    flt += f',aformat=sample_fmts=s16:sample_rates={SAMPLE_RATE}:channel_layouts=stereo'
+    key = render_key('prep', [file_hash(src_path)], {'kind': kind, 'f': flt, 'v': PREP_VERSION})
+    path = os.path.join(_dir('prep'), f'{kind}_{key[:32]}.wav')
+    if os.path.exists(path):
+        return path
+    with _lock(path):
+        if not os.path.exists(path):
+            logger.info(f'Render-Cache: bereite {kind} vor ({os.path.basename(src_path)})')
+            _write_atomic(path, lambda tmp: run_ffmpeg(
+                ['-i', src_path, '-af', flt, '-c:a', 'pcm_s16le', tmp]))
+    return path
+
+
+def cached_render(op, inputs, params, render):
+    """
+    Liefert die gecachten MP3-Bytes für (op, inputs, params) oder rendert sie
+    über render(out_path) und legt sie ab.
+    """
+    key = render_key(op, inputs, params)
+    path = os.path.join(_dir('mix'), f'{op}_{key[:40]}.mp3')
+    if os.path.exists(path):
+        os.utime(path)  # Zugriff merken (prune nach Alter)
+        logger.debug(f'Render-Cache Treffer: {op} {key[:12]}')
+        with open(path, 'rb') as fh:
+            return fh.read()
+    with _lock(path):
+        if not os.path.exists(path):
+            _write_atomic(path, render)
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+def prune(max_age_days=MIX_MAX_AGE_DAYS):
+    """Entfernt Mischungen, die seit max_age_days nicht mehr benutzt wurden.
+    Vorbereitete Betten/Intros bleiben (klein, werden täglich gebraucht)."""
+    mix_dir = os.path.join(settings.MEDIA_ROOT, CACHE_DIR, 'mix')
+    if not os.path.isdir(mix_dir):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for name in os.listdir(mix_dir):
+        path = os.path.join(mix_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -16,7 +16,7 @@ from django.db import transaction
 from django.db.models import Max
 from django.utils import timezone
 
-from .models import Track, SpokenContent, PlaylistEntry, ContentTag, StationConfig
+from .models import Track, SpokenContent, PlaylistEntry, PlaylistVersion, ContentTag, StationConfig
 
 BERLIN = ZoneInfo('Europe/Berlin')
 UTC = ZoneInfo('UTC')
@@ -167,15 +167,20 @@ def build_schedule(target_count=40):
             add('ad', spoken=a, dur=max(a.duration_sec, 15))
 
     PlaylistEntry.objects.bulk_create(entries)
+    PlaylistVersion.bump()
     return len(entries)
 
 
 @transaction.atomic
 def renumber():
     """Positions-Lücken nach Umsortieren/Löschen schließen (0..n)."""
+    changed = False
     for i, e in enumerate(PlaylistEntry.objects.filter(status='queued').order_by('position')):
         if e.position != i:
             PlaylistEntry.objects.filter(pk=e.pk).update(position=i)
+            changed = True
+    if changed:
+        PlaylistVersion.bump()
 
 
 def _rubrik_is_music(rubrik_key):
@@ -217,104 +222,11 @@ def projected_timeline(target_date, now=None):
     - REAL: bereits in der Queue stehende Einträge (kumuliert ab jetzt)
     - THEORETISCH: noch nicht materialisierte Pins + Auto-Blöcke des Tages
       (nur NACH dem letzten realen Eintrag, um Doppelung zu vermeiden).
-    Liefert nach Zeit sortierte dicts.
+    Liefert nach Zeit sortierte dicts. Kommt aus der vorberechneten
+    Projektion (radio/projection.py) und wird nur bei Änderungen neu gerechnet.
     """
-    from .models import ScheduledItem, ProgramSlot
-    now = now or timezone.now()
-    smap = _season_map()
-    rows = []
-
-    current = (PlaylistEntry.objects.filter(status='playing')
-               .select_related('track', 'spoken').order_by('-started_at').first())
-    queued = list(PlaylistEntry.objects.filter(status='queued')
-                  .select_related('track', 'spoken').order_by('position'))
-    t = now
-    if current and current.started_at:
-        rest = (current.duration_sec or 0) - (now - current.started_at).total_seconds()
-        if rest > 0:
-            t = now + timedelta(seconds=rest)
-    last_real = None
-    real_marks = []   # (Zeit, Rubrik-Key, track_id, spoken_id) für Pin-Dubletten-Abgleich
-    for e in queued:
-        pe = t.astimezone(BERLIN)
-        real_marks.append((pe, (e.spoken.kind if e.spoken_id and e.spoken else ('music' if e.track_id else e.kind)),
-                           e.track_id, e.spoken_id))
-        if pe.date() == target_date:
-            try:
-                au = e.audio_url or ''
-            except Exception:
-                au = ''
-            rows.append({'time': pe.isoformat(), 'time_str': pe.strftime('%H:%M'),
-                         'kind': e.kind, 'title': e.title or '—', 'source': 'real',
-                         'pk': e.pk, 'resolved': True, 'enforce': '', 'tags': '',
-                         'audio_url': au})
-        last_real = t
-        t += timedelta(seconds=e.duration_sec or 120)
-
-    cutoff = (last_real or now).astimezone(BERLIN)
-    now_b = now.astimezone(BERLIN)
-
-    for pin in ScheduledItem.objects.filter(is_active=True):
-        if not pin.applies_on(target_date):
-            continue
-        pt = datetime.combine(target_date, pin.start_time, tzinfo=BERLIN)
-        # Geplante Pins werden ZUSÄTZLICH zur Auto-Queue angezeigt (sie liegen wie
-        # eine Ebene darüber). Nur bereits vergangene Pins des heutigen Tages
-        # ausblenden – NICHT anhand der projizierten Queue-Länge (sonst verschwinden
-        # z.B. „exakt"-Pins, die ja ohnehin unterbrechen).
-        if pt <= now_b:
-            continue
-        # Bereits materialisiert? Realer Eintrag derselben Rubrik (bzw. desselben
-        # Inhalts bei festen Pins) im ±12-Minuten-Fenster -> Pin nicht doppelt zeigen.
-        rkey = pin.rubrik_key or 'music'
-        materialized = False
-        for (mt, mkind, mtrack, mspoken) in real_marks:
-            if abs((mt - pt).total_seconds()) > 720:
-                continue
-            if pin.mode == 'pinned_track' and pin.track_id and mtrack == pin.track_id:
-                materialized = True; break
-            if pin.mode == 'pinned_spoken' and pin.spoken_id and mspoken == pin.spoken_id:
-                materialized = True; break
-            if pin.mode not in ('pinned_track', 'pinned_spoken') and mkind == rkey:
-                materialized = True; break
-        if materialized:
-            continue
-        title, kind = pin.name, (pin.rubrik_key or 'music')
-        if pin.mode == 'pinned_track' and pin.track:
-            title, kind = title or pin.track.title, 'music'
-        elif pin.mode == 'pinned_spoken' and pin.spoken:
-            title, kind = title or pin.spoken.title, pin.spoken.kind
-        else:
-            title = title or ('Rubrik: ' + (pin.rubrik_key or '?'))
-        pau = ''
-        try:
-            if pin.mode == 'pinned_track' and pin.track and pin.track.audio_file:
-                pau = pin.track.audio_file.url
-            elif pin.mode == 'pinned_spoken' and pin.spoken and pin.spoken.audio_file:
-                pau = pin.spoken.audio_file.url
-        except Exception:
-            pau = ''
-        rows.append({'time': pt.isoformat(), 'time_str': pt.strftime('%H:%M'),
-                     'kind': kind, 'title': title, 'source': 'theoretical', 'is_pin': True,
-                     'mode': pin.mode, 'pk': pin.pk, 'enforce': pin.enforce,
-                     'gen_status': pin.gen_status,
-                     'resolved': _pin_resolvable(pin, target_date, smap), 'tags': '',
-                     'audio_url': pau})
-
-    wd = target_date.weekday()
-    for slot in ProgramSlot.objects.filter(is_active=True):
-        if wd not in slot.active_weekdays():
-            continue
-        st = datetime.combine(target_date, slot.start_time, tzinfo=UTC).astimezone(BERLIN)
-        if st <= cutoff:
-            continue
-        rows.append({'time': st.isoformat(), 'time_str': st.strftime('%H:%M'),
-                     'kind': 'auto', 'title': 'Auto-Block: ' + (slot.kinds or 'music'),
-                     'source': 'theoretical', 'is_slot': True, 'pk': slot.pk,
-                     'resolved': True, 'enforce': '', 'tags': ''})
-
-    rows.sort(key=lambda r: r['time'])
-    return rows
+    from . import projection
+    return projection.get_day(target_date, now)
 
 
 def _spoken_kind(s):
@@ -400,8 +312,11 @@ def ensure_queue_filled(min_hours=10, max_days=3):
     wird nie erneut geplant -> keine Doppel-Einträge). Gibt die Anzahl neu
     erzeugter Einträge zurück.
     """
+    from .programming import LibraryPool, RotationEngine
     now = timezone.now()
     total_made = 0
+    # Eine Engine für alle Folgetage: Rotation läuft über Tagesgrenzen weiter
+    engine = None
     for _ in range(max_days + 2):
         qs = list(PlaylistEntry.objects.filter(status='queued')
                   .select_related('track', 'spoken'))
@@ -417,19 +332,22 @@ def ensure_queue_filled(min_hours=10, max_days=3):
             target = through.astimezone(BERLIN).date() + timedelta(days=1)
         if (target - today).days > max_days:
             break
-        made = materialize_day(target, replace=False, generate=False)
+        if engine is None:
+            engine = RotationEngine(LibraryPool.load())
+        made = materialize_day(target, replace=False, generate=False, engine=engine)
         total_made += made
         if made == 0:
             break  # nichts (mehr) planbar -> keine Endlosschleife
     return total_made
 
 
-def materialize_day(target_date=None, replace=False, generate=False):
+def materialize_day(target_date=None, replace=False, generate=False, engine=None):
     """
     Übersetzt den Tagesplan (Pins + Slots) in konkrete PlaylistEntry-Zeilen.
     Pins landen nahe ihrer Berlin-Uhrzeit; dazwischen füllt der Slot-Plan
     bzw. – falls keine Slots – ein Musik-Teppich aus eligiblen Tracks.
     generate=False (z.B. aus next_track): erzeugt NICHTS inline (schnell).
+    engine: gemeinsame programming.RotationEngine (mehrtägige Planung).
     Gibt die Anzahl erzeugter Zeilen zurück.
     """
     from .models import ScheduledItem, ProgramSlot
@@ -473,41 +391,30 @@ def materialize_day(target_date=None, replace=False, generate=False):
             pins.append([pt, res])
     pins.sort(key=lambda x: x[0])
 
+    from .programming import LibraryPool, RotationEngine, fetch_objects
+    if engine is None:
+        engine = RotationEngine(LibraryPool.load())
+    start = start_floor
+    horizon = (pins[-1][0] + timedelta(minutes=30)) if pins else (start + timedelta(hours=2))
+
     wd = target_date.weekday()
     filler = []
     for slot in ProgramSlot.objects.filter(is_active=True).order_by('start_time', 'order'):
         if wd in slot.active_weekdays():
             try:
-                filler.extend(tasks._build_slot_order(slot))
+                filler.extend(tasks._build_slot_order(slot, engine=engine, on_date=target_date,
+                                                      start=start))
             except Exception:
                 pass
     if not filler:
-        # Instrumental- und Gesangs-Pool getrennt sammeln und nach dem
-        # eingestellten Gesangs-Anteil (StationConfig.song_share) verzahnen
-        instr, vocal = [], []
-        for t in (Track.objects.filter(is_active=True).exclude(audio_file='')
-                  .exclude(source='elevenlabs').exclude(mood='jingle')
-                  .exclude(category='ad')
-                  .order_by('play_count', 'created_at')):
-            if not _auto_eligible(t, target_date, smap):
-                continue
-            item = {'type': 'track', 'pk': t.pk, 'kind': 'music',
-                    'title': t.title, 'dur': t.duration_sec or 120}
-            is_song = (getattr(t, 'category', '') == 'song') or bool(getattr(t, 'lyrics', ''))
-            (vocal if is_song else instr).append(item)
-        share = max(0, min(100, getattr(StationConfig.get(), 'song_share', 35) or 0)) / 100.0
-        acc, ii, vi = 0.0, 0, 0
-        for _ in range(len(instr) + len(vocal)):
-            acc += share
-            if (acc >= 1.0 and vocal) or not instr:
-                if not vocal:
-                    break
-                filler.append(vocal[vi % len(vocal)]); vi += 1; acc -= 1.0
-            else:
-                filler.append(instr[ii % len(instr)]); ii += 1
-
-    start = start_floor
-    horizon = (pins[-1][0] + timedelta(minutes=30)) if pins else (start + timedelta(hours=2))
+        # Musik-Teppich: Instrumental/Gesang nach StationConfig.song_share verzahnt,
+        # ohne Effekte, Jingles und Spots
+        filler = engine.plan((horizon - start).total_seconds(), on_date=target_date,
+                             kinds=('music', 'song'), start=start,
+                             rules={'music_per_talk': 0, 'jingle_every': 0, 'ad_every_min': 0},
+                             predicate=lambda it: it.get('mood') != 'jingle'
+                             and it.get('source') != 'elevenlabs')
+    objs = fetch_objects(filler)
 
     # Werbe-Rotation: Pool (gesprochene + gesungene Spots), Abstand aus den Einstellungen
     cfg = StationConfig.get()
@@ -533,8 +440,8 @@ def materialize_day(target_date=None, replace=False, generate=False):
             continue
         if filler:
             it = filler[fi % len(filler)]; fi += 1
-            tr = Track.objects.filter(pk=it['pk']).first() if it['type'] == 'track' else None
-            sp = SpokenContent.objects.filter(pk=it['pk']).first() if it['type'] == 'spoken' else None
+            tr = objs.get(('track', it['pk'])) if it['type'] == 'track' else None
+            sp = objs.get(('spoken', it['pk'])) if it['type'] == 'spoken' else None
             if tr or sp:
                 seq.append((it.get('kind', 'music'), tr, sp, it.get('dur', 120)))
             t += timedelta(seconds=(it.get('dur') or 120))
@@ -554,6 +461,7 @@ def materialize_day(target_date=None, replace=False, generate=False):
                                   scheduled_time=tt, status='queued', manual=True))
         pos += 1; tt += timedelta(seconds=dur or 60)
     PlaylistEntry.objects.bulk_create(rows)
+    PlaylistVersion.bump()
     return len(rows)
 
 
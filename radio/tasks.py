@@ -85,32 +85,35 @@ def _synthesize(text, voice, kind=None, gemini_model=None, eleven_model=None):
 
 def _prepend_news_intro(news_bytes):
     """Stellt das feste News-Intro (media/radio/news_intro.mp3) vor die Bytes.
-    Robust per ffmpeg-Resample+Concat; gibt Original zurück, wenn kein Intro da ist."""
+    Intro liegt vorbereitet (normalisiert, 44,1 kHz) im Render-Cache; gleiche
+    Eingaben werden nicht erneut gerendert. Gibt Original zurück, wenn kein Intro da ist."""
     import os
-    import subprocess
     import tempfile
     from django.conf import settings as _dj
+    from . import render_cache
     from .models import StationConfig
     if not StationConfig.get().news_intro_enabled:
         return news_bytes
     intro = os.path.join(_dj.MEDIA_ROOT, 'radio', 'news_intro.mp3')
     if not news_bytes or not os.path.exists(intro):
         return news_bytes
-    try:
+
+    def _render(out):
+        intro_wav = render_cache.prepared(intro, kind='intro')
         with tempfile.TemporaryDirectory() as td:
             npath = os.path.join(td, 'news.mp3')
-            out = os.path.join(td, 'out.mp3')
             with open(npath, 'wb') as fh:
                 fh.write(news_bytes)
-            cmd = ['ffmpeg', '-y', '-i', intro, '-i', npath, '-filter_complex',
-                   '[0:a]aformat=sample_rates=44100:channel_layouts=stereo[a0];'
-                   '[1:a]aformat=sample_rates=44100:channel_layouts=stereo[a1];'
-                   '[a0][a1]concat=n=2:v=0:a=1[a]',
-                   '-map', '[a]', '-c:a', 'libmp3lame', '-b:a', '192k', out]
-            subprocess.run(cmd, check=True, capture_output=True, timeout=120)
-            if os.path.exists(out) and os.path.getsize(out) > 0:
-                with open(out, 'rb') as fh:
-                    return fh.read()
+            render_cache.run_ffmpeg(
+                ['-i', intro_wav, '-i', npath, '-filter_complex',
+                 '[1:a]aformat=sample_rates=44100:channel_layouts=stereo[a1];'
+                 '[0:a][a1]concat=n=2:v=0:a=1[a]',
+                 '-map', '[a]', '-c:a', 'libmp3lame', '-b:a', '192k', out], timeout=120)
+
+    try:
+        return render_cache.cached_render(
+            'news_intro', [render_cache.file_hash(intro), render_cache.bytes_hash(news_bytes)],
+            {'b': '192k'}, _render)
     except Exception as e:
         logger.warning('News-Intro voranstellen fehlgeschlagen: %s', e)
     return news_bytes
@@ -241,53 +244,49 @@ MUSIC_BEDS = {'garten-meditation': (114, 0.14)}
 
 def _mix_music_bed(mp3_bytes, track_pk, gain=0.14, pre=2.5, tail=6.0):
     """Legt ein leises, weichgefiltertes Musikbett unter eine Sprachaufnahme.
-    Musik startet pre Sekunden vor der Stimme und klingt tail Sekunden aus."""
-    import subprocess, tempfile, os as _os
+    Musik startet pre Sekunden vor der Stimme und klingt tail Sekunden aus.
+    Das Bett kommt vorbereitet (normalisiert + Tiefpass) aus dem Render-Cache,
+    fertige Mischungen werden nach Inhalt + Parametern wiederverwendet."""
+    import tempfile, os as _os
+    from . import render_cache
     from .models import Track
     t = Track.objects.filter(pk=track_pk).exclude(audio_file='').first()
     if not t:
         return mp3_bytes
-    vp = out = None
+
+    def _render(out):
+        bed = render_cache.prepared(t.audio_file.path, kind='bed')
+        with tempfile.TemporaryDirectory() as td:
+            vp = _os.path.join(td, 'voice.mp3')
+            with open(vp, 'wb') as f:
+                f.write(mp3_bytes)
+            dur = _probe_duration(vp, use_cache=False)
+            if not dur:
+                raise RuntimeError('Dauer der Sprachaufnahme unbekannt')
+            total = dur + pre + tail
+            fade_st = max(0.0, total - 5)
+            flt = (f'[0:a]adelay={int(pre*1000)}|{int(pre*1000)}[v];'
+                   f'[1:a]atrim=0:{total},volume={gain},'
+                   f'afade=t=in:d=3,afade=t=out:st={fade_st}:d=5[m];'
+                   f'[v][m]amix=inputs=2:duration=longest:normalize=0[mix]')
+            render_cache.run_ffmpeg(['-i', vp, '-stream_loop', '-1', '-i', bed,
+                                  '-filter_complex', flt, '-map', '[mix]',
+                                  '-c:a', 'libmp3lame', '-b:a', '160k', out])
+
     try:
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as f:
-            f.write(mp3_bytes); vp = f.name
-        out = vp + '.mix.mp3'
-        dur = _probe_duration(vp)
-        if not dur:
-            return mp3_bytes
-        total = dur + pre + tail
-        fade_st = max(0.0, total - 5)
-        flt = (f'[0:a]adelay={int(pre*1000)}|{int(pre*1000)}[v];'
-               f'[1:a]atrim=0:{total},volume={gain},lowpass=f=4500,'
-               f'afade=t=in:d=3,afade=t=out:st={fade_st}:d=5[m];'
-               f'[v][m]amix=inputs=2:duration=longest:normalize=0[mix]')
-        subprocess.run(['ffmpeg', '-y', '-v', 'error', '-i', vp,
-                        '-stream_loop', '-1', '-i', t.audio_file.path,
-                        '-filter_complex', flt, '-map', '[mix]',
-                        '-c:a', 'libmp3lame', '-b:a', '160k', out],
-                       check=True, timeout=180)
-        return open(out, 'rb').read()
+        return render_cache.cached_render(
+            'music_bed', [render_cache.bytes_hash(mp3_bytes), render_cache.file_hash(t.audio_file.path)],
+            {'gain': gain, 'pre': pre, 'tail': tail, 'b': '160k'}, _render)
     except Exception as e:
         logger.warning(f'Musikbett-Mischung fehlgeschlagen (Track {track_pk}): {e}')
         return mp3_bytes
-    finally:
-        for q in (vp, out):
-            if q and _os.path.exists(q):
-                _os.unlink(q)
 
 
-def _probe_duration(path):
-    """Audiolänge in Sekunden via ffprobe (0 bei Fehler)."""
-    import subprocess
-    try:
-        out = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'csv=p=0', path],
-            capture_output=True, text=True, timeout=30,
-        ).stdout.strip()
-        return int(float(out)) if out else 0
-    except Exception:
-        return 0
+def _probe_duration(path, use_cache=True):
+    """Audiolänge in Sekunden via ffprobe (0 bei Fehler) – gecacht über core.media_probe.
+    Temporäre Dateien mit use_cache=False prüfen."""
+    from core.media_probe import probe_duration
+    return probe_duration(path, use_cache=use_cache)
 
 
 @shared_task
@@ -407,19 +406,20 @@ def cleanup_old_media(track_keep=150, spoken_days=7, played_hours=24):
         e.delete()
         removed['entries'] += 1
 
+    try:
+        from . import render_cache
+        removed['render_cache'] = render_cache.prune()
+    except Exception:
+        logger.exception('Render-Cache-Aufräumen fehlgeschlagen')
+
     logger.info(f'cleanup_old_media (Bibliothek bleibt): {removed}')
     return removed
 
 
 def _track_kind(t):
     """Rubrik eines Tracks: manuelle Kategorie hat Vorrang, sonst aus Quelle abgeleitet."""
-    if getattr(t, 'category', '') in ('music', 'song', 'effekt', 'ad'):
-        return t.category
-    if t.source == 'elevenlabs':
-        return 'effekt'
-    if t.lyrics or t.source in ('acestep',):
-        return 'song'
-    return 'music'
+    from .programming import track_kind
+    return track_kind(getattr(t, 'category', ''), t.source, bool(t.lyrics))
 
 
 def _library_candidates(limit=120):
@@ -427,111 +427,21 @@ def _library_candidates(limit=120):
 
     Ausgeschlossene (Track.is_active=False / SpokenContent.auto_include=False) und
     saisonal gesperrte Inhalte (siehe scheduler._seasonal_ok) werden NICHT geliefert.
+    Jeder Inhalt kommt einmal vor; der Saison-Boost steht in 'weight'.
     """
-    from .models import Track, SpokenContent
-    from . import scheduler
+    from .programming import LibraryPool
     from django.utils import timezone
-    today = timezone.localdate()
-    smap = scheduler._season_map()
-    cands = []
-    for t in (Track.objects.filter(is_active=True).exclude(audio_file='')
-              .order_by('play_count', '-created_at')[:limit]):
-        if not scheduler._seasonal_ok(t.tags, today, smap):
-            continue
-        item = {'type': 'track', 'pk': t.pk, 'kind': _track_kind(t),
-                'title': t.title, 'dur': t.duration_sec or 120,
-                'desc': (t.description or t.mood or '')[:80]}
-        # Saison-Boost: aktive Saison-Inhalte mehrfach in den Pool legen
-        cands.extend([item] * scheduler._season_boost(t.tags, today, smap))
-    # Werbe-/Spot-Tracks (z.B. gesungene Spots) IMMER aufnehmen – sie dürfen nicht
-    # durch das Pool-Limit der (vielen) Musiktitel verdrängt werden
-    have = {(c['type'], c['pk']) for c in cands}
-    for t in Track.objects.filter(is_active=True, category='ad').exclude(audio_file=''):
-        if ('track', t.pk) not in have and scheduler._seasonal_ok(t.tags, today, smap):
-            cands.append({'type': 'track', 'pk': t.pk, 'kind': 'ad',
-                          'title': t.title, 'dur': t.duration_sec or 60,
-                          'desc': (t.description or t.mood or '')[:80]})
-    from django.db.models import F as _F
-    for s in (SpokenContent.objects.filter(status='generated', auto_include=True).exclude(audio_file='').exclude(kind='news')
-              .order_by(_F('last_played_at').asc(nulls_first=True), '-created_at')[:limit]):
-        if not scheduler._seasonal_ok(s.tags, today, smap):
-            continue
-        item = {'type': 'spoken', 'pk': s.pk, 'kind': s.kind,
-                'title': s.title, 'dur': s.duration_sec or 60,
-                'desc': (s.description or s.text[:80])}
-        cands.extend([item] * scheduler._season_boost(s.tags, today, smap))
-    return cands
+    return LibraryPool.load(limit=limit).candidates(timezone.localdate())
 
 
-def _fallback_mix(cands, target_sec):
+def _fallback_mix(cands, target_sec, engine=None):
     """Standard-Mix nach den globalen Misch-Regeln (StationConfig):
     alle N Musiktitel ein Wortbeitrag, Jingle alle K Titel, Werbung alle M Minuten.
-    Füllt zyklisch bis zur Zielzeit (faire Rotation, keine direkte Wiederholung)."""
-    import random
-    from .models import StationConfig, Rubrik
-    cfg = StationConfig.get()
-    mpt = cfg.std_music_per_talk or 0      # 0 = nie automatisch Wortbeitrag
-    jev = cfg.std_jingle_every or 0        # 0 = keine Jingles
-    ade = cfg.std_ad_every_min or 0        # 0 = keine Werbung
-
-    # Pro-Rubrik konfigurierte Kategorie (Einstellungen → Rubriken); leer = automatisch
-    catmap = {r.key: r.category for r in Rubrik.objects.all() if r.category}
-
-    def _bucket(c):
-        # explizite Rubrik-Kategorie hat Vorrang
-        cat = catmap.get(c['kind'])
-        if cat:
-            return cat
-        # Fallback: Heuristik nach Art-Name
-        if c['kind'] in ('music', 'song'):
-            return 'music'
-        if c['kind'] in ('jingle', 'effekt'):
-            return 'jingle'
-        if c['kind'] == 'ad':
-            return 'ad'
-        return 'talk'
-
-    music_all = [c for c in cands if _bucket(c) == 'music']
-    talk = [c for c in cands if _bucket(c) == 'talk']
-    jings = [c for c in cands if _bucket(c) == 'jingle']
-    ads = [c for c in cands if _bucket(c) == 'ad']
-    # Instrumental vs. Gesang nach eingestelltem Anteil (StationConfig.song_share) mischen
-    instr = [c for c in music_all if c['kind'] != 'song']
-    vocal = [c for c in music_all if c['kind'] == 'song']
-    random.shuffle(instr); random.shuffle(vocal)
-    share = max(0, min(100, getattr(cfg, 'song_share', 35) or 0)) / 100.0
-    music = []
-    acc, ii, vi = 0.0, 0, 0
-    for _ in range(len(music_all)):
-        acc += share
-        if (acc >= 1.0 and vocal) or not instr:
-            if not vocal:
-                break
-            music.append(vocal[vi % len(vocal)]); vi += 1; acc -= 1.0
-        else:
-            music.append(instr[ii % len(instr)]); ii += 1
-    random.shuffle(talk); random.shuffle(jings); random.shuffle(ads)
-    if not music and not talk:
-        return []
-    order = []; total = 0; mi = ti = ji = ai = since = mcount = 0; last_ad = 0; guard = 0
-    while total < target_sec and guard < 5000:
-        guard += 1
-        if music:
-            c = music[mi % len(music)]; mi += 1
-            if order and (order[-1]['type'], order[-1]['pk']) == (c['type'], c['pk']) and len(music) > 1:
-                continue
-            order.append(c); total += c['dur'] or 60; mcount += 1; since += 1
-        elif talk:
-            c = talk[ti % len(talk)]; ti += 1; order.append(c); total += c['dur'] or 60
-        else:
-            break
-        if jev and jings and mcount > 0 and mcount % jev == 0:
-            order.append(jings[ji % len(jings)]); ji += 1; total += order[-1]['dur'] or 5
-        if mpt and since >= mpt and talk:
-            c = talk[ti % len(talk)]; ti += 1; since = 0; order.append(c); total += c['dur'] or 60
-        if ade and ads and (total - last_ad) >= ade * 60:
-            order.append(ads[ai % len(ads)]); ai += 1; last_ad = total; total += order[-1]['dur'] or 10
-    return order
+    Faire Rotation über programming.RotationEngine (keine direkte Wiederholung,
+    Mindestabstand je Titel, Saison-Gewicht)."""
+    from .programming import LibraryPool, RotationEngine
+    engine = engine or RotationEngine(LibraryPool(cands))
+    return engine.plan(target_sec)
 
 
 @shared_task
@@ -541,9 +451,8 @@ def auto_program(target_minutes=120):
     zusammen (Musik mit/ohne Gesang + Wortbeiträge + Jingles, sinnvoll gemischt)
     und hängt es HINTEN an den Sendeplan an. Läuft alle 2 Std. via Celery-Beat.
     """
-    from .models import Track, SpokenContent, PlaylistEntry
-    from . import glm, scheduler
-    import json as _json
+    from .models import PlaylistEntry
+    from . import programming, scheduler
 
     cands = _library_candidates()
     if not cands:
@@ -566,6 +475,7 @@ def auto_program(target_minutes=120):
                     order[i], order[j] = order[j], order[i]
                     break
 
+    objs = programming.fetch_objects(order)
     last = (PlaylistEntry.objects.order_by('-position').values_list('position', flat=True).first()) or 0
     pos = last
     created = 0
@@ -573,9 +483,9 @@ def auto_program(target_minutes=120):
         pos += 1
         entry = PlaylistEntry(status='queued', manual=False, position=pos, kind=c['kind'])
         if c['type'] == 'track':
-            entry.track = Track.objects.filter(pk=c['pk']).first()
+            entry.track = objs.get(('track', c['pk']))
         else:
-            entry.spoken = SpokenContent.objects.filter(pk=c['pk']).first()
+            entry.spoken = objs.get(('spoken', c['pk']))
         if entry.content:
             entry.save(); created += 1
     scheduler.renumber()
@@ -583,59 +493,39 @@ def auto_program(target_minutes=120):
     return f'auto_program: {created} Einträge angehängt'
 
 
-def _build_slot_order(slot):
-    """Baut die Beitragsreihenfolge für einen Slot nach dessen Mischregeln aus der Bibliothek."""
-    import random
+def _build_slot_order(slot, engine=None, on_date=None, start=None):
+    """Baut die Beitragsreihenfolge für einen Slot nach dessen Mischregeln aus der Bibliothek.
+    Mit gemeinsamer `engine` setzt sich die Rotation über Slots und Tage fort."""
+    from .programming import LibraryPool, RotationEngine
     kinds = [k.strip() for k in (slot.kinds or '').split(',') if k.strip()] or ['music']
-    cands = [c for c in _library_candidates() if c['kind'] in kinds]
-    music = [c for c in cands if c['kind'] in ('music', 'song')]
-    talk = [c for c in cands if c['kind'] in ('news', 'tip', 'wissen', 'story', 'dialog', 'kreativ', 'jingle', 'effekt')]
-    ads = [c for c in cands if c['kind'] == 'ad']
-    random.shuffle(music); random.shuffle(talk); random.shuffle(ads)
-    if not (music or talk or ads):
-        return []
-    target = (slot.duration_min or 60) * 60
-    order, total, mi, ti, ai, mcount, last_ad, guard = [], 0, 0, 0, 0, 0, 0, 0
-    while total < target and guard < 4000:
-        guard += 1
-        if ads and slot.ad_every_min and (total - last_ad) >= slot.ad_every_min * 60:
-            c = ads[ai % len(ads)]; ai += 1; last_ad = total
-        elif slot.music_per_talk and mcount >= slot.music_per_talk and talk:
-            c = talk[ti % len(talk)]; ti += 1; mcount = 0
-        elif music:
-            c = music[mi % len(music)]; mi += 1; mcount += 1
-        elif talk:
-            c = talk[ti % len(talk)]; ti += 1
-        elif ads:
-            c = ads[ai % len(ads)]; ai += 1
-        else:
-            break
-        if order and (order[-1]['type'], order[-1]['pk']) == (c['type'], c['pk']):
-            continue
-        order.append(c); total += (c.get('dur') or 60)
-    return order
+    engine = engine or RotationEngine(LibraryPool.load(limit=120))
+    return engine.plan((slot.duration_min or 60) * 60, on_date=on_date, mode='slot', kinds=kinds,
+                       rules={'music_per_talk': slot.music_per_talk or 0,
+                              'ad_every_min': slot.ad_every_min or 0},
+                       start=start)
 
 
 @shared_task
 def fill_slot(slot_id, append=True):
     """Füllt EINEN Slot aus der Bibliothek (nach seinen Mischregeln) und hängt ihn an den Sendeplan."""
-    from .models import ProgramSlot, Track, SpokenContent, PlaylistEntry
-    from . import scheduler
+    from .models import ProgramSlot, PlaylistEntry
+    from . import programming, scheduler
     slot = ProgramSlot.objects.filter(pk=slot_id).first()
     if not slot:
         return 'fill_slot: Slot nicht gefunden'
     order = _build_slot_order(slot)
     if not order:
         return f'fill_slot: keine passenden Inhalte für „{slot.name}"'
+    objs = programming.fetch_objects(order)
     pos = (PlaylistEntry.objects.order_by('-position').values_list('position', flat=True).first()) or 0
     created = 0
     for c in order:
         pos += 1
         e = PlaylistEntry(status='queued', manual=False, position=pos, kind=c['kind'])
         if c['type'] == 'track':
-            e.track = Track.objects.filter(pk=c['pk']).first()
+            e.track = objs.get(('track', c['pk']))
         else:
-            e.spoken = SpokenContent.objects.filter(pk=c['pk']).first()
+            e.spoken = objs.get(('spoken', c['pk']))
         if e.content:
             e.save(); created += 1
     scheduler.renumber()
@@ -897,11 +787,12 @@ def fetch_news(self, only_if_missing=False):
                 .exclude(pk=sc.pk).update(auto_include=False)
             # bereits eingeplante (noch nicht gespielte) Journal-Einträge auf die frische Ausgabe umbiegen
             try:
-                from .models import PlaylistEntry as _PE
+                from .models import PlaylistEntry as _PE, PlaylistVersion
                 swapped = _PE.objects.filter(
                     status='queued', spoken__kind='news',
                     spoken__title__startswith='Naturmacher-Journal').exclude(spoken=sc).update(spoken=sc)
                 if swapped:
+                    PlaylistVersion.bump()
                     logger.info(f'fetch_news: {swapped} eingeplante Journal-Slots auf neue Ausgabe getauscht')
             except Exception as _e:
                 logger.warning(f'fetch_news: Journal-Tausch fehlgeschlagen: {_e}')
@@ -1330,6 +1221,12 @@ def enforce_pins():
         scheduler.apply_mix_settings()
     except Exception:
         pass
+    # Timeline-Projektion (heute + 2 Tage) warm halten -> Dashboard liest nur noch
+    try:
+        from . import projection
+        projection.refresh_ahead(days=2)
+    except Exception:
+        logger.exception('enforce_pins: Timeline-Projektion nicht aktualisierbar')
     now = _dt.now(ZoneInfo('Europe/Berlin'))
     today = now.date()
     fired = 0
@@ -14,7 +14,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.http import require_POST
 
-from .models import StationConfig, Track, ProgramSlot, SpokenContent, PlaylistEntry, ScheduledItem
+from .models import StationConfig, Track, ProgramSlot, SpokenContent, PlaylistEntry, PlaylistVersion, ScheduledItem
 from . import scheduler, glm
 
 BERLIN = ZoneInfo('Europe/Berlin')
@@ -164,10 +164,22 @@ def _entry_meta(e):
 @_superuser_only
 def schedule_fragment(request):
     """Sendeplan-Liste als HTML-Fragment + Anzahl (für AJAX-Refresh ohne Reload)."""
-    days, queued, current, nxt = _projected_days()
-    html = render(request, 'radio/_schedlist.html', {'days': days}).content.decode('utf-8')
-    _n, _reach = _queue_reach()
-    return JsonResponse({'html': html, 'count': len(queued), 'reach': _reach})
+    from django.core.cache import cache
+    from . import projection
+    # Fragment nur neu rendern, wenn sich Queue, Anschlusspunkt (Minute) oder
+    # Pins geändert haben – sonst kostet der AJAX-Refresh drei kleine Abfragen.
+    fp, anchor, _cur = projection.queue_state()
+    pins_stamp = projection.ScheduleProjection.objects.aggregate(
+        n=models.Count('id'), ts=models.Min('computed_at'))
+    key = 'radio:schedfrag:%s:%d:%s:%s' % (fp, anchor.timestamp() // 60, pins_stamp['n'], pins_stamp['ts'])
+    data = cache.get(key)
+    if data is None:
+        days, queued, current, nxt = _projected_days()
+        html = render(request, 'radio/_schedlist.html', {'days': days}).content.decode('utf-8')
+        _n, _reach = _queue_reach()
+        data = {'html': html, 'count': len(queued), 'reach': _reach}
+        cache.set(key, data, 120)
+    return JsonResponse(data)
 
 
 def _upcoming_pins(days=8, limit=40):
@@ -209,20 +221,16 @@ def _upcoming_pins(days=8, limit=40):
     # Eintrag derselben Rubrik (bzw. desselben Inhalts) im ±12-Minuten-Fenster,
     # würde der Pin sonst doppelt erscheinen (z. B. 11:00 geplant + 11:05 real).
     try:
+        from .projection import PinIndex, entry_mark_kind
         _days, _queued, _cur, _nxt = _projected_days()
-        marks = [(e.proj, (e.spoken.kind if e.spoken_id and e.spoken else ('music' if e.track_id else e.kind)),
-                  e.track_id, e.spoken_id) for e in _queued]
+        index = PinIndex((e.proj, entry_mark_kind(e), e.track_id, e.spoken_id) for e in _queued)
         def _is_materialized(it):
-            for (mt, mkind, mtrack, mspoken) in marks:
-                if abs((mt - it['dt']).total_seconds()) > 720:
-                    continue
-                if it['_track'] and mtrack == it['_track']:
-                    return True
-                if it['_spoken'] and mspoken == it['_spoken']:
-                    return True
-                if not it['_track'] and not it['_spoken'] and mkind == (it['_rk'] or 'music'):
-                    return True
-            return False
+            if it['_track'] and index.near(('track', it['_track']), it['dt']):
+                return True
+            if it['_spoken'] and index.near(('spoken', it['_spoken']), it['dt']):
+                return True
+            return (not it['_track'] and not it['_spoken']
+                    and index.near(('kind', it['_rk'] or 'music'), it['dt']))
         out = [it for it in out if not _is_materialized(it)]
     except Exception:
         pass
@@ -387,6 +395,7 @@ def entry_move(request, pk):
             entry.position, neighbor.position = neighbor.position, entry.position
             PlaylistEntry.objects.filter(pk=entry.pk).update(position=entry.position)
             PlaylistEntry.objects.filter(pk=neighbor.pk).update(position=neighbor.position)
+            PlaylistVersion.bump()
     return redirect('radio:dashboard')
 
 
@@ -1876,13 +1885,8 @@ def library_upload(request):
 
 
 def _probe_dur(path):
-    import subprocess
-    try:
-        out = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                              '-of', 'csv=p=0', path], capture_output=True, text=True, timeout=30).stdout.strip()
-        return int(float(out)) if out else 0
-    except Exception:
-        return 0
+    from core.media_probe import probe_duration
+    return probe_duration(path)
 
 
 @_superuser_only
@@ -0,0 +1,394 @@
+"""
+Shopify API-Gateway
+===================
+Ein Gateway pro Store und Prozess für alle Admin-API-Aufrufe
+(ShopifyAPIClient, Backup, Restore, Vergleich, Verkaufsdaten-Import).
+
+Verbindungen:
+    Eine requests.Session pro Store – Keep-Alive und TLS-Session werden
+    wiederverwendet statt pro Aufruf neu aufgebaut.
+
+Drosselung (Leaky Bucket, wie Shopify selbst zählt):
+    REST      Kapazität 40 Aufrufe, Abfluss 2/s (Plus: 80 / 4/s)
+    GraphQL   Kapazität 1000 Kostenpunkte, Abfluss 50/s
+    Der Füllstand liegt in Redis (ein Hash pro Shop und API), damit sich alle
+    Celery-Worker und Web-Prozesse dasselbe Budget teilen. Jeder Aufruf
+    reserviert per Lua-Skript seinen Platz und bekommt die Wartezeit bis zum
+    freien Slot zurück. Die Antworten korrigieren den Zustand:
+        X-Shopify-Shop-Api-Call-Limit: 32/40            (REST)
+        extensions.cost.throttleStatus                  (GraphQL)
+    Kapazität und Abfluss übernehmen wir daraus, Plus-Shops werden also
+    automatisch schneller bedient. Ohne Redis zählt jeder Prozess für sich.
+
+Metriken:
+    Pro Shop und Endpoint (IDs durch ':id' ersetzt) Anzahl, Gesamtdauer,
+    Wartezeit und 429-Antworten in Redis – abrufbar über endpoint_metrics().
+
+Verwendung:
+    gateway = ShopifyGateway.for_store(store)
+    response = gateway.request('GET', f"{store.get_api_url()}/products.json", params={'limit': 250})
+"""
+
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'workloom:shopify_api'
+METRICS_TTL = 7 * 86400
+
+REST_BUCKET = (40, 2.0)          # (Kapazität, Abfluss pro Sekunde) – Standard-Shops
+GRAPHQL_BUCKET = (1000, 50.0)
+GRAPHQL_DEFAULT_COST = 50        # Reservierung, wenn der Aufrufer keine Kosten angibt
+
+MAX_RETRIES = 3
+RETRY_DELAY = 1.0                # Sekunden, verdoppelt sich pro Versuch
+MAX_RETRY_AFTER = 30             # höchstens so lange auf Retry-After warten
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def is_unsent(exc):
+    """
+    Hat der Request Shopify nachweislich nicht erreicht (Verbindungsaufbau
+    gescheitert)? Nur dann dürfen POST/PUT/DELETE wiederholt werden – ein
+    ReadTimeout oder RemoteDisconnected nach gesendetem Body würde sonst
+    Produkte/Artikel doppeln. ConnectionError allein reicht dafür nicht,
+    darunter fallen auch ProtocolError/RemoteDisconnected.
+    """
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.exceptions.ConnectionError):
+        return False
+    cause = exc.args[0] if exc.args else None
+    if isinstance(cause, MaxRetryError):
+        cause = cause.reason
+    return isinstance(cause, NewConnectionError)
+
+
+# Platz reservieren: Füllstand abfließen lassen, Kosten addieren, Wartezeit zurückgeben.
+# Reservierungen über der Kapazität sind wartende Aufrufer (Warteschlange).
+_RESERVE_LUA = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local state = redis.call('hmget', KEYS[1], 'level', 'ts', 'capacity', 'rate')
+local capacity = tonumber(state[3] or ARGV[3])
+local rate = tonumber(state[4] or ARGV[4])
+local level = tonumber(state[1] or '0')
+local ts = tonumber(state[2] or ARGV[1])
+level = math.max(0, level - (now - ts) * rate)
+local wait = 0
+if level + cost > capacity then
+    wait = (level + cost - capacity) / rate
+end
+redis.call('hset', KEYS[1], 'level', level + cost, 'ts', now, 'capacity', capacity, 'rate', rate)
+redis.call('expire', KEYS[1], 600)
+return tostring(wait)
+"""
+
+# Zustand aus der Antwort übernehmen; wartende Reservierungen bleiben erhalten
+_SYNC_LUA = """
+local now = tonumber(ARGV[1])
+local used = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local state = redis.call('hmget', KEYS[1], 'level', 'ts', 'capacity', 'rate')
+local queued = 0
+if state[1] then
+    local old_rate = tonumber(state[4] or ARGV[4])
+    local level = math.max(0, tonumber(state[1]) - (now - tonumber(state[2] or ARGV[1])) * old_rate)
+    queued = math.max(0, level - tonumber(state[3] or ARGV[3]))
+end
+redis.call('hset', KEYS[1], 'level', used + queued, 'ts', now, 'capacity', capacity, 'rate', rate)
+redis.call('expire', KEYS[1], 600)
+return 1
+"""
+
+_ID_RE = re.compile(r'/\d+(?=/|\.json|$)')
+_VERSION_RE = re.compile(r'^.*?/admin/api/[^/]+')
+
+
+_redis_client = None
+_redis_down_until = 0
+
+
+def _redis():
+    """Gemeinsamer Client des Prozesses; None für eine Minute nach einem Fehler"""
+    global _redis_client
+    if time.time() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        try:
+            import redis
+            _redis_client = redis.Redis.from_url(
+                getattr(settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0'),
+                socket_timeout=2, socket_connect_timeout=1,
+            )
+        except Exception as e:
+            _redis_failed(e)
+            return None
+    return _redis_client
+
+
+def _redis_failed(e):
+    global _redis_down_until
+    if time.time() >= _redis_down_until:
+        logger.warning(f"Shopify-Budget ohne Redis (prozesslokal): {e}")
+    _redis_down_until = time.time() + 60
+
+
+def endpoint_name(method, url):
+    """'GET products/:id.json' – Pfad ohne Host, API-Version und IDs"""
+    path = _VERSION_RE.sub('', url.split('?', 1)[0]).lstrip('/')
+    return f"{method.upper()} {_ID_RE.sub('/:id', '/' + path).lstrip('/')}"
+
+
+class _LocalBucket:
+    """Prozesslokaler Ersatz, wenn Redis nicht erreichbar ist (gleiche Rechnung wie die Lua-Skripte)"""
+
+    def __init__(self, capacity, rate):
+        self.capacity, self.rate = capacity, rate
+        self.level, self.ts = 0.0, time.time()
+        self.lock = threading.Lock()
+
+    def _leak(self, now):
+        self.level = max(0.0, self.level - (now - self.ts) * self.rate)
+        self.ts = now
+
+    def reserve(self, cost):
+        with self.lock:
+            self._leak(time.time())
+            wait = max(0.0, (self.level + cost - self.capacity) / self.rate)
+            self.level += cost
+            return wait
+
+    def sync(self, used, capacity, rate):
+        with self.lock:
+            self._leak(time.time())
+            queued = max(0.0, self.level - self.capacity)
+            self.level, self.capacity, self.rate = used + queued, capacity, rate
+
+
+class LeakyBucket:
+    """Gemeinsamer Füllstand eines Shops (pro API) in Redis, lokal als Fallback"""
+
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.default = (capacity, rate)
+        self.local = _LocalBucket(capacity, rate)
+
+    def reserve(self, cost=1):
+        """Platz reservieren, Wartezeit in Sekunden zurückgeben"""
+        r = _redis()
+        if r is not None:
+            try:
+                return float(r.eval(_RESERVE_LUA, 1, self.key, time.time(), cost, *self.default))
+            except Exception as e:
+                _redis_failed(e)
+        return self.local.reserve(cost)
+
+    def sync(self, used, capacity, rate):
+        r = _redis()
+        if r is not None:
+            try:
+                r.eval(_SYNC_LUA, 1, self.key, time.time(), used, capacity, rate)
+                return
+            except Exception as e:
+                _redis_failed(e)
+        self.local.sync(used, capacity, rate)
+
+
+class ShopifyGateway:
+    """HTTP-Zugang zur Admin-API eines Stores: Session, Budget, Retries, Metriken"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, store):
+        self.shop = store.shop_domain
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'X-Shopify-Access-Token': store.access_token,
+            'Content-Type': 'application/json',
+        })
+        self.rest_bucket = LeakyBucket(f'{KEY_PREFIX}:bucket:rest:{self.shop}', *REST_BUCKET)
+        self.graphql_bucket = LeakyBucket(f'{KEY_PREFIX}:bucket:graphql:{self.shop}', *GRAPHQL_BUCKET)
+
+    @classmethod
+    def for_store(cls, store):
+        """Gateway des Stores – pro Prozess einmal, neu bei geändertem Token"""
+        key = (store.pk, store.shop_domain, store.access_token)
+        with cls._instances_lock:
+            gateway = cls._instances.get(key)
+            if gateway is None:
+                gateway = cls._instances[key] = cls(store)
+            return gateway
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def request(self, method, url, graphql_cost=None, **kwargs):
+        """
+        Wie requests.request, aber gedrosselt und mit Retries bei 429,
+        GraphQL-THROTTLED und Verbindungsfehlern (schreibende Methoden nur, wenn
+        is_unsent()). graphql_cost schätzt die Kosten einer GraphQL-Abfrage
+        (Standard: GRAPHQL_DEFAULT_COST).
+        """
+        is_graphql = url.split('?', 1)[0].endswith('/graphql.json')
+        bucket = self.graphql_bucket if is_graphql else self.rest_bucket
+        cost = (graphql_cost or GRAPHQL_DEFAULT_COST) if is_graphql else 1
+        endpoint = 'POST graphql.json' if is_graphql else endpoint_name(method, url)
+        kwargs.setdefault('timeout', 30)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_delay = RETRY_DELAY
+
+        for attempt in range(MAX_RETRIES):
+            wait = bucket.reserve(cost)
+            if wait > 0:
+                time.sleep(wait)
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self._record(endpoint, time.monotonic() - started, wait, error=True)
+                if (idempotent or is_unsent(e)) and attempt < MAX_RETRIES - 1:
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                    continue
+                raise
+
+            throttled = response.status_code == 429
+            if is_graphql:
+                throttled = self._sync_graphql(response) or throttled
+            else:
+                self._sync_rest(response)
+            self._record(endpoint, time.monotonic() - started, wait, throttled=throttled)
+
+            if throttled and attempt < MAX_RETRIES - 1:
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    delay = min(float(retry_after), MAX_RETRY_AFTER) if retry_after else retry_delay
+                except ValueError:
+                    delay = retry_delay
+                time.sleep(delay)
+                retry_delay *= 2
+                continue
+            return response
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Budget aus den Antworten
+    # ------------------------------------------------------------------
+
+    def _sync_rest(self, response):
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit', '')
+        used, _, capacity = header.partition('/')
+        try:
+            used, capacity = int(used), int(capacity)
+        except ValueError:
+            return
+        # Plus-Shops haben doppelte Kapazität und doppelten Abfluss
+        rate = REST_BUCKET[1] * capacity / REST_BUCKET[0]
+        self.rest_bucket.sync(used, capacity, rate)
+
+    def _sync_graphql(self, response):
+        """Kostenstatus übernehmen; True wenn Shopify die Abfrage gedrosselt hat"""
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        if not isinstance(data, dict):
+            return False
+        status = ((data.get('extensions') or {}).get('cost') or {}).get('throttleStatus')
+        if status:
+            capacity = float(status.get('maximumAvailable') or GRAPHQL_BUCKET[0])
+            available = float(status.get('currentlyAvailable') or 0)
+            rate = float(status.get('restoreRate') or GRAPHQL_BUCKET[1])
+            self.graphql_bucket.sync(capacity - available, capacity, rate)
+        return any(
+            (error.get('extensions') or {}).get('code') == 'THROTTLED'
+            for error in data.get('errors') or [] if isinstance(error, dict)
+        )
+
+    # ------------------------------------------------------------------
+    # Metriken
+    # ------------------------------------------------------------------
+
+    def _record(self, endpoint, duration, wait, throttled=False, error=False):
+        if throttled:
+            logger.info(f"Shopify drosselt {self.shop}: {endpoint}")
+        r = _redis()
+        if r is None:
+            return
+        key = f'{KEY_PREFIX}:metrics:{self.shop}'
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.hincrby(key, f'{endpoint}|count', 1)
+            pipe.hincrbyfloat(key, f'{endpoint}|ms', round(duration * 1000, 1))
+            if wait > 0:
+                pipe.hincrbyfloat(key, f'{endpoint}|wait_ms', round(wait * 1000, 1))
+            if throttled:
+                pipe.hincrby(key, f'{endpoint}|throttled', 1)
+            if error:
+                pipe.hincrby(key, f'{endpoint}|errors', 1)
+            pipe.expire(key, METRICS_TTL)
+            pipe.execute()
+        except Exception as e:
+            # Metriken dürfen keinen API-Aufruf scheitern lassen
+            _redis_failed(e)
+
+
+def endpoint_metrics(store):
+    """
+    {endpoint: {'count', 'avg_ms', 'wait_ms', 'throttled', 'errors'}} eines Stores,
+    nach Gesamtdauer absteigend; {} ohne Redis.
+    """
+    r = _redis()
+    if r is None:
+        return {}
+    try:
+        raw = r.hgetall(f'{KEY_PREFIX}:metrics:{store.shop_domain}')
+    except Exception as e:
+        logger.warning(f"Shopify-Metriken nicht abrufbar: {e}")
+        return {}
+    stats = {}
+    for field, value in raw.items():
+        endpoint, _, name = field.decode().rpartition('|')
+        stats.setdefault(endpoint, {})[name] = float(value)
+    result = {}
+    for endpoint, values in stats.items():
+        count = int(values.get('count', 0))
+        result[endpoint] = {
+            'count': count,
+            'avg_ms': round(values.get('ms', 0) / count, 1) if count else 0,
+            'total_ms': round(values.get('ms', 0), 1),
+            'wait_ms': round(values.get('wait_ms', 0), 1),
+            'throttled': int(values.get('throttled', 0)),
+            'errors': int(values.get('errors', 0)),
+        }
+    return dict(sorted(result.items(), key=lambda item: -item[1]['total_ms']))
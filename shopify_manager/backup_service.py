@@ -15,7 +15,6 @@ Erstellt umfassende Backups von Shopify-Daten:
 
 import requests
 import json
-import time
 import io
 import os
 import re
@@ -27,6 +26,7 @@ from django.db import transaction
 from django.conf import settings
 
 from .models import ShopifyStore, ShopifyBackup, BackupItem
+from .api_gateway import ShopifyGateway
 
 
 def sanitize_title(title: str) -> str:
@@ -62,8 +62,7 @@ class ShopifyBackupService:
             'X-Shopify-Access-Token': store.access_token,
             'Content-Type': 'application/json'
         }
-        self.last_request_time = 0
-        self.min_request_interval = 0.5  # 2 Requests pro Sekunde
+        self.gateway = ShopifyGateway.for_store(store)
         # Bei Resume: Vorhandene Größe aus DB laden
         self.total_size = backup.total_size_bytes or 0
         # Limit pro Durchlauf (100 Elemente, dann Pause)
@@ -71,44 +70,9 @@ class ShopifyBackupService:
         self.items_saved_this_session = 0
         self.session_limit_reached = False
 
-    def _rate_limit(self):
-        """Wartet die minimale Zeit zwischen API-Requests ab"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-
-        self.last_request_time = time.time()
-
     def _make_request(self, method: str, url: str, **kwargs) -> requests.Response:
-        """Macht einen Rate-Limited API Request mit Retry-Logik"""
-        max_retries = 3
-        retry_delay = 1.0
-
-        for attempt in range(max_retries):
-            try:
-                self._rate_limit()
-                response = requests.request(method, url, headers=self.headers, **kwargs)
-
-                if response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-
-                return response
-
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    raise
-
-        return response
+        """API-Request über das gemeinsame Gateway (Drosselung, Retries, Keep-Alive)"""
+        return self.gateway.request(method, url, **kwargs)
 
     def _fetch_all_paginated(self, endpoint: str, key: str, params: dict = None) -> List[Dict]:
         """Holt alle Daten von einem paginierten Endpoint"""
@@ -8,12 +8,12 @@ Vergleicht ein Backup mit dem aktuellen Stand auf Shopify:
 """
 
 import requests
-import time
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from django.utils import timezone
 
 from .models import ShopifyStore, ShopifyBackup, BackupItem
+from .api_gateway import ShopifyGateway
 
 
 @dataclass
@@ -44,21 +44,11 @@ class ShopifyCompareService:
             'X-Shopify-Access-Token': store.access_token,
             'Content-Type': 'application/json'
         }
-        self.last_request_time = 0
-        self.min_request_interval = 0.5
-
-    def _rate_limit(self):
-        """Wartet die minimale Zeit zwischen API-Requests ab"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        self.last_request_time = time.time()
+        self.gateway = ShopifyGateway.for_store(store)
 
     def _make_request(self, method: str, url: str, **kwargs) -> requests.Response:
-        """Macht einen Rate-Limited API Request"""
-        self._rate_limit()
-        return requests.request(method, url, headers=self.headers, **kwargs)
+        """API-Request über das gemeinsame Gateway (Drosselung, Retries, Keep-Alive)"""
+        return self.gateway.request(method, url, **kwargs)
 
     def _fetch_all_paginated(self, endpoint: str, key: str) -> List[Dict]:
         """Holt alle Daten von einem paginierten Endpoint"""
@@ -0,0 +1,123 @@
+from datetime import timezone as dt_timezone
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Tagessummen für alle vorhandenen Verkaufsdaten aufbauen"""
+    SalesData = apps.get_model('shopify_manager', 'SalesData')
+    SalesDailyRollup = apps.get_model('shopify_manager', 'SalesDailyRollup')
+    ProductSalesDailyRollup = apps.get_model('shopify_manager', 'ProductSalesDailyRollup')
+
+    sales = SalesData.objects.annotate(day=TruncDate('order_date', tzinfo=dt_timezone.utc)).order_by()
+    daily = sales.values('store_id', 'day').annotate(
+        r_orders=Count('shopify_order_id', distinct=True),
+        r_line_items=Count('id'),
+        r_quantity=Sum('quantity'),
+        r_revenue=Sum('total_price'),
+        r_procurement_cost=Sum(F('cost_price') * F('quantity')),
+        r_cost_price_sum=Sum('cost_price'),
+        r_shipping_cost=Sum('shipping_cost'),
+        r_shop_shipping_cost=Sum('shop_shipping_cost'),
+        r_actual_shipping_cost=Sum('actual_shipping_cost'),
+        r_shopify_fees=Sum('shopify_fee'),
+        r_paypal_fees=Sum('paypal_fee'),
+        r_payment_gateway_fees=Sum('payment_gateway_fee'),
+        r_tax=Sum('tax_amount'),
+    )
+    SalesDailyRollup.objects.bulk_create([
+        SalesDailyRollup(
+            store_id=row['store_id'], date=row['day'],
+            **{key[2:]: value or 0 for key, value in row.items() if key.startswith('r_')}
+        )
+        for row in daily
+    ], batch_size=500)
+
+    per_product = sales.filter(product__isnull=False).values('store_id', 'product_id', 'day').annotate(
+        r_orders=Count('shopify_order_id', distinct=True),
+        r_quantity=Sum('quantity'),
+        r_revenue=Sum('total_price'),
+    )
+    ProductSalesDailyRollup.objects.bulk_create([
+        ProductSalesDailyRollup(
+            store_id=row['store_id'], product_id=row['product_id'], date=row['day'],
+            orders=row['r_orders'], quantity=row['r_quantity'] or 0, revenue=row['r_revenue'] or 0,
+        )
+        for row in per_product
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopify_manager', '0010_image_storage_to_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Bestelltag (UTC)')),
+                ('orders', models.PositiveIntegerField(default=0, help_text='Anzahl unterschiedlicher Bestellungen')),
+                ('line_items', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('procurement_cost', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('cost_price_sum', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('shipping_cost', models.DecimalField(decimal_places=2, default=0.0, help_text='Legacy-Feld shipping_cost', max_digits=15)),
+                ('shop_shipping_cost', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('actual_shipping_cost', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('shopify_fees', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('paypal_fees', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('payment_gateway_fees', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('tax', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='shopify_manager.shopifystore')),
+            ],
+            options={
+                'verbose_name': 'Tagesumsatz (Rollup)',
+                'verbose_name_plural': 'Tagesumsätze (Rollup)',
+                'ordering': ['-date'],
+                'unique_together': {('store', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Bestelltag (UTC)')),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='shopify_manager.shopifyproduct')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales_rollups', to='shopify_manager.shopifystore')),
+            ],
+            options={
+                'verbose_name': 'Produkt-Tagesumsatz (Rollup)',
+                'verbose_name_plural': 'Produkt-Tagesumsätze (Rollup)',
+                'unique_together': {('store', 'product', 'date')},
+                'indexes': [models.Index(fields=['store', 'date'], name='shopify_prod_rollup_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopifyVariantCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant_id', models.CharField(help_text='Shopify Variant ID', max_length=50)),
+                ('inventory_item_id', models.CharField(blank=True, help_text='Shopify Inventory Item ID', max_length=50)),
+                ('cost', models.DecimalField(blank=True, decimal_places=2, help_text='Einkaufspreis (leer = in Shopify nicht gepflegt)', max_digits=10, null=True)),
+                ('fetched_at', models.DateTimeField(help_text='Zeitpunkt der letzten Abfrage bei Shopify')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variant_costs', to='shopify_manager.shopifystore')),
+            ],
+            options={
+                'verbose_name': 'Varianten-Einkaufspreis',
+                'verbose_name_plural': 'Varianten-Einkaufspreise',
+                'unique_together': {('store', 'variant_id')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1678,6 +1678,90 @@ class SalesStatistics(models.Model):
         unique_together = ['store', 'date', 'period_type']
 
 
+class SalesDailyRollup(models.Model):
+    """
+    Tagessummen der Verkaufsdaten pro Store – Grundlage aller Dashboard-Kennzahlen.
+    Wird beim Import und von save_daily_statistics() aus SalesData neu berechnet
+    (SalesRollupService.refresh).
+    """
+    store = models.ForeignKey(ShopifyStore, on_delete=models.CASCADE, related_name='sales_rollups')
+    date = models.DateField(help_text="Bestelltag (UTC)")
+
+    # Mengen
+    orders = models.PositiveIntegerField(default=0, help_text="Anzahl unterschiedlicher Bestellungen")
+    line_items = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    # Beschaffung: Summe cost_price * quantity bzw. Summe cost_price (Kostenaufschlüsselung)
+    procurement_cost = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    cost_price_sum = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    # Versand
+    shipping_cost = models.DecimalField(max_digits=15, decimal_places=2, default=0.00, help_text="Legacy-Feld shipping_cost")
+    shop_shipping_cost = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    actual_shipping_cost = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    # Gebühren und Steuern
+    shopify_fees = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    paypal_fees = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    payment_gateway_fees = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    tax = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tagesumsatz (Rollup)"
+        verbose_name_plural = "Tagesumsätze (Rollup)"
+        ordering = ['-date']
+        unique_together = ['store', 'date']
+
+    def __str__(self):
+        return f"{self.store.name} - {self.date}"
+
+
+class ProductSalesDailyRollup(models.Model):
+    """Tagessummen pro Store und Produkt (Bestseller)"""
+    store = models.ForeignKey(ShopifyStore, on_delete=models.CASCADE, related_name='product_sales_rollups')
+    product = models.ForeignKey(ShopifyProduct, on_delete=models.CASCADE, related_name='sales_rollups')
+    date = models.DateField(help_text="Bestelltag (UTC)")
+
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    class Meta:
+        verbose_name = "Produkt-Tagesumsatz (Rollup)"
+        verbose_name_plural = "Produkt-Tagesumsätze (Rollup)"
+        unique_together = ['store', 'product', 'date']
+        indexes = [
+            models.Index(fields=['store', 'date'], name='shopify_prod_rollup_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.title} - {self.date}"
+
+
+class ShopifyVariantCost(models.Model):
+    """
+    Einkaufspreis (inventory_item.cost) pro Variante – ersetzt die zwei
+    API-Aufrufe pro Line Item beim Verkaufsdaten-Import.
+    """
+    store = models.ForeignKey(ShopifyStore, on_delete=models.CASCADE, related_name='variant_costs')
+    variant_id = models.CharField(max_length=50, help_text="Shopify Variant ID")
+    inventory_item_id = models.CharField(max_length=50, blank=True, help_text="Shopify Inventory Item ID")
+    cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Einkaufspreis (leer = in Shopify nicht gepflegt)")
+    fetched_at = models.DateTimeField(help_text="Zeitpunkt der letzten Abfrage bei Shopify")
+
+    class Meta:
+        verbose_name = "Varianten-Einkaufspreis"
+        verbose_name_plural = "Varianten-Einkaufspreise"
+        unique_together = ['store', 'variant_id']
+
+    def __str__(self):
+        return f"{self.variant_id}: {self.cost}"
+
+
 class ShopifyProductCollection(models.Model):
     """Many-to-Many-Beziehung zwischen Produkten und Kategorien"""
     product = models.ForeignKey(ShopifyProduct, on_delete=models.CASCADE, related_name='collections')
@@ -1,16 +1,243 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
 from django.utils import timezone
-from django.db import transaction
-from django.db.models import Sum, Count, Q, F
+from django.db import connection, transaction
+from django.db.models import Sum, Count, Q, F, Min, Max, DateField
+from django.db.models.functions import TruncDate, Trunc
+import logging
 import requests
 import json
 from .models import (
     ShopifyStore, SalesData, ShopifyProduct, 
-    SalesStatistics, RecurringCost, AdsCost, ShippingProfile
+    SalesStatistics, RecurringCost, AdsCost, ShippingProfile,
+    SalesDailyRollup, ProductSalesDailyRollup, ShopifyVariantCost
 )
 from .shopify_api import ShopifyAPIClient
 
+logger = logging.getLogger(__name__)
+
+
+def _as_day(value):
+    """datetime (naiv = UTC) oder date -> date (UTC-Tag, wie in den Rollups)"""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        return value.date()
+    return value
+
+
+class VariantCostCache:
+    """
+    Einkaufspreise pro Variante, persistent in ShopifyVariantCost.
+
+    Statt zwei Requests pro Line Item (variants/<id> + inventory_items/<id>)
+    werden fehlende bzw. veraltete Varianten einer Auftragsseite gesammelt:
+    inventory_item_id über products.json?ids=… (ändert sich nie, bleibt
+    gespeichert), Kosten über inventory_items.json?ids=… (100 pro Request).
+    """
+    TTL = timedelta(hours=24)
+    PRODUCT_BATCH = 250
+    INVENTORY_BATCH = 100
+
+    def __init__(self, store, api_client):
+        self.store = store
+        self.api_client = api_client
+        self._costs = {}
+
+    def get(self, variant_id, product_id=None):
+        variant_id = str(variant_id)
+        if variant_id not in self._costs:
+            self.prefetch([(variant_id, product_id)])
+        return self._costs.get(variant_id)
+
+    def prefetch(self, variants):
+        """variants: Iterable von (variant_id, product_id)"""
+        product_of = {str(v): str(p) if p else None for v, p in variants if v}
+        wanted = product_of.keys() - self._costs.keys()
+        if not wanted:
+            return
+
+        rows = {
+            row.variant_id: row
+            for row in ShopifyVariantCost.objects.filter(store=self.store, variant_id__in=wanted)
+        }
+        fresh_after = timezone.now() - self.TTL
+        stale = []
+        for variant_id in wanted:
+            row = rows.get(variant_id)
+            if row and row.fetched_at >= fresh_after:
+                self._costs[variant_id] = row.cost
+            else:
+                stale.append(variant_id)
+        if not stale:
+            return
+
+        try:
+            self._refresh(stale, rows, product_of)
+        except Exception as e:
+            logger.warning(f"Einkaufspreise für {len(stale)} Varianten nicht abrufbar: {e}")
+        for variant_id in stale:
+            # Bei Fehlern den alten Wert verwenden; ohne Eintrag beim nächsten Import erneut versuchen
+            self._costs.setdefault(variant_id, rows[variant_id].cost if variant_id in rows else None)
+
+    def _refresh(self, variant_ids, rows, product_of):
+        inventory_items = {
+            v: rows[v].inventory_item_id for v in variant_ids if v in rows and rows[v].inventory_item_id
+        }
+        missing = [v for v in variant_ids if v not in inventory_items]
+        if missing:
+            inventory_items.update(self._fetch_inventory_item_ids(missing, product_of))
+
+        costs = self._fetch_costs(set(inventory_items.values()))
+        now = timezone.now()
+        entries = []
+        for variant_id in variant_ids:
+            inventory_item_id = inventory_items.get(variant_id)
+            if not inventory_item_id:
+                continue
+            cost = costs.get(inventory_item_id)
+            self._costs[variant_id] = cost
+            entries.append(ShopifyVariantCost(
+                store=self.store, variant_id=variant_id,
+                inventory_item_id=inventory_item_id, cost=cost, fetched_at=now,
+            ))
+        # MySQL kennt kein ON CONFLICT (...) – dort greift ON DUPLICATE KEY auf (store, variant_id)
+        conflict_target = (
+            {'unique_fields': ['store', 'variant_id']}
+            if connection.features.supports_update_conflicts_with_target else {}
+        )
+        ShopifyVariantCost.objects.bulk_create(
+            entries, batch_size=500, update_conflicts=True,
+            update_fields=['inventory_item_id', 'cost', 'fetched_at'],
+            **conflict_target,
+        )
+
+    def _get(self, path, params):
+        response = self.api_client._make_request(
+            'GET', f"{self.store.get_api_url()}/{path}", params=params, timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_inventory_item_ids(self, variant_ids, product_of):
+        wanted = set(variant_ids)
+        result = {}
+        product_ids = sorted({product_of[v] for v in variant_ids if product_of.get(v)})
+        for i in range(0, len(product_ids), self.PRODUCT_BATCH):
+            batch = product_ids[i:i + self.PRODUCT_BATCH]
+            data = self._get('products.json', {
+                'ids': ','.join(batch), 'fields': 'id,variants', 'limit': self.PRODUCT_BATCH,
+            })
+            for product in data.get('products', []):
+                for variant in product.get('variants', []):
+                    variant_id = str(variant.get('id'))
+                    if variant_id in wanted and variant.get('inventory_item_id'):
+                        result[variant_id] = str(variant['inventory_item_id'])
+
+        # Varianten ohne bekanntes Produkt (oder gelöschte Produkte) einzeln nachschlagen
+        for variant_id in wanted - result.keys():
+            if product_of.get(variant_id):
+                continue
+            variant = self._get(f'variants/{variant_id}.json', {'fields': 'id,inventory_item_id'}).get('variant', {})
+            if variant.get('inventory_item_id'):
+                result[variant_id] = str(variant['inventory_item_id'])
+        return result
+
+    def _fetch_costs(self, inventory_item_ids):
+        costs = {}
+        ids = sorted(inventory_item_ids)
+        for i in range(0, len(ids), self.INVENTORY_BATCH):
+            batch = ids[i:i + self.INVENTORY_BATCH]
+            data = self._get('inventory_items.json', {'ids': ','.join(batch), 'limit': self.INVENTORY_BATCH})
+            for item in data.get('inventory_items', []):
+                cost = item.get('cost')
+                if cost and Decimal(str(cost)) > 0:
+                    costs[str(item.get('id'))] = Decimal(str(cost))
+        return costs
+
+
+class SalesRollupService:
+    """
+    Pflegt SalesDailyRollup/ProductSalesDailyRollup: die Tage eines
+    Zeitraums werden komplett aus SalesData neu berechnet (ein gruppiertes
+    Query pro Tabelle), damit Import, Kostenänderungen und Nachberechnung
+    dieselbe Logik nutzen.
+    """
+
+    # Rollup-Feld -> Aggregat über SalesData
+    AGGREGATES = {
+        'orders': Count('shopify_order_id', distinct=True),
+        'line_items': Count('id'),
+        'quantity': Sum('quantity'),
+        'revenue': Sum('total_price'),
+        'procurement_cost': Sum(F('cost_price') * F('quantity')),
+        'cost_price_sum': Sum('cost_price'),
+        'shipping_cost': Sum('shipping_cost'),
+        'shop_shipping_cost': Sum('shop_shipping_cost'),
+        'actual_shipping_cost': Sum('actual_shipping_cost'),
+        'shopify_fees': Sum('shopify_fee'),
+        'paypal_fees': Sum('paypal_fee'),
+        'payment_gateway_fees': Sum('payment_gateway_fee'),
+        'tax': Sum('tax_amount'),
+    }
+    PRODUCT_AGGREGATES = {
+        'orders': Count('shopify_order_id', distinct=True),
+        'quantity': Sum('quantity'),
+        'revenue': Sum('total_price'),
+    }
+
+    def __init__(self, store):
+        self.store = store
+
+    def refresh(self, start_date, end_date):
+        """Rollups für alle Tage von start_date bis end_date (inklusive) neu berechnen"""
+        start_date, end_date = _as_day(start_date), _as_day(end_date)
+        start = datetime.combine(start_date, datetime.min.time(), tzinfo=dt_timezone.utc)
+        end = datetime.combine(end_date + timedelta(days=1), datetime.min.time(), tzinfo=dt_timezone.utc)
+        sales = SalesData.objects.filter(
+            store=self.store, order_date__gte=start, order_date__lt=end
+        ).annotate(day=TruncDate('order_date', tzinfo=dt_timezone.utc)).order_by()
+
+        # Aggregat-Aliase dürfen nicht wie SalesData-Felder heißen
+        daily = sales.values('day').annotate(**{f'r_{k}': v for k, v in self.AGGREGATES.items()})
+        per_product = sales.filter(product__isnull=False).values('day', 'product_id').annotate(
+            **{f'r_{k}': v for k, v in self.PRODUCT_AGGREGATES.items()}
+        )
+
+        with transaction.atomic():
+            SalesDailyRollup.objects.filter(store=self.store, date__range=[start_date, end_date]).delete()
+            ProductSalesDailyRollup.objects.filter(store=self.store, date__range=[start_date, end_date]).delete()
+            SalesDailyRollup.objects.bulk_create([
+                SalesDailyRollup(store=self.store, date=row['day'],
+                                 **{k: row[f'r_{k}'] or 0 for k in self.AGGREGATES})
+                for row in daily
+            ], batch_size=500)
+            ProductSalesDailyRollup.objects.bulk_create([
+                ProductSalesDailyRollup(store=self.store, product_id=row['product_id'], date=row['day'],
+                                        **{k: row[f'r_{k}'] or 0 for k in self.PRODUCT_AGGREGATES})
+                for row in per_product
+            ], batch_size=500)
+
+    def refresh_for(self, sales_data):
+        """Rollups für den Zeitraum eines SalesData-Querysets neu berechnen (z.B. nach update())"""
+        bounds = sales_data.aggregate(first=Min('order_date'), last=Max('order_date'))
+        if bounds['first']:
+            self.refresh(bounds['first'], bounds['last'])
+
+    def rebuild(self):
+        """Alle Rollups des Stores neu aufbauen"""
+        self.refresh_for(SalesData.objects.filter(store=self.store))
+
+    def totals(self, start_date, end_date):
+        """Alle Summen eines Zeitraums in einem Query"""
+        totals = SalesDailyRollup.objects.filter(
+            store=self.store, date__range=[_as_day(start_date), _as_day(end_date)]
+        ).aggregate(**{f'r_{k}': Sum(k) for k in self.AGGREGATES})
+        return {
+            k: totals[f'r_{k}'] or (0 if k in ('orders', 'line_items', 'quantity') else Decimal('0.00'))
+            for k in self.AGGREGATES
+        }
+
 
 class SalesDataImportService:
     """Service zum Importieren von Verkaufsdaten aus Shopify"""
@@ -18,6 +245,8 @@ class SalesDataImportService:
     def __init__(self, store):
         self.store = store
         self.api_client = ShopifyAPIClient(store)
+        self.variant_costs = VariantCostCache(store, self.api_client)
+        self._imported_days = set()
     
     def import_orders(self, start_date=None, end_date=None, limit=250):
         """
@@ -35,56 +264,64 @@ class SalesDataImportService:
         imported_count = 0
         page_info = None
         
-        while True:
-            # Shopify Orders API mit Pagination
-            url = f"{self.store.get_api_url()}/orders.json"
-            params = {
-                'status': 'any',
-                'financial_status': 'paid',  # Nur bezahlte Bestellungen
-                'created_at_min': start_date_str,
-                'created_at_max': end_date_str,
-                'limit': min(limit, 250),  # Shopify max limit
-                'fields': 'id,created_at,total_price,currency,financial_status,gateway,line_items,tax_lines,shipping_lines,total_tax,shipping_address,billing_address'
-            }
-            
-            if page_info:
-                params['page_info'] = page_info
-            
-            headers = {
-                'X-Shopify-Access-Token': self.store.access_token,
-                'Content-Type': 'application/json'
-            }
-            
-            try:
-                response = requests.get(url, params=params, headers=headers)
-                response.raise_for_status()
-                
-                orders_data = response.json()
-                orders = orders_data.get('orders', [])
-                
-                if not orders:
-                    break
+        try:
+            while True:
+                # Shopify Orders API mit Pagination
+                url = f"{self.store.get_api_url()}/orders.json"
+                params = {
+                    'status': 'any',
+                    'financial_status': 'paid',  # Nur bezahlte Bestellungen
+                    'created_at_min': start_date_str,
+                    'created_at_max': end_date_str,
+                    'limit': min(limit, 250),  # Shopify max limit
+                    'fields': 'id,created_at,total_price,currency,financial_status,gateway,line_items,tax_lines,shipping_lines,total_tax,shipping_address,billing_address'
+                }
                 
-                for order in orders:
-                    imported_count += self._process_order(order)
+                if page_info:
+                    params['page_info'] = page_info
                 
-                # Prüfe auf weitere Seiten
-                link_header = response.headers.get('Link', '')
-                if 'rel="next"' in link_header:
-                    # Extrahiere page_info aus Link header
-                    import re
-                    match = re.search(r'page_info=([^&">]+)', link_header)
-                    if match:
-                        page_info = match.group(1)
-                    else:
+                try:
+                    response = self.api_client._make_request('GET', url, params=params)
+                    response.raise_for_status()
+                    
+                    orders_data = response.json()
+                    orders = orders_data.get('orders', [])
+                    
+                    if not orders:
                         break
-                else:
-                    break
                     
-            except requests.exceptions.RequestException as e:
-                return False, f"Fehler beim Importieren: {str(e)}"
-            except Exception as e:
-                return False, f"Unerwarteter Fehler: {str(e)}"
+                    # Einkaufspreise der ganzen Seite gesammelt abfragen
+                    self.variant_costs.prefetch(
+                        (item.get('variant_id'), item.get('product_id'))
+                        for order in orders for item in order.get('line_items', [])
+                        if not item.get('cost_per_item')
+                    )
+                    
+                    for order in orders:
+                        imported_count += self._process_order(order)
+                    
+                    # Prüfe auf weitere Seiten
+                    link_header = response.headers.get('Link', '')
+                    if 'rel="next"' in link_header:
+                        # Extrahiere page_info aus Link header
+                        import re
+                        match = re.search(r'page_info=([^&">]+)', link_header)
+                        if match:
+                            page_info = match.group(1)
+                        else:
+                            break
+                    else:
+                        break
+                        
+                except requests.exceptions.RequestException as e:
+                    return False, f"Fehler beim Importieren: {str(e)}"
+                except Exception as e:
+                    return False, f"Unerwarteter Fehler: {str(e)}"
+        finally:
+            # Tagessummen für alle Tage mit neuen Verkaufsdaten aktualisieren
+            if self._imported_days:
+                SalesRollupService(self.store).refresh(min(self._imported_days), max(self._imported_days))
+                self._imported_days.clear()
         
         return True, f"Erfolgreich {imported_count} Verkaufsdaten importiert"
     
@@ -161,13 +398,9 @@ class SalesDataImportService:
             if line_item.get('cost_per_item'):
                 cost_price = Decimal(str(line_item.get('cost_per_item', '0.00')))
             
-            # 2. Falls nicht verfügbar, versuche über Variant API
+            # 2. Falls nicht verfügbar, aus dem Varianten-Kostencache (inventory_item.cost)
             if not cost_price and variant_id:
-                cost_price = self._get_variant_cost(variant_id)
-            
-            # 3. Fallback: Versuche über Inventory Item API
-            if not cost_price and variant_id:
-                cost_price = self._get_inventory_cost(variant_id)
+                cost_price = self.variant_costs.get(variant_id, product_id)
             
             # Steuern für diesen Line Item berechnen
             line_item_tax = self._calculate_line_item_tax(line_item, final_tax_amount, item_total, total_price)
@@ -201,6 +434,7 @@ class SalesDataImportService:
             
             if created:
                 imported_count += 1
+                self._imported_days.add(_as_day(order_date))
         
         return imported_count
     
@@ -210,12 +444,7 @@ class SalesDataImportService:
         """
         try:
             url = f"{self.store.get_api_url()}/products/{product_id}.json"
-            headers = {
-                'X-Shopify-Access-Token': self.store.access_token,
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers)
+            response = self.api_client._make_request('GET', url)
             if response.status_code == 200:
                 product_data = response.json().get('product', {})
                 
@@ -351,71 +580,6 @@ class SalesDataImportService:
         
         return Decimal('0.00')
     
-    def _get_variant_cost(self, variant_id):
-        """
-        Holt die Einkaufskosten für eine Variante aus der Shopify API
-        """
-        try:
-            url = f"{self.store.get_api_url()}/variants/{variant_id}.json"
-            headers = {
-                'X-Shopify-Access-Token': self.store.access_token,
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                variant_data = response.json().get('variant', {})
-                inventory_item_id = variant_data.get('inventory_item_id')
-                
-                if inventory_item_id:
-                    # Hole Inventory Item für cost_per_item
-                    inventory_url = f"{self.store.get_api_url()}/inventory_items/{inventory_item_id}.json"
-                    inventory_response = requests.get(inventory_url, headers=headers)
-                    
-                    if inventory_response.status_code == 200:
-                        inventory_data = inventory_response.json().get('inventory_item', {})
-                        cost = inventory_data.get('cost')
-                        if cost:
-                            return Decimal(str(cost))
-                            
-        except Exception as e:
-            print(f"Fehler beim Abrufen der Variant-Kosten {variant_id}: {str(e)}")
-            
-        return None
-    
-    def _get_inventory_cost(self, variant_id):
-        """
-        Alternative Methode um Inventory Item Kosten zu holen
-        """
-        try:
-            # Erst die Variant-Daten holen um inventory_item_id zu bekommen
-            variant_url = f"{self.store.get_api_url()}/variants/{variant_id}.json"
-            headers = {
-                'X-Shopify-Access-Token': self.store.access_token,
-                'Content-Type': 'application/json'
-            }
-            
-            variant_response = requests.get(variant_url, headers=headers)
-            if variant_response.status_code == 200:
-                variant_data = variant_response.json().get('variant', {})
-                inventory_item_id = variant_data.get('inventory_item_id')
-                
-                if inventory_item_id:
-                    # Jetzt die Inventory Item Daten holen
-                    inventory_url = f"{self.store.get_api_url()}/inventory_items/{inventory_item_id}.json"
-                    inventory_response = requests.get(inventory_url, headers=headers)
-                    
-                    if inventory_response.status_code == 200:
-                        inventory_data = inventory_response.json().get('inventory_item', {})
-                        cost = inventory_data.get('cost')
-                        if cost and cost != '0.00':
-                            return Decimal(str(cost))
-                            
-        except Exception as e:
-            print(f"Fehler beim Abrufen der Inventory-Kosten {variant_id}: {str(e)}")
-            
-        return None
-    
     def _calculate_line_item_tax(self, line_item, total_tax, item_total, order_total):
         """
         Berechnet die Steuern für einen Line Item basierend auf dem Verhältnis zum Gesamtpreis
@@ -485,26 +649,21 @@ class SalesStatisticsService:
     
     def calculate_statistics(self, start_date, end_date, period_type='daily'):
         """
-        Berechnet Statistiken für einen bestimmten Zeitraum
+        Berechnet Statistiken für einen bestimmten Zeitraum (ganze Tage)
+        aus den Tagessummen – ein Query statt eines Aggregats pro Kennzahl
         """
-        # Hole Verkaufsdaten für den Zeitraum
-        sales_data = SalesData.objects.filter(
-            store=self.store,
-            order_date__range=[start_date, end_date]
-        )
+        totals = SalesRollupService(self.store).totals(start_date, end_date)
         
         # Grundstatistiken
-        total_orders = sales_data.values('shopify_order_id').distinct().count()
-        total_revenue = sales_data.aggregate(Sum('total_price'))['total_price__sum'] or Decimal('0.00')
-        total_cost = sales_data.aggregate(
-            total_cost=Sum(F('cost_price') * F('quantity'))
-        )['total_cost'] or Decimal('0.00')
+        total_orders = totals['orders']
+        total_revenue = totals['revenue']
+        total_cost = totals['procurement_cost']
         
         # Einzelne Kostenarten
-        total_shipping_costs = sales_data.aggregate(Sum('shipping_cost'))['shipping_cost__sum'] or Decimal('0.00')
-        total_shopify_fees = sales_data.aggregate(Sum('shopify_fee'))['shopify_fee__sum'] or Decimal('0.00')
-        total_paypal_fees = sales_data.aggregate(Sum('paypal_fee'))['paypal_fee__sum'] or Decimal('0.00')
-        total_tax = sales_data.aggregate(Sum('tax_amount'))['tax_amount__sum'] or Decimal('0.00')
+        total_shipping_costs = totals['shipping_cost']
+        total_shopify_fees = totals['shopify_fees']
+        total_paypal_fees = totals['paypal_fees']
+        total_tax = totals['tax']
         
         # Werbekosten für den Zeitraum
         ads_costs = AdsCost.objects.filter(
@@ -567,17 +726,17 @@ class SalesStatisticsService:
         """
         Ermittelt die Bestseller für einen Zeitraum
         """
-        bestsellers = SalesData.objects.filter(
+        bestsellers = ProductSalesDailyRollup.objects.filter(
             store=self.store,
-            order_date__range=[start_date, end_date],
-            product__isnull=False
+            date__range=[_as_day(start_date), _as_day(end_date)]
         ).values(
             'product__title',
             'product__shopify_id'
         ).annotate(
             total_quantity=Sum('quantity'),
-            total_revenue=Sum('total_price'),
-            total_orders=Count('shopify_order_id', distinct=True)
+            total_revenue=Sum('revenue'),
+            # Eine Bestellung liegt an genau einem Tag – Tageswerte sind summierbar
+            total_orders=Sum('orders')
         ).order_by('-total_quantity')[:limit]
         
         return list(bestsellers)
@@ -586,35 +745,24 @@ class SalesStatisticsService:
         """
         Erstellt Zeitreihen-Daten für Diagramme
         """
-        if period_type == 'daily':
-            date_format = '%Y-%m-%d'
-            date_trunc = 'day'
-        elif period_type == 'weekly':
-            date_format = '%Y-%W'
-            date_trunc = 'week'
-        elif period_type == 'monthly':
-            date_format = '%Y-%m'
-            date_trunc = 'month'
-        else:
-            date_format = '%Y-%m-%d'
-            date_trunc = 'day'
+        rollups = SalesDailyRollup.objects.filter(
+            store=self.store,
+            date__range=[_as_day(start_date), _as_day(end_date)]
+        )
         
-        from django.db.models import DateTimeField
-        from django.db.models.functions import Trunc
+        if period_type in ('weekly', 'monthly'):
+            date_trunc = 'week' if period_type == 'weekly' else 'month'
+            rollups = rollups.annotate(
+                period=Trunc('date', date_trunc, output_field=DateField())
+            ).values('period').annotate(
+                revenue=Sum('revenue'),
+                orders=Sum('orders'),
+                quantity=Sum('quantity')
+            )
+        else:
+            rollups = rollups.annotate(period=F('date')).values('period', 'revenue', 'orders', 'quantity')
         
-        # Gruppiere Verkaufsdaten nach Zeitraum
-        time_series = SalesData.objects.filter(
-            store=self.store,
-            order_date__range=[start_date, end_date]
-        ).annotate(
-            period=Trunc('order_date', date_trunc, output_field=DateTimeField())
-        ).values('period').annotate(
-            revenue=Sum('total_price'),
-            orders=Count('shopify_order_id', distinct=True),
-            quantity=Sum('quantity')
-        ).order_by('period')
-        
-        return list(time_series)
+        return list(rollups.order_by('period'))
     
     def save_daily_statistics(self, date=None):
         """
@@ -630,19 +778,18 @@ class SalesStatisticsService:
             start_date = timezone.make_aware(start_date)
             end_date = timezone.make_aware(end_date)
         
+        # Tagessummen aus den Verkaufsdaten nachziehen (auch ohne vorherigen Import)
+        SalesRollupService(self.store).refresh(date, date)
+        
         stats = self.calculate_statistics(start_date, end_date, 'daily')
         
-        # Erstelle oder aktualisiere Statistik-Eintrag
-        statistic, created = SalesStatistics.objects.get_or_create(
+        # Abgeleitete Werte (Marge, ROAS, …) sind Properties des Modells
+        fields = {f.name for f in SalesStatistics._meta.concrete_fields}
+        statistic, created = SalesStatistics.objects.update_or_create(
             store=self.store,
             date=date,
             period_type='daily',
-            defaults=stats
+            defaults={k: v for k, v in stats.items() if k in fields}
         )
         
-        if not created:
-            for key, value in stats.items():
-                setattr(statistic, key, value)
-            statistic.save()
-        
         return statistic
\ No newline at end of file
@@ -21,7 +21,7 @@ from .sales_forms import (
     DateRangeForm, ShippingProfileForm, RecurringCostForm, AdsCostForm,
     SalesDataImportForm, ProductCostForm, BulkProductCostForm, SalesFilterForm
 )
-from .sales_service import SalesDataImportService, SalesStatisticsService
+from .sales_service import SalesDataImportService, SalesStatisticsService, SalesRollupService
 
 
 @login_required
@@ -393,7 +393,9 @@ def update_product_cost_view(request):
         
         # Aktualisiere Einkaufspreis in allen Verkaufsdaten
         if cost_price:
-            SalesData.objects.filter(product=product).update(cost_price=Decimal(cost_price))
+            product_sales = SalesData.objects.filter(product=product)
+            product_sales.update(cost_price=Decimal(cost_price))
+            SalesRollupService(product.store).refresh_for(product_sales)
             
             return JsonResponse({
                 'success': True,
@@ -485,50 +487,30 @@ def cost_breakdown_view(request):
         start_datetime = timezone.make_aware(start_datetime)
         end_datetime = timezone.make_aware(end_datetime)
     
-    # Hole Verkaufsdaten
-    sales_data = SalesData.objects.filter(
-        store=store,
-        order_date__range=[start_datetime, end_datetime]
-    )
+    # Alle Summen des Zeitraums aus den Tagessummen (ein Query)
+    totals = SalesRollupService(store).totals(start_datetime, end_datetime)
     
     # Berechne Kosten-Statistiken
-    total_revenue = sales_data.aggregate(Sum('total_price'))['total_price__sum'] or 0
-    total_orders = sales_data.count()
+    total_revenue = totals['revenue']
+    total_orders = totals['line_items']
     
     # Beschaffungskosten aus Shopify
-    total_procurement_cost = sales_data.exclude(cost_price__isnull=True).aggregate(
-        total_cost=Sum('cost_price')
-    )['total_cost'] or Decimal('0.00')
+    total_procurement_cost = totals['cost_price_sum']
     
     # Versandkosten unterscheiden zwischen Shop und tatsächlichen Kosten
-    total_shop_shipping = sales_data.aggregate(
-        Sum('shop_shipping_cost')
-    )['shop_shipping_cost__sum'] or Decimal('0.00')
-    
-    total_actual_shipping = sales_data.exclude(actual_shipping_cost__isnull=True).aggregate(
-        Sum('actual_shipping_cost')
-    )['actual_shipping_cost__sum'] or Decimal('0.00')
+    total_shop_shipping = totals['shop_shipping_cost']
+    total_actual_shipping = totals['actual_shipping_cost']
     
     # Versandgewinn/-verlust
     shipping_profit = total_shop_shipping - total_actual_shipping
     
     # Gebühren aus Shopify-Daten
-    total_shopify_fees = sales_data.aggregate(
-        Sum('shopify_fee')
-    )['shopify_fee__sum'] or Decimal('0.00')
-    
-    total_paypal_fees = sales_data.aggregate(
-        Sum('paypal_fee')
-    )['paypal_fee__sum'] or Decimal('0.00')
-    
-    total_payment_gateway_fees = sales_data.aggregate(
-        Sum('payment_gateway_fee')
-    )['payment_gateway_fee__sum'] or Decimal('0.00')
+    total_shopify_fees = totals['shopify_fees']
+    total_paypal_fees = totals['paypal_fees']
+    total_payment_gateway_fees = totals['payment_gateway_fees']
     
     # Steuern aus Shopify tax_lines
-    total_tax = sales_data.aggregate(
-        Sum('tax_amount')
-    )['tax_amount__sum'] or Decimal('0.00')
+    total_tax = totals['tax']
     
     # Gesamtkosten und Gewinn
     # Verwende tatsächliche Versandkosten falls verfügbar, sonst Shop-Versandkosten
@@ -538,7 +520,7 @@ def cost_breakdown_view(request):
     net_profit = total_revenue - total_cost - total_tax
     
     # Unique orders count for accurate per-order calculations
-    unique_orders = sales_data.values('shopify_order_id').distinct().count()
+    unique_orders = totals['orders']
     
     # Durchschnittswerte
     avg_procurement_cost = total_procurement_cost / unique_orders if unique_orders > 0 else Decimal('0.00')
@@ -1,11 +1,11 @@
 import requests
 import json
-import time
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 from django.utils import timezone as django_timezone
 from django.db import models
 from .models import ShopifyStore, ShopifyProduct, ShopifyProductImage, ShopifySyncLog, ShopifyBlog, ShopifyBlogPost, ShopifyCollection
+from .api_gateway import ShopifyGateway
 
 
 class ShopifyAPIClient:
@@ -18,53 +18,11 @@ class ShopifyAPIClient:
             'X-Shopify-Access-Token': store.access_token,
             'Content-Type': 'application/json'
         }
-        self.last_request_time = 0
-        self.min_request_interval = 0.5  # 500ms zwischen Requests = 2 Requests pro Sekunde
-    
-    def _rate_limit(self):
-        """Wartet die minimale Zeit zwischen API-Requests ab"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            print(f"⏱️ Rate limiting: Warte {sleep_time:.2f}s...")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.gateway = ShopifyGateway.for_store(store)
     
     def _make_request(self, method: str, url: str, **kwargs) -> requests.Response:
-        """Macht einen Rate-Limited API Request mit Retry-Logik"""
-        max_retries = 3
-        retry_delay = 1.0  # Startet mit 1 Sekunde
-        
-        for attempt in range(max_retries):
-            try:
-                self._rate_limit()
-                response = requests.request(method, url, headers=self.headers, **kwargs)
-                
-                # Prüfe auf Rate-Limiting
-                if response.status_code == 429:
-                    print(f"⚠️ Rate limit erreicht (Versuch {attempt + 1}/{max_retries})")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ Warte {retry_delay}s vor erneutem Versuch...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                
-                return response
-                
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    print(f"⚠️ Request-Fehler (Versuch {attempt + 1}/{max_retries}): {e}")
-                    print(f"⏳ Warte {retry_delay}s vor erneutem Versuch...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    raise
-        
-        return response
+        """API-Request über das gemeinsame Gateway (Drosselung, Retries, Keep-Alive)"""
+        return self.gateway.request(method, url, **kwargs)
     
     def test_connection(self) -> Tuple[bool, str]:
         """Testet die Verbindung zur Shopify API"""
@@ -16,6 +16,7 @@ import base64
 import os
 import shutil
 
+from core import search as fulltext  # 'search' ist in den Views der Suchbegriff
 from .models import ShopifyStore, ShopifyProduct, ShopifySyncLog, ProductSEOOptimization, SEOAnalysisResult, ShopifyBlog, ShopifyBlogPost, BlogPostSEOOptimization, ShopifyCollection, CollectionSEOOptimization
 from .ai_seo_service import generate_seo_with_ai, BlogPostSEOService
 from .shopify_api import ShopifyAPIClient
@@ -131,12 +132,7 @@ class ShopifyProductListView(LoginRequiredMixin, ListView):
         if form.is_valid():
             search = form.cleaned_data.get('search')
             if search:
-                queryset = queryset.filter(
-                    Q(title__icontains=search) |
-                    Q(body_html__icontains=search) |
-                    Q(tags__icontains=search) |
-                    Q(vendor__icontains=search)
-                )
+                queryset = fulltext.filter_queryset(queryset, search, ranked=False)
             
             status = form.cleaned_data.get('status')
             if status:
@@ -1623,12 +1619,7 @@ class ShopifyBlogDetailView(LoginRequiredMixin, DetailView):
         if filter_form.is_valid():
             search = filter_form.cleaned_data.get('search')
             if search:
-                posts = posts.filter(
-                    Q(title__icontains=search) |
-                    Q(content__icontains=search) |
-                    Q(tags__icontains=search) |
-                    Q(author__icontains=search)
-                )
+                posts = fulltext.filter_queryset(posts, search, ranked=False)
             
             status = filter_form.cleaned_data.get('status')
             if status:
@@ -1712,12 +1703,7 @@ class ShopifyBlogPostListView(LoginRequiredMixin, ListView):
         # Filter
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(tags__icontains=search) |
-                Q(author__icontains=search)
-            )
+            queryset = fulltext.filter_queryset(queryset, search, ranked=False)
         
         status = self.request.GET.get('status')
         if status:
@@ -3608,8 +3594,8 @@ def unified_seo_optimization_view(request):
         blog_posts = blog_posts.filter(blog__store_id=store_filter)
     
     if search_query:
-        products = products.filter(Q(title__icontains=search_query) | Q(body_html__icontains=search_query))
-        blog_posts = blog_posts.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
+        products = fulltext.filter_queryset(products, search_query, ranked=False)
+        blog_posts = fulltext.filter_queryset(blog_posts, search_query, ranked=False)
     
     # Paginierung
     items_per_page = 20
@@ -4551,6 +4537,7 @@ def apply_seo_view(request):
 from .models import ShopifyBackup, BackupItem, RestoreLog
 from .backup_service import ShopifyBackupService
 from .restore_service import ShopifyRestoreService
+from .api_gateway import ShopifyGateway
 from django.http import HttpResponse
 
 
@@ -5024,7 +5011,6 @@ def restore_item(request, store_id, backup_id, item_id):
 @require_http_methods(['POST'])
 def sync_item_from_shopify(request, store_id, backup_id, item_id):
     """Einzelnes Element vom aktuellen Shopify-Stand aktualisieren (Shopify → Backup)"""
-    import requests
     import re
 
     store = get_object_or_404(ShopifyStore, id=store_id, user=request.user)
@@ -5032,16 +5018,13 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
     item = get_object_or_404(BackupItem, id=item_id, backup=backup)
 
     base_url = store.get_api_url()
-    headers = {
-        'X-Shopify-Access-Token': store.access_token,
-        'Content-Type': 'application/json'
-    }
+    gateway = ShopifyGateway.for_store(store)
 
     try:
         # Je nach Typ den richtigen Endpunkt aufrufen
         if item.item_type == 'product':
             url = f"{base_url}/products/{item.shopify_id}.json"
-            response = requests.get(url, headers=headers)
+            response = gateway.get(url)
             if response.status_code == 200:
                 data = response.json().get('product', {})
                 item.title = data.get('title', item.title)
@@ -5060,7 +5043,7 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
             blog_id = item.parent_id
             if blog_id:
                 url = f"{base_url}/blogs/{blog_id}/articles/{item.shopify_id}.json"
-                response = requests.get(url, headers=headers)
+                response = gateway.get(url)
                 if response.status_code == 200:
                     data = response.json().get('article', {})
                     item.title = data.get('title', item.title)
@@ -5078,7 +5061,7 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
 
         elif item.item_type == 'blog':
             url = f"{base_url}/blogs/{item.shopify_id}.json"
-            response = requests.get(url, headers=headers)
+            response = gateway.get(url)
             if response.status_code == 200:
                 data = response.json().get('blog', {})
                 item.title = data.get('title', item.title)
@@ -5093,10 +5076,10 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
         elif item.item_type == 'collection':
             # Erst Smart Collection versuchen, dann Custom Collection
             url = f"{base_url}/smart_collections/{item.shopify_id}.json"
-            response = requests.get(url, headers=headers)
+            response = gateway.get(url)
             if response.status_code == 404:
                 url = f"{base_url}/custom_collections/{item.shopify_id}.json"
-                response = requests.get(url, headers=headers)
+                response = gateway.get(url)
 
             if response.status_code == 200:
                 data = response.json()
@@ -5114,7 +5097,7 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
 
         elif item.item_type == 'page':
             url = f"{base_url}/pages/{item.shopify_id}.json"
-            response = requests.get(url, headers=headers)
+            response = gateway.get(url)
             if response.status_code == 200:
                 data = response.json().get('page', {})
                 item.title = data.get('title', item.title)
@@ -5128,7 +5111,7 @@ def sync_item_from_shopify(request, store_id, backup_id, item_id):
 
         elif item.item_type == 'redirect':
             url = f"{base_url}/redirects/{item.shopify_id}.json"
-            response = requests.get(url, headers=headers)
+            response = gateway.get(url)
             if response.status_code == 200:
                 data = response.json().get('redirect', {})
                 item.title = f"{data.get('path', '')} → {data.get('target', '')}"
@@ -0,0 +1,234 @@
+/**
+ * Chunked Upload Client
+ * Lädt große Dateien in Teilen hoch: mehrere Teile parallel, jeder Teil mit
+ * CRC32-Prüfsumme und Wiederholung, Fortsetzung nach Abbruch (bereits
+ * empfangene Teile werden übersprungen). Danach wird der Server-Status
+ * abgefragt, bis die Verarbeitung (Video anlegen, Thumbnail) fertig ist.
+ *
+ * Server-Seite: core/uploads.py, Endpunkte in videos/views.py.
+ *
+ *   const result = await ChunkedUpload.upload(fileOrBlob, {
+ *       initUrl: '/videos/api/chunked/init/',
+ *       chunkUrl: '/videos/api/chunked/chunk/',
+ *       completeUrl: '/videos/api/chunked/complete/',
+ *       statusUrl: (uploadId) => `/videos/api/chunked/status/${uploadId}/`,
+ *       csrfToken: '...',
+ *       initData: { filename, title, description },
+ *       onProgress: (loadedBytes, totalBytes) => {},
+ *       onStatus: (text) => {},
+ *   });
+ *   // result: Status-JSON des Servers (video_id, video_title, redirect_url, ...)
+ */
+
+(function (window) {
+    'use strict';
+
+    const DEFAULT_PARALLEL = 3;
+    const MAX_ATTEMPTS = 4;
+    const CHUNK_TIMEOUT_MS = 120000;
+    const POLL_INTERVAL_MS = 1500;
+    const POLL_TIMEOUT_MS = 30 * 60 * 1000;
+
+    // ---------- CRC32 (gleiche Prüfsumme wie zlib.crc32 auf dem Server) ----------
+
+    const CRC_TABLE = (function () {
+        const table = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+            }
+            table[n] = c >>> 0;
+        }
+        return table;
+    })();
+
+    async function crc32(blob) {
+        const bytes = new Uint8Array(await blob.arrayBuffer());
+        let crc = 0xFFFFFFFF;
+        for (let i = 0; i < bytes.length; i++) {
+            crc = CRC_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+        }
+        return ((crc ^ 0xFFFFFFFF) >>> 0).toString(16).padStart(8, '0');
+    }
+
+    // ---------- HTTP ----------
+
+    async function postJSON(url, data, csrfToken) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+            body: JSON.stringify(data),
+        });
+        const json = await response.json();
+        if (!json.success) {
+            throw new Error(json.error || `HTTP ${response.status}`);
+        }
+        return json;
+    }
+
+    async function getJSON(url) {
+        const response = await fetch(url, { credentials: 'same-origin' });
+        const json = await response.json();
+        if (!json.success) {
+            throw new Error(json.error || `HTTP ${response.status}`);
+        }
+        return json;
+    }
+
+    function sendChunk(url, formData, csrfToken, onProgress) {
+        return new Promise((resolve, reject) => {
+            const xhr = new XMLHttpRequest();
+            xhr.upload.addEventListener('progress', (e) => {
+                if (e.lengthComputable) onProgress(e.loaded);
+            });
+            xhr.addEventListener('load', () => {
+                let json = null;
+                try {
+                    json = JSON.parse(xhr.responseText);
+                } catch (e) {
+                    // fällt unten in den Fehlerzweig
+                }
+                if (xhr.status === 200 && json && json.success) {
+                    resolve(json);
+                } else {
+                    reject(new Error((json && json.error) || `HTTP ${xhr.status}`));
+                }
+            });
+            xhr.addEventListener('error', () => reject(new Error('Netzwerkfehler')));
+            xhr.addEventListener('timeout', () => reject(new Error('Zeitüberschreitung')));
+            xhr.open('POST', url, true);
+            xhr.timeout = CHUNK_TIMEOUT_MS;
+            xhr.setRequestHeader('X-CSRFToken', csrfToken);
+            xhr.send(formData);
+        });
+    }
+
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+    // ---------- Upload ----------
+
+    function resumeKey(file) {
+        // Nur echte Dateien lassen sich nach einem Neuladen wiedererkennen
+        if (!file.name || !file.lastModified) return null;
+        return `chunked-upload:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    async function findResumableUpload(file, options) {
+        const key = resumeKey(file);
+        const uploadId = options.uploadId || (key && window.localStorage.getItem(key));
+        if (!uploadId) return null;
+        try {
+            const status = await getJSON(options.statusUrl(uploadId));
+            if (status.status === 'uploading' && status.total_size === file.size) {
+                return status;
+            }
+        } catch (e) {
+            // Unbekannt/abgelaufen -> neu beginnen
+        }
+        if (key) window.localStorage.removeItem(key);
+        return null;
+    }
+
+    async function upload(file, options) {
+        const onProgress = options.onProgress || function () {};
+        const onStatus = options.onStatus || function () {};
+        const csrfToken = options.csrfToken;
+        const totalSize = file.size;
+
+        // Schritt 1: Fortsetzen oder neu initialisieren
+        let uploadId, chunkSize, totalChunks, received = new Set(), parallel;
+        const resumable = await findResumableUpload(file, options);
+        if (resumable) {
+            uploadId = resumable.upload_id;
+            chunkSize = resumable.chunk_size;
+            totalChunks = resumable.total_chunks;
+            received = new Set(resumable.received_chunks || []);
+            parallel = resumable.max_parallel || DEFAULT_PARALLEL;
+            onStatus(`Upload wird fortgesetzt (${received.size} von ${totalChunks} Teilen vorhanden)...`);
+        } else {
+            const init = await postJSON(options.initUrl, Object.assign({ total_size: totalSize }, options.initData), csrfToken);
+            uploadId = init.upload_id;
+            chunkSize = init.chunk_size;
+            totalChunks = init.total_chunks;
+            parallel = init.max_parallel || DEFAULT_PARALLEL;
+            const key = resumeKey(file);
+            if (key) window.localStorage.setItem(key, uploadId);
+        }
+
+        // Schritt 2: Teile parallel hochladen
+        const chunkBytes = (n) => Math.min(chunkSize, totalSize - n * chunkSize);
+        let doneBytes = 0;
+        received.forEach((n) => { doneBytes += chunkBytes(n); });
+        const inFlight = new Map();
+        const reportProgress = () => {
+            let loaded = doneBytes;
+            inFlight.forEach((bytes) => { loaded += bytes; });
+            onProgress(Math.min(loaded, totalSize), totalSize);
+        };
+        reportProgress();
+
+        const queue = [];
+        for (let n = 0; n < totalChunks; n++) {
+            if (!received.has(n)) queue.push(n);
+        }
+
+        let failure = null;
+        const worker = async () => {
+            while (queue.length && !failure) {
+                const n = queue.shift();
+                const blob = file.slice(n * chunkSize, n * chunkSize + chunkBytes(n));
+                const checksum = await crc32(blob);
+                for (let attempt = 1; ; attempt++) {
+                    const formData = new FormData();
+                    formData.append('upload_id', uploadId);
+                    formData.append('chunk_number', n);
+                    formData.append('checksum', checksum);
+                    formData.append('chunk', blob, `chunk_${n}`);
+                    try {
+                        await sendChunk(options.chunkUrl, formData, csrfToken, (loaded) => {
+                            inFlight.set(n, loaded);
+                            reportProgress();
+                        });
+                        break;
+                    } catch (error) {
+                        inFlight.delete(n);
+                        if (attempt >= MAX_ATTEMPTS) {
+                            failure = new Error(`Teil ${n + 1} fehlgeschlagen: ${error.message}`);
+                            failure.uploadId = uploadId;
+                            return;
+                        }
+                        await sleep(1000 * Math.pow(2, attempt - 1));
+                    }
+                }
+                inFlight.delete(n);
+                received.add(n);
+                doneBytes += chunkBytes(n);
+                reportProgress();
+                onStatus(`Teil ${received.size} von ${totalChunks} hochgeladen...`);
+            }
+        };
+        await Promise.all(Array.from({ length: Math.min(parallel, Math.max(queue.length, 1)) }, worker));
+        if (failure) throw failure;
+
+        // Schritt 3: Abschließen und auf die Verarbeitung warten
+        onStatus('Video wird verarbeitet...');
+        let status = await postJSON(options.completeUrl, { upload_id: uploadId }, csrfToken);
+        const started = Date.now();
+        while (status.status === 'processing') {
+            if (Date.now() - started > POLL_TIMEOUT_MS) {
+                throw new Error('Verarbeitung dauert ungewöhnlich lange - bitte später in der Videoliste nachsehen.');
+            }
+            await sleep(POLL_INTERVAL_MS);
+            status = await getJSON(options.statusUrl(uploadId));
+        }
+        const key = resumeKey(file);
+        if (key) window.localStorage.removeItem(key);
+        if (status.status !== 'complete') {
+            throw new Error(status.error_message || 'Verarbeitung fehlgeschlagen');
+        }
+        return status;
+    }
+
+    window.ChunkedUpload = { upload: upload, crc32: crc32 };
+})(window);
@@ -0,0 +1,326 @@
+"""
+Event-driven ComfyUI job tracking.
+
+Instead of polling /queue and /history/<id> every few seconds per job, one
+background thread per ComfyUI base URL keeps a single websocket
+(ws://<host>/ws?clientId=<CLIENT_ID>) open and multiplexes all in-flight
+prompts of this process over it. ComfyUI pushes
+
+    execution_start / execution_cached / executing / progress /
+    executed / execution_success / execution_error / execution_interrupted
+
+for every prompt submitted with our client_id (see tasks._submit_workflow).
+Progress callbacks fire only when the integer percentage actually changes;
+completion callbacks fire once, after the outputs were fetched from
+/history/<id>. A prompt counts as finished on the final `executing` event
+(node=None): ComfyUI sends execution_success before it has written the
+history entry, the final `executing` only afterwards.
+
+If the websocket cannot be opened, callers fall back to HTTP polling
+(tasks._poll_status).
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# One client id per worker process; ComfyUI routes progress events by it
+CLIENT_ID = f'workloom-{uuid.uuid4().hex[:12]}'
+
+RECONNECT_DELAY = 5           # seconds between reconnect attempts
+RECENT_FINISHED = 256         # finished prompt ids kept for late watch() calls
+SILENCE_CHECK = 30            # no event for this long -> check /history and /queue
+LOST_CHECKS = 2               # consecutive checks without the prompt in /queue -> lost
+HISTORY_RETRIES = 3           # /history lookups before a finished prompt counts as missing
+HISTORY_RETRY_DELAY = 1       # seconds between those lookups
+
+# Step progress of the first progress-reporting node (the sampler) maps to
+# 0..SAMPLER_SHARE percent, later ones (VAE decode, upscale, ...) to the rest.
+SAMPLER_SHARE = 90
+
+
+class PromptJob:
+    """State of one watched prompt; wait() blocks on an event, not on polling."""
+
+    def __init__(self, prompt_id, on_progress=None, on_done=None):
+        self.prompt_id = prompt_id
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.state = 'queued'
+        self.progress = 0
+        self.node = None
+        self.step = (0, 0)
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.last_event_at = time.time()
+        self.last_check_at = 0
+        self.missing_checks = 0
+        self.result = None
+        self._progress_nodes = []
+        self._event = threading.Event()
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, run_timeout, queue_timeout=None, tick=15, on_tick=None):
+        """Wait for completion. run_timeout counts from execution_start, queue
+        time is bounded separately (default: run_timeout). Returns the result dict."""
+        if queue_timeout is None:
+            queue_timeout = run_timeout
+        tick = min(tick, run_timeout, queue_timeout)
+        while not self._event.wait(tick):
+            now = time.time()
+            if on_tick:
+                on_tick(self)
+                if self.done:
+                    break
+            if self.started_at and now - self.started_at > run_timeout:
+                return {'status': 'timeout'}
+            if not self.started_at and now - self.submitted_at > queue_timeout:
+                return {'status': 'timeout', 'message': f'Queue wait exceeded {int(queue_timeout)}s'}
+        return self.result
+
+    def _set_progress(self, percent):
+        percent = max(0, min(99, int(percent)))
+        if percent <= self.progress:
+            return
+        self.progress = percent
+        if self.on_progress:
+            try:
+                self.on_progress(self)
+            except Exception as e:
+                logger.debug(f"ComfyUI progress callback failed: {e}")
+
+    def _step(self, node, value, maximum):
+        if node not in self._progress_nodes:
+            self._progress_nodes.append(node)
+        self.node = node
+        self.step = (value, maximum)
+        fraction = value / maximum if maximum else 0
+        if self._progress_nodes.index(node) == 0:
+            self._set_progress(fraction * SAMPLER_SHARE)
+        else:
+            self._set_progress(SAMPLER_SHARE + fraction * (99 - SAMPLER_SHARE))
+
+    def _finish(self, result):
+        if self._event.is_set():
+            return
+        self.result = result
+        self.state = result.get('status', 'error')
+        if self.state == 'done':
+            self.progress = 100
+        self._event.set()
+        if self.on_done:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                logger.warning(f"ComfyUI completion callback failed for {self.prompt_id}: {e}")
+
+
+class ComfyUIWatcher:
+    """One websocket per ComfyUI base URL and process, shared by all prompts."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_url(cls, url):
+        url = url.rstrip('/')
+        with cls._instances_lock:
+            watcher = cls._instances.get(url)
+            if watcher is None or not watcher._thread.is_alive():
+                watcher = cls(url)
+                cls._instances[url] = watcher
+                watcher._thread.start()
+            return watcher
+
+    def __init__(self, url):
+        self.url = url
+        self.ws_url = url.replace('https://', 'wss://', 1).replace('http://', 'ws://', 1) + f'/ws?clientId={CLIENT_ID}'
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'comfyui-ws-{url}', daemon=True)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def wait_connected(self, timeout=10):
+        return self._connected.wait(timeout)
+
+    def watch(self, prompt_id, on_progress=None, on_done=None):
+        """Register a submitted prompt; callbacks run on the watcher thread."""
+        job = PromptJob(prompt_id, on_progress, on_done)
+        with self._lock:
+            finished = self._finished.pop(prompt_id, None)
+            if finished is None:
+                self._jobs[prompt_id] = job
+        if finished is not None:
+            # Completed before we registered (fast/cached prompt)
+            job.started_at = job.started_at or time.time()
+            job._finish(self._result_for(prompt_id, finished))
+        return job
+
+    def verify(self, job):
+        """For a job that has been silent for a while: look it up in /history,
+        otherwise make sure ComfyUI still has it in /queue. A prompt missing
+        from both (lost, server restarted) fails instead of waiting out the
+        timeout; one that is running sets started_at if execution_start was missed."""
+        now = time.time()
+        if job.done or now - max(job.last_event_at, job.last_check_at) < SILENCE_CHECK:
+            return
+        job.last_check_at = now
+        result = self._history_result(job.prompt_id)
+        if result:
+            self._complete(job.prompt_id, result)
+            return
+
+        position = self._queue_position(job.prompt_id)
+        if position is None:
+            return  # /queue unreachable – try again next time
+        if position == 'missing':
+            job.missing_checks += 1
+            if job.missing_checks >= LOST_CHECKS:
+                self._complete(job.prompt_id, {'status': 'error', 'message': 'Prompt no longer in ComfyUI queue'})
+            return
+        job.missing_checks = 0
+        if position == 'running' and job.started_at is None:
+            job.state = 'running'
+            job.started_at = now
+
+    # ------------------------------------------------------------------
+    # Websocket loop
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            try:
+                from websockets.sync.client import connect
+
+                with connect(self.ws_url, open_timeout=10, max_size=None) as ws:
+                    self._connected.set()
+                    logger.info(f"ComfyUI websocket connected: {self.url}")
+                    self._reconcile()
+                    for raw in ws:
+                        if isinstance(raw, bytes):
+                            continue  # binary preview images
+                        self._handle(raw)
+            except Exception as e:
+                logger.warning(f"ComfyUI websocket {self.url} lost: {e}")
+            self._connected.clear()
+            with self._lock:
+                idle = not self._jobs
+            if idle:
+                # Nobody is waiting – end the thread, for_url() starts a new one on demand
+                with self._instances_lock:
+                    if self._instances.get(self.url) is self:
+                        del self._instances[self.url]
+                return
+            time.sleep(RECONNECT_DELAY)
+
+    def _handle(self, raw):
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        kind = msg.get('type')
+        data = msg.get('data') or {}
+        prompt_id = data.get('prompt_id')
+        if not prompt_id:
+            return
+
+        # Not on execution_success: the history entry is written after it
+        if kind == 'executing' and data.get('node') is None:
+            self._complete(prompt_id, None)
+            return
+        if kind in ('execution_error', 'execution_interrupted'):
+            message = data.get('exception_message') or kind
+            self._complete(prompt_id, {'status': 'error', 'message': str(message)[:500]})
+            return
+
+        with self._lock:
+            job = self._jobs.get(prompt_id)
+        if job is None:
+            return
+        job.last_event_at = time.time()
+        if kind == 'execution_start':
+            job.state = 'running'
+            job.started_at = time.time()
+            if job.on_progress:
+                try:
+                    job.on_progress(job)
+                except Exception as e:
+                    logger.debug(f"ComfyUI progress callback failed: {e}")
+        elif kind == 'progress':
+            if job.started_at is None:
+                # execution_start arrived before watch() registered the prompt
+                job.state = 'running'
+                job.started_at = time.time()
+            job._step(data.get('node'), data.get('value', 0), data.get('max', 0))
+
+    def _complete(self, prompt_id, result):
+        with self._lock:
+            job = self._jobs.pop(prompt_id, None)
+            if job is None:
+                self._finished[prompt_id] = result or {}
+                while len(self._finished) > RECENT_FINISHED:
+                    self._finished.popitem(last=False)
+                return
+        job._finish(self._result_for(prompt_id, result))
+
+    def _result_for(self, prompt_id, result):
+        if result and result.get('status'):
+            return result
+        for attempt in range(HISTORY_RETRIES):
+            if attempt:
+                time.sleep(HISTORY_RETRY_DELAY)
+            found = self._history_result(prompt_id)
+            if found:
+                return found
+        return {'status': 'error', 'message': 'No history entry'}
+
+    def _history_result(self, prompt_id):
+        try:
+            hist = requests.get(f'{self.url}/history/{prompt_id}', timeout=15).json()
+        except Exception as e:
+            logger.warning(f"ComfyUI history lookup failed for {prompt_id}: {e}")
+            return None
+        entry = hist.get(prompt_id)
+        if not entry:
+            return None
+        status = entry.get('status', {})
+        if status.get('completed', False):
+            return {'status': 'done', 'outputs': entry.get('outputs', {})}
+        if status.get('status_str') == 'error':
+            return {'status': 'error', 'message': str(entry.get('messages', []))[:500]}
+        return None
+
+    def _queue_position(self, prompt_id):
+        """'running', 'pending' or 'missing'; None if /queue could not be read."""
+        try:
+            queue = requests.get(f'{self.url}/queue', timeout=10).json()
+        except Exception as e:
+            logger.warning(f"ComfyUI queue lookup failed for {prompt_id}: {e}")
+            return None
+        for position, key in (('running', 'queue_running'), ('pending', 'queue_pending')):
+            if any(len(item) >= 2 and item[1] == prompt_id for item in queue.get(key, [])):
+                return position
+        return 'missing'
+
+    def _reconcile(self):
+        """After (re)connect: catch completions that happened while disconnected."""
+        with self._lock:
+            pending = list(self._jobs)
+        for prompt_id in pending:
+            result = self._history_result(prompt_id)
+            if result:
+                self._complete(prompt_id, result)
@@ -0,0 +1,225 @@
+"""
+GPU job scheduler for the video pipeline.
+
+Replaces the old "SETNX lock + self.retry(countdown=60)" polling: render jobs
+go into a Redis priority FIFO (sorted set, score = priority + enqueue time) and
+the lock holder hands the GPU straight to the next group of jobs when it
+finishes. Jobs waiting at the same time are dispatched together as ONE group,
+so the worker can run all FLUX frames, then all Hunyuan renders, then all XTTS
+voiceovers across projects instead of swapping models per scene.
+
+Redis keys:
+    workloom:gpu_pipeline_lock   holder of the GPU (same key as the old lock)
+    workloom:gpu_jobs            sorted set of queued jobs ("scene:<id>", "project:<id>")
+    workloom:gpu_running         jobs of the group currently on the GPU
+    workloom:gpu_metrics         idle/busy accounting (feeds check_auto_shutdown)
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'workloom:gpu_pipeline_lock'
+QUEUE_KEY = 'workloom:gpu_jobs'
+RUNNING_KEY = 'workloom:gpu_running'
+METRICS_KEY = 'workloom:gpu_metrics'
+
+LOCK_TTL = 4 * 3600          # a crashed worker frees the GPU after this
+DISPATCH_LOCK_TTL = 60
+MAX_GROUP_JOBS = 8           # jobs handed to the GPU worker in one group
+
+PRIORITY_SCENE = 0           # interactive single-scene clicks first
+PRIORITY_PROJECT = 5         # whole-project batches after that
+
+# Compare-and-delete: only the current holder may release the lock
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_EXTEND_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _redis():
+    import redis
+    return redis.Redis.from_url(getattr(settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0'))
+
+
+def job_member(kind, target_id):
+    return f'{kind}:{target_id}'
+
+
+def parse_member(member):
+    if isinstance(member, bytes):
+        member = member.decode('utf-8', 'ignore')
+    kind, _, target = member.partition(':')
+    return {'kind': kind, 'target': target}
+
+
+# ------------------------------------------------------------------
+# Idle / busy accounting
+# ------------------------------------------------------------------
+
+def _transition(r, state):
+    """Switch the metrics state machine to 'idle' or 'busy' and book the elapsed time."""
+    now = time.time()
+    current = r.hmget(METRICS_KEY, 'state', 'since')
+    prev_state = (current[0] or b'').decode()
+    since = float(current[1] or now)
+    if prev_state == state:
+        return
+    pipe = r.pipeline()
+    if prev_state in ('idle', 'busy'):
+        pipe.hincrbyfloat(METRICS_KEY, f'{prev_state}_seconds', max(0.0, now - since))
+    pipe.hset(METRICS_KEY, mapping={'state': state, 'since': now})
+    pipe.execute()
+
+
+def metrics():
+    """Queue length, running group and idle/busy totals; {} if Redis is unreachable."""
+    try:
+        r = _redis()
+        raw = {k.decode(): v.decode() for k, v in r.hgetall(METRICS_KEY).items()}
+        queued = r.zcard(QUEUE_KEY)
+        running = [m.decode() for m in r.smembers(RUNNING_KEY)]
+        holder = r.get(LOCK_KEY)
+    except Exception as e:
+        logger.warning(f"gpu_scheduler metrics failed: {e}")
+        return {}
+    now = time.time()
+    state = raw.get('state', 'idle')
+    since = float(raw.get('since') or now)
+    idle_total = float(raw.get('idle_seconds') or 0)
+    busy_total = float(raw.get('busy_seconds') or 0)
+    if state == 'idle':
+        idle_total += now - since
+    else:
+        busy_total += now - since
+    total = idle_total + busy_total
+    return {
+        'state': state,
+        'state_seconds': round(now - since, 1),
+        'idle_seconds': round(idle_total, 1),
+        'busy_seconds': round(busy_total, 1),
+        'utilization': round(busy_total / total, 3) if total else 0,
+        'queued': queued,
+        'running': running,
+        'holder': holder.decode('utf-8', 'ignore') if holder else None,
+        'groups': int(raw.get('groups') or 0),
+        'jobs': int(raw.get('jobs') or 0),
+    }
+
+
+# ------------------------------------------------------------------
+# Queue
+# ------------------------------------------------------------------
+
+def submit(kind, target_id, priority=None):
+    """Queue a GPU job and dispatch if the GPU is free.
+
+    Re-submitting a job that is already queued keeps its original position.
+    Falls back to running the job directly when Redis is down (fail-open,
+    like the old lock)."""
+    from .tasks import run_gpu_jobs_task
+    if priority is None:
+        priority = PRIORITY_SCENE if kind == 'scene' else PRIORITY_PROJECT
+    member = job_member(kind, target_id)
+    try:
+        r = _redis()
+        score = priority * 1e13 + time.time() * 1000
+        r.zadd(QUEUE_KEY, {member: score}, nx=True)
+    except Exception as e:
+        logger.warning(f"gpu_scheduler submit failed, running {member} directly: {e}")
+        run_gpu_jobs_task.delay([parse_member(member)], None)
+        return member
+    dispatch()
+    return member
+
+
+def dispatch():
+    """Hand the GPU to the next group of queued jobs if nobody holds it.
+
+    Returns the new holder id or None (GPU busy or queue empty)."""
+    from .tasks import run_gpu_jobs_task
+    try:
+        r = _redis()
+        token = f'dispatch:{uuid.uuid4().hex}'
+        if not r.set(LOCK_KEY, token, nx=True, ex=DISPATCH_LOCK_TTL):
+            return None
+        members = r.zrange(QUEUE_KEY, 0, MAX_GROUP_JOBS - 1)
+        if not members:
+            r.delete(RUNNING_KEY)
+            r.eval(_RELEASE_LUA, 1, LOCK_KEY, token)
+            _transition(r, 'idle')
+            return None
+        holder = f'gpu:{uuid.uuid4().hex[:12]}'
+        pipe = r.pipeline()
+        pipe.zrem(QUEUE_KEY, *members)
+        pipe.delete(RUNNING_KEY)
+        pipe.sadd(RUNNING_KEY, *members)
+        pipe.expire(RUNNING_KEY, LOCK_TTL)
+        pipe.set(LOCK_KEY, holder, ex=LOCK_TTL)
+        pipe.hincrby(METRICS_KEY, 'groups', 1)
+        pipe.hincrby(METRICS_KEY, 'jobs', len(members))
+        pipe.execute()
+        _transition(r, 'busy')
+    except Exception as e:
+        logger.warning(f"gpu_scheduler dispatch failed: {e}")
+        return None
+
+    jobs = [parse_member(m) for m in members]
+    try:
+        run_gpu_jobs_task.delay(jobs, holder)
+    except Exception as e:
+        logger.error(f"gpu_scheduler: could not start GPU group, requeueing: {e}")
+        r.zadd(QUEUE_KEY, {m: 0 for m in members})
+        r.delete(RUNNING_KEY)
+        r.eval(_RELEASE_LUA, 1, LOCK_KEY, holder)
+        return None
+    logger.info(f"gpu_scheduler: {holder} got the GPU for {len(jobs)} job(s): "
+                f"{', '.join(m.decode() for m in members)}")
+    return holder
+
+
+def heartbeat(holder):
+    """Extend the lock while a long group is still running."""
+    if not holder:
+        return
+    try:
+        _redis().eval(_EXTEND_LUA, 1, LOCK_KEY, holder, LOCK_TTL)
+    except Exception as e:
+        logger.debug(f"gpu_scheduler heartbeat failed: {e}")
+
+
+def finish(holder):
+    """Release the GPU and immediately hand it to the next queued group."""
+    if holder:
+        try:
+            r = _redis()
+            if r.eval(_RELEASE_LUA, 1, LOCK_KEY, holder):
+                r.delete(RUNNING_KEY)
+        except Exception as e:
+            logger.warning(f"gpu_scheduler release failed: {e}")
+    dispatch()
+
+
+def is_pending(scene):
+    """True if the scene (or its project) is queued or on the GPU right now."""
+    members = [job_member('scene', scene.id), job_member('project', scene.project_id)]
+    try:
+        r = _redis()
+        for m in members:
+            if r.zscore(QUEUE_KEY, m) is not None or r.sismember(RUNNING_KEY, m):
+                return True
+    except Exception:
+        return False
+    return False
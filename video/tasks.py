@@ -292,9 +292,13 @@ def _upload_image_to_comfyui(url, local_path):
     return None
 
 def _submit_workflow(url, workflow):
-    """Submit workflow to ComfyUI."""
+    """Submit workflow to ComfyUI. The client_id routes the prompt's progress
+    events to this process's websocket (see comfyui_client)."""
+    from .comfyui_client import CLIENT_ID, ComfyUIWatcher
+    # Open the socket before submitting so no early event is missed
+    ComfyUIWatcher.for_url(url).wait_connected(timeout=5)
     r = requests.post(f"{url}/prompt",
-        data=json.dumps({"prompt": workflow}),
+        data=json.dumps({"prompt": workflow, "client_id": CLIENT_ID}),
         headers={"Content-Type": "application/json"},
         timeout=30)
     result = r.json()
@@ -395,6 +399,40 @@ def _poll_status(url, prompt_id, timeout=900, scene_id=None):
     return {"status": "timeout"}
 
 
+def _wait_for_prompt(url, prompt_id, timeout=900, scene_id=None, queue_timeout=None):
+    """Wait for a ComfyUI prompt via the shared websocket watcher.
+
+    Progress comes from the sampler's step events and is written only when the
+    integer percentage changes; outputs are fetched from /history once at the
+    end. Same result dicts as _poll_status, which stays the fallback when the
+    websocket is unavailable. Queue wait is capped at queue_timeout (default:
+    timeout), so synchronous callers never block longer than they asked for."""
+    from .comfyui_client import ComfyUIWatcher
+    from .models import Scene
+
+    watcher = ComfyUIWatcher.for_url(url)
+    if not watcher.wait_connected(timeout=10):
+        logger.warning(f"ComfyUI websocket unavailable, polling {prompt_id}")
+        return _poll_status(url, prompt_id, timeout=timeout, scene_id=scene_id)
+
+    def on_progress(job):
+        # Runs on the watcher thread – one UPDATE per percent, not per tick
+        if job.state == 'running' and job.progress == 0:
+            Scene.objects.filter(id=scene_id, error_message="In Warteschlange...").update(error_message="")
+        Scene.objects.filter(id=scene_id).update(render_progress=job.progress)
+
+    if scene_id:
+        Scene.objects.filter(id=scene_id).update(render_progress=0, error_message="In Warteschlange...")
+    job = watcher.watch(prompt_id, on_progress=on_progress if scene_id else None)
+    result = job.wait(run_timeout=timeout, queue_timeout=queue_timeout, on_tick=watcher.verify)
+
+    if scene_id and result.get("status") == "done":
+        Scene.objects.filter(id=scene_id).update(render_progress=100)
+    if result.get("status") == "timeout":
+        logger.warning(f"Job {prompt_id} timed out (state={job.state}, progress={job.progress}%)")
+    return result
+
+
 def _download_video(url, outputs, scene_id):
     """Download MP4 from ComfyUI output (VHS_VideoCombine saves MP4 directly)."""
     media_dir = os.path.join(settings.MEDIA_ROOT, "video", "renders")
@@ -588,7 +626,8 @@ def render_scene_task(scene_id, preview=False, resolution=''):
             poll_timeout = max(2400, scene_steps * 90 + 900)  # min 40 min
         else:
             poll_timeout = 1200
-        result = _poll_status(url, prompt_id, timeout=poll_timeout, scene_id=str(scene.id))
+        # Background render: may wait up to 2h behind other jobs in the ComfyUI queue
+        result = _wait_for_prompt(url, prompt_id, timeout=poll_timeout, scene_id=str(scene.id), queue_timeout=7200)
         if result["status"] != "done":
             raise Exception(f"Rendering failed: {result}")
 
@@ -817,6 +856,15 @@ def check_auto_shutdown():
     except Exception as e:
         logger.debug(f"hard-cap check failed: {e}")
 
+    # GPU scheduler: queued/running jobs keep the GPU up; its idle clock is
+    # more precise than last_activity (set only at job boundaries).
+    from . import gpu_scheduler
+    gpu_scheduler.dispatch()  # recover a queue whose holder crashed (lock TTL expired)
+    gpu = gpu_scheduler.metrics()
+    if gpu.get("queued") or gpu.get("running"):
+        logger.info(f"Auto-shutdown skipped: GPU queue={gpu.get('queued')} running={gpu.get('running')}")
+        return {"status": "active", "queued": gpu.get("queued"), "running": len(gpu.get("running") or [])}
+
     active = Scene.objects.filter(status="generating").count()
     if active > 0:
         logger.info(f"Auto-shutdown skipped: {active} active scenes")
@@ -825,13 +873,16 @@ def check_auto_shutdown():
     state = GPUServerState.get()
     now = timezone.now()
     idle_minutes = (now - state.last_activity).total_seconds() / 60
+    if gpu.get("state") == "idle":
+        idle_minutes = min(idle_minutes, gpu["state_seconds"] / 60)
     shutdown_threshold = getattr(state, 'auto_shutdown_minutes', 10) or 10
 
     if idle_minutes < shutdown_threshold:
         check_auto_shutdown.apply_async(countdown=60)
         return {"status": "grace_period", "idle_min": round(idle_minutes, 1)}
 
-    logger.info(f"Auto-shutdown: idle={idle_minutes:.1f}min")
+    logger.info(f"Auto-shutdown: idle={idle_minutes:.1f}min, "
+                f"utilization={gpu.get('utilization')}, idle_total={gpu.get('idle_seconds')}s")
     result = stop_gpu_server()
     state.is_manually_started = False
     state.save()
@@ -952,9 +1003,14 @@ def cleanup_stuck_scenes():
     from .models import Scene, SceneVideo
     from datetime import timedelta
     from celery.result import AsyncResult
+    from . import gpu_scheduler
     cutoff = timezone.now() - timedelta(minutes=180)
     stuck_count = 0
+    gpu_scheduler.dispatch()
     for s in Scene.objects.filter(status='generating'):
+        # Queued or running on the GPU scheduler -> not stuck
+        if gpu_scheduler.is_pending(s):
+            continue
         # Skip if scene has an active Celery task
         if s.celery_task_id:
             try:
@@ -985,218 +1041,243 @@ def cleanup_stuck_scenes():
 
 
 
-@shared_task(bind=True, max_retries=None)
-def render_project_batched_task(self, project_id):
-    """Phase-batched render for an entire project:
+@shared_task
+def render_project_batched_task(project_id):
+    """Queue a phase-batched render of an entire project on the GPU scheduler.
+
+    The actual work runs in run_gpu_jobs_task once the GPU is free; projects
+    and scenes that are waiting at the same time share one batched run."""
+    from . import gpu_scheduler
+    return gpu_scheduler.submit('project', str(project_id))
 
-      Phase A:  For every scene (in order): frames → ComfyUI /free → Hunyuan render.
-                Keeps the Hunyuan model hot in VRAM across scenes, no FLUX<->Hunyuan
-                shuffle between scenes.
-      Phase B:  Apply text overlays for every scene that has one (CPU ffmpeg).
-      Phase C:  Generate voiceovers for every scene that has text (XTTS GPU).
-                At the end, re-mux audio into each scene's video.
 
-    This is much faster than per-scene pipelines because the GPU model cache
-    only transitions FLUX→Hunyuan once, and XTTS only loads once."""
-    from .models import VideoProject, Scene
+@shared_task
+def render_scene_pipeline_task(scene_id):
+    """Queue the full pipeline for a SINGLE scene (frames -> video -> voiceover)
+    on the GPU scheduler, so parallel clicks do not all hit the GPU at once."""
+    from . import gpu_scheduler
+    return gpu_scheduler.submit('scene', str(scene_id))
+
 
-    holder = f"batch:{project_id}:{self.request.id}"
-    if not _acquire_gpu_lock(holder, ttl=14400):
-        logger.info(f"Batched: GPU busy, requeue project {project_id} in 60s")
-        raise self.retry(countdown=60, exc=Exception("GPU busy"))
+@shared_task(acks_late=True)
+def run_gpu_jobs_task(jobs, holder):
+    """Runs one group of GPU jobs handed out by gpu_scheduler.dispatch().
 
+    A single scene runs the classic per-scene pipeline; everything else is
+    phase-batched across all scenes of the group. The GPU is handed to the
+    next group in finally, without any polling delay."""
+    from . import gpu_scheduler
     try:
+        _update_gpu_activity()
+    except Exception:
+        pass
+    try:
+        if len(jobs) == 1 and jobs[0]['kind'] == 'scene':
+            _run_scene_pipeline(jobs[0]['target'])
+        else:
+            _run_batched_jobs(jobs, holder)
+    except Exception as e:
+        logger.error(f"GPU group {holder} failed: {e}")
+    finally:
         try:
-            project = VideoProject.objects.get(id=project_id)
-        except VideoProject.DoesNotExist:
-            logger.error(f"Batched pipeline: project {project_id} not found")
-            return
+            _update_gpu_activity()
+        except Exception:
+            pass
+        gpu_scheduler.finish(holder)
 
-        scenes = list(project.scenes.all().order_by('order'))
-        if not scenes:
-            return
 
-        # Mark all pending/error scenes as generating upfront
-        for s in scenes:
-            if s.status in ('pending', 'error', 'done'):
-                # Skip 'done' scenes only if they already have a video; otherwise re-run
-                if s.status == 'done' and s.rendered_videos.filter(status='done').exists():
-                    continue
-                s.status = 'generating'
-                s.render_progress = 0
-                s.error_message = 'In Warteschlange'
-                s.save(update_fields=['status', 'render_progress', 'error_message'])
-
-        # ---------- Phase A: all FLUX frames (FLUX stays hot in VRAM) ----------
-        for s in scenes:
-            s.refresh_from_db()
-            if s.status == 'done' and s.rendered_videos.filter(status='done').exists():
-                continue
-            try:
-                if s.start_frame_prompt and s.start_frame_prompt.strip() and not s.start_frame:
-                    s.error_message = f'Phase 1/4: Frame {s.order}'
-                    s.save(update_fields=['error_message'])
-                    try:
-                        _pipeline_generate_frame(s, 'start')
-                    except Exception as e:
-                        logger.warning(f"Batched: start-frame failed for {s.id}: {e}")
-                    s.refresh_from_db()
-                if s.end_frame_prompt and s.end_frame_prompt.strip() and not s.end_frame:
-                    s.error_message = f'Phase 1/4: End-Frame {s.order}'
-                    s.save(update_fields=['error_message'])
-                    try:
-                        _pipeline_generate_frame(s, 'end')
-                    except Exception as e:
-                        logger.warning(f"Batched: end-frame failed for {s.id}: {e}")
-                    s.refresh_from_db()
-            except Exception as e:
-                logger.error(f"Batched Phase A frame {s.id}: {e}")
+def _comfyui_free(reason):
+    """Ask ComfyUI to unload all models (between FLUX/Hunyuan/XTTS phases)."""
+    try:
+        url = _get_runpod_comfyui_url()
+        if url:
+            import requests as _req
+            _req.post(f'{url}/free',
+                      json={'unload_models': True, 'free_memory': True},
+                      timeout=15)
+            logger.info(f"ComfyUI /free ({reason})")
+    except Exception as _e:
+        logger.warning(f"ComfyUI /free failed ({reason}): {_e}")
 
-        # Unload FLUX from VRAM exactly ONCE before switching to Hunyuan
-        try:
-            url = _get_runpod_comfyui_url()
-            if url:
-                import requests as _req
-                _req.post(f'{url}/free',
-                          json={'unload_models': True, 'free_memory': True},
-                          timeout=15)
-                logger.info("Batched: ComfyUI /free after Phase A (FLUX→Hunyuan switch)")
-        except Exception as _e:
-            logger.warning(f"Batched: /free failed between A and B: {_e}")
 
-        # ---------- Phase B: all Hunyuan video renders (Hunyuan stays hot) ----------
-        for s in scenes:
-            s.refresh_from_db()
-            if s.status == 'done' and s.rendered_videos.filter(status='done').exists():
-                continue
-            try:
-                s.error_message = f'Phase 2/4: Video {s.order}'
-                s.save(update_fields=['error_message'])
-                render_scene_task(str(s.id))
-                s.refresh_from_db()
-            except Exception as e:
-                logger.error(f"Batched Phase B video {s.id}: {e}")
-                s.status = 'error'
-                s.error_message = f'Batch-Render: {str(e)[:400]}'
-                s.save(update_fields=['status', 'error_message'])
+def _scene_done(s):
+    return s.status == 'done' and s.rendered_videos.filter(status='done').exists()
 
-        # ---------- Phase C: text overlays (CPU, ffmpeg) ----------
-        for s in scenes:
-            s.refresh_from_db()
-            if s.status != 'done':
-                continue
-            if not (s.text_overlay and s.text_overlay.strip()):
-                continue
-            try:
-                s.error_message = f'Phase 3/4: Overlay {s.order}'
-                s.save(update_fields=['error_message'])
-                apply_text_overlay_task(str(s.id))
-                s.refresh_from_db()
-            except Exception as e:
-                logger.warning(f"Batched Phase C overlay {s.id}: {e}")
 
-        # ---------- Phase D: voiceovers (XTTS/Piper) + music (MusicGen) ----------
-        # Free ComfyUI VRAM for XTTS/MusicGen
-        try:
-            url = _get_runpod_comfyui_url()
-            if url:
-                import requests as _req
-                _req.post(f'{url}/free',
-                          json={'unload_models': True, 'free_memory': True},
-                          timeout=15)
-        except Exception:
-            pass
+def _run_batched_jobs(jobs, holder=None):
+    """Phase-batched render for a group of project and scene jobs:
 
-        # D1: voiceovers
-        for s in scenes:
-            s.refresh_from_db()
-            if s.status != 'done':
+      Phase A:  All FLUX frames of every scene (FLUX stays hot in VRAM).
+      Phase B:  All Hunyuan video renders (one FLUX→Hunyuan switch in total).
+      Phase C:  Text overlays (CPU ffmpeg).
+      Phase D:  All voiceovers (XTTS loads once), audio re-muxed per scene.
+      Phase E:  Music – one track per project job, per-scene music for scene jobs.
+
+    Across projects this keeps each GPU model loaded for the whole group
+    instead of swapping FLUX/Hunyuan/XTTS per scene."""
+    from .models import VideoProject, Scene
+    from . import gpu_scheduler
+
+    projects = []
+    scenes, seen = [], set()
+    single_scene_ids = set()
+    for job in jobs:
+        if job['kind'] == 'project':
+            project = VideoProject.objects.filter(id=job['target']).first()
+            if not project:
+                logger.error(f"Batched pipeline: project {job['target']} not found")
                 continue
-            if not (s.voiceover_text and s.voiceover_text.strip()):
+            projects.append(project)
+            candidates = list(project.scenes.all().order_by('order'))
+        else:
+            candidates = list(Scene.objects.filter(id=job['target']))
+            single_scene_ids.update(str(c.id) for c in candidates)
+        for s in candidates:
+            if s.id not in seen:
+                seen.add(s.id)
+                scenes.append(s)
+    if not scenes:
+        return
+
+    # Mark all pending/error scenes as generating upfront
+    for s in scenes:
+        if s.status in ('pending', 'error', 'done', 'generating'):
+            # Skip 'done' scenes only if they already have a video; otherwise re-run
+            if _scene_done(s):
                 continue
-            try:
-                s.error_message = f'Phase 4/5: Voiceover {s.order}'
+            s.status = 'generating'
+            s.render_progress = 0
+            s.error_message = 'In Warteschlange'
+            s.save(update_fields=['status', 'render_progress', 'error_message'])
+
+    # ---------- Phase A: all FLUX frames (FLUX stays hot in VRAM) ----------
+    for s in scenes:
+        s.refresh_from_db()
+        if _scene_done(s):
+            continue
+        try:
+            if s.start_frame_prompt and s.start_frame_prompt.strip() and not s.start_frame:
+                s.error_message = f'Phase 1/4: Frame {s.order}'
+                s.save(update_fields=['error_message'])
+                try:
+                    _pipeline_generate_frame(s, 'start')
+                except Exception as e:
+                    logger.warning(f"Batched: start-frame failed for {s.id}: {e}")
+                s.refresh_from_db()
+            if s.end_frame_prompt and s.end_frame_prompt.strip() and not s.end_frame:
+                s.error_message = f'Phase 1/4: End-Frame {s.order}'
                 s.save(update_fields=['error_message'])
-                _pipeline_generate_voiceover(s)
+                try:
+                    _pipeline_generate_frame(s, 'end')
+                except Exception as e:
+                    logger.warning(f"Batched: end-frame failed for {s.id}: {e}")
                 s.refresh_from_db()
-            except Exception as e:
-                logger.warning(f"Batched Phase D voiceover {s.id}: {e}")
+        except Exception as e:
+            logger.error(f"Batched Phase A frame {s.id}: {e}")
+    gpu_scheduler.heartbeat(holder)
 
-        # ---------- Phase E: project-level music (one track for all scenes) ----------
-        project.refresh_from_db()
-        if (project.music_prompt and project.music_prompt.strip()) or project.music_genre:
-            try:
-                total_dur = sum(s.duration for s in scenes if s.status == 'done')
-                if total_dur > 0:
-                    for s in scenes:
-                        if s.status == 'done':
-                            s.error_message = 'Phase 5/5: Projekt-Musik'
-                            s.save(update_fields=['error_message'])
-                    _pipeline_generate_project_music(project, total_dur)
-            except Exception as e:
-                logger.warning(f"Batched Phase E project music: {e}")
+    # Unload FLUX from VRAM exactly ONCE before switching to Hunyuan
+    _comfyui_free('after Phase A, FLUX→Hunyuan switch')
 
-        # Clear transient error messages on success
-        for s in scenes:
+    # ---------- Phase B: all Hunyuan video renders (Hunyuan stays hot) ----------
+    for s in scenes:
+        s.refresh_from_db()
+        if _scene_done(s):
+            continue
+        try:
+            s.error_message = f'Phase 2/4: Video {s.order}'
+            s.save(update_fields=['error_message'])
+            render_scene_task(str(s.id))
             s.refresh_from_db()
-            if s.status == 'done' and s.error_message and 'Fehler' not in s.error_message:
-                s.error_message = ''
-                s.save(update_fields=['error_message'])
+        except Exception as e:
+            logger.error(f"Batched Phase B video {s.id}: {e}")
+            s.status = 'error'
+            s.error_message = f'Batch-Render: {str(e)[:400]}'
+            s.save(update_fields=['status', 'error_message'])
+        gpu_scheduler.heartbeat(holder)
+
+    # ---------- Phase C: text overlays (CPU, ffmpeg) ----------
+    for s in scenes:
+        s.refresh_from_db()
+        if s.status != 'done':
+            continue
+        if not (s.text_overlay and s.text_overlay.strip()):
+            continue
+        try:
+            s.error_message = f'Phase 3/4: Overlay {s.order}'
+            s.save(update_fields=['error_message'])
+            apply_text_overlay_task(str(s.id))
+            s.refresh_from_db()
+        except Exception as e:
+            logger.warning(f"Batched Phase C overlay {s.id}: {e}")
 
-        logger.info(f"Batched pipeline done for project {project_id}")
-    except Exception as e:
-        logger.error(f"Batched pipeline error: {e}")
-    finally:
-        _release_gpu_lock(holder)
+    # ---------- Phase D: voiceovers (XTTS/Piper) ----------
+    # Free ComfyUI VRAM for XTTS/MusicGen
+    _comfyui_free('before Phase D, XTTS/MusicGen')
 
+    for s in scenes:
+        s.refresh_from_db()
+        if s.status != 'done':
+            continue
+        if not (s.voiceover_text and s.voiceover_text.strip()):
+            continue
+        try:
+            s.error_message = f'Phase 4/5: Voiceover {s.order}'
+            s.save(update_fields=['error_message'])
+            _pipeline_generate_voiceover(s)
+            s.refresh_from_db()
+        except Exception as e:
+            logger.warning(f"Batched Phase D voiceover {s.id}: {e}")
+    gpu_scheduler.heartbeat(holder)
 
-def _acquire_gpu_lock(holder, ttl=5400):
-    """Try to acquire a global GPU pipeline lock via Redis SETNX.
-    Returns True if acquired. The lock has a TTL so a crashed task doesn't
-    permanently block the queue. Callers MUST release via _release_gpu_lock."""
-    try:
-        import redis as _redis
-        from django.conf import settings as _settings
-        r = _redis.Redis.from_url(getattr(_settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0'))
-        return bool(r.set('workloom:gpu_pipeline_lock', holder, nx=True, ex=ttl))
-    except Exception as e:
-        logger.warning(f"gpu_lock acquire failed: {e}")
-        return True  # fail-open: don't block rendering if Redis is down
+    # ---------- Phase E: music (MusicGen stays loaded for the whole group) ----------
+    for project in projects:
+        project.refresh_from_db()
+        if not ((project.music_prompt and project.music_prompt.strip()) or project.music_genre):
+            continue
+        project_scenes = [s for s in scenes if s.project_id == project.id]
+        try:
+            total_dur = sum(s.duration for s in project_scenes if s.status == 'done')
+            if total_dur > 0:
+                for s in project_scenes:
+                    if s.status == 'done':
+                        s.error_message = 'Phase 5/5: Projekt-Musik'
+                        s.save(update_fields=['error_message'])
+                _pipeline_generate_project_music(project, total_dur)
+        except Exception as e:
+            logger.warning(f"Batched Phase E project music {project.id}: {e}")
+    for s in scenes:
+        if str(s.id) not in single_scene_ids or s.status != 'done':
+            continue
+        if (s.music_prompt and s.music_prompt.strip()) or s.music_genre:
+            try:
+                s.error_message = 'Phase 5/5: Musik'
+                s.save(update_fields=['error_message'])
+                _pipeline_generate_music(s)
+            except Exception as e:
+                logger.warning(f"Batched Phase E music {s.id}: {e}")
 
+    # Clear transient error messages on success
+    for s in scenes:
+        s.refresh_from_db()
+        if s.status == 'done' and s.error_message and 'Fehler' not in s.error_message:
+            s.error_message = ''
+            s.save(update_fields=['error_message'])
 
-def _release_gpu_lock(holder):
-    try:
-        import redis as _redis
-        from django.conf import settings as _settings
-        r = _redis.Redis.from_url(getattr(_settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0'))
-        current = r.get('workloom:gpu_pipeline_lock')
-        if current and current.decode('utf-8', 'ignore') == holder:
-            r.delete('workloom:gpu_pipeline_lock')
-    except Exception as e:
-        logger.warning(f"gpu_lock release failed: {e}")
+    logger.info(f"Batched pipeline done: {len(projects)} project(s), {len(scenes)} scene(s)")
 
 
-@shared_task(bind=True, max_retries=None)
-def render_scene_pipeline_task(self, scene_id):
+def _run_scene_pipeline(scene_id):
     """Full pipeline for a SINGLE scene: generate frames -> render video -> voiceover.
-    Serialized via Redis lock so parallel clicks do not all hit the GPU at once."""
+    Runs while the caller holds the GPU (see run_gpu_jobs_task)."""
     from .models import Scene
-    import time
-
-    # Acquire global GPU pipeline lock. If another task holds it, requeue in 30s.
-    holder = f"scene:{scene_id}:{self.request.id}"
-    if not _acquire_gpu_lock(holder):
-        logger.info(f"Pipeline: GPU busy, requeue scene {scene_id} in 30s")
-        raise self.retry(countdown=30, exc=Exception("GPU busy"))
 
     try:
         scene = Scene.objects.get(id=scene_id)
     except Scene.DoesNotExist:
         logger.error(f"Pipeline: Scene {scene_id} not found")
-        _release_gpu_lock(holder)
         return
 
-    project = scene.project
     scene.status = "generating"
     scene.render_progress = 0
     scene.error_message = ""
@@ -1209,7 +1290,7 @@ def render_scene_pipeline_task(self, scene_id):
             scene.save(update_fields=["error_message"])
             _pipeline_generate_frame(scene, "start")
             scene.refresh_from_db()
-        
+
         # Step 2: Generate end frame if prompt given and no frame exists
         if scene.end_frame_prompt and scene.end_frame_prompt.strip() and not scene.end_frame:
             scene.error_message = "Generiere End-Frame..."
@@ -1219,29 +1300,22 @@ def render_scene_pipeline_task(self, scene_id):
             except Exception as e:
                 logger.warning(f"End-frame generation failed (non-critical): {e}")
             scene.refresh_from_db()
-        
+
         # Between FLUX frame generation and Hunyuan video render, force ComfyUI
         # to unload cached models from VRAM. FLUX (~17 GB) + Hunyuan (~8 GB) +
         # encoders (~9 GB) don't coexist well on a single A40 — without explicit
         # free the next scene hit 2-3× slower renders due to VRAM shuffling.
-        try:
-            url = _get_runpod_comfyui_url()
-            if url:
-                import requests as _req
-                _req.post(f'{url}/free', json={"unload_models": True, "free_memory": True}, timeout=15)
-                logger.info(f"ComfyUI /free called before Hunyuan render for scene {scene_id}")
-        except Exception as _e:
-            logger.warning(f"ComfyUI /free failed (non-critical): {_e}")
+        _comfyui_free(f"before Hunyuan render for scene {scene_id}")
 
         # Step 3: Render the video
         scene.error_message = "Rendere Video..."
         scene.save(update_fields=["error_message"])
         render_scene_task(scene_id)
         scene.refresh_from_db()
-        
+
         if scene.status != "done":
             return  # Render failed, error already set
-        
+
         # Step 4: Generate voiceover if text is set
         if scene.voiceover_text and scene.voiceover_text.strip():
             scene.error_message = "Generiere Voiceover..."
@@ -1274,14 +1348,12 @@ def render_scene_pipeline_task(self, scene_id):
 
         scene.error_message = ""
         scene.save(update_fields=["error_message"])
-        
+
     except Exception as e:
         logger.error(f"Pipeline error for scene {scene_id}: {e}")
         scene.status = "error"
         scene.error_message = f"Pipeline: {str(e)[:500]}"
         scene.save(update_fields=["status", "error_message"])
-    finally:
-        _release_gpu_lock(holder)
 
 
 FRAME_STYLE_DEFS = {
@@ -1520,7 +1592,7 @@ def _pipeline_flux_frame(frame, prompt, character_path=None, other_ref_paths=Non
                                      guidance=guidance, pulid_weight=pulid_w)
     
     prompt_id = _submit_workflow(url, workflow)
-    result = _poll_status(url, prompt_id, timeout=300, scene_id=None)
+    result = _wait_for_prompt(url, prompt_id, timeout=300)
     if result.get("status") != "done":
         raise Exception(f"FLUX Render fehlgeschlagen: {result}")
     
@@ -1695,19 +1767,8 @@ def _mux_all_audio_into_video(scene):
 
 def _probe_video_dims(path):
     """Return (width, height) of the video, or (1920, 1080) on failure."""
-    import subprocess, json
-    try:
-        r = subprocess.run(
-            ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
-             '-show_entries', 'stream=width,height', '-of', 'json', path],
-            capture_output=True, text=True, timeout=10)
-        if r.returncode == 0:
-            d = json.loads(r.stdout)
-            s = d.get('streams', [{}])[0]
-            return int(s.get('width', 1920)), int(s.get('height', 1080))
-    except Exception:
-        pass
-    return 1920, 1080
+    from core.media_probe import probe_dims
+    return probe_dims(path, default=(1920, 1080))
 
 
 def _build_drawtext_filter(text, pos_v, pos_h, style, video_width=1920, video_height=1080):
@@ -1920,11 +1981,9 @@ def apply_text_overlay_task(scene_id):
         out_path = tmp.name
 
     try:
-        # Probe audio to decide whether to copy an audio stream
-        src_has_audio = bool(subprocess.run(
-            ['ffprobe', '-v', 'error', '-select_streams', 'a',
-             '-show_entries', 'stream=codec_type', '-of', 'csv=p=0', source_path],
-            capture_output=True, text=True, timeout=10).stdout.strip())
+        # Probe audio to decide whether to copy an audio stream (cache hit after _probe_video_dims)
+        from core.media_probe import probe as _probe_media
+        src_has_audio = bool((_probe_media(source_path) or {}).get('has_audio'))
 
         cmd = ['ffmpeg', '-y', '-i', source_path, '-vf', filter_str,
                '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '20']
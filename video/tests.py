@@ -1,3 +1,71 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import comfyui_client
+from .comfyui_client import ComfyUIWatcher
+
+
+class ComfyUIWatcherEventOrderTests(SimpleTestCase):
+    """Replays the websocket events of one prompt in ComfyUI's order."""
+
+    prompt_id = 'p-1'
+    outputs = {'9': {'images': [{'filename': 'out.png'}]}}
+
+    def setUp(self):
+        self.watcher = ComfyUIWatcher('http://comfy.test')
+        self.history = {}
+
+    def _history_get(self, url, timeout=None):
+        response = mock.Mock()
+        response.json.return_value = dict(self.history)
+        return response
+
+    def _send(self, kind, **data):
+        self.watcher._handle(json.dumps({'type': kind, 'data': dict(data, prompt_id=self.prompt_id)}))
+
+    def _history_written(self):
+        self.history[self.prompt_id] = {'status': {'completed': True}, 'outputs': self.outputs}
+
+    def test_completes_on_final_executing_after_history_is_written(self):
+        with mock.patch.object(comfyui_client.requests, 'get', side_effect=self._history_get):
+            job = self.watcher.watch(self.prompt_id)
+            self._send('execution_start')
+            self._send('executing', node='3')
+            self._send('progress', node='3', value=10, max=20)
+            self._send('executed', node='9')
+            self._send('execution_success')
+            self.assertFalse(job.done)
+            self._history_written()
+            self._send('executing', node=None)
+
+        self.assertTrue(job.done)
+        self.assertEqual(job.result, {'status': 'done', 'outputs': self.outputs})
+        self.assertEqual(job.progress, 100)
+
+    def test_retries_history_lookup_before_giving_up(self):
+        calls = []
+
+        def history_get(url, timeout=None):
+            calls.append(url)
+            if len(calls) == 2:
+                self._history_written()
+            return self._history_get(url, timeout)
+
+        with mock.patch.object(comfyui_client.requests, 'get', side_effect=history_get), \
+                mock.patch.object(comfyui_client.time, 'sleep'):
+            job = self.watcher.watch(self.prompt_id)
+            self._send('execution_start')
+            self._send('executing', node=None)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(job.result['status'], 'done')
+
+    def test_error_event_completes_without_history(self):
+        with mock.patch.object(comfyui_client.requests, 'get') as get:
+            job = self.watcher.watch(self.prompt_id)
+            self._send('execution_error', exception_message='CUDA out of memory')
+
+        get.assert_not_called()
+        self.assertEqual(job.result, {'status': 'error', 'message': 'CUDA out of memory'})
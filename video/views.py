@@ -494,7 +494,7 @@ def frame_generate_flux(request, pk):
     """Generate a character frame using FLUX + PuLID on RunPod ComfyUI."""
     import time, uuid
     import requests as _requests
-    from video.tasks import _ensure_runpod_running, _upload_image_to_comfyui, _submit_workflow, _poll_status
+    from video.tasks import _ensure_runpod_running, _upload_image_to_comfyui, _submit_workflow, _wait_for_prompt
 
     project = get_object_or_404(VideoProject, pk=pk, user=request.user)
     prompt = request.POST.get('prompt', '').strip()
@@ -569,7 +569,7 @@ def frame_generate_flux(request, pk):
 
         # Submit and poll
         prompt_id = _submit_workflow(url, workflow)
-        result = _poll_status(url, prompt_id, timeout=300, scene_id=None)
+        result = _wait_for_prompt(url, prompt_id, timeout=300)
 
         if result.get("status") != "done":
             raise Exception(f"Render failed: {result}")
@@ -1035,7 +1035,7 @@ def _generate_frame_flux(frame, prompt, character_path=None, other_ref_paths=Non
     """Generate frame using FLUX with optional PuLID (character) + Redux (products/stills)."""
     import random
     import requests as _requests
-    from video.tasks import _ensure_runpod_running, _upload_image_to_comfyui, _submit_workflow, _poll_status
+    from video.tasks import _ensure_runpod_running, _upload_image_to_comfyui, _submit_workflow, _wait_for_prompt
 
     url = _ensure_runpod_running()
     if not url:
@@ -1093,7 +1093,7 @@ def _generate_frame_flux(frame, prompt, character_path=None, other_ref_paths=Non
                                      guidance=flux_guidance, pulid_weight=pulid_cfg)
 
     prompt_id = _submit_workflow(url, workflow)
-    result = _poll_status(url, prompt_id, timeout=300, scene_id=None)
+    result = _wait_for_prompt(url, prompt_id, timeout=300)
     if result.get("status") != "done":
         raise Exception(f"FLUX Render fehlgeschlagen: {result}")
 
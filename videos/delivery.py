@@ -0,0 +1,317 @@
+"""
+Video delivery
+==============
+Django authorizes, the web server moves the bytes.
+
+With VIDEO_ACCEL_REDIRECT set (e.g. '/protected-media/'), serve_file() returns
+an empty response carrying X-Accel-Redirect; nginx then streams the file from
+an `internal` location with sendfile and answers Range/If-Range itself (see
+docs/setup/NGINX_SETUP_GUIDE.md). No Python worker stays busy for the transfer.
+
+Without it, the Python fallback:
+    - answers exactly the requested byte ranges (single range as 206, several
+      as multipart/byteranges, unsatisfiable as 416)
+    - honours If-Range, If-None-Match and If-Modified-Since (ETag in nginx
+      format, so switching between both paths keeps client caches valid)
+    - passes full and open-ended ranges ("bytes=N-", what video players send)
+      as FileResponse, so the WSGI server's wsgi.file_wrapper can use
+      os.sendfile (gunicorn does)
+
+Access tracking is buffered per process (access_counter) and written as one
+UPDATE per flush instead of a save() per request.
+"""
+
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024       # read size for the Python fallback
+MAX_RANGES = 16               # more ranges in one request -> serve the whole file
+CAN_SHARE_TTL = 300           # seconds the owner's sharing status is cached
+CAN_SHARE_KEY = 'videos:can_share:{}'
+ACCESS_FLUSH_INTERVAL = 60    # seconds between access count flushes
+ACCESS_FLUSH_THRESHOLD = 500  # buffered hits that force an earlier flush
+
+_RANGE_SPEC_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header, size):
+    """
+    Parse a Range header into sorted, merged (start, end) tuples with inclusive
+    ends. Returns None if the header is to be ignored (missing, malformed,
+    other unit, too many ranges) and raises RangeNotSatisfiable if no range
+    overlaps the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    parts = spec.split(',')
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        match = _RANGE_SPEC_RE.match(part)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0 or size == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue
+        end = min(int(last), size - 1) if last else size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        prev_start, prev_end = merged[-1]
+        if start <= prev_end + 1:
+            merged[-1] = (prev_start, max(prev_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def file_etag(stat):
+    """ETag as nginx builds it ("<mtime hex>-<size hex>")."""
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _if_range_allows(request, etag, last_modified):
+    """True if the Range header applies (no If-Range, or it still matches)."""
+    value = request.META.get('HTTP_IF_RANGE', '').strip()
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith('W/'):
+        # Strong comparison only; a weak ETag never matches
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _read_range(path, start, end):
+    """Yield exactly the bytes start..end (inclusive) of path."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _file_response(path, start, content_type, status):
+    """FileResponse from start to EOF - eligible for wsgi.file_wrapper/sendfile."""
+    f = open(path, 'rb')
+    f.seek(start)
+    response = FileResponse(f, content_type=content_type, status=status)
+    response.block_size = CHUNK_SIZE
+    return response
+
+
+def _multipart_response(path, ranges, size, content_type):
+    boundary = uuid.uuid4().hex
+    heads = [
+        (f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+         f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('ascii')
+        for start, end in ranges
+    ]
+    tail = f'\r\n--{boundary}--\r\n'.encode('ascii')
+
+    def body():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            yield from _read_range(path, start, end)
+        yield tail
+
+    length = sum(len(h) for h in heads) + sum(end - start + 1 for start, end in ranges) + len(tail)
+    response = StreamingHttpResponse(body(), status=206,
+                                     content_type=f'multipart/byteranges; boundary={boundary}')
+    response['Content-Length'] = str(length)
+    return response
+
+
+def _content_response(request, path, size, etag, last_modified, content_type):
+    ranges = None
+    if _if_range_allows(request, etag, last_modified):
+        try:
+            ranges = parse_range_header(request.META.get('HTTP_RANGE', ''), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if not ranges:
+        return _file_response(path, 0, content_type, status=200)
+    if len(ranges) > 1:
+        return _multipart_response(path, ranges, size, content_type)
+
+    start, end = ranges[0]
+    if end == size - 1:
+        response = _file_response(path, start, content_type, status=206)
+    else:
+        response = StreamingHttpResponse(_read_range(path, start, end), status=206,
+                                         content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _accel_redirect(path, content_type):
+    """X-Accel-Redirect response for files below MEDIA_ROOT, else None."""
+    prefix = getattr(settings, 'VIDEO_ACCEL_REDIRECT', '')
+    if not prefix:
+        return None
+    relative = os.path.relpath(os.path.realpath(path), os.path.realpath(settings.MEDIA_ROOT))
+    if relative.startswith(os.pardir):
+        return None
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative.replace(os.sep, '/'))
+    return response
+
+
+def serve_file(request, path, content_type):
+    """
+    Response for a local file: X-Accel-Redirect if configured, otherwise the
+    Python fallback with exact Range handling.
+    """
+    response = _accel_redirect(path, content_type)
+    if response is not None:
+        return response
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('Video file not found')
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    # 304 (If-None-Match / If-Modified-Since) or 412 (If-Match / If-Unmodified-Since)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _content_response(request, path, size, etag, last_modified, content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def is_initial_request(request):
+    """True for the first request of a playback (no Range or starting at byte 0)."""
+    range_header = request.META.get('HTTP_RANGE', '').replace(' ', '')
+    return not range_header or range_header.startswith('bytes=0-')
+
+
+# ------------------------------------------------------------------
+# Sharing restrictions
+# ------------------------------------------------------------------
+
+def owner_can_share(user_id):
+    """UserStorage.can_share() of the video owner, cached per owner."""
+    from .models import UserStorage
+
+    key = CAN_SHARE_KEY.format(user_id)
+    allowed = cache.get(key)
+    if allowed is None:
+        storage = UserStorage.objects.filter(user_id=user_id).first()
+        # No storage record yet means nothing is used, so sharing is allowed
+        allowed = storage.can_share() if storage else True
+        cache.set(key, allowed, CAN_SHARE_TTL)
+    return allowed
+
+
+def invalidate_owner_can_share(user_id):
+    cache.delete(CAN_SHARE_KEY.format(user_id))
+
+
+# ------------------------------------------------------------------
+# Access tracking
+# ------------------------------------------------------------------
+
+class AccessCounter:
+    """
+    Buffers Video.access_count increments in memory and writes them with
+    F() updates - one UPDATE per distinct count per flush. Hits of the last
+    interval are lost if the process dies, which is fine for archiving hints.
+    """
+
+    def __init__(self, interval=ACCESS_FLUSH_INTERVAL, threshold=ACCESS_FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def hit(self, video_id):
+        with self._lock:
+            self._pending[video_id] += 1
+            self._buffered += 1
+            due = (self._buffered >= self.threshold
+                   or time.monotonic() - self._last_flush >= self.interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        from .models import Video
+
+        by_count = defaultdict(list)
+        for video_id, count in pending.items():
+            by_count[count].append(video_id)
+        now = timezone.now()
+        try:
+            for count, video_ids in by_count.items():
+                Video.objects.filter(pk__in=video_ids).update(
+                    access_count=F('access_count') + count,
+                    last_accessed=now,
+                )
+        except Exception as e:
+            logger.warning(f"Could not flush video access counts: {e}")
+
+
+access_counter = AccessCounter()
+atexit.register(access_counter.flush)
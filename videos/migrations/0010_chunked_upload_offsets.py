@@ -0,0 +1,29 @@
+# Generated manually for offset-based parallel chunk uploads
+
+from django.db import migrations, models
+import videos.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_add_subtitle_words_json'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Wird hochgeladen'), ('processing', 'Wird verarbeitet'), ('complete', 'Abgeschlossen'), ('failed', 'Fehlgeschlagen'), ('expired', 'Abgelaufen')], default='uploading', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='uploadchunk',
+            name='checksum',
+            field=models.CharField(blank=True, help_text='CRC32 (hex) of the received chunk', max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='uploadchunk',
+            name='chunk_file',
+            field=models.FileField(blank=True, upload_to=videos.models.chunked_upload_path),
+        ),
+    ]
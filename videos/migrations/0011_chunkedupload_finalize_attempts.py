@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_chunked_upload_offsets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='finalize_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -426,6 +426,7 @@ class ChunkedUpload(models.Model):
 
     STATUS_CHOICES = [
         ('uploading', 'Wird hochgeladen'),
+        ('processing', 'Wird verarbeitet'),
         ('complete', 'Abgeschlossen'),
         ('failed', 'Fehlgeschlagen'),
         ('expired', 'Abgelaufen'),
@@ -449,6 +450,7 @@ class ChunkedUpload(models.Model):
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
     error_message = models.TextField(blank=True)
+    finalize_attempts = models.PositiveSmallIntegerField(default=0)  # Started finalize runs
 
     # Resulting video (after completion)
     video = models.OneToOneField(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='chunked_upload')
@@ -474,7 +476,18 @@ class ChunkedUpload(models.Model):
     def get_chunk_dir(self):
         """Get directory path for chunks"""
         from django.conf import settings
-        return os.path.join(settings.MEDIA_ROOT, 'chunks', str(self.user.id), str(self.upload_id))
+        return os.path.join(settings.MEDIA_ROOT, 'chunks', str(self.user_id), str(self.upload_id))
+
+    def get_part_path(self):
+        """File the chunks are written into at their offsets (see core.uploads)"""
+        return os.path.join(self.get_chunk_dir(), 'upload.part')
+
+    def get_chunk_range(self, chunk_number):
+        """(offset, size) of a chunk, or None if chunk_number is out of range"""
+        if not 0 <= chunk_number < self.total_chunks:
+            return None
+        offset = chunk_number * self.chunk_size
+        return offset, min(self.chunk_size, self.total_size - offset)
 
     def is_complete(self):
         """Check if all chunks have been received"""
@@ -505,7 +518,9 @@ class UploadChunk(models.Model):
     chunked_upload = models.ForeignKey(ChunkedUpload, on_delete=models.CASCADE, related_name='chunks')
     chunk_number = models.IntegerField()  # 0-indexed
     chunk_size = models.IntegerField(default=0)  # Size of this chunk in bytes
-    chunk_file = models.FileField(upload_to=chunked_upload_path)
+    checksum = models.CharField(max_length=8, blank=True, help_text='CRC32 (hex) of the received chunk')
+    # Legacy: chunks used to be stored as separate files, now written into upload.part
+    chunk_file = models.FileField(upload_to=chunked_upload_path, blank=True)
 
     received_at = models.DateTimeField(auto_now_add=True)
 
@@ -112,6 +112,16 @@ def update_storage_on_video_save(sender, instance, created, **kwargs):
         logger.error(f"Failed to update storage for user {instance.user.username}: {str(e)}")
 
 
+@receiver(post_save, sender=UserStorage)
+@receiver(post_delete, sender=UserStorage)
+def invalidate_sharing_status(sender, instance, **kwargs):
+    """
+    Drop the cached sharing status used by the public stream view
+    """
+    from .delivery import invalidate_owner_can_share
+    invalidate_owner_can_share(instance.user_id)
+
+
 def reset_user_to_free_plan(user):
     """
     Reset user to free 100MB plan (used when subscription ends)
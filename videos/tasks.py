@@ -0,0 +1,133 @@
+"""
+Celery tasks for the videos app
+"""
+import logging
+import os
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.uploads import finalize_part_file
+
+logger = logging.getLogger(__name__)
+
+# finalize_chunked_upload is killed after 30 minutes, so a 'processing'
+# upload untouched for longer than this has no finalize run in progress
+FINALIZE_STALE_AFTER = timedelta(minutes=45)
+FINALIZE_MAX_ATTEMPTS = 3
+
+
+@shared_task(time_limit=1800, soft_time_limit=1740)
+def finalize_chunked_upload(chunked_upload_id):
+    """
+    Turn a fully received chunked upload into a Video: move upload.part into
+    place (rename, no copy), create the Video, update storage, probe duration
+    and generate the thumbnail. Runs outside the request so large uploads do
+    not block a web worker; clients poll api_chunked_upload_status.
+
+    Safe to run again after a worker crash: an already moved file and an
+    already created Video are picked up instead of failing or duplicating.
+    Uploads left in 'processing' are re-dispatched by recover_stale_uploads.
+    """
+    from .models import ChunkedUpload, Video
+    from .subscription_sync import StorageSubscriptionSync
+    from .utils import generate_video_thumbnail, get_video_duration
+
+    try:
+        chunked_upload = ChunkedUpload.objects.select_related('user').get(pk=chunked_upload_id)
+    except ChunkedUpload.DoesNotExist:
+        logger.warning(f"[Chunked Upload] {chunked_upload_id} no longer exists")
+        return None
+
+    # Count the run and mark the upload as active; anything but 'processing'
+    # means it was already finalized (e.g. task redelivered after a crash)
+    started = ChunkedUpload.objects.filter(pk=chunked_upload.pk, status='processing').update(
+        finalize_attempts=F('finalize_attempts') + 1, updated_at=timezone.now())
+    if not started:
+        return chunked_upload.video_id
+    chunked_upload.finalize_attempts += 1
+
+    user = chunked_upload.user
+    try:
+        ext = os.path.splitext(chunked_upload.filename)[1] or '.mp4'
+        final_filename = f"{chunked_upload.upload_id}{ext}"
+        final_path = os.path.join(settings.MEDIA_ROOT, 'videos', str(user.id), final_filename)
+
+        part_path = chunked_upload.get_part_path()
+        if os.path.exists(part_path) or not os.path.exists(final_path):
+            actual_size = finalize_part_file(part_path, final_path, chunked_upload.total_size)
+        else:
+            # Redelivered after the rename
+            actual_size = os.path.getsize(final_path)
+
+        video = chunked_upload.video
+        if video is None:
+            # Create video record
+            video = Video(
+                user=user,
+                title=chunked_upload.title,
+                description=chunked_upload.description,
+                file_size=actual_size
+            )
+            video.video_file.name = f'videos/{user.id}/{final_filename}'
+            video.save()
+            # Link right away so a redelivered task does not create a second Video
+            chunked_upload.video = video
+            chunked_upload.save(update_fields=['video'])
+
+            # Update user storage
+            user_storage = StorageSubscriptionSync.sync_user_storage(user)
+            user_storage.used_storage += actual_size
+            user_storage.save()
+
+        # Generate thumbnail (schnell dank optimiertem ffmpeg)
+        try:
+            generate_video_thumbnail(video)
+            video.duration = get_video_duration(video.video_file.path)
+            video.save()
+        except Exception as e:
+            logger.warning(f"[Chunked Upload] Thumbnail generation failed: {e}")
+
+        chunked_upload.mark_complete()
+        chunked_upload.cleanup_chunks()
+
+        logger.info(f"[Chunked Upload] Complete! Video ID: {video.id}")
+        return video.id
+
+    except Exception as e:
+        logger.error(f"[Chunked Upload] Finalize failed: {e}")
+        chunked_upload.mark_failed(str(e))
+        return None
+
+
+@shared_task
+def recover_stale_uploads():
+    """
+    Re-dispatch finalizing for uploads stuck in 'processing' (worker crash,
+    lost task, hard time limit). Uploads whose finalize run already started
+    FINALIZE_MAX_ATTEMPTS times are marked failed instead. A re-dispatched
+    task for an upload that is merely still queued exits early once the
+    first run has finalized it.
+    """
+    from .models import ChunkedUpload
+
+    now = timezone.now()
+    stale = ChunkedUpload.objects.filter(status='processing', updated_at__lt=now - FINALIZE_STALE_AFTER)
+    redispatched = failed = 0
+    for upload in stale:
+        if upload.finalize_attempts >= FINALIZE_MAX_ATTEMPTS:
+            upload.mark_failed(f'Finalizing did not finish after {upload.finalize_attempts} attempts')
+            failed += 1
+            continue
+        # Touch updated_at so the next run does not dispatch it again right away
+        claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='processing',
+                                               updated_at=upload.updated_at).update(updated_at=now)
+        if claimed:
+            finalize_chunked_upload.delay(upload.pk)
+            redispatched += 1
+    if redispatched or failed:
+        logger.warning(f"[Chunked Upload] Stale finalizing: {redispatched} re-dispatched, {failed} failed")
+    return {'redispatched': redispatched, 'failed': failed}
@@ -1,13 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, Http404, StreamingHttpResponse, JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse, Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.http import require_POST
 from .models import Video, UserStorage, ChunkedUpload, UploadChunk
 from .forms import VideoUploadForm
 from .utils import generate_video_thumbnail, get_video_duration
+from core.uploads import create_part_file, install_checksum_handler, uploaded_checksum, write_chunk
 # Tasks removed - direct video hosting without conversion
 import os
 import logging
@@ -15,9 +16,9 @@ import mimetypes
 import requests
 import json
 import math
-from wsgiref.util import FileWrapper
 from django.core.files.base import ContentFile
-from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from datetime import timedelta
 from django.utils import timezone
 
@@ -206,63 +207,35 @@ def video_embed(request, unique_id):
 
 def video_stream(request, unique_id):
     """Stream video file - supports external embedding (Shopify, etc.)"""
-    video = get_object_or_404(Video, unique_id=unique_id)
+    from .delivery import access_counter, is_initial_request, owner_can_share, serve_file
+
+    video = get_object_or_404(Video.objects.only('id', 'user_id', 'video_file'), unique_id=unique_id)
 
     # Check if the video owner has sharing restrictions
     try:
-        user_storage, created = UserStorage.objects.get_or_create(user=video.user)
-        if not user_storage.can_share():
+        if not owner_can_share(video.user_id):
             return HttpResponse('Video nicht verfügbar', status=403)
     except Exception:
         pass  # If storage check fails, allow access
 
-    # Use the uploaded video file directly
-    video_file = video.video_file
-    path = video_file.path
-
-    # Get file size and content type
-    file_size = os.path.getsize(path)
+    if not video.video_file:
+        raise Http404('Video file not found')
+    path = video.video_file.path
     content_type, _ = mimetypes.guess_type(path)
     content_type = content_type or 'video/mp4'
 
-    # Handle range requests for video seeking
-    range_header = request.META.get('HTTP_RANGE', '').strip()
-    range_match = range_header.replace('bytes=', '').split('-') if range_header else None
-
-    if range_match:
-        start = int(range_match[0]) if range_match[0] else 0
-        end = int(range_match[1]) if range_match[1] else file_size - 1
-
-        # Open file and seek to start position
-        file_handle = open(path, 'rb')
-        file_handle.seek(start)
-
-        # Create response with partial content
-        response = StreamingHttpResponse(
-            FileWrapper(file_handle, 8192),
-            status=206,
-            content_type=content_type
-        )
-        response['Content-Length'] = str(end - start + 1)
-        response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
-    else:
-        # Full file response
-        response = StreamingHttpResponse(
-            FileWrapper(open(path, 'rb'), 8192),
-            content_type=content_type
-        )
-        response['Content-Length'] = str(file_size)
-
-    response['Accept-Ranges'] = 'bytes'
+    # nginx (X-Accel-Redirect) or exact range streaming, see videos/delivery.py
+    response = serve_file(request, path, content_type)
 
     # CORS headers for external embedding (Shopify, etc.)
     response['Access-Control-Allow-Origin'] = '*'
     response['Access-Control-Allow-Methods'] = 'GET, HEAD, OPTIONS'
-    response['Access-Control-Allow-Headers'] = 'Range'
-    response['Access-Control-Expose-Headers'] = 'Content-Length, Content-Range, Accept-Ranges'
+    response['Access-Control-Allow-Headers'] = 'Range, If-Range'
+    response['Access-Control-Expose-Headers'] = 'Content-Length, Content-Range, Accept-Ranges, ETag'
 
-    # Track video access
-    video.track_access()
+    # Track video access - once per playback, not per seek request
+    if is_initial_request(request) and response.status_code in (200, 206):
+        access_counter.hit(video.id)
 
     return response
 
@@ -1233,8 +1206,35 @@ def api_check_upload_status(request, video_id):
 
 
 # ==================== CHUNKED UPLOAD ====================
+# Chunks may arrive in parallel and in any order; each one is written directly
+# at its offset into upload.part (core.uploads), so there is no merge step.
+# Completion (move into place, Video record, thumbnail) runs as a Celery task,
+# clients poll api_chunked_upload_status. Browser client: static/js/chunked-upload.js
 
 CHUNK_SIZE = 5 * 1024 * 1024  # 5MB chunks (kleinere Chunks = flüssigerer Progress)
+CHUNK_PARALLEL = 3  # concurrent chunk requests per upload
+
+
+def _chunked_upload_status_data(chunked_upload):
+    return {
+        'success': True,
+        'upload_id': str(chunked_upload.upload_id),
+        'status': chunked_upload.status,
+        'filename': chunked_upload.filename,
+        'total_size': chunked_upload.total_size,
+        'uploaded_size': chunked_upload.uploaded_size,
+        'chunk_size': chunked_upload.chunk_size,
+        'chunks_received': chunked_upload.chunks_received,
+        'total_chunks': chunked_upload.total_chunks,
+        'received_chunks': list(chunked_upload.chunks.order_by('chunk_number').values_list('chunk_number', flat=True)),
+        'max_parallel': CHUNK_PARALLEL,
+        'progress': chunked_upload.get_progress_percent(),
+        'is_complete': chunked_upload.is_complete(),
+        'video_id': chunked_upload.video_id,
+        'video_title': chunked_upload.title,
+        'redirect_url': '/videos/',
+        'error_message': chunked_upload.error_message
+    }
 
 
 @login_required
@@ -1292,15 +1292,15 @@ def api_chunked_upload_init(request):
             expires_at=timezone.now() + timedelta(hours=24)  # 24 hour expiry
         )
 
-        # Create chunk directory
-        chunk_dir = chunked_upload.get_chunk_dir()
-        os.makedirs(chunk_dir, exist_ok=True)
+        # Chunks are written straight into this file at their offsets
+        create_part_file(chunked_upload.get_part_path(), total_size)
 
         return JsonResponse({
             'success': True,
             'upload_id': str(chunked_upload.upload_id),
             'chunk_size': CHUNK_SIZE,
             'total_chunks': total_chunks,
+            'max_parallel': CHUNK_PARALLEL,
             'message': f'Upload initialisiert. {total_chunks} Chunks werden erwartet.'
         })
 
@@ -1310,19 +1310,28 @@ def api_chunked_upload_init(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
 @login_required
 @require_POST
 def api_chunked_upload_chunk(request):
-    """Upload a single chunk"""
+    """Upload a single chunk - parallel and in any order"""
+    # The checksum handler has to be in place before request.POST/FILES is parsed,
+    # so CSRF is checked afterwards in the inner view
+    install_checksum_handler(request)
+    return _api_chunked_upload_chunk(request)
+
+
+@csrf_protect
+def _api_chunked_upload_chunk(request):
     try:
         upload_id = request.POST.get('upload_id')
-        chunk_number = int(request.POST.get('chunk_number', -1))
         chunk_file = request.FILES.get('chunk')
+        chunk_number = int(request.POST.get('chunk_number', -1))
 
-        if not upload_id or chunk_number < 0 or not chunk_file:
+        if not upload_id or not chunk_file or (chunk_number < 0 and not request.POST.get('offset')):
             return JsonResponse({
                 'success': False,
-                'error': 'upload_id, chunk_number und chunk sind erforderlich.'
+                'error': 'upload_id, chunk_number (oder offset) und chunk sind erforderlich.'
             }, status=400)
 
         # Get chunked upload
@@ -1338,47 +1347,74 @@ def api_chunked_upload_chunk(request):
                 'error': 'Upload nicht gefunden oder bereits abgeschlossen.'
             }, status=404)
 
-        # Check if chunk already exists
-        if UploadChunk.objects.filter(chunked_upload=chunked_upload, chunk_number=chunk_number).exists():
-            return JsonResponse({
-                'success': True,
-                'message': f'Chunk {chunk_number} bereits vorhanden.',
-                'chunks_received': chunked_upload.chunks_received,
-                'progress': chunked_upload.get_progress_percent()
-            })
+        # tus-style byte offset as an alternative to the chunk number
+        if chunk_number < 0:
+            offset = int(request.POST['offset'])
+            if offset % chunked_upload.chunk_size:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Offset muss ein Vielfaches von {chunked_upload.chunk_size} sein.'
+                }, status=400)
+            chunk_number = offset // chunked_upload.chunk_size
 
-        # Save chunk to file
-        chunk_filename = f'chunk_{chunk_number:05d}'
-        chunk_path = os.path.join(chunked_upload.get_chunk_dir(), chunk_filename)
+        chunk_range = chunked_upload.get_chunk_range(chunk_number)
+        if chunk_range is None:
+            return JsonResponse({
+                'success': False,
+                'error': f'Chunk {chunk_number} liegt außerhalb der Datei.'
+            }, status=400)
+        offset, expected_size = chunk_range
 
-        with open(chunk_path, 'wb') as f:
-            for part in chunk_file.chunks():
-                f.write(part)
+        if chunk_file.size != expected_size:
+            return JsonResponse({
+                'success': False,
+                'error': f'Chunk {chunk_number} hat {chunk_file.size} statt {expected_size} Bytes.'
+            }, status=400)
 
-        chunk_size = os.path.getsize(chunk_path)
+        checksum = uploaded_checksum(request, 'chunk')
+        client_checksum = request.POST.get('checksum', '').strip().lower()
+        if client_checksum and client_checksum != checksum:
+            return JsonResponse({
+                'success': False,
+                'error': f'Prüfsumme von Chunk {chunk_number} stimmt nicht überein.',
+                'checksum_mismatch': True
+            }, status=400)
 
-        # Create chunk record
-        UploadChunk.objects.create(
-            chunked_upload=chunked_upload,
-            chunk_number=chunk_number,
-            chunk_size=chunk_size,
-            chunk_file=f'chunks/{request.user.id}/{upload_id}/{chunk_filename}'
-        )
+        # Check if chunk already exists
+        if not UploadChunk.objects.filter(chunked_upload=chunked_upload, chunk_number=chunk_number).exists():
+            write_chunk(chunked_upload.get_part_path(), offset, chunk_file)
+            try:
+                with transaction.atomic():
+                    UploadChunk.objects.create(
+                        chunked_upload=chunked_upload,
+                        chunk_number=chunk_number,
+                        chunk_size=expected_size,
+                        checksum=checksum
+                    )
+            except IntegrityError:
+                pass  # Parallel retry of the same chunk - same bytes at the same offset
+            else:
+                # Atomic counters - several chunks of one upload arrive at the same time
+                ChunkedUpload.objects.filter(pk=chunked_upload.pk).update(
+                    chunks_received=F('chunks_received') + 1,
+                    uploaded_size=F('uploaded_size') + expected_size
+                )
 
-        # Update progress
-        chunked_upload.chunks_received += 1
-        chunked_upload.uploaded_size += chunk_size
-        chunked_upload.save()
+        chunked_upload.refresh_from_db(fields=['chunks_received', 'uploaded_size'])
 
         return JsonResponse({
             'success': True,
             'chunk_number': chunk_number,
+            'offset': offset,
+            'checksum': checksum,
             'chunks_received': chunked_upload.chunks_received,
             'total_chunks': chunked_upload.total_chunks,
             'progress': chunked_upload.get_progress_percent(),
             'is_complete': chunked_upload.is_complete()
         })
 
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Ungültige Chunk-Nummer oder Offset.'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -1386,8 +1422,8 @@ def api_chunked_upload_chunk(request):
 @login_required
 @require_POST
 def api_chunked_upload_complete(request):
-    """Complete chunked upload and merge chunks into final video"""
-    from .subscription_sync import StorageSubscriptionSync
+    """Complete chunked upload - finalizing runs in the background"""
+    from .tasks import finalize_chunked_upload
 
     logger = logging.getLogger(__name__)
 
@@ -1413,96 +1449,39 @@ def api_chunked_upload_complete(request):
                 'error': 'Upload nicht gefunden.'
             }, status=404)
 
-        # Check if all chunks received
-        if not chunked_upload.is_complete():
-            return JsonResponse({
-                'success': False,
-                'error': f'Nicht alle Chunks empfangen. {chunked_upload.chunks_received}/{chunked_upload.total_chunks}'
-            }, status=400)
-
-        # Merge chunks into final file
-        try:
-            chunk_dir = chunked_upload.get_chunk_dir()
-            ext = os.path.splitext(chunked_upload.filename)[1] or '.mp4'
-            final_filename = f"{chunked_upload.upload_id}{ext}"
-            final_path = os.path.join(
-                settings.MEDIA_ROOT,
-                'videos',
-                str(request.user.id),
-                final_filename
-            )
-
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(final_path), exist_ok=True)
-
-            # Merge chunks in order
-            logger.info(f"[Chunked Upload] Merging {chunked_upload.total_chunks} chunks...")
-            with open(final_path, 'wb') as final_file:
-                for i in range(chunked_upload.total_chunks):
-                    chunk_path = os.path.join(chunk_dir, f'chunk_{i:05d}')
-                    if os.path.exists(chunk_path):
-                        with open(chunk_path, 'rb') as chunk_file:
-                            final_file.write(chunk_file.read())
-                    else:
-                        logger.error(f"[Chunked Upload] Missing chunk {i}")
-                        chunked_upload.mark_failed(f'Chunk {i} fehlt')
-                        return JsonResponse({
-                            'success': False,
-                            'error': f'Chunk {i} fehlt.'
-                        }, status=400)
-
-            # Verify file size
-            actual_size = os.path.getsize(final_path)
-            if abs(actual_size - chunked_upload.total_size) > 1024:  # Allow 1KB tolerance
-                logger.warning(f"[Chunked Upload] Size mismatch: expected {chunked_upload.total_size}, got {actual_size}")
-
-            # Create video record
-            video = Video(
-                user=request.user,
-                title=chunked_upload.title,
-                description=chunked_upload.description,
-                file_size=actual_size
-            )
-            video.video_file.name = f'videos/{request.user.id}/{final_filename}'
-            video.save()
-
-            # Update user storage
-            user_storage = StorageSubscriptionSync.sync_user_storage(request.user)
-            user_storage.used_storage += actual_size
-            user_storage.save()
-
-            # Generate thumbnail (schnell dank optimiertem ffmpeg)
-            try:
-                generate_video_thumbnail(video)
-                video.duration = get_video_duration(video.video_file.path)
-                video.save()
-            except Exception as e:
-                logger.warning(f"[Chunked Upload] Thumbnail generation failed: {e}")
-
-            # Link video to chunked upload and mark complete
-            chunked_upload.video = video
-            chunked_upload.mark_complete()
-
-            # Cleanup chunks
-            chunked_upload.cleanup_chunks()
-
-            logger.info(f"[Chunked Upload] Complete! Video ID: {video.id}")
-
-            return JsonResponse({
-                'success': True,
-                'message': 'Video erfolgreich hochgeladen!',
-                'video_id': video.id,
-                'video_title': video.title,
-                'redirect_url': '/videos/'
-            })
-
-        except Exception as e:
-            logger.error(f"[Chunked Upload] Merge failed: {e}")
-            chunked_upload.mark_failed(str(e))
-            return JsonResponse({
-                'success': False,
-                'error': f'Zusammenfügen fehlgeschlagen: {str(e)}'
-            }, status=500)
+        if chunked_upload.status == 'uploading':
+            # Check if all chunks received
+            received = set(chunked_upload.chunks.values_list('chunk_number', flat=True))
+            missing = [i for i in range(chunked_upload.total_chunks) if i not in received]
+            if missing:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Nicht alle Chunks empfangen. {len(received)}/{chunked_upload.total_chunks}',
+                    'missing_chunks': missing
+                }, status=400)
+
+            # Only the first complete call starts finalizing
+            claimed = ChunkedUpload.objects.filter(pk=chunked_upload.pk, status='uploading').update(
+                status='processing', updated_at=timezone.now())
+            if claimed:
+                logger.info(f"[Chunked Upload] {upload_id}: all {chunked_upload.total_chunks} chunks received, finalizing")
+                try:
+                    finalize_chunked_upload.delay(chunked_upload.pk)
+                except Exception:
+                    # Fallback: synchron ausführen (z.B. wenn Celery/Redis down ist)
+                    logger.exception('Celery dispatch failed — finalizing synchronously')
+                    finalize_chunked_upload.apply(args=[chunked_upload.pk])
+            chunked_upload.refresh_from_db()
+
+        data = _chunked_upload_status_data(chunked_upload)
+        if chunked_upload.status == 'failed':
+            data.update(success=False, error=f'Verarbeitung fehlgeschlagen: {chunked_upload.error_message}')
+            return JsonResponse(data, status=500)
+        if chunked_upload.status == 'processing':
+            data['message'] = 'Upload vollständig, Video wird verarbeitet...'
+            return JsonResponse(data, status=202)
+        data['message'] = 'Video erfolgreich hochgeladen!'
+        return JsonResponse(data)
 
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Ungültiges JSON'}, status=400)
@@ -1512,27 +1491,13 @@ def api_chunked_upload_complete(request):
 
 @login_required
 def api_chunked_upload_status(request, upload_id):
-    """Get status of a chunked upload"""
+    """Get status of a chunked upload (received chunks for resuming, finalizing progress)"""
     try:
         chunked_upload = ChunkedUpload.objects.get(
             upload_id=upload_id,
             user=request.user
         )
-
-        return JsonResponse({
-            'success': True,
-            'upload_id': str(chunked_upload.upload_id),
-            'status': chunked_upload.status,
-            'filename': chunked_upload.filename,
-            'total_size': chunked_upload.total_size,
-            'uploaded_size': chunked_upload.uploaded_size,
-            'chunks_received': chunked_upload.chunks_received,
-            'total_chunks': chunked_upload.total_chunks,
-            'progress': chunked_upload.get_progress_percent(),
-            'is_complete': chunked_upload.is_complete(),
-            'video_id': chunked_upload.video.id if chunked_upload.video else None,
-            'error_message': chunked_upload.error_message
-        })
+        return JsonResponse(_chunked_upload_status_data(chunked_upload))
 
     except ChunkedUpload.DoesNotExist:
         return JsonResponse({
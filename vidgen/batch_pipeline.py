@@ -0,0 +1,247 @@
+"""
+Pipelined Batch-Scheduler für VidGen
+
+Statt jedes Projekt strikt nacheinander durch Skript -> Audio -> Clips ->
+Render zu schicken, laufen die Stufen überlappend: während Projekt N
+rendert, entstehen bereits Skript und Vertonung für Projekt N+1.
+Jede Stufe hat eine eigene Parallelitätsgrenze (LLM/TTS vertragen mehrere
+gleichzeitige Requests, der lokale Remotion-Render nutzt dagegen ein
+gemeinsames public/-Verzeichnis und darf nur einmal gleichzeitig laufen).
+
+Grenzen überschreibbar über settings.VIDGEN_STAGE_LIMITS, z.B.
+    VIDGEN_STAGE_LIMITS = {'script': 6, 'render': 2}
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('script', 'audio', 'clips', 'render')
+
+DEFAULT_STAGE_LIMITS = {
+    'script': 4,   # GPT-Skripte
+    'audio': 3,    # TTS + Whisper
+    'clips': 3,    # Pexels (intern nochmals parallel)
+    'render': 1,   # lokaler Remotion-Render: gemeinsames public/-Verzeichnis
+}
+# Modal rendert in isolierten Containern – dort darf parallel gerendert werden
+MODAL_RENDER_LIMIT = 4
+
+REPORT_CACHE_TTL = 24 * 60 * 60
+
+
+def report_cache_key(batch_id):
+    return f'vidgen:batch_pipeline:{batch_id}'
+
+
+class StageStats:
+    """Durchsatz-Statistik einer Pipeline-Stufe"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, started, ended, ok):
+        with self._lock:
+            self.busy_seconds += ended - started
+            self.first_start = started if self.first_start is None else min(self.first_start, started)
+            self.last_end = ended if self.last_end is None else max(self.last_end, ended)
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def as_dict(self):
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        items = self.done + self.failed
+        return {
+            'limit': self.limit,
+            'done': self.done,
+            'failed': self.failed,
+            'busy_seconds': round(self.busy_seconds, 1),
+            'wall_seconds': round(wall, 1),
+            'avg_seconds': round(self.busy_seconds / items, 1) if items else 0,
+            'per_minute': round(items / wall * 60, 2) if wall else 0,
+            # Auslastung der Stufe relativ zu ihrer Parallelitätsgrenze
+            'utilization': round(self.busy_seconds / (wall * self.limit), 2) if wall else 0,
+        }
+
+
+def _set_status(project, status, progress):
+    project.status = status
+    project.progress = progress
+    project.save(update_fields=['status', 'progress', 'updated_at'])
+
+
+def _stage_script(project, state):
+    from .tasks import generate_script
+    _set_status(project, 'script', 10)
+    generate_script(project)
+
+
+def _stage_audio(project, state):
+    from .tasks import generate_audio
+    _set_status(project, 'audio', 30)
+    state['audio_path'], state['duration'] = generate_audio(project)
+
+
+def _stage_clips(project, state):
+    from .tasks import fetch_pexels_clips_smart
+    _set_status(project, 'clips', 50)
+    state['clips'] = fetch_pexels_clips_smart(project, state['duration'])
+
+
+def _stage_render(project, state):
+    from .tasks import render_video, compress_video, save_to_videos_app
+    _set_status(project, 'rendering', 70)
+    video_path = render_video(project, state['audio_path'], state['clips'], state['duration'])
+    _set_status(project, 'compressing', 90)
+    final_path = compress_video(video_path)
+    save_to_videos_app(project, final_path)
+    project.status = 'done'
+    project.progress = 100
+    project.completed_at = timezone.now()
+    project.calculate_total_cost()
+    project.save()
+
+
+STAGE_RUNNERS = {
+    'script': _stage_script,
+    'audio': _stage_audio,
+    'clips': _stage_clips,
+    'render': _stage_render,
+}
+
+
+class BatchPipeline:
+    """
+    Führt mehrere VideoProjects überlappend durch die Stufen aus STAGES.
+
+    Verwendung:
+        report = BatchPipeline(projects).run()
+    """
+
+    def __init__(self, projects, limits=None, batch_id=None):
+        self.projects = list(projects)
+        self.batch_id = batch_id
+        self.limits = dict(DEFAULT_STAGE_LIMITS)
+        if self.projects and all(getattr(p, 'render_backend', 'local') == 'modal' for p in self.projects):
+            self.limits['render'] = MODAL_RENDER_LIMIT
+        self.limits.update(getattr(settings, 'VIDGEN_STAGE_LIMITS', {}) or {})
+        self.limits.update(limits or {})
+        self.stats = {s: StageStats(s, max(1, int(self.limits[s]))) for s in STAGES}
+        self._executors = {}
+        self._remaining = len(self.projects)
+        self._remaining_lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def run(self):
+        started = time.monotonic()
+        if not self.projects:
+            return self._report(started)
+
+        self._executors = {
+            s: ThreadPoolExecutor(max_workers=self.stats[s].limit, thread_name_prefix=f'vidgen-{s}')
+            for s in STAGES
+        }
+        try:
+            for project in self.projects:
+                self._submit(project, {}, 0)
+            self._finished.wait()
+        except BaseException:
+            # z.B. SoftTimeLimitExceeded: nicht auf laufende Stufen warten,
+            # wartende Stufen verwerfen
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        return self._report(started)
+
+    def _submit(self, project, state, stage_index):
+        stage = STAGES[stage_index]
+        self._executors[stage].submit(self._run_stage, project, state, stage_index)
+
+    def _claim(self, project):
+        """Übernimmt ein 'pending'-Projekt; False, wenn es schon woanders läuft."""
+        return type(project).objects.filter(pk=project.pk, status='pending').update(
+            status='script', progress=10, updated_at=timezone.now(),
+        ) == 1
+
+    def _run_stage(self, project, state, stage_index):
+        stage = STAGES[stage_index]
+        if stage_index == 0 and not self._claim(project):
+            self._project_finished(project)
+            return
+        t0 = time.monotonic()
+        ok = False
+        try:
+            STAGE_RUNNERS[stage](project, state)
+            ok = True
+        except Exception as e:
+            logger.exception(f"VidGen-Pipeline: Stufe '{stage}' fehlgeschlagen für Projekt {project.id}")
+            try:
+                project.status = 'failed'
+                project.error_message = str(e) or type(e).__name__
+                project.save(update_fields=['status', 'error_message', 'updated_at'])
+            except Exception:
+                logger.exception('VidGen-Pipeline: Fehlerstatus nicht speicherbar')
+        finally:
+            self.stats[stage].record(t0, time.monotonic(), ok)
+            close_old_connections()
+
+        if ok and stage_index + 1 < len(STAGES):
+            self._submit(project, state, stage_index + 1)
+        else:
+            self._project_finished(project)
+
+    def _project_finished(self, project):
+        if project.batch_id:
+            try:
+                project.batch.update_progress()
+            except Exception:
+                logger.exception('VidGen-Pipeline: Batch-Fortschritt nicht aktualisierbar')
+        with self._remaining_lock:
+            self._remaining -= 1
+            done = self._remaining <= 0
+        if self.batch_id:
+            cache.set(report_cache_key(self.batch_id), self._report(None), REPORT_CACHE_TTL)
+        if done:
+            self._finished.set()
+
+    def _report(self, started):
+        report = {
+            'projects': len(self.projects),
+            'stages': {s: self.stats[s].as_dict() for s in STAGES},
+        }
+        if started is not None:
+            wall = time.monotonic() - started
+            serial = sum(self.stats[s].busy_seconds for s in STAGES)
+            report['wall_seconds'] = round(wall, 1)
+            report['serial_seconds'] = round(serial, 1)
+            report['speedup'] = round(serial / wall, 2) if wall else 0
+        return report
+
+
+def run_batch(batch, projects):
+    """Startet die Pipeline für einen BatchJob und speichert den Durchsatz-Report."""
+    pipeline = BatchPipeline(projects, batch_id=batch.id)
+    report = pipeline.run()
+    cache.set(report_cache_key(batch.id), report, REPORT_CACHE_TTL)
+    logger.info(f"VidGen-Batch {batch.id}: {report.get('wall_seconds')}s Wandzeit, "
+                f"Speedup {report.get('speedup')}x, Stufen: {report['stages']}")
+    return report
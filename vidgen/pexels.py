@@ -0,0 +1,293 @@
+"""
+Pexels-Clip-Beschaffung für VidGen
+
+Sucht und lädt Stock-Clips parallel über eine gemeinsame HTTP-Session
+(Keep-Alive, Timeouts, Retries). Suchergebnisse werden pro Suchbegriff
+gecacht, heruntergeladene Videos landen in einer inhaltsadressierten
+Clip-Bibliothek unter MEDIA_ROOT/vidgen/clip_library/:
+
+    clip_library/<sha256[:2]>/<sha256>.mp4      # Inhalt (dedupliziert)
+    clip_library/pexels/<video_id>_<file_id>.mp4  # Symlink -> Inhalt
+
+Wiederholte Suchbegriffe über Projekte und Batches hinweg laden so
+weder Suchergebnisse noch Videodateien erneut.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+PEXELS_SEARCH_URL = 'https://api.pexels.com/videos/search'
+SEARCH_TIMEOUT = (5, 20)        # (connect, read) Sekunden
+DOWNLOAD_TIMEOUT = (5, 120)
+SEARCH_CACHE_TTL = 6 * 60 * 60  # Suchergebnisse 6 Stunden wiederverwenden
+MAX_WORKERS = 6
+DOWNLOAD_CHUNK = 256 * 1024
+LIBRARY_DIR = 'vidgen/clip_library'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Gemeinsame requests.Session mit Connection-Pool für alle Worker-Threads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=2, backoff_factor=0.5,
+                          status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset(['GET']))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS * 2, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+def _search_cache_key(params):
+    raw = json.dumps(params, sort_keys=True)
+    return 'vidgen:pexels:search:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def search_videos(api_key, query, orientation='portrait', size=None, per_page=5):
+    """
+    Sucht Videos bei Pexels (gecacht pro Suchbegriff + Parameter).
+
+    Returns:
+        Liste der Pexels-Video-Objekte (leer bei Fehler – Fehler werden nicht gecacht)
+    """
+    params = {'query': query.strip().lower(), 'orientation': orientation, 'per_page': per_page}
+    if size:
+        params['size'] = size
+    key = _search_cache_key(params)
+    videos = cache.get(key)
+    if videos is not None:
+        return videos
+
+    try:
+        response = get_session().get(
+            PEXELS_SEARCH_URL,
+            headers={'Authorization': api_key},
+            params=params,
+            timeout=SEARCH_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Pexels-Suche fehlgeschlagen für '{query}': {e}")
+        return []
+
+    if response.status_code != 200:
+        logger.warning(f"Pexels API Fehler für '{query}': {response.status_code}")
+        return []
+
+    videos = response.json().get('videos', [])
+    cache.set(key, videos, SEARCH_CACHE_TTL)
+    return videos
+
+
+def pick_video_file(video, min_height=1080):
+    """Wählt die erste Datei >= min_height, sonst die höchste verfügbare Auflösung."""
+    files = sorted(video.get('video_files', []), key=lambda x: x.get('height') or 0, reverse=True)
+    if not files:
+        return None
+    for vf in files:
+        if (vf.get('height') or 0) >= min_height:
+            return vf
+    return files[0]
+
+
+def _library_root():
+    return os.path.join(settings.MEDIA_ROOT, LIBRARY_DIR)
+
+
+def _index_path(video_id, file_id):
+    return os.path.join(_library_root(), 'pexels', f'{video_id}_{file_id}.mp4')
+
+
+def _existing_clip_path(video_id, file_id):
+    """Lokale Kopie aus Bibliothek oder früheren PexelsClip-Datensätzen."""
+    index = _index_path(video_id, file_id)
+    if os.path.exists(index):
+        return os.path.realpath(index)
+
+    from .models import PexelsClip
+    for clip in PexelsClip.objects.filter(pexels_id=str(video_id)).exclude(video_file='').only('video_file')[:5]:
+        try:
+            path = clip.video_file.path
+        except (NotImplementedError, ValueError):
+            continue
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            return path
+    return None
+
+
+def download_clip(video, video_file):
+    """
+    Lädt eine Pexels-Videodatei in die Clip-Bibliothek (oder nutzt die vorhandene).
+
+    Returns:
+        Absoluter Pfad der lokalen Datei
+    """
+    video_id = video['id']
+    file_id = video_file.get('id') or hashlib.sha1(video_file['link'].encode()).hexdigest()[:12]
+    existing = _existing_clip_path(video_id, file_id)
+    if existing:
+        return existing
+
+    root = _library_root()
+    os.makedirs(os.path.join(root, 'pexels'), exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=root)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            with get_session().get(video_file['link'], stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                    fh.write(chunk)
+                    digest.update(chunk)
+
+        sha = digest.hexdigest()
+        content_path = os.path.join(root, sha[:2], f'{sha}.mp4')
+        os.makedirs(os.path.dirname(content_path), exist_ok=True)
+        if os.path.exists(content_path):
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, content_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    index = _index_path(video_id, file_id)
+    try:
+        os.symlink(content_path, index)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        logger.debug(f"Bibliotheks-Index nicht anlegbar ({index}): {e}")
+    return content_path
+
+
+def library_relative_name(path):
+    """Pfad relativ zu MEDIA_ROOT (für FileField.name), falls in der Bibliothek."""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    real = os.path.realpath(path)
+    if real.startswith(media_root + os.sep):
+        return os.path.relpath(real, media_root)
+    return None
+
+
+def acquire_clips(api_key, keywords, orientation='portrait', size='medium', per_page=5,
+                  fallback_query='professional work', min_height=1080, unique=True,
+                  max_workers=MAX_WORKERS):
+    """
+    Beschafft je Suchbegriff einen Clip: Suchen und Downloads laufen parallel,
+    die Auswahl (keine doppelten Videos, Fallback-Suche) bleibt deterministisch
+    in Keyword-Reihenfolge.
+
+    Returns:
+        Liste von dicts (path, pexels_id, duration, width, height, keyword, index) –
+        Keywords ohne Treffer fehlen in der Liste, index ist die Keyword-Position.
+    """
+    queries = list(dict.fromkeys(k for k in keywords if k))
+    workers = max(1, min(max_workers, len(queries) or 1))
+
+    # 1) Alle Suchen parallel (Cache-Treffer kosten keinen Request)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(queries, pool.map(
+            lambda q: search_videos(api_key, q, orientation=orientation, size=size, per_page=per_page),
+            queries)))
+
+    # 2) Auswahl in Keyword-Reihenfolge
+    used_video_ids = set()
+    selections = []
+    for index, keyword in enumerate(keywords):
+        videos = results.get(keyword) or []
+        selected = None
+        for video in videos:
+            if not unique or video['id'] not in used_video_ids:
+                selected = video
+                break
+        if not selected and videos:
+            selected = videos[0]  # Fallback: Duplikat statt Lücke
+        if not selected and fallback_query:
+            fallback = search_videos(api_key, fallback_query, orientation=orientation, per_page=3)
+            selected = fallback[0] if fallback else None
+        if not selected:
+            continue
+        best_file = pick_video_file(selected, min_height=min_height)
+        if not best_file:
+            continue
+        used_video_ids.add(selected['id'])
+        selections.append((index, keyword, selected, best_file))
+
+    # 3) Downloads parallel, gleiche Dateien nur einmal
+    pending = {}
+    for _, _, video, vf in selections:
+        pending.setdefault((video['id'], vf.get('id') or vf.get('link')), (video, vf))
+
+    def _fetch(item):
+        video, vf = item
+        try:
+            return download_clip(video, vf)
+        except Exception as e:
+            logger.warning(f"Pexels-Download fehlgeschlagen (Video {video['id']}): {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending) or 1))) as pool:
+        paths = dict(zip(pending.keys(), pool.map(_fetch, pending.values())))
+
+    clips = []
+    for index, keyword, video, vf in selections:
+        path = paths.get((video['id'], vf.get('id') or vf.get('link')))
+        if not path:
+            continue
+        clips.append({
+            'path': path,
+            'pexels_id': str(video['id']),
+            'duration': video.get('duration', 10),
+            'width': vf.get('width') or video.get('width', 1080),
+            'height': vf.get('height') or video.get('height', 1920),
+            'keyword': keyword,
+            'index': index,
+        })
+    return clips
+
+
+def save_clip_record(project, clip, order):
+    """
+    Legt einen PexelsClip-Datensatz an, der direkt auf die Bibliotheksdatei
+    zeigt (kein erneutes Kopieren in upload_to).
+    """
+    from django.core.files import File
+    from .models import PexelsClip
+
+    record = PexelsClip(
+        project=project,
+        pexels_id=clip['pexels_id'],
+        search_query=clip['keyword'][:200],
+        duration=clip.get('duration') or 0,
+        width=clip.get('width') or 0,
+        height=clip.get('height') or 0,
+        order=order,
+    )
+    name = library_relative_name(clip['path'])
+    if name:
+        record.video_file.name = name
+        record.save()
+    else:
+        with open(clip['path'], 'rb') as f:
+            record.video_file.save(f'clip_{project.id}_{order}.mp4', File(f), save=True)
+    return record
@@ -2,7 +2,6 @@ import os
 import json
 import subprocess
 import tempfile
-import requests
 from decimal import Decimal
 from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
@@ -577,17 +576,19 @@ fire station"""
 
 
 def fetch_pexels_clips_smart(project, duration):
-    """Holt thematisch passende Clips von Pexels basierend auf Skript-Inhalt"""
-    from .models import PexelsClip
-    
+    """Holt thematisch passende Clips von Pexels basierend auf Skript-Inhalt.
+
+    Suchen und Downloads laufen parallel über vidgen.pexels; bereits
+    bekannte Suchbegriffe und Videos kommen aus Cache bzw. Clip-Bibliothek.
+    """
+    from .pexels import acquire_clips
+
     user = project.user
     api_key = getattr(user, 'pexels_api_key', None)
     
     if not api_key:
         raise ValueError("Kein Pexels API-Key hinterlegt")
     
-    headers = {'Authorization': api_key}
-    
     # Anzahl benötigter Clips berechnen (4 Sek pro Clip)
     num_clips_needed = max(5, (int(duration) // 4) + 2)
     
@@ -597,93 +598,9 @@ def fetch_pexels_clips_smart(project, duration):
     
     print(f"Smart Keywords: {keywords}")
     
-    temp_dir = tempfile.mkdtemp()
-    clips = []
-    used_video_ids = set()  # Vermeidet Duplikate
-    
-    for i, keyword in enumerate(keywords):
-        # Pexels API aufrufen
-        response = requests.get(
-            'https://api.pexels.com/videos/search',
-            headers=headers,
-            params={
-                'query': keyword,
-                'orientation': 'portrait',
-                'size': 'medium',
-                'per_page': 5
-            }
-        )
-        
-        if response.status_code != 200:
-            print(f"Pexels API Fehler für '{keyword}': {response.status_code}")
-            continue
-        
-        videos = response.json().get('videos', [])
-        
-        # Finde ein Video das noch nicht verwendet wurde
-        selected_video = None
-        for video in videos:
-            if video['id'] not in used_video_ids:
-                selected_video = video
-                used_video_ids.add(video['id'])
-                break
-        
-        if not selected_video:
-            # Fallback: erstes Video nehmen auch wenn Duplikat
-            if videos:
-                selected_video = videos[0]
-            else:
-                # Generische Suche als Fallback
-                fallback_response = requests.get(
-                    'https://api.pexels.com/videos/search',
-                    headers=headers,
-                    params={
-                        'query': 'professional work',
-                        'orientation': 'portrait',
-                        'per_page': 3
-                    }
-                )
-                fallback_videos = fallback_response.json().get('videos', [])
-                if fallback_videos:
-                    selected_video = fallback_videos[0]
-        
-        if not selected_video:
-            continue
-        
-        # Beste Qualität finden
-        video_files = sorted(
-            selected_video['video_files'],
-            key=lambda x: x.get('height', 0),
-            reverse=True
-        )
-        
-        best_file = None
-        for vf in video_files:
-            if vf.get('height', 0) >= 1080:
-                best_file = vf
-                break
-        
-        if not best_file:
-            best_file = video_files[0]
-        
-        # Download
-        clip_path = os.path.join(temp_dir, f'clip{i+1}.mp4')
-        clip_response = requests.get(best_file['link'], stream=True)
-        
-        with open(clip_path, 'wb') as f:
-            for chunk in clip_response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        clips.append({
-            'path': clip_path,
-            'pexels_id': str(selected_video['id']),
-            'duration': selected_video.get('duration', 10),
-            'width': best_file.get('width', 1080),
-            'height': best_file.get('height', 1920),
-            'keyword': keyword  # Für Debugging
-        })
-        
-        print(f"Clip {i+1}: '{keyword}' -> Video {selected_video['id']}")
+    clips = acquire_clips(api_key, keywords, orientation='portrait', size='medium', per_page=5)
+    for i, clip in enumerate(clips):
+        print(f"Clip {i+1}: '{clip['keyword']}' -> Video {clip['pexels_id']}")
     
     return clips
 
@@ -974,34 +891,94 @@ def cleanup_stale_videos():
     return f'Cleaned up {count} stale videos'
 
 
+# Zeitbudget je Projekt für den Pipeline-Task; das Zeitlimit des Tasks
+# wächst mit der Zahl offener Projekte des Batches
+BATCH_PROJECT_SECONDS = 1800
+
+
 @shared_task
 def process_batch(batch_id):
-    """Verarbeitet einen Batch von Videos"""
-    from .models import VideoBatch, VideoProject
-    
-    batch = VideoBatch.objects.get(id=batch_id)
-    keywords = batch.get_keywords_list()
-    
-    for i, keyword in enumerate(keywords):
-        # Projekt für jedes Keyword erstellen
-        project = VideoProject.objects.create(
-            user=batch.user,
-            batch=batch,
-            title=keyword,
-            template=batch.template,
-            platform=batch.platform,
-            voice=batch.voice,
-            title_position=batch.title_position,
-            target_duration=batch.target_duration,
-            resolution=getattr(batch, 'resolution', '1080p'),
-            custom_script=batch.custom_script,
-            watermark=batch.watermark,
-        )
-        
-        # Video generieren
-        generate_video.delay(str(project.id))
+    """Verarbeitet einen Batch von Videos.
+
+    Legt die Projekte an (bei erneutem Aufruf werden die vorhandenen
+    wiederverwendet) und startet einen process_batch_pipeline-Task für alle
+    offenen Projekte. Dort laufen sie überlappend durch
+    Skript/Audio/Clips/Render (siehe vidgen.batch_pipeline).
+    """
+    from django.db import transaction
+    from .models import BatchJob, VideoProject
+    
+    with transaction.atomic():
+        batch = BatchJob.objects.select_for_update().get(id=batch_id)
+        projects = list(batch.projects.order_by('created_at'))
+        if not projects:
+            for keyword in batch.get_keywords_list():
+                # Projekt für jedes Keyword erstellen
+                projects.append(VideoProject.objects.create(
+                    user=batch.user,
+                    batch=batch,
+                    title=keyword,
+                    template=batch.template,
+                    platform=batch.platform,
+                    voice=batch.voice,
+                    title_position=getattr(batch, 'title_position', 'top'),
+                    target_duration=getattr(batch, 'target_duration', 45),
+                    resolution=getattr(batch, 'resolution', '1080p'),
+                    render_backend=getattr(batch, 'render_backend', 'local'),
+                    custom_script=getattr(batch, 'custom_script', ''),
+                    watermark=batch.watermark,
+                ))
+        batch.total_count = len(projects)
+        batch.status = 'processing'
+        batch.save(update_fields=['total_count', 'status', 'updated_at'])
+    
+    pending = sum(1 for p in projects if p.status == 'pending')
+    if pending:
+        _dispatch_batch_pipeline(batch_id, pending)
+    
+    return f'Batch {batch_id}: {pending} videos queued'
+
+
+def _dispatch_batch_pipeline(batch_id, project_count):
+    soft_limit = BATCH_PROJECT_SECONDS * max(1, project_count)
+    process_batch_pipeline.apply_async(
+        (str(batch_id),), soft_time_limit=soft_limit, time_limit=soft_limit + 60,
+    )
+
+
+@shared_task(acks_late=False)
+def process_batch_pipeline(batch_id):
+    """Alle offenen Projekte eines Batches in einer gemeinsamen Pipeline.
+
+    Ein Projekt wird erst beim Start seiner Skript-Stufe von 'pending'
+    übernommen. Läuft das Zeitlimit ab, scheitern nur die bereits
+    begonnenen Projekte; die noch nicht gestarteten bleiben 'pending' und
+    laufen in einem Folge-Task weiter. acks_late ist aus, weil der Broker
+    einen stundenlang unbestätigten Task sonst ein zweites Mal zustellt.
+    """
+    from .models import BatchJob, VideoProject
+    from .batch_pipeline import run_batch
     
-    return f'Batch {batch_id}: {len(keywords)} videos queued'
+    batch = BatchJob.objects.get(id=batch_id)
+    projects = list(batch.projects.filter(status='pending').order_by('created_at'))
+    if not projects:
+        return {'batch_id': str(batch_id), 'videos': 0}
+    
+    try:
+        report = run_batch(batch, projects)
+    except SoftTimeLimitExceeded:
+        ids = [p.id for p in projects]
+        VideoProject.objects.filter(id__in=ids).exclude(status__in=['pending', 'done', 'failed']).update(
+            status='failed',
+            error_message='Task Timeout: Batch dauerte zu lange. Bitte mit kürzerer Dauer oder 720p erneut versuchen.',
+            updated_at=timezone.now(),
+        )
+        remaining = VideoProject.objects.filter(id__in=ids, status='pending').count()
+        if remaining:
+            _dispatch_batch_pipeline(batch_id, remaining)
+        batch.update_progress()
+        raise
+    return {'batch_id': str(batch_id), 'videos': len(projects), 'pipeline': report}
 
 
 # ============================================
@@ -1110,10 +1087,7 @@ def generate_audio_only(project):
 
 def fetch_clips_only(project, custom_keywords=None):
     """Nur Clips suchen - für manuellen Workflow"""
-    from .models import PexelsClip
-    import requests
-    import tempfile
-    import os
+    from .pexels import acquire_clips, save_clip_record
     
     user = project.user
     api_key = getattr(user, 'pexels_api_key', None)
@@ -1134,138 +1108,58 @@ def fetch_clips_only(project, custom_keywords=None):
             user=user
         )
     
-    headers = {'Authorization': api_key}
-    clips = []
-    
-    for i, keyword in enumerate(keywords[:12]):
-        response = requests.get(
-            'https://api.pexels.com/videos/search',
-            headers=headers,
-            params={'query': keyword, 'per_page': 5, 'orientation': 'portrait'}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('videos'):
-                video = data['videos'][0]
-                
-                # Beste Qualität finden
-                video_files = sorted(
-                    video.get('video_files', []),
-                    key=lambda x: x.get('height', 0),
-                    reverse=True
-                )
-                
-                if video_files:
-                    video_url = video_files[0].get('link')
-                    
-                    # Video herunterladen
-                    temp_dir = tempfile.mkdtemp()
-                    clip_path = os.path.join(temp_dir, f'clip_{i}.mp4')
-                    
-                    video_response = requests.get(video_url)
-                    with open(clip_path, 'wb') as f:
-                        f.write(video_response.content)
-                    
-                    # In DB speichern
-                    from django.core.files import File
-                    clip = PexelsClip.objects.create(
-                        project=project,
-                        pexels_id=str(video['id']),
-                        search_query=keyword,
-                        duration=video.get('duration', 0),
-                        width=video.get('width', 0),
-                        height=video.get('height', 0),
-                        order=i
-                    )
-                    with open(clip_path, 'rb') as f:
-                        clip.video_file.save(f'clip_{project.id}_{i}.mp4', File(f))
-                    clip.save()
-                    clips.append(clip)
-    
-    return clips
+    # Erstes Suchergebnis je Keyword in höchster Auflösung (parallel + gecacht)
+    acquired = acquire_clips(api_key, keywords[:12], orientation='portrait', per_page=5,
+                             fallback_query=None, min_height=0, unique=False)
+    return [save_clip_record(project, clip, clip['index']) for clip in acquired]
 
 
 def search_single_clip(project, clip_index, keyword):
     """Einzelnen Clip neu suchen - gibt ANDERES Video zurück"""
-    from .models import PexelsClip
-    import requests
-    import tempfile
-    import os
     import random
+    from .pexels import search_videos, pick_video_file, download_clip, save_clip_record
     
     user = project.user
     api_key = getattr(user, 'pexels_api_key', None)
     if not api_key:
         raise ValueError("Kein Pexels API Key hinterlegt")
     
-    headers = {'Authorization': api_key}
-    
     # Alte pexels_id holen (falls vorhanden)
     old_clip = project.clips.filter(order=clip_index).first()
     old_pexels_id = old_clip.pexels_id if old_clip else None
     
-    response = requests.get(
-        'https://api.pexels.com/videos/search',
-        headers=headers,
-        params={'query': keyword, 'per_page': 15, 'orientation': 'portrait'}  # Mehr Videos holen
-    )
-    
-    if response.status_code != 200:
-        raise ValueError(f"Pexels API Fehler: {response.status_code}")
-    
-    data = response.json()
-    if not data.get('videos'):
+    videos = search_videos(api_key, keyword, orientation='portrait', per_page=15)  # Mehr Videos holen
+    if not videos:
         raise ValueError(f"Keine Videos gefunden für: {keyword}")
     
     # Versuche ein ANDERES Video zu finden
-    videos = data['videos']
-    available_videos = [v for v in videos if v['id'] != old_pexels_id]
+    available_videos = [v for v in videos if str(v['id']) != old_pexels_id]
     
     if available_videos:
         video = random.choice(available_videos)  # Zufälliges ANDERES Video
     else:
         video = videos[0]  # Fallback: erstes Video
-    video_files = sorted(
-        video.get('video_files', []),
-        key=lambda x: x.get('height', 0),
-        reverse=True
-    )
     
-    if not video_files:
+    video_file = pick_video_file(video, min_height=0)
+    if not video_file:
         raise ValueError("Keine Video-Dateien verfügbar")
     
-    video_url = video_files[0].get('link')
+    # Video aus Bibliothek oder per Download
+    clip_path = download_clip(video, video_file)
     
-    # Video herunterladen
-    temp_dir = tempfile.mkdtemp()
-    clip_path = os.path.join(temp_dir, f'clip_{clip_index}.mp4')
-    
-    video_response = requests.get(video_url)
-    with open(clip_path, 'wb') as f:
-        f.write(video_response.content)
-    
-    # Alten Clip löschen oder aktualisieren
-    old_clip = project.clips.filter(order=clip_index).first()
+    # Alten Clip löschen
     if old_clip:
         old_clip.delete()
     
     # Neuen Clip speichern
-    from django.core.files import File
-    clip = PexelsClip.objects.create(
-        project=project,
-        pexels_id=str(video['id']),
-        search_query=keyword,
-        duration=video.get('duration', 0),
-        width=video.get('width', 0),
-        height=video.get('height', 0),
-        order=clip_index
-    )
-    with open(clip_path, 'rb') as f:
-        clip.video_file.save(f'clip_{project.id}_{clip_index}.mp4', File(f))
-    clip.save()
-    
-    return clip
+    return save_clip_record(project, {
+        'path': clip_path,
+        'pexels_id': str(video['id']),
+        'keyword': keyword,
+        'duration': video.get('duration', 0),
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+    }, clip_index)
 
 
 @shared_task
@@ -1,6 +1,5 @@
 import io
 import json
-import subprocess
 from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
@@ -33,15 +32,9 @@ def _is_superuser(u):
 
 
 def _probe_duration(path):
-    """Audiolaenge in Sekunden via ffprobe; 0 wenn nicht ermittelbar."""
-    try:
-        out = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'default=noprint_wrappers=1:nokey=1', path],
-            capture_output=True, text=True, timeout=20)
-        return int(float(out.stdout.strip()))
-    except Exception:
-        return 0
+    """Audiolaenge in Sekunden via ffprobe; 0 wenn nicht ermittelbar (gecacht)."""
+    from core.media_probe import probe_duration
+    return probe_duration(path)
 
 
 def _abs(request, path):